@@ -0,0 +1,178 @@
+"""
+Адаптивный предел одновременных запросов (service.resilience.AdaptiveLimit) на имитации API,
+емкость которой меняется со временем. Имитация обрабатывает capacity запросов одновременно
+за service_time; сверх емкости задержка растет пропорционально нагрузке, а при нагрузке больше
+capacity × --overload запрос сразу получает 503. Фазы (--phases, секунды:емкость:время ответа)
+по умолчанию: норма, API замедлилось и сузилось, восстановление.
+
+--readers и --writers клиентов без пауз запрашивают информацию о заявке (чтение)
+и отмену заявки (запись) — спрос заведомо больше емкости. Режимы:
+
+    fixed:N    постоянный предел N на вид запроса (как пул соединений с max_connections=N)
+    adaptive   ConcurrencyLimiter с пределами из настроек (READ_/WRITE_CONCURRENCY_*)
+
+Строка JSON на режим и фазу: успешные ответы и ошибки в секунду, p50/p99 задержки вызова
+(вместе с ожиданием в очереди предела) и средний предел чтения и записи.
+
+    python -m benchmarks.bench_adaptive_concurrency --modes fixed:100,fixed:16,adaptive
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.bench_suite import MOCK_HOST, percentile
+from benchmarks.mock_yandex import MockYandexAPI
+from service.http_client import ClientSettings, UpstreamClient
+from service.order_confirmation import GetInfoAboutDraft, OrderConfirmation
+from service.resilience import ConcurrencyLimiter, UpstreamPolicy
+from src import consts as c
+
+Phase = Tuple[float, int, float]
+
+
+class VaryingCapacityTransport(httpx.AsyncBaseTransport):
+    """
+    Имитация API с емкостью, меняющейся по фазам
+    phases: list - (длительность, емкость, время ответа без очереди) по порядку
+    overload: float - Нагрузка (доля емкости), сверх которой запросы получают 503
+    """
+    def __init__(self, api: MockYandexAPI, phases: List[Phase], overload: float, seed: int = 1):
+        self.api = api
+        self.phases = phases
+        self.overload = overload
+        self.active = 0
+        self.rejected = 0
+        self.started = time.perf_counter()
+        self._random = random.Random(seed)
+
+    def phase(self, moment: Optional[float] = None) -> int:
+        elapsed = (moment if moment is not None else time.perf_counter()) - self.started
+        for index, (duration, _, _) in enumerate(self.phases):
+            if elapsed < duration:
+                return index
+            elapsed -= duration
+        return len(self.phases) - 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        _, capacity, service_time = self.phases[self.phase()]
+        if self.active >= capacity * self.overload:
+            self.rejected += 1
+            await asyncio.sleep(service_time / 10)
+            return httpx.Response(503, request=request)
+        self.active += 1
+        try:
+            # Разделение емкости: сверх capacity запросы обслуживаются во столько раз медленнее
+            load = max(1.0, self.active / capacity)
+            await asyncio.sleep(service_time * load * self._random.lognormvariate(0, 0.2))
+        finally:
+            self.active -= 1
+        return self.api.handle(request)
+
+
+def make_policy(mode: str) -> UpstreamPolicy:
+    if mode == "adaptive":
+        concurrency = ConcurrencyLimiter.from_env()
+    else:
+        size = int(mode.split(":", 1)[1])
+        concurrency = ConcurrencyLimiter(
+            read=(size, size, size), write=(size, size, size), write_endpoints=c.UPSTREAM_WRITE_ENDPOINTS,
+            tolerance=float("inf"), backoff=1.0)
+    # Без повторов и автомата защиты: видна перегрузка, которую предел допускает или предотвращает
+    return UpstreamPolicy(failure_threshold=10 ** 9, concurrency=concurrency)
+
+
+async def run_mode(mode: str, args) -> List[dict]:
+    api = MockYandexAPI(pickup_points=0)
+    request_ids = api.seed_orders(1000)
+    transport = VaryingCapacityTransport(api, args.phases, args.overload)
+    policy = make_policy(mode)
+    settings = ClientSettings().model_copy(update={"max_connections": 1000, "max_keepalive_connections": 1000})
+    client = UpstreamClient("bench", MOCK_HOST, settings, transport=transport, policy=policy)
+    info = GetInfoAboutDraft("bench", MOCK_HOST, client=client)
+    confirmation = OrderConfirmation("bench", MOCK_HOST, client=client)
+    # Результаты по фазам: (вид, успех, задержка)
+    results: List[List[Tuple[str, bool, float]]] = [[] for _ in args.phases]
+    limits: List[Dict[str, List[int]]] = [{"read": [], "write": []} for _ in args.phases]
+    deadline = transport.started + sum(duration for duration, _, _ in args.phases)
+
+    async def worker(kind: str, offset: int):
+        index = offset
+        while time.perf_counter() < deadline:
+            request_id = request_ids[index % len(request_ids)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                if kind == "read":
+                    await info.get_info_about_draft(request_id=request_id)
+                else:
+                    await confirmation.cancel_order(request_id)
+                ok = True
+            except httpx.HTTPError:
+                ok = False
+            results[transport.phase(started)].append((kind, ok, time.perf_counter() - started))
+            if not ok:
+                await asyncio.sleep(args.error_pause)
+
+    async def sample_limits():
+        while time.perf_counter() < deadline:
+            phase = transport.phase()
+            read = policy.concurrency.limit(MOCK_HOST, "/request/info")
+            write = policy.concurrency.limit(MOCK_HOST, "/request/cancel")
+            limits[phase]["read"].append(int(read.limit))
+            limits[phase]["write"].append(int(write.limit))
+            await asyncio.sleep(0.05)
+
+    await asyncio.gather(
+        *(worker("read", offset * 7) for offset in range(args.readers)),
+        *(worker("write", offset * 13) for offset in range(args.writers)),
+        sample_limits())
+    await client.aclose()
+    rows = []
+    for phase, (duration, capacity, service_time) in enumerate(args.phases):
+        calls = results[phase]
+        latencies = sorted(latency for _, ok, latency in calls if ok)
+        succeeded = len(latencies)
+        rows.append({
+            "mode": mode,
+            "phase": phase,
+            "capacity": capacity,
+            "service_ms": round(service_time * 1000, 1),
+            "goodput_rps": round(succeeded / duration, 1),
+            "errors_per_s": round((len(calls) - succeeded) / duration, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "read_limit": round(sum(limits[phase]["read"]) / max(1, len(limits[phase]["read"])), 1),
+            "write_limit": round(sum(limits[phase]["write"]) / max(1, len(limits[phase]["write"])), 1),
+        })
+    return rows
+
+
+def parse_phases(value: str) -> List[Phase]:
+    phases = []
+    for item in value.split(","):
+        duration, capacity, service_time = item.split(":")
+        phases.append((float(duration), int(capacity), float(service_time)))
+    return phases
+
+
+async def main(args):
+    for mode in (mode.strip() for mode in args.modes.split(",")):
+        for row in await run_mode(mode, args):
+            print(json.dumps(row, ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="fixed:100,fixed:16,adaptive")
+    parser.add_argument("--phases", type=parse_phases, default=parse_phases("4:60:0.02,4:15:0.06,4:60:0.02"),
+                        help="Фазы длительность:емкость:время ответа через запятую")
+    parser.add_argument("--overload", type=float, default=2.0, help="Нагрузка в долях емкости, сверх которой 503")
+    parser.add_argument("--readers", type=int, default=150)
+    parser.add_argument("--writers", type=int, default=30)
+    parser.add_argument("--error-pause", type=float, default=0.01, help="Пауза клиента после ошибки, секунды")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""
+Агрегация корзины: цикл Python по строкам против service.cart.Cart (NumPy).
+Считаются итоги (вес, объем, объемный вес, границы габаритов), места по place_barcode
+и раскладка по весу; перед замером проверяется, что результаты совпадают.
+
+    python -m benchmarks.bench_cart --sizes 10,1000,10000 --repeat 20
+"""
+import argparse
+import json
+import math
+import random
+import time
+from typing import Dict, List
+
+from service.cart import Cart
+from src import consts as c
+
+
+def make_items(size: int, seed: int = 1) -> List[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "article": f"ART-{index:06d}",
+            "billing_details": {"assessed_unit_price": 100000, "unit_price": 99900, "nds": 20},
+            "count": rng.randint(1, 5),
+            "name": f"Товар {index}",
+            "place_barcode": f"BOX-{rng.randrange(max(1, size // 20))}",
+            "physical_dims": {
+                "dx": rng.randint(1, 60), "dy": rng.randint(1, 40), "dz": rng.randint(1, 30),
+                "weight_gross": rng.randint(50, 5000)},
+        }
+        for index in range(size)
+    ]
+
+
+def python_summary(items: List[dict]) -> dict:
+    total_weight = volume = units = 0
+    low, high = [math.inf] * 3, [0] * 3
+    for item in items:
+        dims = item["physical_dims"]
+        sides = sorted((dims["dx"], dims["dy"], dims["dz"]), reverse=True)
+        units += item["count"]
+        total_weight += dims["weight_gross"] * item["count"]
+        volume += sides[0] * sides[1] * sides[2] * item["count"]
+        low = [min(a, b) for a, b in zip(low, sides)]
+        high = [max(a, b) for a, b in zip(high, sides)]
+    volumetric_weight = math.ceil(volume * 1000 / c.CART_VOLUMETRIC_DIVISOR)
+    return {
+        "lines": len(items), "units": units, "total_weight": total_weight, "volume": volume,
+        "volumetric_weight": volumetric_weight, "chargeable_weight": max(total_weight, volumetric_weight),
+        "min_dims": tuple(low), "max_dims": tuple(high),
+    }
+
+
+def python_places(items: List[dict]) -> List[dict]:
+    places: Dict[str, dict] = {}
+    for item in items:
+        dims = item["physical_dims"]
+        sides = sorted((dims["dx"], dims["dy"], dims["dz"]), reverse=True)
+        place = places.setdefault(item["place_barcode"], {"dx": 0, "dy": 0, "dz": 0, "weight_gross": 0})
+        place["dx"] = max(place["dx"], sides[0])
+        place["dz"] = max(place["dz"], sides[1])
+        place["dy"] += sides[2] * item["count"]
+        place["weight_gross"] += dims["weight_gross"] * item["count"]
+    return [
+        {"barcode": barcode, "physical_dims": dims, "description": None} for barcode, dims in places.items()]
+
+
+def python_pack(items: List[dict], max_weight: int, prefix: str = "PLACE") -> tuple:
+    packed, places, current = [], [], None
+    for item in items:
+        dims = item["physical_dims"]
+        sides = sorted((dims["dx"], dims["dy"], dims["dz"]), reverse=True)
+        weight = dims["weight_gross"] * item["count"]
+        if current is None or current["weight_gross"] + weight > max_weight:
+            current = {"dx": 0, "dy": 0, "dz": 0, "weight_gross": 0}
+            places.append({"barcode": f"{prefix}-{len(places) + 1}", "physical_dims": current, "description": None})
+        current["dx"] = max(current["dx"], sides[0])
+        current["dz"] = max(current["dz"], sides[1])
+        current["dy"] += sides[2] * item["count"]
+        current["weight_gross"] += weight
+        packed.append({**item, "place_barcode": places[-1]["barcode"]})
+    return packed, places
+
+
+def _timeit(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def run(sizes: List[int], repeat: int) -> List[dict]:
+    rows = []
+    for size in sizes:
+        items = make_items(size)
+        cart = Cart(items)
+        assert cart.summary().as_dict() == python_summary(items), f"итоги для {size} строк различаются"
+        assert cart.group_places() == python_places(items), f"места для {size} строк различаются"
+        assert cart.pack() == python_pack(items, c.CART_MAX_PLACE_WEIGHT), f"раскладка для {size} строк различается"
+        cases = {
+            "summary": (lambda: python_summary(items), lambda: Cart(items).summary()),
+            "group_places": (lambda: python_places(items), lambda: Cart(items).group_places()),
+            "pack": (lambda: python_pack(items, c.CART_MAX_PLACE_WEIGHT), lambda: Cart(items).pack()),
+        }
+        for name, (reference, vectorized) in cases.items():
+            python_s = _timeit(reference, repeat)
+            numpy_s = _timeit(vectorized, repeat)
+            rows.append({
+                "case": name,
+                "lines": size,
+                "python_us": round(python_s * 1e6, 1),
+                "numpy_us": round(numpy_s * 1e6, 1),
+                "speedup": round(python_s / numpy_s, 2),
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,10000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    for row in run([int(size) for size in args.sizes.split(",")], args.repeat):
+        print(json.dumps(row, ensure_ascii=False))
@@ -0,0 +1,106 @@
+"""
+Дублирование медленных запросов чтения (service.resilience.HedgePolicy) на имитации API с тяжелым
+хвостом задержки: обычный ответ — логнормальный вокруг --latency, а доля --slow-share запросов
+задерживается еще на --stall (пауза сборщика мусора, медленная реплика). Задержки попыток
+независимы, поэтому дубль медленной попытки обычно отвечает быстро.
+
+Клиенты по очереди запрашивают актуальные сроки доставки (/request/tracking) и информацию
+о заявке (/request/info). Режимы:
+
+    off        без дублирования, как сейчас
+    pNN        дубль после перцентиля NN времени ответа эндпоинта, бюджет --budget
+
+Строка JSON на режим: p50/p95/p99 вызова, запросов к API на вызов (множитель нагрузки),
+доля дублей, доля побед дубля и отказов по бюджету.
+
+    python -m benchmarks.bench_hedging --modes off,p90,p95 --calls 4000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import random
+
+import httpx
+
+from benchmarks.bench_suite import MOCK_HOST, measure
+from benchmarks.mock_yandex import MockYandexAPI
+from service.http_client import ClientSettings, UpstreamClient
+from service.order_confirmation import GetInfoAboutDraft
+from service.resilience import HedgePolicy, UpstreamPolicy
+
+ENDPOINTS = frozenset({"/request/tracking", "/request/info"})
+
+
+class HeavyTailTransport(httpx.AsyncBaseTransport):
+    """
+    Имитация API, у которой доля запросов отвечает намного дольше остальных
+    """
+    def __init__(self, api: MockYandexAPI, latency: float, slow_share: float, stall: float, seed: int = 1):
+        self.api = api
+        self.latency = latency
+        self.slow_share = slow_share
+        self.stall = stall
+        self.requests = 0
+        self._random = random.Random(seed)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        delay = self.latency * self._random.lognormvariate(0, 0.3)
+        if self._random.random() < self.slow_share:
+            delay += self.stall
+        await asyncio.sleep(delay)
+        return self.api.handle(request)
+
+
+async def run_mode(mode: str, args) -> dict:
+    api = MockYandexAPI(pickup_points=0)
+    request_ids = api.seed_orders(1000)
+    transport = HeavyTailTransport(api, args.latency, args.slow_share, args.stall)
+    hedging = None
+    if mode != "off":
+        hedging = HedgePolicy(
+            ENDPOINTS, percentile=int(mode[1:]) / 100, budget=args.budget, burst=args.burst,
+            min_samples=args.min_samples)
+    client = UpstreamClient(
+        "bench", MOCK_HOST, ClientSettings(), transport=transport, policy=UpstreamPolicy(hedging=hedging))
+    info = GetInfoAboutDraft("bench", MOCK_HOST, client=client)
+
+    async def call(index: int):
+        request_id = request_ids[index % len(request_ids)]
+        if index % 2:
+            await info.get_info_about_draft(request_id=request_id)
+        else:
+            await info.up_to_date_shipping_information(request_id)
+
+    result = await measure(call, args.calls, args.concurrency)
+    await client.aclose()
+    row = {"mode": mode, **result, "upstream_per_call": round(transport.requests / args.calls, 3)}
+    if hedging is not None:
+        stats = hedging.snapshot()
+        requests = sum(item["requests"] for item in stats)
+        hedged = sum(item["hedged"] for item in stats)
+        row.update(
+            hedge_rate=round(hedged / requests, 4) if requests else 0.0,
+            win_rate=round(sum(item["wins"] for item in stats) / hedged, 4) if hedged else 0.0,
+            denied=sum(item["denied"] for item in stats),
+            delay_ms={item["endpoint"]: item["delay_ms"] for item in stats})
+    return row
+
+
+async def main(args):
+    for mode in (mode.strip() for mode in args.modes.split(",")):
+        print(json.dumps(await run_mode(mode, args), ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="off,p90,p95")
+    parser.add_argument("--calls", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.01, help="Обычное время ответа, секунды")
+    parser.add_argument("--slow-share", type=float, default=0.03, help="Доля медленных ответов")
+    parser.add_argument("--stall", type=float, default=0.2, help="Дополнительная задержка медленного ответа, секунды")
+    parser.add_argument("--budget", type=float, default=0.05, help="Доля дублей от числа запросов")
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--min-samples", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
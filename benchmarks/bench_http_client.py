@@ -0,0 +1,116 @@
+"""
+Сравнение клиента "новый httpx.AsyncClient на каждый вызов" с общим пулом UpstreamClient.
+
+Локальный мок-сервер на asyncio отвечает на любой запрос JSON-ом и на каждое
+новое TCP-соединение добавляет задержку, имитирующую TLS-рукопожатие.
+
+    python -m benchmarks.bench_http_client --requests 500 --concurrency 20 --handshake-ms 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from service.calculation_module import Calculate
+from service.http_client import ClientSettings, UpstreamClient
+
+RESPONSE_BODY = json.dumps({"delivery_days": 2, "pricing_total": "199 RUB"}).encode()
+
+
+class HandshakeServer():
+    """
+    Минимальный HTTP/1.1 keep-alive сервер с задержкой на установку соединения
+    """
+    def __init__(self, handshake_delay: float):
+        self.handshake_delay = handshake_delay
+        self.connections = 0
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        await asyncio.sleep(self.handshake_delay)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(RESPONSE_BODY)).encode() + b"\r\n\r\n" + RESPONSE_BODY)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+async def _run(service: Calculate, total: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await service.delivery_interval("station")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies
+
+
+def _summary(name: str, latencies: list[float], elapsed: float, connections: int) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "name": name,
+        "requests": len(ordered),
+        "connections": connections,
+        "elapsed_s": round(elapsed, 4),
+        "rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p99_ms": round(ordered[int(len(ordered) * 0.99) - 1] * 1000, 3),
+    }
+
+
+async def main(total: int, concurrency: int, handshake_ms: float) -> list[dict]:
+    results = []
+    for name in ("per_call_client", "pooled_client"):
+        server = HandshakeServer(handshake_ms / 1000)
+        base_url = await server.start()
+        client = None
+        if name == "pooled_client":
+            client = UpstreamClient("bench", base_url, ClientSettings(max_connections=concurrency))
+        service = Calculate("bench", base_url, client=client)
+        started = time.perf_counter()
+        latencies = await _run(service, total, concurrency)
+        elapsed = time.perf_counter() - started
+        if client is not None:
+            await client.aclose()
+        await server.stop()
+        results.append(_summary(name, latencies, elapsed, server.connections))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--handshake-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    for row in asyncio.run(main(args.requests, args.concurrency, args.handshake_ms)):
+        print(json.dumps(row))
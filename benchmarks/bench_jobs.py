@@ -0,0 +1,241 @@
+"""
+Журнал заданий (service.job_journal) на имитации API: подтверждения, отмены и редактирования заявок.
+--producers клиентов ставят задания пакетами по --submit-batch; замер идет от первой постановки
+до выполнения последнего задания. Режимы:
+
+    inline    операции вызываются напрямую, без журнала — как OrderConfirmation.confirm_order сейчас
+    memory    журнал без файла: очередь и исполнители без записи на диск
+    sqlite    журнал в SQLite; для каждого --commit-intervals (секунды сбора пакета, 0 — сразу)
+    resume    задания записаны в журнал без исполнителей, затем новый журнал на том же файле их выполняет
+    crash     на середине прогона исполнители и запись журнала прерываются без фиксации последнего пакета,
+              как при падении процесса; новый журнал доделывает работу. Повторные операции в API
+              (выполнены, но не успели попасть в журнал) выводятся в reexecuted
+
+Строка JSON на режим: заданий в секунду, задержка постановки (ответ после записи в журнал), пакеты записи.
+
+    python -m benchmarks.bench_jobs --jobs 5000 --producers 16 --submit-batch 50 --workers 32
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.bench_suite import MOCK_HOST, percentile
+from benchmarks.mock_yandex import EndpointProfile, MockYandexAPI, MockYandexTransport
+from service.http_client import ClientSettings, UpstreamClient
+from service.job_journal import ACTION_CANCEL, ACTION_CONFIRM, ACTION_EDIT, STATE_DONE, JobJournal
+from service.order_confirmation import OrderConfirmation
+from service.resilience import UpstreamPolicy
+
+ACTIONS = (ACTION_CONFIRM, ACTION_CANCEL, ACTION_EDIT)
+
+
+def make_specs(count: int, request_ids: List[str], run_id: str) -> List[dict]:
+    specs = []
+    for index in range(count):
+        action = ACTIONS[index % len(ACTIONS)]
+        if action == ACTION_CONFIRM:
+            specs.append({"action": action, "offer_id": f"offer-{run_id}-{index}"})
+        elif action == ACTION_CANCEL:
+            specs.append({"action": action, "request_id": request_ids[index]})
+        else:
+            specs.append({
+                "action": action, "request_id": request_ids[index], "job_id": f"edit-{run_id}-{index}",
+                "changes": {"recipient_info": {"phone": "+79990000000"}}})
+    return specs
+
+
+class Bench():
+    """
+    Имитация API, клиент и набор заданий для одного режима
+    """
+    def __init__(self, args, run_id: str):
+        self.args = args
+        self.api = MockYandexAPI(pickup_points=0)
+        self.transport = MockYandexTransport(self.api, EndpointProfile(latency=args.latency))
+        self.client = UpstreamClient("bench", MOCK_HOST, ClientSettings(), transport=self.transport, policy=UpstreamPolicy())
+        self.confirmation = OrderConfirmation("bench", MOCK_HOST, client=self.client)
+        self.specs = make_specs(args.jobs, self.api.seed_orders(args.jobs), run_id)
+
+    def journal(self, path: Optional[str], commit_interval: float, workers: Optional[int] = None) -> JobJournal:
+        return JobJournal(
+            path, self.confirmation, workers=self.args.workers if workers is None else workers,
+            queue_size=self.args.jobs, commit_interval=commit_interval, synchronous=self.args.synchronous)
+
+    def upstream_requests(self) -> int:
+        return sum(endpoint["requests"] for endpoint in self.transport.snapshot().values())
+
+
+async def produce(submit, specs: List[dict], producers: int, batch: int) -> List[float]:
+    """
+    Постановка specs пакетами по batch в producers потоков; возвращает задержки постановки
+    """
+    batches = [specs[start:start + batch] for start in range(0, len(specs), batch)]
+    counter = itertools.count()
+    latencies: List[float] = []
+
+    async def producer():
+        for index in iter(lambda: next(counter), None):
+            if index >= len(batches):
+                return
+            started = time.perf_counter()
+            await submit(batches[index])
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(producer() for _ in range(producers)))
+    return latencies
+
+
+async def run_inline(bench: Bench) -> dict:
+    semaphore = asyncio.Semaphore(bench.args.workers)
+
+    async def call(spec: dict):
+        async with semaphore:
+            if spec["action"] == ACTION_CONFIRM:
+                await bench.confirmation.confirm_order(spec["offer_id"])
+            elif spec["action"] == ACTION_CANCEL:
+                await bench.confirmation.cancel_order(spec["request_id"])
+            else:
+                await bench.confirmation.edit_order(spec["request_id"], spec["changes"])
+
+    async def submit(specs: List[dict]):
+        await asyncio.gather(*(call(spec) for spec in specs))
+
+    started = time.perf_counter()
+    latencies = await produce(submit, bench.specs, bench.args.producers, bench.args.submit_batch)
+    return {"elapsed_s": time.perf_counter() - started, "latencies": latencies}
+
+
+async def run_journal(journal: JobJournal, bench: Bench) -> dict:
+    jobs = []
+
+    async def submit(specs: List[dict]):
+        jobs.extend(await journal.submit_many(specs))
+
+    await journal.start()
+    started = time.perf_counter()
+    latencies = await produce(submit, bench.specs, bench.args.producers, bench.args.submit_batch)
+    await journal.wait(jobs)
+    elapsed = time.perf_counter() - started
+    await journal.stop()
+    return {"elapsed_s": elapsed, "latencies": latencies, "journal": journal.snapshot()}
+
+
+async def run_resume(bench: Bench, path: str) -> dict:
+    writer = bench.journal(path, bench.args.commit_intervals[0], workers=0)
+    await writer.start()
+    await produce(writer.submit_many, bench.specs, bench.args.producers, bench.args.submit_batch)
+    await writer.stop()
+    journal = bench.journal(path, bench.args.commit_intervals[0])
+    started = time.perf_counter()
+    await journal.start()
+    await journal.wait(list(journal.jobs.values()))
+    elapsed = time.perf_counter() - started
+    await journal.stop()
+    return {"elapsed_s": elapsed, "latencies": [], "journal": journal.snapshot()}
+
+
+async def run_crash(bench: Bench, path: str) -> dict:
+    first = bench.journal(path, bench.args.commit_intervals[0])
+    await first.start()
+    jobs = []
+
+    async def submit(specs: List[dict]):
+        jobs.extend(await first.submit_many(specs))
+
+    started = time.perf_counter()
+    await produce(submit, bench.specs, bench.args.producers, bench.args.submit_batch)
+    while sum(job.finished for job in jobs) < len(jobs) // 2:
+        await asyncio.sleep(0.005)
+    # Падение: исполнители и запись прерываются, накопленный пакет не фиксируется
+    tasks = [*first._tasks, first._writer_task]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    first._close()
+    executed_before = sum(job.state == STATE_DONE for job in jobs)
+    second = bench.journal(path, bench.args.commit_intervals[0])
+    await second.start()
+    await second.wait(list(second.jobs.values()))
+    elapsed = time.perf_counter() - started
+    await second.stop()
+    return {
+        "elapsed_s": elapsed,
+        "latencies": [],
+        "journal": second.snapshot(),
+        "done_before_crash": executed_before,
+    }
+
+
+async def run_mode(mode: str, args, commit_interval: float = 0.0) -> dict:
+    bench = Bench(args, f"{mode}{commit_interval}")
+    directory = tempfile.mkdtemp(prefix="bench-jobs-")
+    path = os.path.join(directory, "jobs.sqlite")
+    try:
+        if mode == "inline":
+            result = await run_inline(bench)
+        elif mode == "memory":
+            result = await run_journal(bench.journal(None, commit_interval), bench)
+        elif mode == "sqlite":
+            result = await run_journal(bench.journal(path, commit_interval), bench)
+        elif mode == "resume":
+            result = await run_resume(bench, path)
+        else:
+            result = await run_crash(bench, path)
+    finally:
+        await bench.client.aclose()
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
+    latencies = sorted(result.pop("latencies"))
+    elapsed = result.pop("elapsed_s")
+    journal: Dict[str, object] = result.pop("journal", None) or {}
+    row = {
+        "mode": mode,
+        "jobs": args.jobs,
+        "workers": args.workers,
+        "elapsed_s": round(elapsed, 3),
+        "jobs_per_s": round(args.jobs / elapsed, 1),
+        "upstream_requests": bench.upstream_requests(),
+        "reexecuted": bench.upstream_requests() - args.jobs,
+    }
+    if mode in ("sqlite", "resume", "crash"):
+        row.update(commit_interval=commit_interval if mode == "sqlite" else args.commit_intervals[0],
+                   synchronous=args.synchronous)
+    if latencies:
+        row.update(
+            submit_p50_ms=round(percentile(latencies, 0.50) * 1000, 2),
+            submit_p99_ms=round(percentile(latencies, 0.99) * 1000, 2))
+    if journal:
+        commits = journal["commits"] or 1
+        row.update(
+            states=journal["states"], resumed=journal["resumed"], retried=journal["retried"],
+            commits=journal["commits"], rows_per_commit=round(journal["written"] / commits, 1))
+    row.update(result)
+    return row
+
+
+async def main(args):
+    modes = [mode.strip() for mode in args.modes.split(",")]
+    for mode in modes:
+        intervals = args.commit_intervals if mode == "sqlite" else [0.0]
+        for interval in intervals:
+            print(json.dumps(await run_mode(mode, args, interval), ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="inline,memory,sqlite,resume,crash")
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--producers", type=int, default=16)
+    parser.add_argument("--submit-batch", type=int, default=50, help="Заданий в одной постановке")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--commit-intervals", type=lambda value: [float(item) for item in value.split(",")],
+                        default=[0.0, 0.005])
+    parser.add_argument("--synchronous", default="FULL", choices=("OFF", "NORMAL", "FULL", "EXTRA"))
+    parser.add_argument("--latency", default="lognormal:0.02:0.4")
+    asyncio.run(main(parser.parse_args()))
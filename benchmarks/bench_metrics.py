@@ -0,0 +1,139 @@
+"""
+Цена метрик: запись одного значения, запрос к API через UpstreamClient и входящий запрос к приложению
+с выключенными и включенными метриками, а также время формирования ответа /metrics.
+Прогоны с метриками и без чередуются, в результат идет медиана.
+
+    python -m benchmarks.bench_metrics --requests 2000 --concurrency 20 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from benchmarks.bench_http_client import HandshakeServer
+from src import consts as c
+from service.calculation_module import Calculate
+from service.http_client import ClientSettings, UpstreamClient
+from service.metrics import MetricsRegistry, UpstreamMetrics
+from service.resilience import UpstreamPolicy
+
+
+def bench_record(count: int = 200000) -> dict:
+    registry = MetricsRegistry()
+    upstream = UpstreamMetrics(registry)
+    started = time.perf_counter()
+    for index in range(count):
+        upstream.duration.observe("/offers/info", value=index % 100 / 1000)
+    observe_ns = (time.perf_counter() - started) / count * 1e9
+    started = time.perf_counter()
+    for _ in range(count):
+        upstream.responses.inc("/offers/info", "200")
+    inc_ns = (time.perf_counter() - started) / count * 1e9
+    return {"case": "record", "histogram_observe_ns": round(observe_ns), "counter_inc_ns": round(inc_ns)}
+
+
+async def _upstream_round(base_url: str, metrics, requests: int, concurrency: int) -> float:
+    client = UpstreamClient("bench", base_url, ClientSettings(), policy=UpstreamPolicy(metrics=metrics))
+    service = Calculate("bench", base_url, client=client)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await service.delivery_interval("station")
+
+    await asyncio.gather(*(one() for _ in range(concurrency)))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    return elapsed / requests
+
+
+async def bench_upstream(requests: int, concurrency: int, rounds: int) -> dict:
+    server = HandshakeServer(0)
+    base_url = await server.start()
+    plain, measured = [], []
+    registry = MetricsRegistry()
+    try:
+        for _ in range(rounds):
+            plain.append(await _upstream_round(base_url, None, requests, concurrency))
+            measured.append(await _upstream_round(base_url, UpstreamMetrics(registry), requests, concurrency))
+    finally:
+        await server.stop()
+    return _compare("upstream_call", plain, measured)
+
+
+async def _inbound_round(enabled: bool, requests: int, concurrency: int) -> float:
+    c.METRICS_ENABLED = enabled
+    from main import app
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://service") as client:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with semaphore:
+                    (await client.get(f"{c.PATH_PREFIX}/orders/tracker/stats")).raise_for_status()
+
+            await asyncio.gather(*(one() for _ in range(concurrency)))
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(requests)))
+            return (time.perf_counter() - started) / requests
+
+
+async def bench_inbound(requests: int, concurrency: int, rounds: int) -> dict:
+    c.yandex_host, c.yandex_key, c.REDIS_HOST = None, "bench", None
+    plain, measured = [], []
+    for _ in range(rounds):
+        plain.append(await _inbound_round(False, requests, concurrency))
+        measured.append(await _inbound_round(True, requests, concurrency))
+    return _compare("inbound_request", plain, measured)
+
+
+def bench_render(endpoints: int = 10) -> dict:
+    registry = MetricsRegistry()
+    upstream = UpstreamMetrics(registry)
+    for index in range(endpoints):
+        for value in range(1000):
+            upstream.duration.observe(f"/endpoint/{index}", value=value / 1000)
+            upstream.responses.inc(f"/endpoint/{index}", "200")
+    started = time.perf_counter()
+    body = registry.render()
+    return {
+        "case": "render",
+        "endpoints": endpoints,
+        "bytes": len(body),
+        "render_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def _compare(case: str, plain: list, measured: list) -> dict:
+    plain_us, measured_us = statistics.median(plain) * 1e6, statistics.median(measured) * 1e6
+    return {
+        "case": case,
+        "metrics_off_us": round(plain_us, 1),
+        "metrics_on_us": round(measured_us, 1),
+        "overhead_us": round(measured_us - plain_us, 1),
+        "overhead_pct": round((measured_us - plain_us) / plain_us * 100, 2),
+    }
+
+
+async def main(requests: int, concurrency: int, rounds: int) -> list:
+    return [
+        bench_record(),
+        await bench_upstream(requests, concurrency, rounds),
+        await bench_inbound(requests, concurrency, rounds),
+        bench_render(),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    for row in asyncio.run(main(args.requests, args.concurrency, args.rounds)):
+        print(json.dumps(row))
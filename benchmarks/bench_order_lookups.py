@@ -0,0 +1,88 @@
+"""
+Чтение заявок несколькими клиентами одновременно (страница покупателя, админка, рассылка):
+каждые --interval секунд все --callers клиентов запрашивают одну и ту же заявку всеми четырьмя
+методами GetInfoAboutDraft. Сравниваются режимы без объединения, только с объединением
+одновременных запросов (single-flight) и с микрокэшем; выводятся обращения к имитации API
+по эндпоинтам и задержка вызовов. Заявки в имитации проходят статусы за --status-step секунд
+на шаг, поэтому к концу прогона часть из них в финальном статусе и кэшируется дольше.
+
+    python -m benchmarks.bench_order_lookups --orders 50 --callers 3 --rounds 40 --interval 0.25
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Optional
+
+from benchmarks.bench_suite import MOCK_HOST, percentile
+from benchmarks.mock_yandex import EndpointProfile, MockYandexAPI, MockYandexTransport
+from service.cache import CachedLoader
+from service.http_client import ClientSettings, UpstreamClient
+from service.order_confirmation import GetInfoAboutDraft
+from service.resilience import UpstreamPolicy
+from src import consts as c
+
+MODES = {
+    "direct": None,
+    "single_flight": 0,
+    "micro_cache": c.ORDER_LOOKUP_MAX_SIZE,
+}
+
+
+async def run_mode(mode: str, args) -> dict:
+    api = MockYandexAPI(pickup_points=0, status_step=args.status_step)
+    request_ids = api.seed_orders(args.orders)
+    transport = MockYandexTransport(api, EndpointProfile(latency=args.latency))
+    client = UpstreamClient("bench", MOCK_HOST, ClientSettings(), transport=transport, policy=UpstreamPolicy())
+    max_size: Optional[int] = MODES[mode]
+    lookups = CachedLoader(c.ORDER_LOOKUP_TTL, max_size) if max_size is not None else None
+    info = GetInfoAboutDraft("bench", MOCK_HOST, client=client, lookups=lookups)
+    latencies: List[float] = []
+
+    async def timed(call):
+        started = time.perf_counter()
+        await call
+        latencies.append(time.perf_counter() - started)
+
+    async def caller(request_id: str):
+        await asyncio.gather(
+            timed(info.get_info_about_draft(request_id=request_id)),
+            timed(info.up_to_date_shipping_information(request_id)),
+            timed(info.get_Delivery_interval(request_id)),
+            timed(info.get_history_of_status_changes(request_id)),
+        )
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        await asyncio.gather(*(caller(request_id) for request_id in request_ids for _ in range(args.callers)))
+        await asyncio.sleep(args.interval)
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    latencies.sort()
+    upstream = transport.snapshot()
+    return {
+        "mode": mode,
+        "lookups": len(latencies),
+        "upstream_requests": sum(endpoint["requests"] for endpoint in upstream.values()),
+        "by_endpoint": {path: endpoint["requests"] for path, endpoint in upstream.items()},
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "elapsed_s": round(elapsed, 2),
+        "cache": lookups.snapshot() if lookups is not None else None,
+    }
+
+
+async def main(args):
+    for mode in MODES:
+        print(json.dumps(await run_mode(mode, args), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--callers", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.25)
+    parser.add_argument("--status-step", type=float, default=1.0)
+    parser.add_argument("--latency", default="lognormal:0.03:0.4")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""
+Сборка тела создания заказа: модели на каждый товар + json.dumps (как раньше)
+против одной проверки тела через TypeAdapter и сериализации сразу в байты.
+Перед замером проверяется, что оба пути дают одинаковые байты.
+
+    python -m benchmarks.bench_payloads --sizes 1,50,500 --repeat 200
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from service.payloads import (
+    encode_json,
+    offer_create_body,
+    offer_create_payload,
+    request_create_body,
+    request_create_payload,
+)
+
+
+def make_order(size: int) -> dict:
+    start = datetime(2026, 3, 2, 9, tzinfo=timezone.utc)
+    items = [
+        {
+            "article": f"ART-{i:05d}",
+            "billing_details": {"assessed_unit_price": 100000 + i, "unit_price": 99900 + i, "nds": 20},
+            "count": 1 + i % 3,
+            "name": f"Товар №{i} «тест»",
+            "place_barcode": f"PLACE-{i:05d}",
+            "physical_dims": {"dx": 10 + i % 5, "dy": 20, "dz": 15, "weight_gross": 500 + i},
+            "description": None if i % 2 else f"Коробка {i}",
+        }
+        for i in range(size)
+    ]
+    return {
+        "operator_request_id": f"order-{size}",
+        "source": {
+            "platform_station_id": "fbed3aa1-2cc6-4370-ab4d-59c5cc9bb924",
+            "interval_utc": {"start_utc": start.isoformat(), "end_utc": (start + timedelta(hours=2)).isoformat()},
+        },
+        "destination": "e1139f6d-e34f-47a9-a55f-31f032a861a6",
+        "items": items,
+    }
+
+
+def _timeit(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def run(sizes, repeat: int) -> list:
+    rows = []
+    contact = {"phone": "+79990000000", "email": "user@example.com"}
+    for size in sizes:
+        order = make_order(size)
+        args = (order["operator_request_id"], order["source"], order["destination"], order["items"])
+        cases = {
+            "request_create": (
+                lambda: encode_json(request_create_body(*args, {**contact, "name": "Иван"}, "BOX-1")),
+                lambda: request_create_payload(*args, {**contact, "name": "Иван"}, "BOX-1"),
+            ),
+            "offer_create": (
+                lambda: encode_json(offer_create_body(*args, {**contact, "first_name": "Иван"})),
+                lambda: offer_create_payload(*args, {**contact, "first_name": "Иван"}),
+            ),
+        }
+        for name, (reference, fast) in cases.items():
+            expected = reference()
+            assert fast() == expected, f"{name}: тела для {size} товаров различаются"
+            reference_s = _timeit(reference, repeat)
+            fast_s = _timeit(fast, repeat)
+            rows.append({
+                "payload": name,
+                "items": size,
+                "bytes": len(expected),
+                "per_item_models_us": round(reference_s * 1e6, 1),
+                "type_adapter_us": round(fast_s * 1e6, 1),
+                "speedup": round(reference_s / fast_s, 2),
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,50,500")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    for row in run([int(size) for size in args.sizes.split(",")], args.repeat):
+        print(json.dumps(row, ensure_ascii=False))
@@ -0,0 +1,118 @@
+"""
+Таблица цен (service.price_table) на имитации API: расчеты стоимости доставки по популярным маршрутам.
+--routes маршрутов склад → ПВЗ в таблице; запросы выбирают маршрут по закону Ципфа (популярные чаще),
+доля --unknown-share приходится на маршруты вне таблицы, вес — равномерно от 100 г до последней ступени.
+Режимы:
+
+    live         Calculate без кэшей — каждый расчет запрос в API
+    quote_cache  Calculate с QuoteCache, как сейчас: первый расчет ступени идет в API
+    table        Calculate с заполненной таблицей цен и QuoteCache для промахов
+
+Для table дополнительно: время и запросы заполнения таблицы в пределах --rps, стоимость поиска
+в таблице в микросекундах, размер массивов и расхождение цены из таблицы с ответом API для точного
+веса — с интерполяцией и по верхней ступени (доля расчетов дешевле API — underpriced).
+Строка JSON на режим.
+
+    python -m benchmarks.bench_price_table --routes 300 --calls 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List, Tuple
+
+from benchmarks.bench_suite import MOCK_HOST, measure
+from benchmarks.mock_yandex import EndpointProfile, MockYandexAPI, MockYandexTransport
+from src import consts as c
+from service.calculation_module import Calculate
+from service.http_client import ClientSettings, UpstreamClient
+from service.price_table import PriceTable, parse_price
+from service.quote_cache import QuoteCache
+from service.resilience import UpstreamPolicy
+
+
+def make_calls(args) -> List[Tuple[str, str, int]]:
+    rng = random.Random(args.seed)
+    ranks = list(range(args.routes))
+    popularity = [1 / (rank + 1) for rank in ranks]
+    calls = []
+    for _ in range(args.calls):
+        if rng.random() < args.unknown_share:
+            route = rng.randrange(args.routes, args.routes * 10)
+        else:
+            route = rng.choices(ranks, popularity)[0]
+        calls.append((f"pvz-{route:06d}", f"station-{route % 20}", rng.randint(100, c.PRICE_TABLE_WEIGHTS[-1])))
+    return calls
+
+
+def upstream_requests(transport: MockYandexTransport) -> int:
+    return transport.snapshot().get("/pricing-calculator", {}).get("requests", 0)
+
+
+async def run_mode(mode: str, args) -> dict:
+    transport = MockYandexTransport(MockYandexAPI(pickup_points=0), EndpointProfile(latency=args.latency))
+    client = UpstreamClient("bench", MOCK_HOST, ClientSettings(), transport=transport, policy=UpstreamPolicy())
+    live = Calculate("bench", MOCK_HOST, client=client)
+    routes = [(f"station-{route % 20}", f"pvz-{route:06d}") for route in range(args.routes)]
+    row = {"mode": mode, "routes": args.routes, "weights": len(c.PRICE_TABLE_WEIGHTS)}
+    table = None
+    if mode == "table":
+        table = PriceTable(routes, c.PRICE_TABLE_WEIGHTS, live.calculate_delivery,
+                           rate=args.rps, burst=args.rps, concurrency=args.refresh_concurrency)
+        started = time.perf_counter()
+        filled = await table.refresh()
+        row.update(warmup_s=round(time.perf_counter() - started, 3), warmup_requests=upstream_requests(transport),
+                   filled=filled, table_bytes=table.snapshot()["bytes"])
+    calculate = Calculate(
+        "bench", MOCK_HOST,
+        client=client,
+        quote_cache=QuoteCache.from_env() if mode != "live" else None,
+        price_table=table)
+    calls = make_calls(args)
+    before = upstream_requests(transport)
+    result = await measure(lambda index: calculate.calculate_delivery(*calls[index]), len(calls), args.concurrency)
+    row.update(result, upstream_requests=upstream_requests(transport) - before)
+    if table is not None:
+        snapshot = table.snapshot()
+        row.update({key: snapshot[key] for key in ("hits", "interpolated", "unknown_route", "out_of_range", "stale")})
+        known = [call for call in calls if (call[1], call[0]) in table.index][:args.error_sample]
+        started = time.perf_counter()
+        for _ in range(args.lookup_rounds):
+            for destination, source, weight in known:
+                table.lookup(destination, source, weight)
+        row["lookup_us"] = round((time.perf_counter() - started) / (len(known) * args.lookup_rounds) * 1e6, 3)
+        # Расхождение с ценой API для точного веса: интерполяция и цена верхней ступени (как у QuoteCache)
+        expected = [
+            parse_price((await live.calculate_delivery(destination, source, weight))["pricing_total"])[0]
+            for destination, source, weight in known]
+        for interpolate, name in ((True, "interpolated"), (False, "upper_tier")):
+            table.interpolate = interpolate
+            errors = [
+                parse_price(table.lookup(destination, source, weight)["pricing_total"])[0] / price - 1
+                for (destination, source, weight), price in zip(known, expected)]
+            row[f"{name}_error_mean"] = round(sum(abs(error) for error in errors) / len(errors), 4)
+            row[f"{name}_underpriced"] = round(sum(error < 0 for error in errors) / len(errors), 4)
+    await client.aclose()
+    return row
+
+
+async def main(args):
+    for mode in (mode.strip() for mode in args.modes.split(",")):
+        print(json.dumps(await run_mode(mode, args), ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="live,quote_cache,table")
+    parser.add_argument("--routes", type=int, default=300)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--unknown-share", type=float, default=0.1, help="Доля расчетов по маршрутам вне таблицы")
+    parser.add_argument("--rps", type=int, default=500, help="Бюджет заполнения таблицы, запросов в секунду")
+    parser.add_argument("--refresh-concurrency", type=int, default=32)
+    parser.add_argument("--error-sample", type=int, default=500)
+    parser.add_argument("--lookup-rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", default="lognormal:0.02:0.4")
+    asyncio.run(main(parser.parse_args()))
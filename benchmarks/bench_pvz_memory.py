@@ -0,0 +1,111 @@
+"""
+Память при загрузке списка ПВЗ: весь ответ через response.json() с записями,
+держащими исходные словари (как раньше), против потокового разбора тела
+в компактные PickupPoint. Тело отдается кусками, как его читает httpx.
+Для каждого режима печатаются пиковая и удерживаемая после загрузки память (tracemalloc)
+и время разбора без tracemalloc; перед замером проверяется, что оба пути дают одинаковые записи.
+
+    python -m benchmarks.bench_pvz_memory --sizes 10000,50000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Tuple
+
+from benchmarks.mock_yandex import MockYandexAPI
+from service.json_stream import iter_array_items
+from service.pickup_points import PickupPointStore
+
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(slots=True)
+class DictPickupPoint():
+    """
+    Запись ПВЗ в прежнем виде: поля поиска и исходный словарь целиком
+    """
+    id: str
+    type: Optional[str]
+    latitude: float
+    longitude: float
+    payment_methods: Tuple[str, ...]
+    raw: dict
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DictPickupPoint":
+        position = data["position"]
+        return cls(
+            data["id"], data.get("type"), float(position["latitude"]), float(position["longitude"]),
+            tuple(data.get("payment_methods") or ()), data,
+        )
+
+
+async def _chunks(body: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+
+async def load_full(body: bytes) -> list:
+    # response.json(): тело собирается из кусков целиком, затем разбирается в дерево словарей
+    content = b"".join([chunk async for chunk in _chunks(body)])
+    points = json.loads(content).get("points")
+    return [DictPickupPoint.from_dict(point) for point in points]
+
+
+async def load_stream(body: bytes) -> list:
+    store = PickupPointStore()
+    return await store._records(lambda: iter_array_items(_chunks(body), "points"))
+
+
+def measure(loader, body: bytes) -> dict:
+    # Время замеряется отдельным прогоном: tracemalloc сильно замедляет аллокации
+    gc.collect()
+    started = time.perf_counter()
+    asyncio.run(loader(body))
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    records = asyncio.run(loader(body))
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return {
+        "peak_mb": round(peak / 2 ** 20, 1),
+        "retained_mb": round(retained / 2 ** 20, 1),
+        "parse_s": round(elapsed, 3),
+    }
+
+
+def run(sizes) -> list:
+    rows = []
+    for size in sizes:
+        points = MockYandexAPI(pickup_points=size).points
+        body = json.dumps({"points": points}, ensure_ascii=False).encode()
+        del points
+        full = asyncio.run(load_full(body))
+        streamed = asyncio.run(load_stream(body))
+        assert [point.raw for point in full] == [point.raw for point in streamed], "записи различаются"
+        del full, streamed
+        before, after = measure(load_full, body), measure(load_stream, body)
+        rows.append({
+            "points": size,
+            "body_mb": round(len(body) / 2 ** 20, 1),
+            "full_json": before,
+            "stream": after,
+            "peak_ratio": round(before["peak_mb"] / after["peak_mb"], 2),
+            "retained_ratio": round(before["retained_mb"] / after["retained_mb"], 2),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,50000")
+    args = parser.parse_args()
+    for row in run([int(size) for size in args.sizes.split(",")]):
+        print(json.dumps(row, ensure_ascii=False))
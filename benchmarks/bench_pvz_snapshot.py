@@ -0,0 +1,104 @@
+"""
+Старт воркера со снимком ПВЗ: загрузка списка (разбор JSON и построение дерева) против
+чтения отображенного в память снимка, и память, которую индекс занимает в каждом из N воркеров.
+Воркеры — отдельные процессы (spawn); память снимается из /proc/<pid>/smaps_rollup, поэтому
+замер памяти работает только в Linux. Private — страницы, принадлежащие только процессу,
+Pss — доля процесса с учетом общих страниц (общий файл снимка делится между воркерами).
+
+    python -m benchmarks.bench_pvz_snapshot --points 50000 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.mock_yandex import MockYandexAPI
+from service.pickup_points import PickupPointStore
+from service.pvz_snapshot import PickupPointSnapshot
+
+
+def _memory_kb() -> dict:
+    values = {}
+    with open("/proc/self/smaps_rollup") as file:
+        for line in file:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                values[name] = int(rest.split()[0])
+    return {"rss": values["Rss"], "pss": values["Pss"], "private": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def _worker(mode: str, body_path: str, snapshot_path: str, barrier, results):
+    baseline = _memory_kb()
+    started = time.perf_counter()
+    if mode == "json":
+        store = PickupPointStore()
+        with open(body_path, "rb") as file:
+            store.load(json.loads(file.read())["points"])
+    else:
+        store = PickupPointStore(PickupPointSnapshot(snapshot_path))
+        store.restore()
+    elapsed = time.perf_counter() - started
+    # Обращение ко всем телам записей, как при выдаче полного списка: страницы снимка попадают в память
+    touched = sum(len(point.data) for point in store.index.points if point.raw)
+    # Память снимается, когда все воркеры загрузили индекс и держат его одновременно
+    barrier.wait()
+    memory = _memory_kb()
+    results.put({
+        "startup_s": round(elapsed, 3),
+        "points": len(store.index),
+        "touched_mb": round(touched / 2 ** 20, 1),
+        **{f"{name}_mb": round((memory[name] - baseline[name]) / 1024, 1) for name in memory},
+    })
+    barrier.wait()
+
+
+def run_mode(mode: str, workers: int, body_path: str, snapshot_path: str) -> dict:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(mode, body_path, snapshot_path, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    summary = {"mode": mode, "workers": workers, "points": rows[0]["points"]}
+    for name in ("startup_s", "rss_mb", "pss_mb", "private_mb"):
+        summary[f"avg_{name}"] = round(sum(row[name] for row in rows) / workers, 3 if name == "startup_s" else 1)
+    summary["total_pss_mb"] = round(sum(row["pss_mb"] for row in rows), 1)
+    return summary
+
+
+def run(points: int, workers: int) -> list:
+    directory = tempfile.mkdtemp(prefix="bench-pvz-")
+    body_path = os.path.join(directory, "points.json")
+    snapshot_path = os.path.join(directory, "pvz.snapshot")
+    with open(body_path, "w") as file:
+        json.dump({"points": MockYandexAPI(pickup_points=points).points}, file, ensure_ascii=False)
+    writer = PickupPointStore(PickupPointSnapshot(snapshot_path))
+    started = time.perf_counter()
+    with open(body_path, "rb") as file:
+        writer.load(json.loads(file.read())["points"])
+    rows = [{
+        "snapshot_mb": round(os.path.getsize(snapshot_path) / 2 ** 20, 1),
+        "body_mb": round(os.path.getsize(body_path) / 2 ** 20, 1),
+        "build_and_write_s": round(time.perf_counter() - started, 3),
+    }]
+    del writer
+    for mode in ("json", "snapshot"):
+        rows.append(run_mode(mode, workers, body_path, snapshot_path))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    for row in run(args.points, args.workers):
+        print(json.dumps(row, ensure_ascii=False))
@@ -0,0 +1,88 @@
+"""
+Проверка политики обращения к API на транспорте с внедрением сбоев.
+
+Сценарии:
+  flaky  — доля ответов 5xx/429/таймаутов, сравнение доли успешных вызовов без повторов и с повторами;
+  outage — полный отказ эндпоинта: сколько запросов доходит до API, пока автомат защиты разомкнут;
+  rate   — ограничение частоты: фактическая скорость запросов к API при заданном RPS.
+
+    python -m benchmarks.bench_resilience --calls 500 --error-rate 0.2
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.fault_injection import FaultInjectingTransport
+from service.http_client import ClientSettings, UpstreamClient
+from service.order_confirmation import GetInfoAboutDraft
+from service.resilience import RateLimiter, RetryPolicy, UpstreamPolicy
+
+
+def _ok(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"request_id": request.url.params.get("request_id"), "state": {"status": "CREATED"}})
+
+
+async def _drive(policy: UpstreamPolicy, transport: FaultInjectingTransport, calls: int, concurrency: int) -> dict:
+    client = UpstreamClient("bench", "http://mock", ClientSettings(), transport=transport, policy=policy)
+    service = GetInfoAboutDraft("bench", "http://mock", client=client)
+    semaphore = asyncio.Semaphore(concurrency)
+    outcome = {"ok": 0, "failed": 0}
+
+    async def one(index: int):
+        async with semaphore:
+            try:
+                await service.get_info_about_draft(request_id=str(index))
+                outcome["ok"] += 1
+            except Exception:
+                outcome["failed"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(calls)))
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    return {
+        **outcome,
+        "success_rate": round(outcome["ok"] / calls, 4),
+        "upstream_requests": transport.requests,
+        "retries": policy.retries,
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+async def main(calls: int, concurrency: int, error_rate: float) -> list:
+    results = []
+    for name, attempts in (("flaky_no_retry", 1), ("flaky_retry", 4)):
+        transport = FaultInjectingTransport(
+            _ok, error_rate=error_rate, throttle_rate=error_rate / 4, timeout_rate=error_rate / 10,
+            retry_after=0.01, seed=1)
+        policy = UpstreamPolicy(retry=RetryPolicy(attempts, 0.005, 0.05, 1), failure_threshold=10 ** 6)
+        results.append({"scenario": name, **await _drive(policy, transport, calls, concurrency)})
+
+    transport = FaultInjectingTransport(_ok)
+    transport.outage = True
+    policy = UpstreamPolicy(retry=RetryPolicy(3, 0.005, 0.05, 1), failure_threshold=5, recovery_time=60)
+    outage = await _drive(policy, transport, calls, concurrency)
+    breakers = policy.snapshot()["breakers"]
+    results.append({"scenario": "outage_breaker", **outage, "rejected_fast": sum(b["rejected"] for b in breakers.values())})
+
+    rps = 200
+    transport = FaultInjectingTransport(_ok)
+    policy = UpstreamPolicy(limiter=RateLimiter(rps, 1))
+    limited = await _drive(policy, transport, calls, concurrency)
+    results.append({
+        "scenario": "rate_limited", **limited, "target_rps": rps,
+        "observed_rps": round(limited["upstream_requests"] / limited["elapsed_s"], 1)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    args = parser.parse_args()
+    for row in asyncio.run(main(args.calls, args.concurrency, args.error_rate)):
+        print(json.dumps(row))
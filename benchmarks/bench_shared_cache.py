@@ -0,0 +1,72 @@
+"""
+Общий кэш между воркерами: несколько экземпляров TwoLevelCache ("воркеров") с одним Redis
+одновременно запрашивают одни и те же ключи. Считаем обращения к источнику с общим L2
+и без него, а также поведение при недоступном Redis.
+
+    python -m benchmarks.bench_shared_cache --workers 8 --keys 50 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.fake_redis import FakeRedis
+from service.shared_cache import TwoLevelCache, dumps
+
+
+async def _scenario(name: str, workers: int, keys: int, requests: int, redis, source_latency: float) -> dict:
+    caches = [TwoLevelCache("bench", 60, 10000, redis=redis) for _ in range(workers)]
+    source_calls = 0
+
+    async def source(key):
+        nonlocal source_calls
+        source_calls += 1
+        await asyncio.sleep(source_latency)
+        return {"key": key, "pricing_total": "199.00 RUB", "delivery_days": {"min": 1, "max": 3}}
+
+    rng = random.Random(1)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        cache.get_or_load(key, lambda key=key: source(key))
+        for cache, key in ((rng.choice(caches), rng.randrange(keys)) for _ in range(requests))
+    ))
+    elapsed = time.perf_counter() - started
+    return {
+        "scenario": name,
+        "workers": workers,
+        "keys": keys,
+        "requests": requests,
+        "source_calls": source_calls,
+        "elapsed_s": round(elapsed, 3),
+        "l2_hits": sum(cache.l2_hits for cache in caches),
+        "lock_waits": sum(cache.lock_waits for cache in caches),
+        "l2_errors": sum(cache.l2_errors for cache in caches),
+    }
+
+
+async def main(workers: int, keys: int, requests: int) -> list:
+    results = [
+        await _scenario("l1_only", workers, keys, requests, None, 0.02),
+        await _scenario("l1_l2", workers, keys, requests, FakeRedis(latency=0.0005), 0.02),
+    ]
+    down = FakeRedis()
+    down.down = True
+    results.append(await _scenario("redis_down", workers, keys, requests, down, 0.02))
+    sample = [{"pricing_total": "199.00 RUB", "delivery_days": {"min": 1, "max": 3}}] * 20
+    results.append({
+        "scenario": "serialization",
+        "json_bytes": len(json.dumps(sample).encode()),
+        "stored_bytes": len(dumps(sample)),
+    })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    for row in asyncio.run(main(args.workers, args.keys, args.requests)):
+        print(json.dumps(row))
@@ -0,0 +1,171 @@
+"""
+Холодный старт сервиса: каждый замер — новый процесс Python.
+
+    import main          импорт приложения
+    lifespan             запуск lifespan (клиенты, кэши, фоновые задачи) на имитации API
+    first request        первый запрос без обращения к API (/upstream/stats)
+    first upstream       первый запрос с обращением к API (/pricing/cart): создание httpx-клиента, NumPy
+    warm upstream        такой же запрос после прогрева
+    process              от запуска процесса до выхода, по часам родителя
+    uvicorn ready        от запуска uvicorn до первого ответа 200 (--server)
+
+Для каждой цели выводится строка JSON в формате bench_suite (suite=startup): p50/p95/максимум по --runs
+процессам; затем строка с пакетами, дольше всего импортируемыми при import main (python -X importtime).
+
+    python -m benchmarks.bench_startup --runs 10 --server
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+# Модули сервиса и bench_suite здесь не импортируются: дочерний процесс запускает этот же файл,
+# и их импорт до import main исказил бы замер
+
+STATS_PATH = "/api/delivery-service/upstream/stats"
+TARGETS = ("import main", "lifespan", "first request", "first upstream", "warm upstream")
+
+
+def _cart_body(destination: str) -> dict:
+    return {
+        "source": "fbed3aa1-2cc6-4370-ab4d-59c5cc9bb924",
+        "destination": destination,
+        "items": [
+            {"count": 1 + index % 3, "place_barcode": "BOX-1",
+             "physical_dims": {"dx": 20, "dy": 10, "dz": 15, "weight_gross": 700}}
+            for index in range(20)
+        ],
+    }
+
+
+def child() -> Dict[str, float]:
+    """
+    Замеры в новом процессе; вызывается родителем через --child
+    """
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    import httpx
+    from benchmarks.mock_yandex import EndpointProfile, MockYandexAPI, MockYandexTransport
+    from src import consts as c
+    c.yandex_host, c.yandex_key, c.REDIS_HOST = "http://yandex.mock", "bench", None
+    main.app.state.upstream_transport = MockYandexTransport(MockYandexAPI(pickup_points=0), EndpointProfile())
+    timings = {"import main": imported - started}
+
+    async def measure():
+        begin = time.perf_counter()
+        async with main.app.router.lifespan_context(main.app):
+            timings["lifespan"] = time.perf_counter() - begin
+            transport = httpx.ASGITransport(main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://service") as client:
+                for target, call in (
+                    ("first request", lambda: client.get(STATS_PATH)),
+                    ("first upstream", lambda: client.post(
+                        f"{c.PATH_PREFIX}/pricing/cart", json=_cart_body("pvz-000001"))),
+                    ("warm upstream", lambda: client.post(
+                        f"{c.PATH_PREFIX}/pricing/cart", json=_cart_body("pvz-000002"))),
+                ):
+                    begin = time.perf_counter()
+                    response = await call()
+                    response.raise_for_status()
+                    timings[target] = time.perf_counter() - begin
+
+    asyncio.run(measure())
+    return timings
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_ready(timeout: float = 30.0) -> float:
+    """
+    От запуска uvicorn до первого ответа 200
+    """
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        request = f"GET {STATS_PATH} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode()
+        while time.perf_counter() - started < timeout:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+                    sock.sendall(request)
+                    if sock.recv(64).startswith(b"HTTP/1.1 200"):
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.005)
+        raise TimeoutError("uvicorn не ответил")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def import_breakdown(limit: int = 12) -> Dict[str, float]:
+    """
+    Собственное время импорта модулей при import main, сложенное по пакетам верхнего уровня, миллисекунды
+    """
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, env=os.environ, check=True).stderr
+    packages: Dict[str, float] = defaultdict(float)
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(own) / 1000
+    return {name: round(ms, 1) for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:limit]}
+
+
+def run(runs: int, server: bool = False) -> List[dict]:
+    from benchmarks.bench_suite import percentile
+    samples: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-W", "ignore", "-m", "benchmarks.bench_startup", "--child"],
+            capture_output=True, text=True, check=True)
+        samples["process"].append(time.perf_counter() - started)
+        for target, seconds in json.loads(result.stdout.strip().splitlines()[-1]).items():
+            samples[target].append(seconds)
+        if server:
+            samples["uvicorn ready"].append(server_ready())
+    rows = []
+    for target in (*TARGETS, "process", "uvicorn ready"):
+        values = sorted(samples.get(target, ()))
+        if not values:
+            continue
+        rows.append({
+            "suite": "startup",
+            "target": target,
+            "concurrency": 1,
+            "runs": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--server", action="store_true", help="Замерить и запуск uvicorn до первого ответа")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child()))
+    else:
+        for row in run(args.runs, args.server):
+            print(json.dumps(row, ensure_ascii=False))
+        print(json.dumps({"suite": "startup", "import_ms_by_package": import_breakdown()}, ensure_ascii=False))
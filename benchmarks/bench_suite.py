@@ -0,0 +1,327 @@
+"""
+Сквозной бенчмарк сервиса на имитации API Яндекс.Доставки (benchmarks.mock_yandex).
+
+Набор service — методы всех классов сервиса через общий UpstreamClient;
+набор api — эндпоинты FastAPI-приложения в том же процессе (ASGI, с lifespan).
+Для каждой цели и уровня параллельности выводится строка JSON: пропускная способность,
+p50/p95/p99 и максимум задержки, число ошибок. Последняя строка — обращения к имитации API.
+
+    python -m benchmarks.bench_suite --concurrency 1,16,64 --calls 400 --latency lognormal:0.02:0.4
+    python -m benchmarks.bench_suite --endpoint /pricing-calculator=lognormal:0.08:0.5,error=0.02
+    python -m benchmarks.bench_suite --output current.jsonl --baseline previous.jsonl --tolerance 0.2
+
+С --baseline строки с ростом p95 или падением пропускной способности больше чем на tolerance
+выводятся в stderr, и процесс завершается с кодом 1.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.mock_yandex import EndpointProfile, MockYandexAPI, MockYandexTransport
+from src import consts as c
+from service.http_client import ClientSettings, UpstreamClient
+from service.resilience import RetryPolicy, UpstreamPolicy
+from service.calculation_module import Calculate
+from service.Creating_order import CreatingOrder
+from service.creating_draft import DraftDelivery
+from service.order_confirmation import GetInfoAboutDraft, OrderConfirmation
+
+MOCK_HOST = "http://yandex.mock"
+SOURCE_STATION = "fbed3aa1-2cc6-4370-ab4d-59c5cc9bb924"
+
+Call = Callable[[int], Awaitable[object]]
+
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(share * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def measure(call: Call, calls: int, concurrency: int) -> dict:
+    """
+    calls вызовов call(index) не более чем concurrency одновременно
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        for index in iter(lambda: next(counter), None):
+            if index >= calls:
+                return
+            started = time.perf_counter()
+            try:
+                await call(index)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "calls": calls,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(calls / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def _order(index: int, prefix: str, items: int = 3) -> dict:
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return {
+        "operator_request_id": f"{prefix}-{index}",
+        "source": {
+            "platform_station_id": SOURCE_STATION,
+            "interval_utc": {"start_utc": start.isoformat(), "end_utc": (start + timedelta(hours=2)).isoformat()},
+        },
+        "destination": f"pvz-{index % 1000:06d}",
+        "items": [
+            {
+                "article": f"ART-{item}",
+                "billing_details": {"assessed_unit_price": 150000, "unit_price": 150000, "nds": 20},
+                "count": 1,
+                "name": f"Товар {item}",
+                "place_barcode": f"BOX-{index}",
+                "physical_dims": {"dx": 20, "dy": 10, "dz": 15, "weight_gross": 700},
+            }
+            for item in range(items)
+        ],
+    }
+
+
+def service_targets(client: UpstreamClient, api: MockYandexAPI, run_id: str) -> Dict[str, Call]:
+    calculate = Calculate("bench", MOCK_HOST, client=client)
+    creating_order = CreatingOrder("bench", MOCK_HOST, client=client)
+    draft_delivery = DraftDelivery("bench", MOCK_HOST, client=client)
+    confirmation = OrderConfirmation("bench", MOCK_HOST, client=client)
+    info = GetInfoAboutDraft("bench", MOCK_HOST, client=client)
+    request_ids = api.seed_orders(200)
+    contact = {"name": "Иван", "first_name": "Иван", "phone": "+79990000000", "email": "user@example.com"}
+
+    def request_id(index: int) -> str:
+        return request_ids[index % len(request_ids)]
+
+    async def create_order(index: int):
+        order = _order(index, f"{run_id}-request")
+        return await creating_order.Creating_an_application(
+            order["operator_request_id"], order["source"], order["destination"], order["items"], contact, "BOX")
+
+    async def create_offer(index: int):
+        order = _order(index, f"{run_id}-offer")
+        return await draft_delivery.Creating_an_application(
+            order["operator_request_id"], order["source"], order["destination"], order["items"], contact)
+
+    return {
+        "Calculate.calculate_delivery":
+            lambda index: calculate.calculate_delivery(f"pvz-{index % 1000:06d}", SOURCE_STATION, 500 + index % 20 * 250),
+        "Calculate.delivery_interval": lambda index: calculate.delivery_interval(SOURCE_STATION),
+        "Calculate.list_of_PVZ": lambda index: calculate.list_of_PVZ(),
+        "CreatingOrder.Creating_an_application": create_order,
+        "DraftDelivery.Creating_an_application": create_offer,
+        "OrderConfirmation.confirm_order": lambda index: confirmation.confirm_order(f"{run_id}-confirm-{index}"),
+        "GetInfoAboutDraft.get_info_about_draft": lambda index: info.get_info_about_draft(request_id=request_id(index)),
+        "GetInfoAboutDraft.up_to_date_shipping_information":
+            lambda index: info.up_to_date_shipping_information(request_id(index)),
+        "GetInfoAboutDraft.get_Delivery_interval": lambda index: info.get_Delivery_interval(request_id(index)),
+        "GetInfoAboutDraft.get_history_of_status_changes":
+            lambda index: info.get_history_of_status_changes(request_id(index)),
+    }
+
+
+def api_targets(client: httpx.AsyncClient, run_id: str, request_ids: List[str]) -> Dict[str, Call]:
+    prefix = c.PATH_PREFIX
+    rng = random.Random(1)
+
+    async def checked(response: Awaitable[httpx.Response]):
+        (await response).raise_for_status()
+
+    def matrix(index: int) -> dict:
+        return {
+            "sources": [SOURCE_STATION],
+            "destinations": [f"pvz-{rng.randrange(1000):06d}" for _ in range(3)],
+            "weights": [500 + index % 10 * 500, 5000],
+        }
+
+    def bulk(index: int) -> dict:
+        order = _order(index, f"{run_id}-bulk")
+        order["contact"] = {"name": "Иван", "phone": "+79990000000"}
+        order["barcode"] = "BOX"
+        return {"orders": [order], "wait": 10}
+
+    def order_refs(index: int) -> dict:
+        return {"orders": [{"request_id": request_ids[(index * 50 + item) % len(request_ids)]} for item in range(50)]}
+
+    def point() -> dict:
+        return {"latitude": rng.uniform(55.6, 55.9), "longitude": rng.uniform(37.4, 37.8)}
+
+    return {
+        "GET /pvz/nearest": lambda index: checked(client.get(f"{prefix}/pvz/nearest", params={**point(), "limit": 5})),
+        "GET /pvz/radius":
+            lambda index: checked(client.get(f"{prefix}/pvz/radius", params={**point(), "radius_km": 2})),
+        "GET /pvz": lambda index: checked(client.get(f"{prefix}/pvz", params={"station_type": "terminal"})),
+        "POST /pricing/batch": lambda index: checked(client.post(f"{prefix}/pricing/batch", json=matrix(index))),
+        "POST /pricing/batch/stream":
+            lambda index: checked(client.post(f"{prefix}/pricing/batch/stream", json=matrix(index))),
+        "POST /orders/bulk": lambda index: checked(client.post(f"{prefix}/orders/bulk", json=bulk(index))),
+        "POST /orders/info/bulk":
+            lambda index: checked(client.post(f"{prefix}/orders/info/bulk", json=order_refs(index))),
+        "GET /upstream/stats": lambda index: checked(client.get(f"{prefix}/upstream/stats")),
+    }
+
+
+@asynccontextmanager
+async def running_app(transport: MockYandexTransport):
+    """
+    FastAPI-приложение с lifespan, настроенное на имитацию API вместо настоящего
+    """
+    c.yandex_host, c.yandex_key, c.REDIS_HOST = MOCK_HOST, "bench", None
+    c.RATE_LIMIT_RPS = 0
+    from main import app
+    app.state.upstream_transport = transport
+    async with app.router.lifespan_context(app):
+        await app.state.pickup_points.ensure_loaded(
+            Calculate(c.yandex_key, c.yandex_host, client=app.state.upstream.get(c.yandex_key, c.yandex_host)).stream_PVZ)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://service") as client:
+            yield client
+
+
+async def run_targets(
+    suite: str,
+    targets: Dict[str, Call],
+    levels: Iterable[int],
+    calls: int,
+    only: Optional[str],
+) -> List[dict]:
+    rows = []
+    for name, call in targets.items():
+        if only and only not in name:
+            continue
+        for run, concurrency in enumerate(levels):
+            # Сквозная нумерация вызовов: заказы разных прогонов не совпадают по operator_request_id
+            offset = run * calls
+            result = await measure(lambda index: call(offset + index), calls, concurrency)
+            row = {"suite": suite, "target": name, "concurrency": concurrency, **result}
+            print(json.dumps(row, ensure_ascii=False), flush=True)
+            rows.append(row)
+    return rows
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """
+    Параметры имитации API: задержка и ошибки по умолчанию, профили эндпоинтов, число ПВЗ
+    """
+    parser.add_argument("--latency", default="lognormal:0.02:0.4", help="Задержка имитации по умолчанию")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument(
+        "--endpoint", action="append", default=[],
+        help="Профиль эндпоинта: /path=latency[,error=..][,throttle=..][,timeout=..][,retry_after=..]")
+    parser.add_argument("--pickup-points", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def mock_transport(args) -> MockYandexTransport:
+    default = EndpointProfile(
+        latency=args.latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        timeout_rate=args.timeout_rate, retry_after=args.retry_after)
+    profiles = {}
+    for spec in args.endpoint:
+        path, profile = spec.split("=", 1)
+        profiles[path] = EndpointProfile.parse(profile, default)
+    return MockYandexTransport(MockYandexAPI(args.pickup_points), default, profiles, seed=args.seed)
+
+
+async def main(args) -> List[dict]:
+    transport = mock_transport(args)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    run_id = f"bench{int(time.time())}"
+    rows: List[dict] = []
+
+    if args.suite in ("all", "service"):
+        policy = UpstreamPolicy(
+            retry=RetryPolicy(c.RETRY_MAX_ATTEMPTS, c.RETRY_BASE_DELAY, c.RETRY_MAX_DELAY, c.RETRY_AFTER_MAX),
+            failure_threshold=c.BREAKER_FAILURE_THRESHOLD,
+            recovery_time=c.BREAKER_RECOVERY_TIME)
+        client = UpstreamClient("bench", MOCK_HOST, ClientSettings.from_env(), transport=transport, policy=policy)
+        try:
+            rows += await run_targets("service", service_targets(client, transport.api, run_id), levels, args.calls, args.only)
+        finally:
+            await client.aclose()
+
+    if args.suite in ("all", "api"):
+        async with running_app(transport) as client:
+            request_ids = transport.api.seed_orders(1000)
+            rows += await run_targets("api", api_targets(client, run_id, request_ids), levels, args.calls, args.only)
+
+    print(json.dumps({"suite": "mock", "upstream": transport.snapshot()}), flush=True)
+    return rows
+
+
+def compare(rows: List[dict], baseline_path: str, tolerance: float) -> List[dict]:
+    """
+    Строки, в которых p95 вырос или пропускная способность упала больше чем на tolerance
+    """
+    baseline: Dict[Tuple[str, str, int], dict] = {}
+    with open(baseline_path, encoding="utf-8") as file:
+        for line in file:
+            row = json.loads(line)
+            if "target" in row:
+                baseline[(row["suite"], row["target"], row["concurrency"])] = row
+    regressions = []
+    for row in rows:
+        previous = baseline.get((row["suite"], row["target"], row["concurrency"]))
+        if previous is None:
+            continue
+        if row["p95_ms"] > previous["p95_ms"] * (1 + tolerance) or row["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append({
+                "target": row["target"],
+                "suite": row["suite"],
+                "concurrency": row["concurrency"],
+                "p95_ms": [previous["p95_ms"], row["p95_ms"]],
+                "rps": [previous["rps"], row["rps"]],
+            })
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", choices=("all", "service", "api"), default="all")
+    parser.add_argument("--only", help="Запускать только цели, в названии которых есть эта строка")
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--calls", type=int, default=400, help="Вызовов на цель и уровень параллельности")
+    add_mock_arguments(parser)
+    parser.add_argument("--output", help="Сохранить строки результатов в файл JSONL")
+    parser.add_argument("--baseline", help="JSONL предыдущего запуска для поиска регрессий")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rows = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + "\n")
+    if args.baseline:
+        regressions = compare(rows, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(json.dumps({"regression": regression}, ensure_ascii=False), file=sys.stderr)
+        sys.exit(1 if regressions else 0)
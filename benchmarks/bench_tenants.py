@@ -0,0 +1,181 @@
+"""
+Реестр клиентов (service.tenants) на имитации API: шумный магазин рядом с тихим.
+Шумный держит --noisy-concurrency запросов одновременно, тихий — --quiet-concurrency; задержки
+замеряются у тихого. Запрос — отмена заявки (POST /request/cancel): идемпотентна и не кэшируется,
+так что каждый вызов доходит до API. Режимы:
+
+    shared     оба магазина на одном UpstreamClient и одной политике — один пул соединений
+               и один бюджет частоты запросов, как до реестра
+    isolated   TenantRegistry: у каждого магазина свой пул (--max-connections) и свой бюджет (--rps)
+    construct  стоимость получения сервисов на запрос: создание Calculate, CreatingOrder, DraftDelivery,
+               OrderConfirmation и GetInfoAboutDraft (как зависимости FastAPI раньше) против TenantRegistry.get;
+               затем обход --tenants клиентов при --max-active открытых — сколько вытеснено LRU
+
+Строка JSON на режим.
+
+    python -m benchmarks.bench_tenants --duration 3 --rps 200 --max-connections 10
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from benchmarks.bench_suite import MOCK_HOST, percentile
+from benchmarks.mock_yandex import EndpointProfile, MockYandexAPI, MockYandexTransport
+from src import consts as c
+from service.cache import CachedLoader
+from service.calculation_module import Calculate
+from service.Creating_order import CreatingOrder
+from service.creating_draft import DraftDelivery
+from service.http_client import ClientSettings, UpstreamClient
+from service.interval_store import IntervalStore
+from service.order_confirmation import GetInfoAboutDraft, OrderConfirmation
+from service.pickup_points import PickupPointStore
+from service.quote_cache import QuoteCache
+from service.resilience import UpstreamPolicy
+from service.shared_cache import TwoLevelCache
+from service.tenants import DEFAULT_TENANT, TenantConfig, TenantRegistry, TenantServices
+
+
+def make_registry(args, transport: MockYandexTransport, configs: dict, max_active: int) -> TenantRegistry:
+    client = UpstreamClient("bench", MOCK_HOST, ClientSettings(), transport=transport, policy=UpstreamPolicy())
+    interval_cache = TwoLevelCache("intervals", c.INTERVAL_CACHE_TTL, c.INTERVAL_CACHE_MAX_SIZE)
+    pickup_points = PickupPointStore()
+    pvz_cache = TwoLevelCache("pvz", c.PVZ_CACHE_TTL, 0)
+    default = TenantServices(
+        DEFAULT_TENANT, client,
+        quote_cache=QuoteCache.from_env(),
+        order_lookups=CachedLoader(c.ORDER_LOOKUP_TTL, c.ORDER_LOOKUP_MAX_SIZE),
+        pickup_points=pickup_points,
+        pvz_cache=pvz_cache,
+        interval_cache=interval_cache,
+        intervals=IntervalStore(Calculate("bench", MOCK_HOST, client=client, interval_cache=interval_cache).delivery_interval))
+    return TenantRegistry(
+        default, configs, pickup_points, pvz_cache, transport=transport, max_active=max_active, close_delay=0)
+
+
+async def load(confirmation: OrderConfirmation, request_ids: List[str], concurrency: int, deadline: float) -> List[float]:
+    latencies: List[float] = []
+
+    async def worker(offset: int):
+        index = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await confirmation.cancel_order(request_ids[index % len(request_ids)])
+            latencies.append(time.perf_counter() - started)
+            index += concurrency
+
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    return latencies
+
+
+async def run_contention(mode: str, args) -> dict:
+    api = MockYandexAPI(pickup_points=0)
+    transport = MockYandexTransport(api, EndpointProfile(latency=args.latency))
+    request_ids = api.seed_orders(1000)
+    settings = ClientSettings().model_copy(update={
+        "max_connections": args.max_connections,
+        "max_keepalive_connections": args.max_connections,
+    })
+    registry = None
+    if mode == "shared":
+        client = UpstreamClient(
+            "bench", MOCK_HOST, settings,
+            transport=transport,
+            policy=UpstreamPolicy.from_env(rate=args.rps, burst=args.burst))
+        noisy = quiet = OrderConfirmation("bench", MOCK_HOST, client=client)
+        clients = [client]
+    else:
+        config = {"base_url": MOCK_HOST, "rps": args.rps, "burst": args.burst, "max_connections": args.max_connections}
+        registry = make_registry(args, transport, {
+            "noisy": TenantConfig(api_key="noisy", **config),
+            "quiet": TenantConfig(api_key="quiet", **config),
+        }, max_active=2)
+        noisy, quiet = registry.get("noisy").confirmation, registry.get("quiet").confirmation
+        clients = [registry.default.client]
+    deadline = time.perf_counter() + args.duration
+    try:
+        noisy_latencies, quiet_latencies = await asyncio.gather(
+            load(noisy, request_ids, args.noisy_concurrency, deadline),
+            load(quiet, request_ids, args.quiet_concurrency, deadline))
+    finally:
+        if registry is not None:
+            await registry.aclose()
+        for client in clients:
+            await client.aclose()
+    quiet_latencies.sort()
+    return {
+        "mode": mode,
+        "rps": args.rps,
+        "max_connections": args.max_connections,
+        "noisy_calls": len(noisy_latencies),
+        "quiet_calls": len(quiet_latencies),
+        "quiet_p50_ms": round(percentile(quiet_latencies, 0.50) * 1000, 2),
+        "quiet_p99_ms": round(percentile(quiet_latencies, 0.99) * 1000, 2),
+    }
+
+
+async def run_construct(args) -> dict:
+    transport = MockYandexTransport(MockYandexAPI(pickup_points=0), EndpointProfile(latency="fixed:0"))
+    configs = {f"shop-{index}": TenantConfig(api_key=f"key-{index}", base_url=MOCK_HOST) for index in range(args.tenants)}
+    registry = make_registry(args, transport, configs, max_active=args.max_active)
+    default = registry.default
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        client = default.client
+        Calculate(
+            "bench", MOCK_HOST,
+            client=client,
+            pickup_points=registry.pickup_points,
+            quote_cache=default.quote_cache,
+            pvz_cache=registry.pvz_cache,
+            interval_cache=default.interval_cache,
+            intervals=default.intervals)
+        CreatingOrder("bench", MOCK_HOST, client=client, intervals=default.intervals)
+        DraftDelivery("bench", MOCK_HOST, client=client)
+        OrderConfirmation("bench", MOCK_HOST, client=client)
+        GetInfoAboutDraft("bench", MOCK_HOST, client=client, lookups=default.order_lookups)
+    per_request = (time.perf_counter() - started) / args.iterations
+    names = list(configs)
+    started = time.perf_counter()
+    for index in range(args.iterations):
+        registry.get(names[index % min(len(names), args.max_active)])
+    registry_get = (time.perf_counter() - started) / args.iterations
+    # Обход всех клиентов по кругу при max_active открытых: каждое обращение к давно неиспользованному — новый пул
+    for index in range(args.iterations):
+        registry.get(names[index % len(names)])
+    snapshot = registry.snapshot()
+    await registry.aclose()
+    await default.client.aclose()
+    return {
+        "mode": "construct",
+        "per_request_us": round(per_request * 1e6, 2),
+        "registry_get_us": round(registry_get * 1e6, 2),
+        "tenants": args.tenants,
+        "max_active": args.max_active,
+        "created": snapshot["created"],
+        "evicted": snapshot["evicted"],
+    }
+
+
+async def main(args):
+    for mode in (mode.strip() for mode in args.modes.split(",")):
+        row = await run_construct(args) if mode == "construct" else await run_contention(mode, args)
+        print(json.dumps(row, ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="shared,isolated,construct")
+    parser.add_argument("--duration", type=float, default=3.0, help="Секунд нагрузки на режим")
+    parser.add_argument("--noisy-concurrency", type=int, default=64)
+    parser.add_argument("--quiet-concurrency", type=int, default=2)
+    parser.add_argument("--rps", type=float, default=200, help="Бюджет запросов в секунду на эндпоинт")
+    parser.add_argument("--burst", type=int, default=20)
+    parser.add_argument("--max-connections", type=int, default=10)
+    parser.add_argument("--tenants", type=int, default=200)
+    parser.add_argument("--max-active", type=int, default=64)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--latency", default="lognormal:0.02:0.4")
+    asyncio.run(main(parser.parse_args()))
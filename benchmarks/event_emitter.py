@@ -0,0 +1,165 @@
+"""
+Генератор push-событий о смене статусов заявок для нагрузки на POST /orders/events.
+Каждая из --orders заявок проходит статусы имитации API (STATUS_FLOW); события идут волнами —
+по шагу всех заявок в случайном порядке. Доля --duplicate-rate событий отправляется повторно
+в одном из следующих пакетов, доля --drop-rate теряется (разрыв в sequence, заявка сверяется с API).
+
+Режимы:
+    http     пакеты --batch событий отправляются в приложение (в процессе или на --url) в --connections потоков
+    ingest   события передаются OrderTracker.ingest напрямую — предел пропускной способности без HTTP и валидации
+
+Выводится строка JSON: отправлено событий, событий в секунду, итоги приема (applied/duplicate/stale/gaps),
+для приложения в процессе — счетчики трекера и обращения к имитации API (сверки заявок).
+
+    python -m benchmarks.event_emitter --orders 20000 --batch 500 --connections 4
+    python -m benchmarks.event_emitter --mode ingest --orders 50000 --listeners 2
+    python -m benchmarks.event_emitter --url http://localhost:8000 --rate 20000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.bench_suite import add_mock_arguments, mock_transport, percentile, running_app
+from benchmarks.mock_yandex import STATUS_FLOW
+from src import consts as c
+
+
+def generate_events(
+    orders: int,
+    duplicate_rate: float,
+    drop_rate: float,
+    seed: int,
+    started: Optional[float] = None,
+) -> List[dict]:
+    """
+    События в порядке отправки; повторы вставлены на случайную позицию в пределах следующей волны
+    """
+    rng = random.Random(seed)
+    started = started if started is not None else time.time() - len(STATUS_FLOW) * 60
+    request_ids = [f"evt-{seed}-{index}" for index in range(orders)]
+    events: List[dict] = []
+    for step, status in enumerate(STATUS_FLOW):
+        wave: List[dict] = []
+        for index in rng.sample(range(orders), orders):
+            event = {
+                "request_id": request_ids[index],
+                "status": status,
+                "timestamp": round(started + step * 60 + index / orders, 6),
+                "description": status.replace("_", " ").capitalize(),
+                "sequence": step,
+            }
+            if rng.random() < drop_rate:
+                continue
+            wave.append(event)
+            if rng.random() < duplicate_rate:
+                wave.insert(rng.randrange(len(wave)), dict(event))
+        events += wave
+    return events
+
+
+async def post_batches(client: httpx.AsyncClient, events: List[dict], args) -> dict:
+    """
+    Отправка пакетов в args.connections потоков; при args.rate — не быстрее rate событий в секунду
+    """
+    path = f"{c.PATH_PREFIX}/orders/events"
+    batches = [events[start:start + args.batch] for start in range(0, len(events), args.batch)]
+    counter = itertools.count()
+    totals: Counter = Counter()
+    latencies: List[float] = []
+    headers = {"X-Events-Token": args.token} if args.token else None
+    started = time.perf_counter()
+
+    async def worker():
+        for index in iter(lambda: next(counter), None):
+            if index >= len(batches):
+                return
+            if args.rate:
+                delay = started + index * args.batch / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            sent = time.perf_counter()
+            response = await client.post(path, json={"events": batches[index]}, headers=headers)
+            latencies.append(time.perf_counter() - sent)
+            if response.status_code != 200:
+                totals[f"http_{response.status_code}"] += 1
+                continue
+            totals.update(response.json())
+
+    await asyncio.gather(*(worker() for _ in range(args.connections)))
+    latencies.sort()
+    return {
+        "batches": len(batches),
+        "result": dict(totals),
+        "batch_p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "batch_p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def ingest_all(tracker, events: List[dict]) -> dict:
+    totals: Counter = Counter()
+    for event in events:
+        totals[tracker.ingest(event)] += 1
+    return {"result": dict(totals)}
+
+
+async def main(args) -> dict:
+    events = generate_events(args.orders, args.duplicate_rate, args.drop_rate, args.seed)
+    row: Dict[str, object] = {"mode": args.mode, "orders": args.orders, "events": len(events)}
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            started = time.perf_counter()
+            row.update(await post_batches(client, events, args))
+            elapsed = time.perf_counter() - started
+        row.update(elapsed_s=round(elapsed, 3), events_per_s=round(len(events) / elapsed))
+        return row
+
+    transport = mock_transport(args)
+    # Сверка заявки с API должна находить заявки, заведенные генератором
+    transport.api.auto_orders = True
+    async with running_app(transport) as client:
+        from main import app
+        tracker = app.state.order_tracker
+        delivered = Counter()
+        for _ in range(args.listeners):
+            tracker.add_listener(lambda event: delivered.update((event["status"],)))
+        started = time.perf_counter()
+        if args.mode == "ingest":
+            row.update(ingest_all(tracker, events))
+        else:
+            row.update(await post_batches(client, events, args))
+        elapsed = time.perf_counter() - started
+        # Сверки заявок с пропущенными событиями идут в фоне; даем им завершиться
+        await asyncio.sleep(args.settle)
+        row.update(
+            elapsed_s=round(elapsed, 3),
+            events_per_s=round(len(events) / elapsed),
+            listener_deliveries=sum(delivered.values()),
+            tracker=tracker.snapshot(),
+            upstream={path: endpoint["requests"] for path, endpoint in transport.snapshot().items()},
+        )
+    return row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("http", "ingest"), default="http")
+    parser.add_argument("--url", help="Адрес запущенного сервиса; без него приложение поднимается в процессе")
+    parser.add_argument("--token", default=c.STATUS_EVENTS_TOKEN, help="Значение заголовка X-Events-Token")
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--drop-rate", type=float, default=0.001)
+    parser.add_argument("--batch", type=int, default=500, help="Событий в одном запросе")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0.0, help="Событий в секунду; 0 — без ограничения")
+    parser.add_argument("--listeners", type=int, default=1, help="Внутренние обработчики изменений в трекере")
+    parser.add_argument("--settle", type=float, default=1.0, help="Ожидание фоновых сверок после отправки, секунды")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args)), ensure_ascii=False))
@@ -0,0 +1,57 @@
+"""
+Минимальная замена redis.asyncio.Redis в памяти: get/set(nx, px, ex)/delete.
+Позволяет проверять общий кэш без запущенного Redis, в том числе его недоступность.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class FakeRedis():
+    """
+    latency: float - Задержка каждой операции, секунды
+    down: bool - Пока True, все операции завершаются ConnectionError
+    """
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.down = False
+        self.calls = 0
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    async def _tick(self):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.down:
+            raise ConnectionError("fake redis is down")
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        await self._tick()
+        return self._alive(key)
+
+    async def set(self, key: str, value: Any, ex: Optional[float] = None, px: Optional[int] = None, nx: bool = False):
+        await self._tick()
+        if nx and self._alive(key) is not None:
+            return None
+        ttl = px / 1000 if px is not None else ex
+        if isinstance(value, str):
+            value = value.encode()
+        self._data[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        await self._tick()
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+    async def aclose(self):
+        pass
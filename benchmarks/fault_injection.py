@@ -0,0 +1,71 @@
+"""
+Транспорт httpx с внедрением сбоев для проверки политики повторов и автомата защиты
+без обращения к настоящему API.
+"""
+import asyncio
+import inspect
+import random
+from typing import Callable, Optional, Sequence, Union
+
+import httpx
+
+
+class FaultInjectingTransport(httpx.AsyncBaseTransport):
+    """
+    Обертка над обработчиком запросов, которая с заданной вероятностью возвращает ошибки
+    handler: Callable - Обработчик запроса (синхронный или async), возвращает httpx.Response
+    error_rate: float - Доля ответов 5xx
+    throttle_rate: float - Доля ответов 429
+    timeout_rate: float - Доля запросов, завершающихся таймаутом
+    retry_after: float - Значение заголовка Retry-After для ответов 429
+    latency: float | Callable - Задержка перед ответом, секунды, или функция random.Random -> задержка
+    outage: bool - Пока True, все запросы получают 503
+    """
+    def __init__(
+        self,
+        handler: Callable,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        retry_after: Optional[float] = None,
+        latency: Union[float, Callable[[random.Random], float]] = 0.0,
+        error_statuses: Sequence[int] = (500, 502, 503, 504),
+        seed: Optional[int] = None,
+    ):
+        self.handler = handler
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.timeout_rate = timeout_rate
+        self.retry_after = retry_after
+        self.latency = latency
+        self.error_statuses = tuple(error_statuses)
+        self.outage = False
+        self.requests = 0
+        self.injected = 0
+        self._random = random.Random(seed)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        latency = self.latency(self._random) if callable(self.latency) else self.latency
+        if latency:
+            await asyncio.sleep(latency)
+        if self.outage:
+            self.injected += 1
+            return httpx.Response(503, request=request)
+        roll = self._random.random()
+        if roll < self.timeout_rate:
+            self.injected += 1
+            raise httpx.ReadTimeout("injected timeout", request=request)
+        roll -= self.timeout_rate
+        if roll < self.throttle_rate:
+            self.injected += 1
+            headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else {}
+            return httpx.Response(429, headers=headers, request=request)
+        roll -= self.throttle_rate
+        if roll < self.error_rate:
+            self.injected += 1
+            return httpx.Response(self._random.choice(self.error_statuses), request=request)
+        response = self.handler(request)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
@@ -0,0 +1,341 @@
+"""
+Локальная имитация API Яндекс.Доставки для бенчмарков: все эндпоинты, к которым обращается сервис,
+с настраиваемыми распределениями задержки и ошибок по каждому эндпоинту.
+Работает как транспорт httpx в том же процессе — сеть и настоящий API не нужны.
+"""
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fault_injection import FaultInjectingTransport
+
+ENDPOINTS = (
+    "/pricing-calculator",
+    "/offers/info",
+    "/pickup-points/list",
+    "/request/create",
+    "/offers/create",
+    "/offers/confirm",
+    "/request/info",
+    "/request/tracking",
+    "/request/datetime_options",
+    "/request/history",
+    "/request/cancel",
+    "/request/edit",
+)
+
+# Статусы, через которые проходит заказ в имитации, по одному шагу раз в status_step секунд
+STATUS_FLOW = (
+    "CREATED",
+    "DELIVERY_PROCESSING_STARTED",
+    "DELIVERY_TRANSPORTATION",
+    "DELIVERY_ARRIVED_PICKUP_POINT",
+    "DELIVERY_DELIVERED",
+)
+
+
+def latency_model(spec: str) -> Callable[[random.Random], float]:
+    """
+    Распределение задержки из строки вида вид:параметры, секунды:
+    fixed:0.02, uniform:0.01:0.05, exp:0.02 (среднее), lognormal:0.02:0.5 (медиана и sigma)
+    """
+    kind, *args = spec.split(":")
+    values = [float(arg) for arg in args]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) if values[0] > 0 else 0.0
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+
+@dataclass
+class EndpointProfile():
+    """
+    Поведение эндпоинта имитации
+    latency: str - Распределение задержки, см. latency_model
+    error_rate: float - Доля ответов 5xx
+    throttle_rate: float - Доля ответов 429
+    timeout_rate: float - Доля запросов, завершающихся таймаутом
+    retry_after: float - Retry-After для ответов 429, секунды
+    """
+    latency: str = "fixed:0"
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    timeout_rate: float = 0.0
+    retry_after: Optional[float] = None
+
+    @classmethod
+    def parse(cls, spec: str, default: "EndpointProfile") -> "EndpointProfile":
+        """
+        Профиль из строки latency[,error=0.01][,throttle=0.01][,timeout=0.01][,retry_after=0.05]
+        на основе профиля по умолчанию
+        """
+        latency, *options = spec.split(",")
+        values = dict(option.split("=", 1) for option in options)
+        return cls(
+            latency=latency or default.latency,
+            error_rate=float(values.get("error", default.error_rate)),
+            throttle_rate=float(values.get("throttle", default.throttle_rate)),
+            timeout_rate=float(values.get("timeout", default.timeout_rate)),
+            retry_after=float(values["retry_after"]) if "retry_after" in values else default.retry_after,
+        )
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat().replace("+00:00", "Z")
+
+
+class MockYandexAPI():
+    """
+    Обработчик запросов имитации: правдоподобные ответы и состояние созданных заказов
+    pickup_points: int - Количество ПВЗ в ответе /pickup-points/list
+    status_step: float - Через сколько секунд заказ переходит в следующий статус
+    auto_orders: bool - Неизвестный request_id не дает 404, а заводит заявку при первом обращении
+    """
+    def __init__(self, pickup_points: int = 2000, status_step: float = 5.0, seed: int = 1, auto_orders: bool = False):
+        self.status_step = status_step
+        self.auto_orders = auto_orders
+        self.orders: Dict[str, dict] = {}
+        self.request_codes: Dict[str, str] = {}
+        self._random = random.Random(seed)
+        self.points = [self._point(index) for index in range(pickup_points)]
+        self._routes = {
+            "/pricing-calculator": self.pricing_calculator,
+            "/offers/info": self.offers_info,
+            "/pickup-points/list": self.pickup_points_list,
+            "/request/create": self.request_create,
+            "/offers/create": self.offers_create,
+            "/offers/confirm": self.offers_confirm,
+            "/request/info": self.request_info,
+            "/request/tracking": self.request_tracking,
+            "/request/datetime_options": self.datetime_options,
+            "/request/history": self.request_history,
+            "/request/cancel": self.request_cancel,
+            "/request/edit": self.request_edit,
+        }
+
+    def _point(self, index: int) -> dict:
+        return {
+            "id": f"pvz-{index:06d}",
+            "type": "pickup_point" if index % 5 else "terminal",
+            "position": {
+                "latitude": round(self._random.uniform(55.55, 55.95), 6),
+                "longitude": round(self._random.uniform(37.35, 37.85), 6),
+            },
+            "payment_methods": ["already_paid", "card_on_receipt"] if index % 3 else ["already_paid"],
+            "name": f"Пункт выдачи заказов №{index}",
+            "operator_station_id": str(100000 + index),
+            "address": {
+                "full_address": f"Москва, улица Тестовая, дом {index}",
+                "country": "Россия",
+                "region": "Москва",
+                "locality": "Москва",
+                "street": "улица Тестовая",
+                "house": str(index),
+                "postal_code": "101000",
+            },
+            "contact": {"phone": "+78000000000"},
+            "instruction": "Вход со двора, второй подъезд, звонок на двери пункта выдачи",
+            "schedule": {
+                "time_zone": 3,
+                "restrictions": [
+                    {"days": [1, 2, 3, 4, 5], "time_from": {"hours": 9, "minutes": 0},
+                     "time_to": {"hours": 21, "minutes": 0}},
+                    {"days": [6, 7], "time_from": {"hours": 10, "minutes": 0},
+                     "time_to": {"hours": 18, "minutes": 0}},
+                ],
+            },
+            "is_yandex_branded": bool(index % 2),
+            "is_market_partner": False,
+            "is_dark_store": False,
+            "is_post_office": False,
+        }
+
+    def create_order(self, operator_request_id: Optional[str] = None) -> str:
+        request_id = uuid.UUID(int=self._random.getrandbits(128)).hex
+        self.orders[request_id] = {"created_at": time.time(), "operator_request_id": operator_request_id}
+        if operator_request_id is not None:
+            self.request_codes[operator_request_id] = request_id
+        return request_id
+
+    def seed_orders(self, count: int) -> List[str]:
+        return [self.create_order(f"seed-{index}") for index in range(count)]
+
+    def _status_index(self, order: dict) -> int:
+        steps = int((time.time() - order["created_at"]) / self.status_step) if self.status_step > 0 else 0
+        return min(steps, len(STATUS_FLOW) - 1)
+
+    def _order(self, request: httpx.Request) -> Optional[str]:
+        request_id = request.url.params.get("request_id")
+        if request_id is None and request.content:
+            request_id = json.loads(request.content).get("request_id")
+        if request_id is not None and request_id not in self.orders and self.auto_orders:
+            # Воспроизведение записанного трафика: заявки из журнала имитации неизвестны.
+            # По request_code заявки не создаются — по нему проверяют, что заказа еще нет
+            self.orders[request_id] = {"created_at": time.time(), "operator_request_id": None}
+        if request_id is None:
+            request_id = self.request_codes.get(request.url.params.get("request_code"))
+        return request_id if request_id in self.orders else None
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        route = self._routes.get(request.url.path)
+        if route is None:
+            return httpx.Response(404, json={"code": "not_found", "message": "Unknown endpoint"}, request=request)
+        status, body = route(request)
+        return httpx.Response(status, json=body, request=request)
+
+    def pricing_calculator(self, request: httpx.Request):
+        body = json.loads(request.content)
+        weight = int(body.get("total_weight") or 0)
+        price = 149 + weight // 500 * 25
+        return 200, {"pricing_total": f"{price}.00 RUB", "delivery_days": {"min": 1, "max": 3}}
+
+    def offers_info(self, request: httpx.Request):
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        offers = [
+            {"from": _iso(start + timedelta(days=day, hours=hour)),
+             "to": _iso(start + timedelta(days=day, hours=hour + 2))}
+            for day in range(3) for hour in (0, 4, 8)
+        ]
+        return 200, {"offers": offers}
+
+    def pickup_points_list(self, request: httpx.Request):
+        return 200, {"points": self.points}
+
+    def request_create(self, request: httpx.Request):
+        body = json.loads(request.content)
+        operator_request_id = body["info"]["operator_request_id"]
+        request_id = self.request_codes.get(operator_request_id) or self.create_order(operator_request_id)
+        return 200, {"request_id": request_id}
+
+    def offers_create(self, request: httpx.Request):
+        body = json.loads(request.content)
+        offer_id = f"offer-{body['info']['operator_request_id']}"
+        return 200, {"order_id": offer_id, "offers": [{"offer_id": offer_id}]}
+
+    def offers_confirm(self, request: httpx.Request):
+        offer_id = json.loads(request.content)["offer_id"]
+        request_id = self.request_codes.get(offer_id) or self.create_order(offer_id)
+        return 200, {"request_id": request_id}
+
+    def request_info(self, request: httpx.Request):
+        request_id = self._order(request)
+        if request_id is None:
+            return 404, {"code": "not_found", "message": "Request not found"}
+        order = self.orders[request_id]
+        status = "CANCELLED" if order.get("cancelled") else STATUS_FLOW[self._status_index(order)]
+        changed_at = order["created_at"] + self._status_index(order) * self.status_step
+        return 200, {
+            "request_id": request_id,
+            "request": {"info": {"operator_request_id": order["operator_request_id"]}},
+            "full_items_price": 100000,
+            "sharing_url": f"https://dostavka.yandex.ru/route/{request_id}",
+            "state": {
+                "status": status,
+                "description": status,
+                "timestamp": int(changed_at),
+                "timestamp_utc": _iso(datetime.fromtimestamp(changed_at, timezone.utc)),
+            },
+            "self_pickup_node_code": {"code": "123456", "type": "pickup_point"},
+        }
+
+    def request_tracking(self, request: httpx.Request):
+        if self._order(request) is None:
+            return 404, {"code": "not_found", "message": "Request not found"}
+        day = datetime.now(timezone.utc).replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=2)
+        return 200, {
+            "delivery_date": day.date().isoformat(),
+            "delivery_interval": {"min": _iso(day), "max": _iso(day + timedelta(hours=12))},
+        }
+
+    def datetime_options(self, request: httpx.Request):
+        if self._order(request) is None:
+            return 404, {"code": "not_found", "message": "Request not found"}
+        day = datetime.now(timezone.utc).replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=2)
+        return 200, {"options": [
+            {"from": _iso(day + timedelta(days=offset)), "to": _iso(day + timedelta(days=offset, hours=12))}
+            for offset in range(3)
+        ]}
+
+    def request_history(self, request: httpx.Request):
+        request_id = self._order(request)
+        if request_id is None:
+            return 404, {"code": "not_found", "message": "Request not found"}
+        order = self.orders[request_id]
+        return 200, {"state_history": [
+            {"status": status, "description": status,
+             "timestamp": int(order["created_at"] + index * self.status_step)}
+            for index, status in enumerate(STATUS_FLOW[:self._status_index(order) + 1])
+        ]}
+
+
+    def request_cancel(self, request: httpx.Request):
+        request_id = self._order(request)
+        if request_id is None:
+            return 404, {"code": "not_found", "message": "Request not found"}
+        self.orders[request_id]["cancelled"] = True
+        return 200, {"status": "CANCELLED", "reason": None, "description": "Заявка отменена"}
+
+    def request_edit(self, request: httpx.Request):
+        request_id = self._order(request)
+        if request_id is None:
+            return 404, {"code": "not_found", "message": "Request not found"}
+        order = self.orders[request_id]
+        order["edits"] = order.get("edits", 0) + 1
+        return 200, {"editing_task_id": f"edit-{request_id}-{order['edits']}"}
+
+
+class MockYandexTransport(httpx.AsyncBaseTransport):
+    """
+    Транспорт httpx поверх MockYandexAPI: для каждого эндпоинта свой профиль задержки и ошибок
+    default: EndpointProfile - Профиль для эндпоинтов без переопределения
+    profiles: dict - Профили отдельных эндпоинтов по пути
+    """
+    def __init__(
+        self,
+        api: Optional[MockYandexAPI] = None,
+        default: Optional[EndpointProfile] = None,
+        profiles: Optional[Dict[str, EndpointProfile]] = None,
+        seed: int = 1,
+    ):
+        self.api = api or MockYandexAPI(seed=seed)
+        default = default or EndpointProfile()
+        profiles = profiles or {}
+        self._endpoints = {
+            path: self._transport(profiles.get(path, default), seed + index)
+            for index, path in enumerate(ENDPOINTS)
+        }
+        self._fallback = FaultInjectingTransport(self.api.handle)
+
+    def _transport(self, profile: EndpointProfile, seed: int) -> FaultInjectingTransport:
+        return FaultInjectingTransport(
+            self.api.handle,
+            error_rate=profile.error_rate,
+            throttle_rate=profile.throttle_rate,
+            timeout_rate=profile.timeout_rate,
+            retry_after=profile.retry_after,
+            latency=latency_model(profile.latency),
+            seed=seed,
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self._endpoints.get(request.url.path, self._fallback)
+        return await transport.handle_async_request(request)
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            path: {"requests": transport.requests, "injected": transport.injected}
+            for path, transport in self._endpoints.items()
+            if transport.requests
+        }
@@ -0,0 +1,277 @@
+"""
+Воспроизведение записанного трафика на FastAPI-приложении с имитацией API Яндекс.Доставки.
+Журнал — JSONL в формате service.request_log.RequestLog (пишется при заданном REQUEST_LOG_PATH):
+обязательны method и path, остальные поля (ts, query, content_type, body/body_b64) необязательны.
+
+Режимы:
+    original     запросы уходят с исходными интервалами между ними
+    compressed   интервалы сокращены в --speed раз
+    max          без пауз, не более --concurrency запросов одновременно
+
+По каждому маршруту выводится строка JSON: число запросов, коды ответов, доля ошибок
+(5xx и исключения), p50/p95/p99 и максимум задержки. В режимах с расписанием lag_p99_ms —
+отставание отправки от расписания: если оно растет, генератор или приложение не успевают
+за исходной нагрузкой. Затем итоговая строка и обращения к имитации API.
+
+    python -m benchmarks.replay traffic.jsonl --mode compressed --speed 10
+    python -m benchmarks.replay traffic.jsonl --mode max --concurrency 64 --latency lognormal:0.05:0.5
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from starlette.routing import Match
+
+from benchmarks.bench_suite import add_mock_arguments, mock_transport, percentile, running_app
+
+
+@dataclass
+class RecordedRequest():
+    """
+    Запрос из журнала
+    offset: float - Время от первого запроса журнала, секунды
+    """
+    offset: float
+    method: str
+    path: str
+    query: str = ""
+    content_type: Optional[str] = None
+    body: Optional[bytes] = None
+
+
+@dataclass
+class RouteStats():
+    statuses: Counter = field(default_factory=Counter)
+    latencies: List[float] = field(default_factory=list)
+    lags: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def add(self, status: Optional[int], latency: float, lag: Optional[float]):
+        self.statuses[str(status) if status is not None else "exception"] += 1
+        if status is None or status >= 500:
+            self.errors += 1
+        self.latencies.append(latency)
+        if lag is not None:
+            self.lags.append(lag)
+
+    def merge(self, other: "RouteStats"):
+        self.statuses.update(other.statuses)
+        self.latencies += other.latencies
+        self.lags += other.lags
+        self.errors += other.errors
+
+    def row(self, elapsed: float) -> dict:
+        latencies, lags = sorted(self.latencies), sorted(self.lags)
+        count = len(latencies)
+        row = {
+            "requests": count,
+            "statuses": dict(sorted(self.statuses.items())),
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "rps": round(count / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
+        if lags:
+            row["lag_p99_ms"] = round(percentile(lags, 0.99) * 1000, 2)
+        return row
+
+
+def load_log(path: str, limit: Optional[int] = None) -> Tuple[List[RecordedRequest], Counter]:
+    """
+    Запросы журнала по возрастанию времени и счетчик пропущенных строк по причинам
+    """
+    entries = []
+    skipped: Counter = Counter()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                skipped["invalid_json"] += 1
+                continue
+            if not isinstance(entry, dict) or "method" not in entry or "path" not in entry:
+                skipped["no_method_or_path"] += 1
+            elif entry.get("body_truncated"):
+                # Без тела запрос не повторить так, как он был отправлен
+                skipped["body_truncated"] += 1
+            else:
+                entries.append(entry)
+    entries.sort(key=lambda entry: entry.get("ts") or 0.0)
+    if limit:
+        entries = entries[:limit]
+    first = (entries[0].get("ts") or 0.0) if entries else 0.0
+    requests = []
+    for entry in entries:
+        body = entry.get("body")
+        requests.append(RecordedRequest(
+            offset=max(0.0, (entry.get("ts") or first) - first),
+            method=entry["method"].upper(),
+            path=entry["path"],
+            query=entry.get("query") or "",
+            content_type=entry.get("content_type"),
+            body=body.encode() if body is not None else
+            base64.b64decode(entry["body_b64"]) if entry.get("body_b64") else None,
+        ))
+    return requests, skipped
+
+
+class RouteResolver():
+    """
+    Шаблон маршрута FastAPI для пути запроса — чтобы сводить статистику по /orders/{id}, а не по каждому id
+    """
+    def __init__(self, app):
+        self.app = app
+        self._cache: Dict[Tuple[str, str], str] = {}
+
+    def __call__(self, method: str, path: str) -> str:
+        key = (method, path)
+        label = self._cache.get(key)
+        if label is None:
+            label = f"{method} unmatched"
+            scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+            for route in self.app.routes:
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    label = f"{method} {route.path}"
+                    break
+            self._cache[key] = label
+        return label
+
+
+async def send(client: httpx.AsyncClient, request: RecordedRequest) -> Tuple[Optional[int], float]:
+    """
+    Отправка запроса; задержка считается до полного чтения тела ответа, включая потоковые
+    """
+    url = f"{request.path}?{request.query}" if request.query else request.path
+    headers = {"content-type": request.content_type} if request.content_type else None
+    started = time.perf_counter()
+    try:
+        response = await client.request(request.method, url, content=request.body, headers=headers)
+        status: Optional[int] = response.status_code
+    except Exception:
+        status = None
+    return status, time.perf_counter() - started
+
+
+async def replay_scheduled(
+    client: httpx.AsyncClient,
+    requests: List[RecordedRequest],
+    speed: float,
+    max_in_flight: int,
+    record,
+):
+    """
+    Отправка по расписанию журнала, ускоренному в speed раз
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_in_flight)
+    started = loop.time()
+    tasks = []
+
+    async def run(request: RecordedRequest, lag: float):
+        try:
+            status, latency = await send(client, request)
+            record(request, status, latency, lag)
+        finally:
+            semaphore.release()
+
+    for request in requests:
+        due = started + request.offset / speed
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(run(request, max(0.0, loop.time() - due))))
+    await asyncio.gather(*tasks)
+
+
+async def replay_max(client: httpx.AsyncClient, requests: List[RecordedRequest], concurrency: int, record):
+    """
+    Отправка без пауз в порядке журнала, не более concurrency запросов одновременно
+    """
+    counter = itertools.count()
+
+    async def worker():
+        for index in iter(lambda: next(counter), None):
+            if index >= len(requests):
+                return
+            status, latency = await send(client, requests[index])
+            record(requests[index], status, latency, None)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def main(args) -> List[dict]:
+    requests, skipped = load_log(args.log, args.limit)
+    if skipped:
+        print(json.dumps({"skipped": dict(skipped)}), file=sys.stderr)
+    if not requests:
+        print(json.dumps({"error": "В журнале нет запросов для воспроизведения"}), file=sys.stderr)
+        return []
+    transport = mock_transport(args)
+    transport.api.auto_orders = not args.strict_orders
+    stats: Dict[str, RouteStats] = {}
+    rows: List[dict] = []
+    async with running_app(transport) as client:
+        from main import app
+        resolve = RouteResolver(app)
+
+        def record(request: RecordedRequest, status: Optional[int], latency: float, lag: Optional[float]):
+            stats.setdefault(resolve(request.method, request.path), RouteStats()).add(status, latency, lag)
+
+        started = time.perf_counter()
+        if args.mode == "max":
+            await replay_max(client, requests, args.concurrency, record)
+        else:
+            speed = 1.0 if args.mode == "original" else args.speed
+            await replay_scheduled(client, requests, speed, args.max_in_flight, record)
+        elapsed = time.perf_counter() - started
+
+    total = RouteStats()
+    for route, route_stats in sorted(stats.items()):
+        rows.append({"mode": args.mode, "route": route, **route_stats.row(elapsed)})
+        total.merge(route_stats)
+    rows.append({
+        "mode": args.mode, "route": "*", **total.row(elapsed),
+        "elapsed_s": round(elapsed, 3), "log_span_s": round(requests[-1].offset, 3),
+    })
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False), flush=True)
+    print(json.dumps({"mode": args.mode, "upstream": transport.snapshot()}), flush=True)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="Журнал запросов JSONL")
+    parser.add_argument("--mode", choices=("original", "compressed", "max"), default="original")
+    parser.add_argument("--speed", type=float, default=10.0, help="Ускорение расписания в режиме compressed")
+    parser.add_argument("--concurrency", type=int, default=32, help="Одновременных запросов в режиме max")
+    parser.add_argument(
+        "--max-in-flight", type=int, default=1000,
+        help="Предел одновременных запросов в режимах с расписанием; при его достижении растет lag")
+    parser.add_argument("--limit", type=int, help="Воспроизвести только первые N запросов")
+    parser.add_argument(
+        "--strict-orders", action="store_true",
+        help="Неизвестные имитации request_id дают 404, а не заводятся при первом обращении")
+    add_mock_arguments(parser)
+    parser.add_argument("--output", help="Сохранить строки результатов в файл JSONL")
+    args = parser.parse_args()
+
+    rows = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + "\n")
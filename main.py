@@ -1,13 +1,226 @@
+import asyncio
+import hmac
 import json
 import logging
 import httpx
+from contextlib import asynccontextmanager
+from datetime import datetime
 from typing import Any, Dict, List, Optional
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI, Depends, Header, HTTPException, Request
 from fastapi.websockets import WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
+from src import consts as c
+from schemas.Order_model import PaymentMethod, PickupStationType
+from schemas.Order_info_model import BulkOrderInfoRequest
+from schemas.Job_model import BulkOrderJobRequest
+from schemas.Pricing_model import PricingCartRequest, PricingMatrixRequest
+from schemas.Status_event_model import StatusEventBatch
+from schemas.Submission_model import BulkSubmissionRequest
+from service.http_client import ClientSettings, UpstreamClient, UpstreamClientPool
+from service.resilience import CircuitOpenError, UpstreamPolicy
+from service.metrics import HTTPMetrics, MetricsMiddleware, UpstreamMetrics, make_registry
+from service.request_log import RequestLog, RequestLogMiddleware
+from service.calculation_module import Calculate
+from service.cart import CartError
+from service.pickup_points import PickupPointStore
+from service.pvz_snapshot import PickupPointSnapshot
+from service.interval_store import IntervalStore, NoAvailableIntervalError
+from service.cache import CachedLoader
+from service.quote_cache import QuoteCache
+from service.price_table import PriceTable
+from service.shared_cache import TwoLevelCache, make_redis
+from service.order_tracker import OrderTracker, TrackerFullError
+from service.job_journal import JobError, JobJournal
+from service.tenants import DEFAULT_TENANT, TenantRegistry, TenantServices, UnknownTenantError, load_tenants
+from service.submission_pipeline import OrderSubmission, SubmissionPipeline
+from service.Creating_order import CreatingOrder
+from service.creating_draft import DraftDelivery
+from service.order_confirmation import OrderConfirmation, GetInfoAboutDraft
 
-app=FastAPI()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tenant_configs = load_tenants(c.TENANTS_FILE)
+    # Адреса методов API проверяются до запуска: ошибка в настройках останавливает старт, а не первый запрос
+    c.endpoints()
+    if any(config.test for config in tenant_configs.values()):
+        c.endpoints(True)
+    app.state.metrics = make_registry()
+    app.state.request_log = RequestLog(
+        c.REQUEST_LOG_PATH, c.REQUEST_LOG_MAX_BODY, c.REQUEST_LOG_MAX_PENDING) if c.REQUEST_LOG_PATH else None
+    if app.state.request_log is not None:
+        app.state.request_log.start()
+    app.state.http_metrics = upstream_metrics = None
+    if app.state.metrics is not None:
+        upstream_metrics = UpstreamMetrics(app.state.metrics)
+        app.state.http_metrics = HTTPMetrics(app.state.metrics)
+        app.state.metrics.add_collector(lambda: _state_metrics(app))
+    # upstream_transport задается до запуска приложения только бенчмарками — подмена API на имитацию
+    app.state.upstream = UpstreamClientPool(
+        ClientSettings.from_env(),
+        transport=getattr(app.state, "upstream_transport", None),
+        policy=UpstreamPolicy.from_env(upstream_metrics))
+    snapshot = PickupPointSnapshot(c.PVZ_SNAPSHOT_PATH) if c.PVZ_SNAPSHOT_PATH else None
+    app.state.pickup_points = PickupPointStore(snapshot)
+    # Снимок, записанный другим воркером или прошлым запуском, позволяет отвечать сразу, не дожидаясь API
+    await asyncio.to_thread(app.state.pickup_points.restore)
+    app.state.redis = make_redis()
+    app.state.quote_cache = QuoteCache.from_env(app.state.redis)
+    # Список ПВЗ уже лежит в PickupPointStore, поэтому в памяти процесса его не дублируем
+    app.state.pvz_cache = TwoLevelCache("pvz", c.PVZ_CACHE_TTL, 0, redis=app.state.redis)
+    app.state.interval_cache = TwoLevelCache(
+        "intervals", c.INTERVAL_CACHE_TTL, c.INTERVAL_CACHE_MAX_SIZE, redis=app.state.redis)
+    calculate = Calculate(
+        c.yandex_key, c.yandex_host,
+        client=app.state.upstream.get(c.yandex_key, c.yandex_host),
+        pickup_points=app.state.pickup_points,
+        pvz_cache=app.state.pvz_cache)
+    client = app.state.upstream.get(c.yandex_key, c.yandex_host)
+    app.state.order_lookups = CachedLoader(c.ORDER_LOOKUP_TTL, c.ORDER_LOOKUP_MAX_SIZE)
+    # Интервалы загружаются через общий кэш, чтобы воркеры не запрашивали один склад каждый сам
+    app.state.intervals = IntervalStore(
+        Calculate(c.yandex_key, c.yandex_host, client=client, interval_cache=app.state.interval_cache).delivery_interval)
+    # Таблица цен обновляется расчетами мимо кэшей: в таблицу попадает свежий ответ API
+    app.state.price_table = PriceTable.from_env(Calculate(c.yandex_key, c.yandex_host, client=client).calculate_delivery)
+    # Сервисы на ключе yandex_key создаются один раз: их используют запросы без X-Tenant и фоновые задачи
+    default = TenantServices(
+        DEFAULT_TENANT, client,
+        quote_cache=app.state.quote_cache,
+        order_lookups=app.state.order_lookups,
+        pickup_points=app.state.pickup_points,
+        pvz_cache=app.state.pvz_cache,
+        interval_cache=app.state.interval_cache,
+        intervals=app.state.intervals,
+        price_table=app.state.price_table)
+    app.state.tenants = TenantRegistry(
+        default, tenant_configs,
+        pickup_points=app.state.pickup_points,
+        pvz_cache=app.state.pvz_cache,
+        redis=app.state.redis,
+        transport=getattr(app.state, "upstream_transport", None),
+        metrics=upstream_metrics)
+    app.state.order_tracker = OrderTracker(default.info)
+    app.state.order_tracker.start()
+    # Журнал открывается до приема запросов: незавершенные задания прошлого запуска продолжаются сразу
+    app.state.jobs = JobJournal(c.JOB_JOURNAL_PATH, default.confirmation)
+    await app.state.jobs.start()
+    app.state.submissions = SubmissionPipeline(
+        default.creating_order,
+        default.draft_delivery,
+        default.confirmation,
+        # Проверка, создан ли уже заказ, должна видеть свежий ответ API — без микрокэша
+        GetInfoAboutDraft(c.yandex_key, c.yandex_host, client=client),
+        journal=app.state.jobs)
+    app.state.submissions.start()
+    if c.yandex_host:
+        app.state.pickup_points.start(calculate.stream_PVZ, c.PVZ_REFRESH_INTERVAL)
+    app.state.intervals.start(c.INTERVAL_REFRESH_INTERVAL)
+    if app.state.price_table is not None:
+        app.state.price_table.start(c.PRICE_TABLE_REFRESH_INTERVAL)
+        if c.PRICE_TABLE_WARMUP_TIMEOUT > 0:
+            await app.state.price_table.wait_ready(c.PRICE_TABLE_WARMUP_TIMEOUT)
+    try:
+        yield
+    finally:
+        if app.state.price_table is not None:
+            await app.state.price_table.stop()
+        await app.state.intervals.stop()
+        await app.state.submissions.stop()
+        await app.state.jobs.stop()
+        await app.state.order_tracker.stop()
+        await app.state.pickup_points.stop()
+        await app.state.tenants.aclose()
+        await app.state.upstream.aclose()
+        if app.state.request_log is not None:
+            await app.state.request_log.stop()
+        if app.state.redis is not None:
+            await app.state.redis.aclose()
+
+
+def _state_metrics(app: FastAPI):
+    """
+    Метрики, которые снимаются со снимков состояния кэшей, автоматов защиты и очередей в момент запроса /metrics
+    """
+    caches = {
+        "quotes": app.state.quote_cache.snapshot(),
+        "pvz": app.state.pvz_cache.snapshot(),
+        "intervals": app.state.interval_cache.snapshot(),
+        "order_lookups": app.state.order_lookups.snapshot(),
+    }
+    for stat in ("hits", "misses", "coalesced", "evictions", "expirations", "errors"):
+        yield f"cache_{stat}_total", "counter", f"Кэш: {stat}", [
+            ({"cache": name}, snapshot[stat]) for name, snapshot in caches.items()]
+    yield "cache_size", "gauge", "Кэш: записей в памяти процесса", [
+        ({"cache": name}, snapshot["size"]) for name, snapshot in caches.items()]
+    breakers = app.state.upstream.policy.snapshot()["breakers"]
+    yield "upstream_circuit_open", "gauge", "Автомат защиты эндпоинта разомкнут (1) или нет (0)", [
+        ({"endpoint": endpoint}, int(state["state"] != "closed")) for endpoint, state in breakers.items()]
+    pickup_points = app.state.pickup_points
+    concurrency = app.state.upstream.policy.concurrency
+    if concurrency is not None:
+        limits = concurrency.snapshot()
+        for field, name, kind, help_text in (
+                ("limit", "upstream_concurrency_limit", "gauge", "Адаптивный предел одновременных запросов к API"),
+                ("in_flight", "upstream_concurrency_in_flight", "gauge", "Запросы к API в пределах адаптивного предела"),
+                ("queued", "upstream_concurrency_queued", "gauge", "Запросы, ожидающие места в адаптивном пределе"),
+                ("decreases", "upstream_concurrency_decreases_total", "counter", "Уменьшения адаптивного предела")):
+            yield name, kind, help_text, [
+                ({"base_url": item["base_url"] or "", "kind": item["kind"]}, item[field]) for item in limits]
+    hedging = app.state.upstream.policy.hedging
+    if hedging is not None:
+        hedges = hedging.snapshot()
+        for field, name, help_text in (
+                ("requests", "upstream_hedge_requests_total", "Запросы к API, которые можно дублировать"),
+                ("hedged", "upstream_hedges_total", "Отправленные дубли медленных запросов"),
+                ("wins", "upstream_hedge_wins_total", "Дубли, ответившие раньше первой попытки"),
+                ("denied", "upstream_hedges_denied_total", "Дубли, не отправленные из-за исчерпанного бюджета")):
+            yield name, "counter", help_text, [
+                ({"base_url": item["base_url"] or "", "endpoint": item["endpoint"]}, item[field]) for item in hedges]
+    yield "pvz_index_points", "gauge", "ПВЗ в локальном индексе", [({}, len(pickup_points.index))]
+    if pickup_points.loaded:
+        yield "pvz_index_loaded_timestamp_seconds", "gauge", "Время загрузки списка ПВЗ в индексе", [
+            ({}, pickup_points.loaded_at)]
+    tracker = app.state.order_tracker.snapshot()
+    yield "order_tracker_watched", "gauge", "Отслеживаемые заявки", [({}, tracker["watched"])]
+    yield "order_tracker_polls_total", "counter", "Опросы статусов заявок", [({}, tracker["polls"])]
+    yield "order_status_events_total", "counter", "Push-события статусов заявок", [
+        ({"result": result}, count) for result, count in tracker["events"].items()]
+    yield "order_tracker_reconciles_total", "counter", "Сверки с API заявок со статусами из событий", [
+        ({}, tracker["reconciles"])]
+    yield "order_tracker_evicted_total", "counter", "Заявки без подписчиков, снятые с отслеживания без событий или при заполнении", [
+        ({}, tracker["evicted"])]
+    submissions = app.state.submissions.snapshot()
+    yield "order_submissions_queued", "gauge", "Заказы в очереди отправки", [({}, submissions["queued"])]
+    yield "order_submissions", "gauge", "Заказы по состоянию отправки", [
+        ({"state": state}, count) for state, count in submissions["states"].items()]
+    table = app.state.price_table
+    if table is not None:
+        yield "price_table_lookups_total", "counter", "Расчеты по таблице цен по результату", [
+            ({"result": result}, getattr(table, result))
+            for result in ("hits", "interpolated", "unknown_route", "out_of_range", "stale")]
+        yield "price_table_fresh_cells", "gauge", "Ячейки таблицы цен моложе PRICE_TABLE_MAX_AGE", [
+            ({}, table.snapshot()["fresh"])]
+    request_log = app.state.request_log
+    if request_log is not None:
+        yield "request_log_records_total", "counter", "Запросы, записанные в журнал запросов", [
+            ({}, request_log.records)]
+        yield "request_log_dropped_total", "counter", "Запросы, не записанные в журнал из-за переполнения буфера", [
+            ({}, request_log.dropped)]
+    tenants = app.state.tenants
+    yield "tenants_active", "gauge", "Клиенты с открытыми пулами и кэшами", [({}, len(tenants))]
+    yield "tenants_evicted_total", "counter", "Клиенты, вытесненные из реестра", [({}, tenants.evicted)]
+    jobs = app.state.jobs.snapshot()
+    yield "order_jobs_queued", "gauge", "Задания журнала в очереди исполнителей", [({}, jobs["queued"])]
+    yield "order_jobs", "gauge", "Задания журнала по состоянию", [
+        ({"state": state}, count) for state, count in jobs["states"].items()]
+    yield "order_job_journal_commits_total", "counter", "Пакеты, записанные в журнал заданий", [({}, jobs["commits"])]
+
+
+app=FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,3 +231,389 @@ app.add_middleware(
 )
 
 
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestLogMiddleware)
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_in)))})
+
+
+@app.exception_handler(NoAvailableIntervalError)
+async def no_interval_handler(request: Request, exc: NoAvailableIntervalError):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
+async def get_tenant(request: Request, x_tenant: Optional[str] = Header(default=None)) -> TenantServices:
+    """
+    Сервисы клиента из заголовка X-Tenant; без заголовка — на ключе yandex_key.
+    Асинхронная: вытеснение клиента планирует закрытие его соединений в цикле событий
+    """
+    try:
+        return request.app.state.tenants.get(x_tenant)
+    except UnknownTenantError:
+        raise HTTPException(status_code=404, detail=f"Клиент {x_tenant} не найден")
+
+
+def get_upstream_client(tenant: TenantServices = Depends(get_tenant)) -> UpstreamClient:
+    return tenant.client
+
+
+def get_calculate(tenant: TenantServices = Depends(get_tenant)) -> Calculate:
+    return tenant.calculate
+
+
+def get_creating_order(tenant: TenantServices = Depends(get_tenant)) -> CreatingOrder:
+    return tenant.creating_order
+
+
+def get_draft_delivery(tenant: TenantServices = Depends(get_tenant)) -> DraftDelivery:
+    return tenant.draft_delivery
+
+
+def get_order_confirmation(tenant: TenantServices = Depends(get_tenant)) -> OrderConfirmation:
+    return tenant.confirmation
+
+
+def get_info_about_draft(tenant: TenantServices = Depends(get_tenant)) -> GetInfoAboutDraft:
+    return tenant.info
+
+
+@app.get(f"{c.PATH_PREFIX}/pvz/nearest")
+async def nearest_pvz(
+    latitude: float,
+    longitude: float,
+    limit: int = 5,
+    station_type: Optional[PickupStationType] = None,
+    payment_method: Optional[PaymentMethod] = None,
+    calculate: Calculate = Depends(get_calculate),
+):
+    return await calculate.nearest_PVZ(latitude, longitude, limit, station_type, payment_method)
+
+
+@app.get(f"{c.PATH_PREFIX}/pvz/radius")
+async def pvz_within_radius(
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    station_type: Optional[PickupStationType] = None,
+    payment_method: Optional[PaymentMethod] = None,
+    calculate: Calculate = Depends(get_calculate),
+):
+    return await calculate.PVZ_within_radius(latitude, longitude, radius_km, station_type, payment_method)
+
+
+@app.get(f"{c.PATH_PREFIX}/pvz")
+async def filter_pvz(
+    station_type: Optional[PickupStationType] = None,
+    payment_method: Optional[PaymentMethod] = None,
+    calculate: Calculate = Depends(get_calculate),
+):
+    return await calculate.filter_PVZ(station_type, payment_method)
+
+
+def _check_matrix_size(body: PricingMatrixRequest):
+    size = len(body.sources) * len(body.destinations) * len(body.weights)
+    if size > c.PRICING_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Слишком много расчетов в пакете: {size}, максимум {c.PRICING_BATCH_MAX_ITEMS}")
+
+
+@app.post(f"{c.PATH_PREFIX}/pricing/batch")
+async def calculate_delivery_many(body: PricingMatrixRequest, calculate: Calculate = Depends(get_calculate)):
+    _check_matrix_size(body)
+    return await calculate.calculate_delivery_many(
+        body.sources, body.destinations, body.weights, body.tariff, body.payment_method, body.concurrency)
+
+
+@app.post(f"{c.PATH_PREFIX}/pricing/batch/stream")
+async def stream_calculate_delivery_many(body: PricingMatrixRequest, calculate: Calculate = Depends(get_calculate)):
+    """
+    Пакетный расчет в формате NDJSON: строка на каждый расчет по мере готовности
+    """
+    _check_matrix_size(body)
+
+    async def lines():
+        async for item in calculate.iter_calculate_delivery_many(
+                body.sources, body.destinations, body.weights, body.tariff, body.payment_method, body.concurrency):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post(f"{c.PATH_PREFIX}/pricing/cart")
+async def calculate_cart_delivery(body: PricingCartRequest, calculate: Calculate = Depends(get_calculate)):
+    """
+    Стоимость доставки корзины с итогами: вес, объем, объемный вес, границы габаритов
+    """
+    if len(body.items) > c.CART_MAX_LINES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Слишком много строк в корзине: {len(body.items)}, максимум {c.CART_MAX_LINES}")
+    try:
+        return await calculate.calculate_cart_delivery(
+            body.destination, body.source, body.items, body.tariff, body.payment_method)
+    except CartError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+@app.get(f"{c.PATH_PREFIX}/cache/quotes/stats")
+async def quote_cache_stats(request: Request):
+    return request.app.state.quote_cache.snapshot()
+
+
+@app.get(f"{c.PATH_PREFIX}/pricing/table/stats")
+async def price_table_stats(request: Request):
+    table = request.app.state.price_table
+    return table.snapshot() if table is not None else {"routes": 0}
+
+
+@app.get(f"{c.PATH_PREFIX}/cache/stats")
+async def cache_stats(request: Request):
+    return {
+        "quotes": request.app.state.quote_cache.snapshot(),
+        "pvz": request.app.state.pvz_cache.snapshot(),
+        "intervals": request.app.state.interval_cache.snapshot(),
+        "order_lookups": request.app.state.order_lookups.snapshot(),
+    }
+
+
+@app.get(f"{c.PATH_PREFIX}/intervals/stats")
+async def interval_store_stats(request: Request):
+    return request.app.state.intervals.snapshot()
+
+
+@app.get(f"{c.PATH_PREFIX}/intervals/next")
+async def next_interval(station_id: str, request: Request, after: Optional[datetime] = None):
+    """
+    Ближайший доступный интервал отгрузки склада
+    """
+    interval = await request.app.state.intervals.next_slot(station_id, after)
+    if interval is None:
+        raise NoAvailableIntervalError(station_id)
+    return interval
+
+
+@app.get(f"{c.PATH_PREFIX}/upstream/stats")
+async def upstream_stats(request: Request):
+    return request.app.state.upstream.policy.snapshot()
+
+
+@app.get(f"{c.PATH_PREFIX}/tenants/stats")
+async def tenant_stats(request: Request):
+    return request.app.state.tenants.snapshot()
+
+
+@app.get(f"{c.PATH_PREFIX}/orders/tracker/stats")
+async def order_tracker_stats(request: Request):
+    return request.app.state.order_tracker.snapshot()
+
+
+@app.post(f"{c.PATH_PREFIX}/orders/events")
+async def order_status_events(
+    body: StatusEventBatch,
+    request: Request,
+    x_events_token: Optional[str] = Header(default=None),
+):
+    """
+    Прием уведомлений о смене статусов заявок. Повторы (та же заявка и то же время) отбрасываются,
+    изменения рассылаются подписчикам /ws/orders; заявки с пропущенными событиями сверяются с API
+    """
+    if c.STATUS_EVENTS_TOKEN and not hmac.compare_digest(x_events_token or "", c.STATUS_EVENTS_TOKEN):
+        raise HTTPException(status_code=401, detail="Неверный токен уведомлений")
+    if len(body.events) > c.STATUS_EVENTS_MAX_BATCH:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Слишком много событий в пакете: {len(body.events)}, максимум {c.STATUS_EVENTS_MAX_BATCH}")
+    tracker: OrderTracker = request.app.state.order_tracker
+    gaps = tracker.gaps
+    counts = {"applied": 0, "duplicate": 0, "stale": 0, "dropped": 0}
+    for event in body.events:
+        counts[tracker.ingest(event.model_dump(exclude_none=True))] += 1
+    return {**counts, "gaps": tracker.gaps - gaps}
+
+
+@app.websocket(f"{c.PATH_PREFIX}/ws/orders")
+async def order_status_updates(websocket: WebSocket):
+    """
+    Подписка на изменения статусов заявок.
+    Клиент присылает {"action": "subscribe" | "unsubscribe", "request_ids": [...]},
+    сервер присылает состояние заявки при подписке и далее только при его изменении.
+    На сообщение другого формата сервер отвечает {"error": ...}, соединение остается открытым.
+    Из одного соединения можно подписаться не больше чем на WS_MAX_SUBSCRIPTIONS заявок
+    """
+    tracker: OrderTracker = websocket.app.state.order_tracker
+    await websocket.accept()
+    queue: asyncio.Queue = asyncio.Queue(tracker.queue_size)
+    subscribed: set = set()
+
+    async def push():
+        while True:
+            await websocket.send_json(await queue.get())
+
+    sender = asyncio.create_task(push())
+    try:
+        while True:
+            receive = asyncio.ensure_future(websocket.receive_text())
+            # Отправка, завершившаяся ошибкой, закрывает подписку, а не оставляет ее без получателя
+            await asyncio.wait((receive, sender), return_when=asyncio.FIRST_COMPLETED)
+            if not receive.done():
+                receive.cancel()
+                break
+            parsed = _parse_subscription(receive.result())
+            if isinstance(parsed, str):
+                await websocket.send_json({"error": parsed})
+                continue
+            action, request_ids = parsed
+            if action == "subscribe" and len(subscribed.union(request_ids)) > c.WS_MAX_SUBSCRIPTIONS:
+                await websocket.send_json(
+                    {"error": f"Из одного соединения можно подписаться не больше чем на {c.WS_MAX_SUBSCRIPTIONS} заявок"})
+                continue
+            for request_id in request_ids:
+                if action == "subscribe":
+                    try:
+                        tracker.subscribe(request_id, queue)
+                    except TrackerFullError as exc:
+                        await websocket.send_json({"error": str(exc), "request_id": request_id})
+                        break
+                    subscribed.add(request_id)
+                else:
+                    tracker.unsubscribe(request_id, queue)
+                    subscribed.discard(request_id)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        try:
+            await sender
+        except (asyncio.CancelledError, WebSocketDisconnect):
+            pass
+        except Exception:
+            logger.warning("Не удалось отправить обновление статусов заявок по WebSocket", exc_info=True)
+            # Клиент узнает, что подписка оборвалась, а не ждет событий молча
+            try:
+                await websocket.close(code=1011)
+            except Exception:
+                pass
+        for request_id in subscribed:
+            tracker.unsubscribe(request_id, queue)
+
+
+def _parse_subscription(text: str):
+    """
+    Разбор сообщения подписки: (action, request_ids) или текст ошибки
+    """
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return "Сообщение должно быть JSON-объектом"
+    if not isinstance(message, dict):
+        return "Сообщение должно быть JSON-объектом"
+    action = message.get("action")
+    if action not in ("subscribe", "unsubscribe"):
+        return "action должен быть subscribe или unsubscribe"
+    request_ids = message.get("request_ids") or []
+    if not isinstance(request_ids, list) or not all(isinstance(item, (str, int)) for item in request_ids):
+        return "request_ids должен быть списком идентификаторов заявок"
+    return action, [str(request_id) for request_id in request_ids]
+
+
+@app.post(f"{c.PATH_PREFIX}/orders/bulk", status_code=202)
+async def submit_orders(body: BulkSubmissionRequest, request: Request):
+    """
+    Пакетная отправка заказов через очередь. Повтор с тем же operator_request_id не создает дубль,
+    пока результат хранится в памяти этого процесса (SUBMISSION_MAX_RESULTS последних заказов):
+    после перезапуска или на другом воркере сервис повтор не распознает
+    """
+    if len(body.orders) > c.SUBMISSION_MAX_BATCH:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Слишком много заказов в пакете: {len(body.orders)}, максимум {c.SUBMISSION_MAX_BATCH}")
+    pipeline: SubmissionPipeline = request.app.state.submissions
+    results = await pipeline.submit_many([OrderSubmission(**order.model_dump()) for order in body.orders])
+    if body.wait:
+        await pipeline.wait(results, body.wait)
+    return [result.as_dict() for result in results]
+
+
+@app.post(f"{c.PATH_PREFIX}/orders/info/bulk")
+async def bulk_order_info(body: BulkOrderInfoRequest, info: GetInfoAboutDraft = Depends(get_info_about_draft)):
+    """
+    Информация, отслеживание и история множества заявок в формате NDJSON: строка на заявку по мере готовности.
+    Ошибки отдельных заявок и частей — в поле errors, пакет при этом не прерывается
+    """
+    if len(body.orders) > c.ORDER_INFO_BULK_MAX_ORDERS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Слишком много заявок в пакете: {len(body.orders)}, максимум {c.ORDER_INFO_BULK_MAX_ORDERS}")
+    orders = [order.model_dump() for order in body.orders]
+    parts = list(dict.fromkeys(body.parts))
+
+    async def lines():
+        async for item in info.iter_bulk_order_info(orders, parts, body.concurrency):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get(f"{c.PATH_PREFIX}/orders/bulk/stats")
+async def submission_stats(request: Request):
+    return request.app.state.submissions.snapshot()
+
+
+@app.get(f"{c.PATH_PREFIX}/orders/bulk/{{operator_request_id}}")
+async def submission_status(operator_request_id: str, request: Request):
+    result = request.app.state.submissions.results.get(operator_request_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Заказ не найден в очереди отправки")
+    return result.as_dict()
+
+
+@app.post(f"{c.PATH_PREFIX}/orders/jobs", status_code=202)
+async def submit_order_jobs(body: BulkOrderJobRequest, request: Request):
+    """
+    Подтверждение, отмена и редактирование заявок через журнал заданий. Ответ приходит после записи
+    заданий в журнал; после перезапуска сервиса незавершенные задания выполняются, кроме редактирования,
+    прерванного во время запроса к API: оно завершается ошибкой interrupted.
+    Повтор с тем же job_id не выполняет операцию повторно
+    """
+    if len(body.jobs) > c.JOB_MAX_BATCH:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Слишком много заданий в пакете: {len(body.jobs)}, максимум {c.JOB_MAX_BATCH}")
+    journal: JobJournal = request.app.state.jobs
+    try:
+        jobs = await journal.submit_many([job.model_dump() for job in body.jobs])
+    except JobError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if body.wait:
+        await journal.wait(jobs, body.wait)
+    return [job.as_dict() for job in jobs]
+
+
+@app.get(f"{c.PATH_PREFIX}/orders/jobs/stats")
+async def order_job_stats(request: Request):
+    return request.app.state.jobs.snapshot()
+
+
+@app.get(f"{c.PATH_PREFIX}/orders/jobs/{{job_id}}")
+async def order_job_status(job_id: str, request: Request):
+    job = await request.app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено в журнале")
+    return job.as_dict()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Метрики приложения в текстовом формате Prometheus
+    """
+    if request.app.state.metrics is None:
+        raise HTTPException(status_code=404, detail="Метрики выключены (METRICS_ENABLED=false)")
+    return PlainTextResponse(request.app.state.metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+class OrderJobRequest(BaseModel):
+    """
+    Операция с заявкой для журнала заданий
+    action*: str - confirm — подтверждение предложения; cancel — отмена заявки; edit — редактирование заявки
+    job_id: str - Ключ идемпотентности; по умолчанию confirm:<offer_id> и cancel:<request_id>, для edit — новый:
+        повторная отправка правки без job_id ставит ее еще раз
+    offer_id: str - Идентификатор предложения (для confirm)
+    request_id: str - Идентификатор заказа в системе Яндекс.Доставки (для cancel и edit)
+    changes: dict - Изменяемые поля заявки в формате API (для edit)
+    """
+    action: Literal["confirm", "cancel", "edit"]
+    job_id: Optional[str] = None
+    offer_id: Optional[str] = None
+    request_id: Optional[str] = None
+    changes: Optional[dict] = None
+
+
+class BulkOrderJobRequest(BaseModel):
+    """
+    jobs*: list[OrderJobRequest] - Операции с заявками
+    wait: float - Сколько секунд ждать выполнения перед ответом; 0 — не ждать
+    """
+    jobs: List[OrderJobRequest] = Field(..., min_length=1)
+    wait: float = Field(default=0, ge=0, le=60)
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
+
+from src import consts as c
+
+
+class OrderReference(BaseModel):
+    """
+    Заявка для пакетного запроса информации: нужен хотя бы один из идентификаторов
+    request_id: str - Идентификатор заказа в системе Яндекс.Доставки
+    request_code: str - Идентификатор заказа у отправителя
+    """
+    request_id: Optional[str] = None
+    request_code: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_identifier(self) -> "OrderReference":
+        if not self.request_id and not self.request_code:
+            raise ValueError("Нужен request_id или request_code")
+        return self
+
+
+class BulkOrderInfoRequest(BaseModel):
+    """
+    orders*: list[OrderReference] - Заявки
+    parts: list[str] - Части ответа: info (/request/info), tracking (/request/tracking), history (/request/history)
+    concurrency: int - Максимум одновременных запросов к API, по умолчанию из настроек (не больше ORDER_INFO_BULK_MAX_CONCURRENCY)
+    """
+    orders: List[OrderReference] = Field(..., min_length=1)
+    parts: List[Literal["info", "tracking", "history"]] = Field(
+        default_factory=lambda: ["info", "tracking", "history"], min_length=1)
+    concurrency: Optional[int] = Field(default=None, ge=1, le=c.ORDER_INFO_BULK_MAX_CONCURRENCY)
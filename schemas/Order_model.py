@@ -1,10 +1,19 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from typing import Optional
 from datetime import datetime
 from typing import List
 import enum
 import re
 
+
+class LazyModel(BaseModel):
+    """
+    Модель, схема проверки которой строится при первом использовании, а не при импорте модуля:
+    модели тел запросов к API не нужны, пока сервис не создает заказ
+    """
+    model_config = ConfigDict(defer_build=True)
+
+
 #region Модели Enum и Валидаторы 
 
 class OffersInfoLastMilePolicy(enum.Enum):
@@ -55,7 +64,7 @@ class LastMilePolicy(enum.Enum):
     self_pickup = 'self_pickup'
     time_interval = 'time_interval'  
 
-class ContactPerson(BaseModel):
+class ContactPerson(LazyModel):
     """
     contactPerson: контактное лицо
     first_name*: str - Имя контактного лица
@@ -75,7 +84,7 @@ class ContactPerson(BaseModel):
             raise ValueError("Телефон должен быть в формате +7XXXXXXXXXX")
         return value
 
-class TimeIntervalUTC(BaseModel):
+class TimeIntervalUTC(LazyModel):
     """
     timeIntervalUTC: информация о временном интервале
     start_utc: datetime - UTC timestamp для нижней границы интервала
@@ -89,7 +98,7 @@ class TimeIntervalUTC(BaseModel):
         
 #endregion
 
-class PricingDestinationNode(BaseModel):
+class PricingDestinationNode(LazyModel):
     """
     Информация о точке получения заказа
     address	Type: string
@@ -101,10 +110,10 @@ class PricingDestinationNode(BaseModel):
     platform_station_id	Type: any
     ID ПВЗ или постамата, зарегистрированного в платформе, в который нужна доставка
 """
-    address: str 
+    address: Optional[str] = None
     platform_station_id: str
 
-class PricingSourceNode(BaseModel):
+class PricingSourceNode(LazyModel):
     """
     Класс для указания точки отправления заказа
     platform_station_id: str
@@ -113,7 +122,7 @@ class PricingSourceNode(BaseModel):
     platform_station_id: str
 
 
-class BillingInfo(BaseModel):
+class BillingInfo(LazyModel):
     """
     billingInfo: информация о платеже
     payment_method: already_paid - Метод оплаты
@@ -125,11 +134,9 @@ class BillingInfo(BaseModel):
     delivery_cost: Optional[int] = None
     variable_delivery_cost_for_recipient: Optional[List["VariableDeliveryCostForRecipientItem"]] = None
 
-BillingInfo.model_rebuild()
-
 
 
-class VariableDeliveryCostForRecipientItem(BaseModel):
+class VariableDeliveryCostForRecipientItem(LazyModel):
     """
     Возможность предоставления скидки на доставку в зависимости от суммы выкупленных товаров.
     delivery_cost: int - Стоимость доставки до применения скидки (min_value:0)
@@ -138,8 +145,9 @@ class VariableDeliveryCostForRecipientItem(BaseModel):
     delivery_cost: int
     min_cost_of_accepted_items: int
 
+
   
-class ItemBillingDetails(BaseModel):
+class ItemBillingDetails(LazyModel):
     """
     assessed_unit_price*: int - Оценочная цена за единицу товара (передается в копейках)
     unit_price*: int - Цена за единицу товара (передается в копейках)
@@ -149,7 +157,7 @@ class ItemBillingDetails(BaseModel):
     unit_price: int
     nds: Optional[int] = -1
 
-class RequestResourceItem(BaseModel):
+class RequestResourceItem(LazyModel):
     """
     requestResourceItem: информация о товаре
     article*: string - Артикул
@@ -167,7 +175,7 @@ class RequestResourceItem(BaseModel):
     place_barcode: str
     cargo_types: Optional[List[str]] = None
 
-class RequestInfo(BaseModel):
+class RequestInfo(LazyModel):
     """
     operator_request_id*: str - Идентификатор заказа у отправителя
     comment: str - Комментарий к заказу
@@ -176,7 +184,7 @@ class RequestInfo(BaseModel):
     comment: Optional[str] = None
 
 
-class PlacePhysicalDimensions(BaseModel):
+class PlacePhysicalDimensions(LazyModel):
     """
     placePhysicalDimensions: Весогабаритные характеристики грузомест
     dx*: int - Длина, сантиметры
@@ -190,7 +198,7 @@ class PlacePhysicalDimensions(BaseModel):
     weight_gross: int
 
 
-class ResourcePlace(BaseModel):
+class ResourcePlace(LazyModel):
     """
     resourcePlace: информация о месте
     barcode*: str - Штрихкод места
@@ -202,7 +210,7 @@ class ResourcePlace(BaseModel):
     description: Optional[str] = None
 
 
-class PlatformStation(BaseModel):
+class PlatformStation(LazyModel):
     """
     platformStation: информация о платформенной станции
     platform_station_id*: str - ID платформенной станции, зарегистрированной в платформе
@@ -210,7 +218,7 @@ class PlatformStation(BaseModel):
     platform_station_id: str
 
 
-class SourceRequestNode(BaseModel):
+class SourceRequestNode(LazyModel):
     """
     Класс для указания точки отправления заказа
     platform_station_id: str - ID склада отправки, зарегистрированного в платформе
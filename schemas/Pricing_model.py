@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from src import consts as c
+from schemas.Order_model import PaymentMethod
+
+
+class PricingMatrixRequest(BaseModel):
+    """
+    Запрос пакетного расчета стоимости доставки: все сочетания источник × получатель × вес
+    sources*: List[str] - ID складов отправки
+    destinations*: List[str] - ID ПВЗ или постаматов получения
+    weights*: List[int] - Веса заказа в граммах
+    tariff: str - Тариф доставки (self_pickup)
+    payment_method: PaymentMethod - Метод оплаты
+    concurrency: int - Максимум одновременных запросов к API, по умолчанию из настроек (не больше PRICING_BATCH_MAX_CONCURRENCY)
+    """
+    sources: List[str] = Field(..., min_length=1)
+    destinations: List[str] = Field(..., min_length=1)
+    weights: List[int] = Field(..., min_length=1)
+    tariff: str = "self_pickup"
+    payment_method: PaymentMethod = PaymentMethod.already_paid
+    concurrency: Optional[int] = Field(default=None, ge=1, le=c.PRICING_BATCH_MAX_CONCURRENCY)
+
+
+class PricingCartRequest(BaseModel):
+    """
+    Расчет стоимости доставки корзины
+    source*: str - ID склада отправки
+    destination*: str - ID ПВЗ или постамата получения
+    items*: List[dict] - Товары с count и physical_dims (dx, dy, dz, weight_gross) на единицу товара
+    tariff: str - Тариф доставки (self_pickup)
+    payment_method: PaymentMethod - Метод оплаты
+    """
+    source: str
+    destination: str
+    items: List[dict] = Field(..., min_length=1)
+    tariff: str = "self_pickup"
+    payment_method: PaymentMethod = PaymentMethod.already_paid
@@ -0,0 +1,38 @@
+from datetime import datetime
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+
+class StatusEvent(BaseModel):
+    """
+    Уведомление о смене статуса заявки
+    request_id*: str - Идентификатор заказа в системе Яндекс.Доставки
+    status*: str - Новый статус
+    timestamp: float - Время смены статуса, unix-время
+    timestamp_utc: str - Время смены статуса в ISO 8601, если timestamp не передан
+    description: str - Описание статуса
+    reason: str - Причина (для отмен и ошибок)
+    sequence: int - Порядковый номер события заявки; по разрыву в номерах заявка сверяется с API
+    """
+    request_id: str
+    status: str
+    timestamp: Optional[float] = None
+    timestamp_utc: Optional[str] = None
+    description: Optional[str] = None
+    reason: Optional[str] = None
+    sequence: Optional[int] = Field(default=None, ge=0)
+
+    @model_validator(mode="after")
+    def check_timestamp(self) -> "StatusEvent":
+        if self.timestamp is None and not self.timestamp_utc:
+            raise ValueError("Нужен timestamp или timestamp_utc")
+        if self.timestamp is None:
+            datetime.fromisoformat(self.timestamp_utc.replace("Z", "+00:00"))
+        return self
+
+
+class StatusEventBatch(BaseModel):
+    """
+    events*: list[StatusEvent] - События в порядке получения
+    """
+    events: List[StatusEvent] = Field(..., min_length=1)
@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+class OrderSubmissionRequest(BaseModel):
+    """
+    Заказ для пакетной отправки
+    operator_request_id*: str - Идентификатор заказа у отправителя, ключ идемпотентности в пределах процесса сервиса
+    source*: dict - Словарь с platform_station_id и interval_utc склада отправки; без interval_utc для kind=request берется ближайший доступный интервал
+    destination*: str - Идентификатор ПВЗ-получателя
+    items*: list[dict] - Товары заказа
+    contact*: dict - Контактное лицо получателя
+    barcode: str - Штрихкод места (для kind=request)
+    kind: str - request — /request/create; offer — /offers/create и затем /offers/confirm
+    places: str - Грузоместа: item — на каждый товар, barcode — по place_barcode товаров, pack — раскладка по весу
+    """
+    operator_request_id: str
+    source: dict
+    destination: str
+    items: List[dict] = Field(..., min_length=1)
+    contact: dict
+    barcode: Optional[str] = None
+    kind: Literal["request", "offer"] = "request"
+    places: Literal["item", "barcode", "pack"] = "item"
+
+
+class BulkSubmissionRequest(BaseModel):
+    """
+    orders*: list[OrderSubmissionRequest] - Заказы для отправки
+    wait: float - Сколько секунд ждать завершения отправки перед ответом; 0 — не ждать
+    """
+    orders: List[OrderSubmissionRequest] = Field(..., min_length=1)
+    wait: float = Field(default=0, ge=0, le=60)
@@ -1,27 +1,30 @@
+from typing import List, Optional
 from src import consts as c
-import httpx
-from schemas.Order_model import (
-    BillingInfo,
-    PaymentMethod,
-    DestinationRequestNode,
-    RequestResourceItem,
-    ResourcePlace,
-    LastMilePolicy,
-    ContactPerson,
-    SourceRequestNode)
+from service.base import BaseService
+from service.http_client import UpstreamClient
+from service.interval_store import IntervalStore, NoAvailableIntervalError
+from service.payloads import request_create_payload
 
 
-class CreatingOrder():
+class CreatingOrder(BaseService):
     """
     Класс для Создание заказа на ближайшее доступное время.
     """
-    def __init__(self, api_key: str, base_url: str):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        client: Optional[UpstreamClient] = None,
+        intervals: Optional[IntervalStore] = None,
+        endpoints: Optional[c.EndpointSet] = None,
+    ):
+        super().__init__(api_key, base_url, client, endpoints)
+        self.intervals = intervals
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
             "Accept-Language": "ru"
         }
-        self.base_url = base_url
 
     async def Creating_an_application(
         self,
@@ -30,7 +33,8 @@ class CreatingOrder():
         destination: str,
         items: list[dict],
         contact: dict,
-        barcode: str):
+        barcode: str,
+        places: Optional[List[dict]] = None):
         """
         Создание заявки
         operator_request_id: str - Идентификатор заказа у отправителя
@@ -38,44 +42,15 @@ class CreatingOrder():
         destination: str - Идентификатор ПВЗ-получателя
         items: list[dict] - Список со словарем, содержащим информацию о товаре
         contact: list[dict] - Список со словарем, содержащим информацию о контактном лице
+        places: list[dict] - Грузоместа (Cart.group_places/Cart.pack); по умолчанию место на каждый товар
+        Если в source нет interval_utc, берется ближайший доступный интервал склада из IntervalStore
         """
-        body = {
-            "billing_info": BillingInfo(payment_method=PaymentMethod.already_paid).model_dump(),
-            "destination": {
-                "type": DestinationRequestNode.platform_station.value,  
-                "platform_station_id": destination,
-            },
-            "info": {"operator_request_id": operator_request_id},
-            "items": [
-                RequestResourceItem(
-                    article=item["article"],
-                    billing_details=item["billing_details"],
-                    count=item["count"],
-                    name=item["name"],
-                    place_barcode=item["place_barcode"],
-                ).model_dump()
-                for item in items
-            ],
-            "last_mile_policy" : LastMilePolicy.self_pickup.value,
-            "places" : [ResourcePlace(
-                barcode= barcode,
-                physical_dims= item["physical_dims"],
-                description= item.get("description")
-            ).model_dump()
-            for item in items
-            ],
-            "recipient_info": ContactPerson(
-                name=contact["name"],
-                phone=contact["phone"],
-                email=contact.get("email")
-            ).model_dump(),
-            "source": SourceRequestNode(
-                platform_station=source["platform_station_id"],
-                interval_utc=source["interval_utc"]).model_dump(),
-            "particular_items_refuse": False
-        }
+        if source.get("interval_utc") is None and self.intervals is not None:
+            interval = await self.intervals.next_slot(source["platform_station_id"])
+            if interval is None:
+                raise NoAvailableIntervalError(source["platform_station_id"])
+            source = {**source, "interval_utc": interval}
+        body = request_create_payload(operator_request_id, source, destination, items, contact, barcode, places)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.base_url}/request/create", headers=self.headers,params={'send_unix': False}, json=body)
-            response.raise_for_status()
-            return response.json().get("request_id")
\ No newline at end of file
+        response = await self._request("POST", self.endpoints.Creating_an_order, params={'send_unix': False}, content=body)
+        return response.json().get("request_id")
\ No newline at end of file
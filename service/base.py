@@ -0,0 +1,97 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from src import consts as c
+from service.http_client import UpstreamClient
+from service.resilience import CircuitOpenError
+
+
+def describe_error(exc: BaseException) -> Dict[str, Any]:
+    """
+    Описание ошибки для поэлементных результатов пакетных операций
+    """
+    if isinstance(exc, CircuitOpenError):
+        return {"type": "upstream_circuit_open", "retry_in": round(exc.retry_in, 3), "message": str(exc)}
+    if isinstance(exc, httpx.HTTPStatusError):
+        return {"type": "upstream_status", "status_code": exc.response.status_code, "message": str(exc)}
+    if isinstance(exc, httpx.TimeoutException):
+        return {"type": "upstream_timeout", "message": str(exc) or type(exc).__name__}
+    if isinstance(exc, httpx.TransportError):
+        return {"type": "upstream_unavailable", "message": str(exc) or type(exc).__name__}
+    return {"type": type(exc).__name__, "message": str(exc)}
+
+
+class BaseService():
+    """
+    Базовый класс сервисов API Яндекс.Доставки.
+    Если передан общий UpstreamClient, запросы идут через его пул соединений,
+    иначе на каждый вызов открывается отдельный httpx.AsyncClient.
+    endpoints: EndpointSet - Адреса методов API; по умолчанию боевые (consts.endpoints())
+    """
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        client: Optional[UpstreamClient] = None,
+        endpoints: Optional[c.EndpointSet] = None,
+    ):
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
+        self.base_url = base_url
+        self.client = client
+        self.endpoints = endpoints if endpoints is not None else c.endpoints()
+
+    def _url(self, path: str) -> str:
+        """
+        Адрес метода: путь от base_url или абсолютный URL из настроек как есть
+        """
+        return path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        content: Optional[bytes] = None,
+        idempotent: bool = False,
+    ) -> httpx.Response:
+        if self.client is not None:
+            return await self.client.request(
+                method, path, headers=self.headers, params=params, json=json, content=content, idempotent=idempotent)
+        async with httpx.AsyncClient() as client:
+            response = await client.request(
+                method, self._url(path), headers=self.headers, params=params, json=json, content=content)
+            response.raise_for_status()
+            return response
+
+    @asynccontextmanager
+    async def _stream(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        idempotent: bool = False,
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Запрос, тело ответа которого читается потоком через response.aiter_bytes()
+        """
+        if self.client is not None:
+            async with self.client.stream(
+                    method, path, headers=self.headers, params=params, json=json, idempotent=idempotent) as response:
+                yield response
+            return
+        async with httpx.AsyncClient() as client:
+            async with client.stream(
+                    method, self._url(path), headers=self.headers, params=params, json=json) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+                yield response
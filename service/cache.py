@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, Union
+
+
+@dataclass
+class CacheStats():
+    """
+    Счетчики работы кэша
+    hits: int - Ответ найден в кэше
+    misses: int - Ответа в кэше нет, выполнен запрос к источнику
+    coalesced: int - Запрос присоединился к уже выполняющемуся запросу с тем же ключом
+    evictions: int - Записи, вытесненные по LRU
+    expirations: int - Записи, удаленные по истечении TTL
+    errors: int - Запросы к источнику, завершившиеся ошибкой
+    """
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class TTLCache():
+    """
+    LRU-кэш в памяти процесса с ограничением по размеру и времени жизни записей
+    ttl: float - Время жизни записи по умолчанию, секунды
+    max_size: int - Максимальное количество записей
+    """
+    def __init__(self, ttl: float, max_size: int, stats: Optional[CacheStats] = None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stats = stats or CacheStats()
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.stats.expirations += 1
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+
+class SingleFlight():
+    """
+    Объединение одновременных запросов с одинаковым ключом:
+    к источнику уходит один запрос, остальные вызывающие ждут его результат.
+    Отмена одного из ожидающих не отменяет общий запрос.
+    """
+    def __init__(self, stats: Optional[CacheStats] = None):
+        self.stats = stats or CacheStats()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(loader())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+
+class CachedLoader():
+    """
+    TTL/LRU-кэш с объединением одновременных промахов по одному ключу.
+    ttl: float - Время жизни записи по умолчанию, секунды
+    max_size: int - Максимальное количество записей
+    """
+    def __init__(self, ttl: float, max_size: int):
+        self.stats = CacheStats()
+        self.cache = TTLCache(ttl, max_size, self.stats)
+        self.flight = SingleFlight(self.stats)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Union[None, float, Callable[[Any], float]] = None,
+    ) -> Any:
+        """
+        Значение из кэша или результат loader(); ошибки loader не кэшируются
+        ttl: float - Время жизни записи, если отличается от значения по умолчанию,
+            или функция, вычисляющая его по загруженному значению (None — по умолчанию)
+        """
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self.stats.hits += 1
+            return value
+        if key not in self.flight:
+            self.stats.misses += 1
+
+        async def load():
+            try:
+                result = await loader()
+            except Exception:
+                self.stats.errors += 1
+                raise
+            self.cache.set(key, result, ttl(result) if callable(ttl) else ttl)
+            return result
+
+        return await self.flight.do(key, load)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats.as_dict(), "size": len(self.cache), "inflight": len(self.flight)}
+
+
+_MISSING = object()
@@ -1,5 +1,16 @@
-import httpx
+import asyncio
+import itertools
+from typing import AsyncIterator, List, Optional, Sequence
 from src import consts as c
+from service.base import BaseService, describe_error
+from service.cart import Cart
+from service.http_client import UpstreamClient
+from service.interval_store import IntervalStore
+from service.json_stream import iter_array_items
+from service.pickup_points import PickupPoint, PickupPointStore
+from service.price_table import PriceTable
+from service.quote_cache import QuoteCache
+from service.shared_cache import TwoLevelCache
 from schemas.Order_model import (
     PricingDestinationNode,
     OffersInfoLastMilePolicy,
@@ -10,16 +21,30 @@ from schemas.Order_model import (
     DestinationRequestNode,
 )
 
-class Calculate():
+class Calculate(BaseService):
     """
     Класс для работы с расчетом доставки, стоимости доставки и получения информации о ПВЗ
     """
-    def __init__(self, api_key: str, base_url: str):
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
-        self.base_url = base_url
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        client: Optional[UpstreamClient] = None,
+        pickup_points: Optional[PickupPointStore] = None,
+        quote_cache: Optional[QuoteCache] = None,
+        pvz_cache: Optional[TwoLevelCache] = None,
+        interval_cache: Optional[TwoLevelCache] = None,
+        intervals: Optional[IntervalStore] = None,
+        price_table: Optional[PriceTable] = None,
+        endpoints: Optional[c.EndpointSet] = None,
+    ):
+        super().__init__(api_key, base_url, client, endpoints)
+        self.pickup_points = pickup_points if pickup_points is not None else PickupPointStore()
+        self.quote_cache = quote_cache
+        self.pvz_cache = pvz_cache
+        self.interval_cache = interval_cache
+        self.intervals = intervals
+        self.price_table = price_table
 
     async def calculate_delivery(
         self,
@@ -36,23 +61,129 @@ class Calculate():
         total_weight: int - Общий вес заказа в граммах (min_value:1)
         tariff: str - Тариф доставки. Возможные значения: self_pickup - Самовывоз из ПВЗ или постамата
         payment_method: PaymentMethod - Метод оплаты. Возможные значения: already_paid - Оплачено заранее
+        Если задан price_table, популярные маршруты считаются по таблице цен без запроса к API.
+        Если задан quote_cache, вес округляется до весовой ступени кэша и повторные расчеты берутся из кэша
         """
+        if self.price_table is not None:
+            quote = self.price_table.lookup(destination, source, total_weight, tariff, payment_method)
+            if quote is not None:
+                return quote
+        if self.quote_cache is None:
+            return await self._fetch_quote(destination, source, total_weight, tariff, payment_method)
+        total_weight = self.quote_cache.bucket_weight(total_weight)
+        key = self.quote_cache.key(destination, source, total_weight, tariff, payment_method.value)
+        return await self.quote_cache.get_or_load(
+            key, lambda: self._fetch_quote(destination, source, total_weight, tariff, payment_method))
+
+    async def calculate_cart_delivery(
+        self,
+        destination: str,
+        source: str,
+        items: List[dict],
+        tariff: str = "self_pickup",
+        payment_method: PaymentMethod = PaymentMethod.already_paid,
+    ):
+        """
+        Расчет стоимости доставки корзины: вес берется из итогов корзины (Cart.summary)
+        items: list[dict] - Товары с count и physical_dims на единицу товара
+        """
+        summary = Cart(items).summary()
+        quote = await self.calculate_delivery(
+            destination, source, max(1, summary.total_weight), tariff, payment_method)
+        return {**quote, "cart": summary.as_dict()}
+
+    async def _fetch_quote(
+        self,
+        destination: str,
+        source: str,
+        total_weight: int,
+        tariff: str,
+        payment_method: PaymentMethod,
+    ):
         body = {
-            "destination": PricingDestinationNode(platform_station_id=destination).model_dump(),
+            "destination": PricingDestinationNode(platform_station_id=destination).model_dump(exclude_none=True),
             "source": PricingSourceNode(platform_station_id=source).model_dump(),
             "total_weight": total_weight,
             "last_mile_policy": tariff,
             "payment_method": payment_method.value,
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.base_url}/pricing-calculator", headers=self.headers, json=body)
-            response.raise_for_status()
-            data = response.json()
-            return {
-                "delivery_days": data.get("delivery_days"),
-                "pricing_total": data.get("pricing_total"),
-            }
+        response = await self._request("POST", self.endpoints.calculate_delivery, json=body, idempotent=True)
+        data = response.json()
+        return {
+            "delivery_days": data.get("delivery_days"),
+            "pricing_total": data.get("pricing_total"),
+        }
+
+    def _pricing_matrix(self, sources: Sequence[str], destinations: Sequence[str], weights: Sequence[int]):
+        return [
+            {"index": index, "source": source, "destination": destination, "total_weight": weight}
+            for index, (source, destination, weight) in enumerate(itertools.product(sources, destinations, weights))
+        ]
+
+    async def _quote_matrix_item(
+        self,
+        item: dict,
+        tariff: str,
+        payment_method: PaymentMethod,
+        semaphore: asyncio.Semaphore,
+    ) -> dict:
+        async with semaphore:
+            try:
+                result = await self.calculate_delivery(
+                    item["destination"], item["source"], item["total_weight"], tariff, payment_method)
+            except Exception as exc:
+                return {**item, "result": None, "error": describe_error(exc)}
+        return {**item, "result": result, "error": None}
 
+    async def iter_calculate_delivery_many(
+        self,
+        sources: Sequence[str],
+        destinations: Sequence[str],
+        weights: Sequence[int],
+        tariff: str = "self_pickup",
+        payment_method: PaymentMethod = PaymentMethod.already_paid,
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Пакетный расчет стоимости доставки: результаты отдаются по мере готовности.
+        Каждый элемент содержит index (позиция в матрице sources × destinations × weights),
+        параметры расчета, result и error — ошибка одного расчета не прерывает пакет.
+        concurrency: int - Максимум одновременных запросов к API
+        """
+        semaphore = asyncio.Semaphore(concurrency or c.PRICING_BATCH_CONCURRENCY)
+        tasks = [
+            asyncio.ensure_future(self._quote_matrix_item(item, tariff, payment_method, semaphore))
+            for item in self._pricing_matrix(sources, destinations, weights)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def calculate_delivery_many(
+        self,
+        sources: Sequence[str],
+        destinations: Sequence[str],
+        weights: Sequence[int],
+        tariff: str = "self_pickup",
+        payment_method: PaymentMethod = PaymentMethod.already_paid,
+        concurrency: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Пакетный расчет стоимости доставки для матрицы sources × destinations × weights.
+        Результаты возвращаются в порядке матрицы (source, затем destination, затем вес)
+        sources: Sequence[str] - ID складов отправки
+        destinations: Sequence[str] - ID ПВЗ или постаматов получения
+        weights: Sequence[int] - Веса заказа в граммах
+        concurrency: int - Максимум одновременных запросов к API
+        """
+        results = [None] * (len(sources) * len(destinations) * len(weights))
+        async for item in self.iter_calculate_delivery_many(
+                sources, destinations, weights, tariff, payment_method, concurrency):
+            results[item["index"]] = item
+        return results
 
     async def delivery_interval(
         self,
@@ -61,30 +192,114 @@ class Calculate():
         """
         Получение интервалов доставки
         station_id: str - ID склада отгрузки, зарегистрированного в платформе
+        Если задан IntervalStore, возвращаются еще не начавшиеся интервалы из него без обращения к API
         """
+        if self.intervals is not None:
+            return await self.intervals.offers(station_id)
+        if self.interval_cache is not None:
+            return await self.interval_cache.get_or_load(station_id, lambda: self._fetch_delivery_interval(station_id))
+        return await self._fetch_delivery_interval(station_id)
+
+    async def _fetch_delivery_interval(self, station_id: str):
         params = {
             "station_id": PricingSourceNode(platform_station_id = station_id).model_dump(),
             "last_mile_policy": OffersInfoLastMilePolicy.self_pickup.value,
             "send_unix": False,
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/offers/info", headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json().get("offers")
+        response = await self._request("GET", self.endpoints.delivery_interval, params=params, idempotent=True)
+        return response.json().get("offers")
 
 
     async def list_of_PVZ(self):
         """
         Получение информации о ПВЗ
         """
-        body = {
+        if self.pvz_cache is not None:
+            return await self.pvz_cache.get_or_load("points", self._fetch_PVZ)
+        return await self._fetch_PVZ()
+
+    @staticmethod
+    def _PVZ_query() -> dict:
+        return {
             "is_not_branded_partner_station": True,
             "is_post_office": False,
             "type": PickupStationType.pickup_point.value,
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.base_url}/pickup-points/list", headers=self.headers, json=body)
-            response.raise_for_status()
-            return response.json().get("points")
+
+    async def _fetch_PVZ(self):
+        response = await self._request("POST", self.endpoints.list_of_PVZ, json=self._PVZ_query(), idempotent=True)
+        return response.json().get("points")
+
+    async def stream_PVZ(self) -> AsyncIterator[dict]:
+        """
+        ПВЗ из /pickup-points/list по одному по мере чтения ответа, без сборки всего документа в памяти
+        """
+        async with self._stream(
+                "POST", self.endpoints.list_of_PVZ, json=self._PVZ_query(), idempotent=True) as response:
+            async for point in iter_array_items(response.aiter_bytes(), "points"):
+                yield point
+
+    async def refresh_PVZ(self) -> int:
+        """
+        Перезагрузка локального индекса ПВЗ из /pickup-points/list.
+        Возвращает количество ПВЗ в индексе
+        """
+        return await self.pickup_points.refresh(self.stream_PVZ)
+
+    async def nearest_PVZ(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int = 5,
+        station_type: Optional[PickupStationType] = None,
+        payment_method: Optional[PaymentMethod] = None,
+    ) -> List[dict]:
+        """
+        Ближайшие ПВЗ к точке по локальному индексу
+        latitude: float - Широта
+        longitude: float - Долгота
+        limit: int - Сколько ПВЗ вернуть
+        station_type: PickupStationType - Фильтр по типу ПВЗ
+        payment_method: PaymentMethod - Фильтр по доступному методу оплаты
+        """
+        await self.pickup_points.ensure_loaded(self.stream_PVZ)
+        found = self.pickup_points.index.nearest(
+            latitude, longitude, limit, _enum_value(station_type), _enum_value(payment_method))
+        return [_with_distance(point, distance) for distance, point in found]
+
+    async def PVZ_within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        station_type: Optional[PickupStationType] = None,
+        payment_method: Optional[PaymentMethod] = None,
+    ) -> List[dict]:
+        """
+        ПВЗ в радиусе от точки по локальному индексу, по возрастанию расстояния
+        radius_km: float - Радиус поиска, километры
+        """
+        await self.pickup_points.ensure_loaded(self.stream_PVZ)
+        found = self.pickup_points.index.within_radius(
+            latitude, longitude, radius_km, _enum_value(station_type), _enum_value(payment_method))
+        return [_with_distance(point, distance) for distance, point in found]
+
+    async def filter_PVZ(
+        self,
+        station_type: Optional[PickupStationType] = None,
+        payment_method: Optional[PaymentMethod] = None,
+    ) -> List[dict]:
+        """
+        ПВЗ по типу и/или методу оплаты по локальному индексу
+        """
+        await self.pickup_points.ensure_loaded(self.stream_PVZ)
+        found = self.pickup_points.index.filter(_enum_value(station_type), _enum_value(payment_method))
+        return [point.raw for point in found]
+
+
+def _enum_value(value) -> Optional[str]:
+    return value.value if value is not None else None
 
 
+def _with_distance(point: PickupPoint, distance: float) -> dict:
+    return {**point.raw, "distance_km": round(distance, 3)}
@@ -0,0 +1,201 @@
+"""
+Агрегация корзины на NumPy: вес, объем, объемный вес, границы габаритов и грузоместа.
+
+Товары — словари в формате items CreatingOrder/DraftDelivery: count и physical_dims
+(dx, dy, dz в сантиметрах, weight_gross в граммах) на единицу товара. Поля строк один раз
+переносятся в массивы, дальше все считается векторно — без цикла Python по строкам.
+Стороны единицы упорядочиваются: длина ≥ ширина ≥ высота; в месте единицы лежат друг
+на друге на самой большой грани, поэтому габариты места — наибольшие длина и ширина
+и сумма высот.
+"""
+from bisect import bisect_right
+from dataclasses import asdict, dataclass
+from itertools import chain
+from operator import itemgetter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from src import consts as c
+from service.lazy_imports import load_numpy
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    # NumPy загружается при создании первой корзины, а не при старте приложения
+    np = None
+
+# Как раскладывать товары заказа по грузоместам
+PLACES_PER_ITEM = "item"
+PLACES_BY_BARCODE = "barcode"
+PLACES_PACKED = "pack"
+
+_COUNT = itemgetter("count")
+_PHYSICAL_DIMS = itemgetter("physical_dims")
+_DIMS = itemgetter("dx", "dy", "dz", "weight_gross")
+_PLACE_BARCODE = itemgetter("place_barcode")
+
+
+class CartError(ValueError):
+    """
+    Строка корзины без количества или весогабаритов
+    """
+
+
+@dataclass
+class CartSummary():
+    """
+    Итоги корзины
+    lines: int - Строк в корзине
+    units: int - Единиц товара
+    total_weight: int - Вес брутто, граммы
+    volume: int - Объем, кубические сантиметры
+    volumetric_weight: int - Объемный вес, граммы
+    chargeable_weight: int - Больший из веса брутто и объемного веса, граммы
+    min_dims: tuple - Наименьшие длина, ширина и высота единицы товара, сантиметры
+    max_dims: tuple - Наибольшие длина, ширина и высота единицы товара, сантиметры
+    """
+    lines: int
+    units: int
+    total_weight: int
+    volume: int
+    volumetric_weight: int
+    chargeable_weight: int
+    min_dims: Tuple[int, int, int]
+    max_dims: Tuple[int, int, int]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class Cart():
+    """
+    Корзина в виде массивов: количество, упорядоченные стороны и вес единицы по строкам
+    items: list[dict] - Товары с count и physical_dims
+    """
+    def __init__(self, items: Sequence[dict]):
+        global np
+        np = load_numpy()
+        self.items = items
+        size = len(items)
+        try:
+            self.counts = np.fromiter(map(_COUNT, items), np.int64, size)
+            flat = np.fromiter(chain.from_iterable(map(_DIMS, map(_PHYSICAL_DIMS, items))), np.int64, size * 4)
+        except (KeyError, TypeError, ValueError) as exc:
+            raise CartError(f"Строка корзины без count или physical_dims: {exc!r}") from exc
+        dims = flat.reshape(size, 4)
+        if size and (self.counts.min() < 1 or dims.min() < 0):
+            raise CartError("Количество должно быть положительным, весогабариты — неотрицательными")
+        # Стороны по убыванию: длина, ширина, высота
+        self.sides = -np.sort(-dims[:, :3], axis=1)
+        self.unit_weights = dims[:, 3]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def summary(self, volumetric_divisor: float = c.CART_VOLUMETRIC_DIVISOR) -> CartSummary:
+        """
+        Итоги корзины
+        volumetric_divisor: float - Делитель объемного веса, см³ на килограмм
+        """
+        total_weight = int(self.unit_weights @ self.counts)
+        volume = int(self.sides.prod(axis=1) @ self.counts)
+        volumetric_weight = int(np.ceil(volume * 1000 / volumetric_divisor)) if volumetric_divisor else 0
+        empty = not len(self)
+        return CartSummary(
+            lines=len(self),
+            units=int(self.counts.sum()),
+            total_weight=total_weight,
+            volume=volume,
+            volumetric_weight=volumetric_weight,
+            chargeable_weight=max(total_weight, volumetric_weight),
+            min_dims=(0, 0, 0) if empty else tuple(int(side) for side in self.sides.min(axis=0)),
+            max_dims=(0, 0, 0) if empty else tuple(int(side) for side in self.sides.max(axis=0)),
+        )
+
+    def _places(self, groups: "np.ndarray", barcodes: Sequence[str], descriptions: Sequence[Optional[str]]) -> List[dict]:
+        """
+        Грузоместа по номерам групп строк (groups[i] — место строки i, места нумеруются с нуля подряд)
+        """
+        order = np.argsort(groups, kind="stable")
+        starts = np.flatnonzero(np.r_[True, np.diff(groups[order]) != 0])
+        sides = self.sides[order]
+        counts = self.counts[order]
+        length = np.maximum.reduceat(sides[:, 0], starts)
+        width = np.maximum.reduceat(sides[:, 1], starts)
+        height = np.add.reduceat(sides[:, 2] * counts, starts)
+        weight = np.add.reduceat(self.unit_weights[order] * counts, starts)
+        return [
+            {
+                "barcode": barcode,
+                "physical_dims": {"dx": dx, "dy": dy, "dz": dz, "weight_gross": weight_gross},
+                "description": description,
+            }
+            for barcode, description, dx, dz, dy, weight_gross in zip(
+                barcodes, descriptions, length.tolist(), width.tolist(), height.tolist(), weight.tolist())
+        ]
+
+    def group_places(self, description: Optional[str] = None) -> List[dict]:
+        """
+        Грузоместа по place_barcode товаров, в порядке первого появления штрихкода:
+        один ResourcePlace на штрихкод с суммарным весом и общими габаритами
+        """
+        if not len(self):
+            return []
+        # Номера мест по словарю, а не np.unique: сортировка строк дороже, и порядок появления сохраняется
+        codes: Dict[str, int] = {}
+        groups = np.fromiter(
+            (codes.setdefault(barcode, len(codes)) for barcode in map(_PLACE_BARCODE, self.items)),
+            np.int64, len(self))
+        return self._places(groups, list(codes), [description] * len(codes))
+
+    def pack(
+        self,
+        max_weight: int = c.CART_MAX_PLACE_WEIGHT,
+        prefix: str = "PLACE",
+        description: Optional[str] = None,
+    ) -> Tuple[List[dict], List[dict]]:
+        """
+        Раскладка строк по грузоместам в порядке корзины: место закрывается, когда следующая
+        строка превысила бы max_weight; строка тяжелее max_weight занимает отдельное место.
+        Возвращает товары с place_barcode новых мест и сами места (штрихкоды prefix-1, prefix-2, ...)
+        max_weight: int - Наибольший вес места, граммы
+        """
+        if not len(self):
+            return [], []
+        # Раскладка последовательная: граница места зависит от предыдущей. Двоичный поиск по
+        # накопленному весу — шаг на место, а не на строку
+        cumulative = np.cumsum(self.unit_weights * self.counts).tolist()
+        size = len(cumulative)
+        starts = [0]
+        while True:
+            start = starts[-1]
+            before = cumulative[start - 1] if start else 0
+            end = max(bisect_right(cumulative, before + max_weight, start), start + 1)
+            if end >= size:
+                break
+            starts.append(end)
+        groups = np.zeros(size, np.int64)
+        groups[starts[1:]] = 1
+        groups = np.cumsum(groups)
+        barcodes = [f"{prefix}-{index + 1}" for index in range(len(starts))]
+        items = [
+            {**item, "place_barcode": barcodes[group]}
+            for item, group in zip(self.items, groups.tolist())
+        ]
+        return items, self._places(groups, barcodes, [description] * len(barcodes))
+
+
+def order_places(items: List[dict], mode: str, prefix: str) -> Tuple[List[dict], Optional[List[dict]]]:
+    """
+    Товары и грузоместа для создания заказа
+    mode: str - item — место на каждый товар (places=None, как раньше); barcode — место на place_barcode;
+        pack — раскладка по весу CART_MAX_PLACE_WEIGHT с новыми штрихкодами prefix-N
+    """
+    if mode == PLACES_PER_ITEM:
+        return items, None
+    cart = Cart(items)
+    if mode == PLACES_BY_BARCODE:
+        return items, cart.group_places()
+    if mode == PLACES_PACKED:
+        return cart.pack(prefix=prefix)
+    raise CartError(f"Неизвестный способ раскладки по местам: {mode}")
+
@@ -1,5 +1,9 @@
 import httpx
+from typing import List, Optional
 from src import consts as c
+from service.base import BaseService
+from service.http_client import UpstreamClient
+from service.payloads import offer_create_payload
 from schemas.Order_model import (
     BillingInfo,
     PaymentMethod,
@@ -15,13 +19,15 @@ from schemas.Order_model import (
 )
 
 
-class DraftDelivery:
-    def __init__(self, api_key: str, base_url: str):
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
-        self.base_url = base_url
+class DraftDelivery(BaseService):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        client: Optional[UpstreamClient] = None,
+        endpoints: Optional[c.EndpointSet] = None,
+    ):
+        super().__init__(api_key, base_url, client, endpoints)
 
     async def Creating_an_application(
         self,
@@ -29,7 +35,8 @@ class DraftDelivery:
         source: dict,
         destination: str,
         items: list[dict],
-        contact: dict
+        contact: dict,
+        places: Optional[List[dict]] = None,
     ):
         """
         Создание заявки
@@ -38,47 +45,13 @@ class DraftDelivery:
         destination: str - Идентификатор ПВЗ-получателя
         items: list[dict] - Список со словарем, содержащим информацию о товаре
         contact: list[dict] - Список со словарем, содержащим информацию о контактном лице
+        places: list[dict] - Грузоместа (Cart.group_places/Cart.pack); по умолчанию место на каждый товар
         """
-        body = {
-            "billing_info": BillingInfo(payment_method=PaymentMethod.already_paid).model_dump(),
-            "destination": {
-                "type": DestinationRequestNode.platform_station.value,  
-                "platform_station_id": destination,
-            },
-            "info": {"operator_request_id": operator_request_id},
-            "items": [
-                RequestResourceItem(
-                    article=item["article"],
-                    billing_details=item["billing_details"],
-                    count=item["count"],
-                    name=item["name"],
-                    place_barcode=item["place_barcode"],
-                ).model_dump()
-                for item in items
-            ],
-            "last_mile_policy" : LastMilePolicy.self_pickup.value,
-            "places" : [ResourcePlace(
-                barcode= 'barcode',
-                physical_dims= item["physical_dims"],
-                description= item.get("description")
-            ).model_dump()
-            for item in items
-            ],
-            "recipient_info": [ContactPerson(
-                name=contact["first_name"],
-                phone=contact["phone"],
-                email=contact.get("email")
-            ).model_dump()],
-            "source": SourceRequestNode(
-                platform_station=source["platform_station_id"],
-                interval_utc=source["interval_utc"]).model_dump(),
-                "particular_items_refuse": False
-        }
+        body = offer_create_payload(operator_request_id, source, destination, items, contact, places)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.base_url}/offers/create", headers=self.headers,params={'send_unix': False}, json=body)
-            response.raise_for_status()
-            return response.json().get("order_id")
+        response = await self._request(
+            "POST", self.endpoints.Creating_an_application, params={'send_unix': False}, content=body)
+        return response.json().get("order_id")
 
 # async def Creating_an_application(
 #     self,
@@ -0,0 +1,207 @@
+import importlib.util
+import logging
+import ssl
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from pydantic import BaseModel
+
+from src import consts as c
+from service.resilience import UpstreamPolicy
+
+logger = logging.getLogger(__name__)
+
+
+class ClientSettings(BaseModel):
+    """
+    Настройки пула соединений к API Яндекс.Доставки
+    max_connections: int - Максимальное число одновременных соединений
+    max_keepalive_connections: int - Сколько простаивающих соединений держать открытыми
+    keepalive_expiry: float - Через сколько секунд закрывать простаивающее соединение
+    timeout: float - Общий таймаут чтения/записи, секунды
+    connect_timeout: float - Таймаут установки соединения, секунды
+    pool_timeout: float - Сколько ждать свободное соединение из пула, секунды
+    http2: bool - Использовать HTTP/2 (нужен пакет h2)
+    """
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    timeout: float = 10.0
+    connect_timeout: float = 5.0
+    pool_timeout: float = 5.0
+    http2: bool = False
+
+    @classmethod
+    def from_env(cls) -> "ClientSettings":
+        return cls(
+            max_connections=c.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=c.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=c.HTTP_KEEPALIVE_EXPIRY,
+            timeout=c.HTTP_TIMEOUT,
+            connect_timeout=c.HTTP_CONNECT_TIMEOUT,
+            pool_timeout=c.HTTP_POOL_TIMEOUT,
+            http2=c.HTTP2,
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout, pool=self.pool_timeout)
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+@lru_cache(maxsize=None)
+def _ssl_context() -> ssl.SSLContext:
+    """
+    Один SSL-контекст на процесс: загрузка корневых сертификатов занимает десятки миллисекунд
+    и без общего контекста повторяется для каждого клиента
+    """
+    return httpx.create_ssl_context()
+
+
+class UpstreamClient():
+    """
+    Долгоживущий HTTP-клиент к API Яндекс.Доставки для одной пары base_url/api_key.
+    Держит пул keep-alive соединений, чтобы не делать TCP+TLS рукопожатие на каждый запрос.
+    Сам httpx-клиент (транспорт httpcore и SSL-контекст) создается при первом запросе, а не при старте приложения.
+    """
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        settings: Optional[ClientSettings] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        policy: Optional[UpstreamPolicy] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.settings = settings or ClientSettings.from_env()
+        self.policy = policy or UpstreamPolicy()
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._closed = False
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            http2 = self.settings.http2
+            if http2 and not _http2_available():
+                logger.warning("HTTP/2 запрошен, но пакет h2 не установлен — используется HTTP/1.1")
+                http2 = False
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url or "",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=self.settings.limits(),
+                timeout=self.settings.timeouts(),
+                http2=http2,
+                verify=_ssl_context() if self._transport is None else True,
+                transport=self._transport,
+            )
+        return self._client
+
+    @property
+    def closed(self) -> bool:
+        return self._closed or (self._client is not None and self._client.is_closed)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        content: Optional[bytes] = None,
+        idempotent: bool = False,
+    ) -> httpx.Response:
+        """
+        Выполнение запроса к API через общий пул соединений
+        method: str - HTTP-метод
+        path: str - Путь эндпоинта относительно base_url, например /pricing-calculator
+        content: bytes - Готовое тело запроса (вместо json)
+        idempotent: bool - Запрос можно безопасно повторить; медленный такой запрос может быть
+            продублирован, если его эндпоинт есть в HEDGE_ENDPOINTS
+        """
+        metrics = self.policy.metrics
+
+        def send():
+            # Событие trace httpcore отмечает момент, когда запрос получил соединение из пула
+            extensions = {"trace": metrics.trace(path)} if metrics is not None else None
+            return self.client.request(
+                method, path, headers=headers, params=params, json=json, content=content, extensions=extensions)
+
+        return await self.policy.execute(self.api_key, self.base_url, path, send, idempotent, hedge=idempotent)
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        path: str,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        idempotent: bool = False,
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Запрос с потоковым чтением тела: политика повторов применяется до получения заголовков,
+        тело читается через response.aiter_bytes(), соединение возвращается в пул при выходе из блока
+        """
+        metrics = self.policy.metrics
+
+        def send():
+            extensions = {"trace": metrics.trace(path)} if metrics is not None else None
+            request = self.client.build_request(
+                method, path, headers=headers, params=params, json=json, extensions=extensions)
+            return self.client.send(request, stream=True)
+
+        response = await self.policy.execute(self.api_key, self.base_url, path, send, idempotent)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    async def aclose(self):
+        self._closed = True
+        if self._client is not None:
+            await self._client.aclose()
+
+
+class UpstreamClientPool():
+    """
+    Реестр долгоживущих клиентов: один UpstreamClient на пару base_url/api_key.
+    Создается в lifespan приложения и закрывается при его остановке.
+    """
+    def __init__(
+        self,
+        settings: Optional[ClientSettings] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        policy: Optional[UpstreamPolicy] = None,
+    ):
+        self.settings = settings or ClientSettings.from_env()
+        self.policy = policy or UpstreamPolicy.from_env()
+        self._transport = transport
+        self._clients: Dict[Tuple[str, str], UpstreamClient] = {}
+
+    def get(self, api_key: str, base_url: str) -> UpstreamClient:
+        key = (base_url, api_key)
+        client = self._clients.get(key)
+        if client is None or client.closed:
+            client = UpstreamClient(api_key, base_url, self.settings, transport=self._transport, policy=self.policy)
+            self._clients[key] = client
+        return client
+
+    async def aclose(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src import consts as c
+from service.cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+Fetch = Callable[[str], Awaitable[Optional[List[dict]]]]
+
+
+class NoAvailableIntervalError(LookupError):
+    """
+    У склада нет интервала отгрузки, подходящего для заказа
+    """
+    def __init__(self, station_id: str):
+        super().__init__(f"Нет доступных интервалов отгрузки для склада {station_id}")
+        self.station_id = station_id
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """
+    Граница интервала из ответа /offers/info: ISO-строка или unix-время
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+@dataclass
+class StationSlots():
+    """
+    Интервалы отгрузки склада, отсортированные по началу
+    starts: list[float] - Начала интервалов, unix-время; параллельны slots
+    slots: list[dict] - Интервалы в формате interval_utc: start_utc и end_utc
+    offers: list[dict] - Исходные элементы ответа /offers/info в том же порядке
+    loaded_at: float - Время загрузки, unix-время
+    empty: bool - В ответе API не было еще не начавшихся интервалов
+    requested_at: float - Последнее обращение к складу, unix-время
+    """
+    starts: List[float] = field(default_factory=list)
+    slots: List[dict] = field(default_factory=list)
+    offers: List[dict] = field(default_factory=list)
+    loaded_at: float = 0.0
+    empty: bool = False
+    requested_at: float = 0.0
+
+    @classmethod
+    def from_offers(cls, offers: Optional[List[dict]]) -> "StationSlots":
+        parsed = []
+        for offer in offers or ():
+            start = _timestamp(offer.get("from", offer.get("start_utc")))
+            end = _timestamp(offer.get("to", offer.get("end_utc")))
+            if start is not None and end is not None:
+                parsed.append((start, end, offer))
+        parsed.sort(key=lambda item: item[0])
+        loaded_at = time.time()
+        return cls(
+            starts=[start for start, _, _ in parsed],
+            slots=[{"start_utc": _iso(start), "end_utc": _iso(end)} for start, end, _ in parsed],
+            offers=[offer for _, _, offer in parsed],
+            loaded_at=loaded_at,
+            empty=not parsed or parsed[-1][0] < loaded_at,
+            requested_at=loaded_at,
+        )
+
+    def prune(self, now: float):
+        """
+        Удаление интервалов, начавшихся до now. Каждый интервал удаляется один раз,
+        поэтому в среднем это не добавляет стоимости к поиску
+        """
+        expired = bisect_left(self.starts, now)
+        if expired:
+            del self.starts[:expired], self.slots[:expired], self.offers[:expired]
+
+    def next_after(self, moment: float) -> Optional[dict]:
+        position = bisect_left(self.starts, moment)
+        return self.slots[position] if position < len(self.slots) else None
+
+
+class IntervalStore():
+    """
+    Интервалы отгрузки по складам в памяти процесса с фоновым обновлением.
+    Ближайший интервал после момента T ищется бинарным поиском,
+    прошедшие интервалы удаляются при обращении. В фоне обновляются только склады,
+    к которым обращались за последние idle_ttl секунд; остальные забываются.
+    Пустой ответ API запоминается до следующего обновления (на empty_ttl секунд)
+    fetch: Callable - Загрузка интервалов склада (элементы offers ответа /offers/info)
+    min_lead: float - Минимальный запас до начала интервала, секунды
+    max_stations: int - Сколько складов держать; при заполнении вытесняется давно не запрошенный
+    idle_ttl: float - Через сколько секунд без обращений склад перестает обновляться в фоне
+    empty_ttl: float - Сколько секунд не запрашивать заново склад без интервалов
+    """
+    def __init__(
+        self,
+        fetch: Fetch,
+        min_lead: float = c.INTERVAL_MIN_LEAD,
+        max_stations: int = c.INTERVAL_MAX_STATIONS,
+        idle_ttl: float = c.INTERVAL_STATION_IDLE_TTL,
+        empty_ttl: float = c.INTERVAL_REFRESH_INTERVAL,
+    ):
+        self.fetch = fetch
+        self.min_lead = min_lead
+        self.max_stations = max_stations
+        self.idle_ttl = idle_ttl
+        self.empty_ttl = empty_ttl
+        # Порядок — по последнему обращению: при заполнении вытесняются склады из начала
+        self.stations: "OrderedDict[str, StationSlots]" = OrderedDict()
+        self.refreshes = 0
+        self.failures = 0
+        self.evicted = 0
+        self._flight = SingleFlight()
+        self._task: Optional[asyncio.Task] = None
+
+    def _store(self, station_id: str, offers: Optional[List[dict]]) -> StationSlots:
+        slots = StationSlots.from_offers(offers)
+        previous = self.stations.get(station_id)
+        if previous is not None:
+            slots.requested_at = previous.requested_at
+        # Подмена одной операцией присваивания — читатели не видят частично обновленный список
+        self.stations[station_id] = slots
+        while len(self.stations) > self.max_stations:
+            self.stations.popitem(last=False)
+            self.evicted += 1
+        return slots
+
+    def load(self, station_id: str, offers: Optional[List[dict]]) -> int:
+        return len(self._store(station_id, offers).slots)
+
+    async def _load(self, station_id: str) -> StationSlots:
+        offers = await self.fetch(station_id)
+        self.refreshes += 1
+        return self._store(station_id, offers)
+
+    async def refresh(self, station_id: str) -> int:
+        slots = await self._flight.do(station_id, lambda: self._load(station_id))
+        return len(slots.slots)
+
+    async def _ensure(self, station_id: str, now: float) -> StationSlots:
+        """
+        Интервалы склада; загрузка с API только если склад еще не известен
+        или все известные интервалы уже прошли. Одновременные промахи по складу — один запрос
+        """
+        slots = self.stations.get(station_id)
+        if slots is not None:
+            slots.prune(now)
+            if not slots.slots and not (slots.empty and now - slots.loaded_at < self.empty_ttl):
+                slots = None
+        if slots is None:
+            slots = await self._flight.do(station_id, lambda: self._load(station_id))
+            slots.prune(now)
+        slots.requested_at = now
+        if station_id in self.stations:
+            self.stations.move_to_end(station_id)
+        return slots
+
+    async def offers(self, station_id: str) -> List[dict]:
+        """
+        Еще не начавшиеся интервалы склада в формате ответа /offers/info
+        """
+        slots = await self._ensure(station_id, time.time())
+        return list(slots.offers)
+
+    async def next_slot(self, station_id: str, after: Optional[datetime] = None) -> Optional[dict]:
+        """
+        Ближайший интервал склада, начинающийся не раньше after (по умолчанию — сейчас + min_lead).
+        Возвращает словарь interval_utc или None, если подходящих интервалов нет
+        station_id: str - ID склада отгрузки
+        after: datetime - Момент, после которого должен начинаться интервал
+        """
+        now = time.time()
+        slots = await self._ensure(station_id, now)
+        moment = max(now + self.min_lead, _timestamp(after) if after is not None else now)
+        slot = slots.next_after(moment)
+        return dict(slot) if slot is not None else None
+
+    async def _refresh_station(self, station_id: str):
+        try:
+            await self.refresh(station_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failures += 1
+            logger.warning("Не удалось обновить интервалы склада %s, используются прежние", station_id, exc_info=True)
+
+    async def _refresh_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            now = time.time()
+            idle = [station_id for station_id, slots in self.stations.items() if now - slots.requested_at > self.idle_ttl]
+            for station_id in idle:
+                del self.stations[station_id]
+            self.evicted += len(idle)
+            await asyncio.gather(*(self._refresh_station(station_id) for station_id in list(self.stations)))
+
+    def start(self, interval: float):
+        """
+        Запуск фонового обновления недавно запрошенных складов раз в interval секунд
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_forever(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "stations": len(self.stations),
+            "slots": sum(len(slots.slots) for slots in self.stations.values()),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,564 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+import httpx
+
+from src import consts as c
+from service.base import describe_error
+from service.order_confirmation import OrderConfirmation
+from service.resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+ACTION_CONFIRM = "confirm"
+ACTION_CANCEL = "cancel"
+ACTION_EDIT = "edit"
+
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+_COLUMNS = "job_id, action, target, payload, state, attempts, result, error, created_at, updated_at"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    action TEXT NOT NULL,
+    target TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at);
+"""
+
+_UPSERT = f"""
+INSERT INTO jobs ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (job_id) DO UPDATE SET
+    payload = excluded.payload,
+    state = excluded.state,
+    attempts = excluded.attempts,
+    result = excluded.result,
+    error = excluded.error,
+    updated_at = excluded.updated_at
+"""
+
+# Ограничение SQLite на число параметров запроса в старых сборках — 999
+_LOOKUP_CHUNK = 500
+
+
+class JobError(ValueError):
+    """
+    Задание без обязательных для операции полей или с неизвестной операцией
+    """
+
+
+class JobFailedError(Exception):
+    """
+    Задание журнала завершилось ошибкой
+    """
+    def __init__(self, job: "Job"):
+        super().__init__(f"Задание {job.job_id} не выполнено: {(job.error or {}).get('message')}")
+        self.job = job
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _loads(value: Optional[str]) -> Any:
+    return None if value is None else json.loads(value)
+
+
+@dataclass
+class Job():
+    """
+    Задание журнала
+    job_id: str - Ключ идемпотентности
+    action: str - confirm, cancel или edit
+    payload: dict - offer_id (confirm), request_id (cancel, edit), changes (edit)
+    state: str - pending, running, done или failed
+    attempts: int - Количество попыток выполнения
+    result: dict - Ответ API: request_id (confirm), status (cancel), editing_task_id (edit)
+    error: dict - Описание последней ошибки
+    """
+    job_id: str
+    action: str
+    payload: Dict[str, Any]
+    state: str = STATE_PENDING
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[Dict[str, Any]] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def target(self) -> str:
+        """
+        Заявка или предложение, к которому относится задание
+        """
+        return self.payload["offer_id"] if self.action == ACTION_CONFIRM else self.payload["request_id"]
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (STATE_DONE, STATE_FAILED)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "action": self.action,
+            **self.payload,
+            "state": self.state,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+    def row(self) -> tuple:
+        return (
+            self.job_id, self.action, self.target, _dumps(self.payload), self.state, self.attempts,
+            _dumps(self.result), _dumps(self.error), self.created_at, self.updated_at)
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "Job":
+        job_id, action, _, payload, state, attempts, result, error, created_at, updated_at = row
+        job = cls(job_id, action, _loads(payload), state, attempts, _loads(result), _loads(error), created_at, updated_at)
+        if job.finished:
+            job.done.set()
+        return job
+
+
+def make_job(spec: Dict[str, Any]) -> Job:
+    """
+    Задание из описания: action, job_id, offer_id, request_id, changes
+    """
+    action = spec.get("action")
+    if action == ACTION_CONFIRM:
+        if not spec.get("offer_id"):
+            raise JobError("Для подтверждения нужен offer_id")
+        payload = {"offer_id": spec["offer_id"]}
+        default_id = f"{ACTION_CONFIRM}:{spec['offer_id']}"
+    elif action in (ACTION_CANCEL, ACTION_EDIT):
+        if not spec.get("request_id"):
+            raise JobError(f"Для операции {action} нужен request_id")
+        payload = {"request_id": spec["request_id"]}
+        if action == ACTION_CANCEL:
+            default_id = f"{ACTION_CANCEL}:{spec['request_id']}"
+        else:
+            if not spec.get("changes"):
+                raise JobError("Для редактирования нужны changes")
+            payload["changes"] = spec["changes"]
+            # Правок одной заявки может быть несколько: без job_id каждая — новое задание
+            default_id = f"{ACTION_EDIT}:{uuid.uuid4().hex}"
+    else:
+        raise JobError(f"Неизвестная операция с заявкой: {action}")
+    return Job(spec.get("job_id") or default_id, action, payload)
+
+
+def _retryable(exc: BaseException, action: str) -> bool:
+    """
+    Временная ли ошибка: повтор может пройти успешно. Редактирование не повторяемо — его повторяем,
+    только если запрос заведомо не дошел до API: автомат защиты, 429 или ошибка соединения
+    """
+    if isinstance(exc, CircuitOpenError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        if action == ACTION_EDIT:
+            return exc.response.status_code == 429
+        return exc.response.status_code >= 500 or exc.response.status_code in (408, 429)
+    if action == ACTION_EDIT:
+        return isinstance(exc, httpx.ConnectError)
+    return isinstance(exc, httpx.TransportError)
+
+
+class JobJournal():
+    """
+    Подтверждение, отмена и редактирование заявок через журнал с упреждающей записью в SQLite.
+    Задание сначала фиксируется в журнале, и только потом submit_many возвращает управление и задание
+    выполняется; после перезапуска незавершенные задания выполняются заново (не менее одного раза —
+    подтверждение того же предложения и отмена повторяемы и возвращают прежний результат).
+    Редактирование не повторяемо: оно повторяется только после ошибок, при которых запрос не дошел
+    до API, а прерванное перезапуском во время запроса завершается ошибкой interrupted — применилась
+    ли правка, вызывающий проверяет сам (GET /request/info) и при необходимости ставит ее снова.
+    Записи фиксируются пакетами: одна транзакция и один fsync на все изменения заданий, накопленные,
+    пока шла предыдущая запись (и за commit_interval). Задания одной заявки выполняются по очереди,
+    в порядке постановки. Без path журнал хранится только в памяти процесса
+    path: str - Файл базы SQLite
+    workers: int - Количество исполнителей (максимум одновременных операций)
+    batch_size: int - Записей, при накоплении которых пакет фиксируется, не дожидаясь commit_interval
+    commit_interval: float - Сколько секунд собирать записи в пакет перед записью; 0 — не ждать
+    """
+    def __init__(
+        self,
+        path: Optional[str],
+        confirmation: OrderConfirmation,
+        workers: int = c.JOB_WORKERS,
+        queue_size: int = c.JOB_QUEUE_SIZE,
+        batch_size: int = c.JOB_JOURNAL_BATCH_SIZE,
+        commit_interval: float = c.JOB_JOURNAL_COMMIT_INTERVAL,
+        synchronous: str = c.JOB_JOURNAL_SYNCHRONOUS,
+        retention: float = c.JOB_JOURNAL_RETENTION,
+        max_attempts: int = c.JOB_MAX_ATTEMPTS,
+        retry_delay: float = c.JOB_RETRY_DELAY,
+        max_results: int = c.JOB_MAX_RESULTS,
+    ):
+        if synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Неизвестный режим synchronous журнала: {synchronous}")
+        self.path = path
+        self.confirmation = confirmation
+        self.workers = workers
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.synchronous = synchronous
+        self.retention = retention
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_results = max_results
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.deduplicated = 0
+        self.retried = 0
+        self.resumed = 0
+        self.commits = 0
+        self.written = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self._dirty: Dict[str, Job] = {}
+        self._waiters: List[asyncio.Future] = []
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._closing = False
+        # Задания, ждущие окончания другого задания той же заявки
+        self._busy: Dict[str, Deque[Job]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._writer_task: Optional[asyncio.Task] = None
+
+    @property
+    def persistent(self) -> bool:
+        return bool(self.path)
+
+    async def start(self):
+        if self._tasks:
+            return
+        pending: List[Job] = []
+        if self.persistent:
+            pending = await asyncio.to_thread(self._open)
+            self._closing = False
+            self._writer_task = asyncio.create_task(self._writer())
+        else:
+            logger.warning("JOB_JOURNAL_PATH не задан: задания хранятся в памяти и теряются при перезапуске")
+        for job in pending:
+            self._remember(job)
+        interrupted = [job for job in pending if job.action == ACTION_EDIT and job.state == STATE_RUNNING]
+        for job in interrupted:
+            # Запрос мог дойти до API: повтор применил бы правку дважды
+            job.state = STATE_FAILED
+            job.error = {
+                "type": "interrupted",
+                "message": "Редактирование прервано перезапуском во время запроса, результат неизвестен",
+            }
+            self._mark(job)
+            job.done.set()
+        pending = [job for job in pending if not job.finished]
+        self.resumed += len(pending)
+        self._tasks = [asyncio.create_task(self._executor()) for _ in range(self.workers)]
+        if pending:
+            self._tasks.append(asyncio.create_task(self._resume(pending)))
+
+    async def stop(self):
+        """
+        Остановка исполнителей и фиксация накопленных записей. Прерванные задания
+        остаются в журнале незавершенными и выполнятся после перезапуска
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._busy.clear()
+        if self._writer_task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            self._writer_task = None
+        if self._db is not None:
+            await asyncio.to_thread(self._close)
+
+    def _open(self) -> List[Job]:
+        """
+        Открытие базы и незавершенные задания прошлых запусков в порядке постановки
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(f"PRAGMA synchronous={self.synchronous}")
+        db.executescript(_SCHEMA)
+        db.execute(
+            "DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?",
+            (STATE_DONE, STATE_FAILED, time.time() - self.retention))
+        rows = db.execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE state IN (?, ?) ORDER BY created_at",
+            (STATE_PENDING, STATE_RUNNING)).fetchall()
+        self._db = db
+        return [Job.from_row(row) for row in rows]
+
+    def _close(self):
+        with self._db_lock:
+            self._db.close()
+            self._db = None
+
+    def _write(self, rows: List[tuple]):
+        with self._db_lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(_UPSERT, rows)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _select(self, job_ids: List[str]) -> Dict[str, Job]:
+        found: Dict[str, Job] = {}
+        with self._db_lock:
+            for start in range(0, len(job_ids), _LOOKUP_CHUNK):
+                chunk = job_ids[start:start + _LOOKUP_CHUNK]
+                rows = self._db.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE job_id IN ({', '.join('?' * len(chunk))})", chunk)
+                for row in rows:
+                    found[row[0]] = Job.from_row(row)
+        return found
+
+    def _mark(self, job: Job):
+        """
+        Изменение задания попадает в ближайший пакет записи; несколько изменений одного задания
+        в пределах пакета записываются одной строкой
+        """
+        job.updated_at = time.time()
+        if not self.persistent:
+            return
+        self._dirty[job.job_id] = job
+        self._wakeup.set()
+        if len(self._dirty) >= self.batch_size:
+            self._full.set()
+
+    async def _durable(self):
+        """
+        Ожидание фиксации всех записей, сделанных до вызова
+        """
+        if not self.persistent:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._wakeup.set()
+        await future
+
+    async def _writer(self):
+        while True:
+            await self._wakeup.wait()
+            if not self._closing and len(self._dirty) < self.batch_size and self.commit_interval > 0:
+                # Короткая пауза собирает в одну транзакцию записи одновременных запросов и исполнителей
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.commit_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            self._full.clear()
+            await self._commit()
+            if self._closing:
+                return
+
+    async def _commit(self):
+        dirty, self._dirty = self._dirty, {}
+        waiters, self._waiters = self._waiters, []
+        try:
+            if dirty:
+                await asyncio.to_thread(self._write, [job.row() for job in dirty.values()])
+        except Exception as exc:
+            logger.error("Не удалось записать журнал заданий: %r", exc)
+            # Изменения вернутся в следующий пакет; более новые изменения тех же заданий важнее
+            for job_id, job in dirty.items():
+                self._dirty.setdefault(job_id, job)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(exc)
+            if not self._closing:
+                await asyncio.sleep(self.retry_delay)
+                self._wakeup.set()
+            return
+        self.commits += bool(dirty)
+        self.written += len(dirty)
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _remember(self, job: Job):
+        self.jobs[job.job_id] = job
+        self.jobs.move_to_end(job.job_id)
+        excess = len(self.jobs) - self.max_results
+        if excess <= 0:
+            return
+        # Вытесняются самые старые завершенные задания, где бы они ни стояли: незавершенное
+        # в начале не должно останавливать вытеснение (завершенные остаются в базе для get)
+        evicted = []
+        for job_id, item in self.jobs.items():
+            if item.finished:
+                evicted.append(job_id)
+                if len(evicted) == excess:
+                    break
+        for job_id in evicted:
+            del self.jobs[job_id]
+
+    async def submit_many(self, specs: Sequence[Dict[str, Any]]) -> List[Job]:
+        """
+        Постановка заданий. Возвращает управление после записи заданий в журнал.
+        Для известного job_id возвращает существующее задание; неудачное задание ставится повторно
+        specs: Sequence[dict] - Задания: action, job_id, offer_id, request_id, changes
+        """
+        created = [make_job(spec) for spec in specs]
+        unknown = [job.job_id for job in created if job.job_id not in self.jobs]
+        stored: Dict[str, Job] = {}
+        if unknown and self._db is not None:
+            # Задание могло быть выполнено до перезапуска и уже вытеснено из памяти
+            stored = await asyncio.to_thread(self._select, unknown)
+        results: List[Job] = []
+        accepted: List[Job] = []
+        for job in created:
+            known = self.jobs.get(job.job_id) or stored.pop(job.job_id, None)
+            if known is not None:
+                self._remember(known)
+                if known.state != STATE_FAILED:
+                    self.deduplicated += 1
+                    results.append(known)
+                    continue
+                known.payload = job.payload
+                known.state = STATE_PENDING
+                known.error = None
+                known.done.clear()
+                job = known
+            else:
+                self._remember(job)
+            self._mark(job)
+            results.append(job)
+            accepted.append(job)
+        if accepted:
+            await self._durable()
+            for job in accepted:
+                await self._queue.put(job)
+        return results
+
+    async def submit(self, spec: Dict[str, Any]) -> Job:
+        return (await self.submit_many([spec]))[0]
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None and self._db is not None:
+            job = (await asyncio.to_thread(self._select, [job_id])).get(job_id)
+        return job
+
+    async def wait(self, jobs: List[Job], timeout: Optional[float] = None) -> List[Job]:
+        """
+        Ожидание завершения заданий; по истечении timeout возвращает текущее состояние
+        """
+        pending = [asyncio.ensure_future(job.done.wait()) for job in jobs if not job.finished]
+        if pending:
+            _, not_done = await asyncio.wait(pending, timeout=timeout)
+            for waiter in not_done:
+                waiter.cancel()
+        return jobs
+
+    async def _resume(self, jobs: List[Job]):
+        for job in jobs:
+            await self._queue.put(job)
+
+    async def _call(self, job: Job) -> Dict[str, Any]:
+        if job.action == ACTION_CONFIRM:
+            return {"request_id": await self.confirmation.confirm_order(job.payload["offer_id"])}
+        if job.action == ACTION_CANCEL:
+            return await self.confirmation.cancel_order(job.payload["request_id"])
+        return await self.confirmation.edit_order(job.payload["request_id"], job.payload["changes"])
+
+    async def _execute(self, job: Job):
+        while True:
+            job.attempts += 1
+            job.state = STATE_RUNNING
+            self._mark(job)
+            try:
+                if job.action == ACTION_EDIT:
+                    # Правка отправляется только после записи running на диск: после падения во время
+                    # запроса перезапуск увидит running и не отправит ее повторно
+                    await self._durable()
+                job.result = await self._call(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                job.error = describe_error(exc)
+                if _retryable(exc, job.action) and job.attempts < self.max_attempts:
+                    job.state = STATE_PENDING
+                    self._mark(job)
+                    self.retried += 1
+                    # Повтор здесь же, а не в конце очереди: следующие задания заявки ждут этого
+                    delay = exc.retry_in if isinstance(exc, CircuitOpenError) \
+                        else self.retry_delay * 2 ** (job.attempts - 1)
+                    await asyncio.sleep(delay)
+                    continue
+                logger.warning("Задание %s не выполнено: %r", job.job_id, exc)
+                job.state = STATE_FAILED
+            else:
+                job.state = STATE_DONE
+                job.error = None
+            self._mark(job)
+            job.done.set()
+            return
+
+    async def _executor(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                target = job.target
+                waiting = self._busy.get(target)
+                if waiting is not None:
+                    # Задание этой заявки уже выполняется: следующее выполнит тот же исполнитель
+                    waiting.append(job)
+                    continue
+                self._busy[target] = waiting = deque()
+                try:
+                    while job is not None:
+                        await self._execute(job)
+                        job = waiting.popleft() if waiting else None
+                finally:
+                    self._busy.pop(target, None)
+            finally:
+                self._queue.task_done()
+
+    def snapshot(self) -> Dict[str, Any]:
+        states: Dict[str, int] = {}
+        for job in self.jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+        return {
+            "persistent": self.persistent,
+            "queued": self._queue.qsize(),
+            "workers": self.workers if self._tasks else 0,
+            "states": states,
+            "deduplicated": self.deduplicated,
+            "retried": self.retried,
+            "resumed": self.resumed,
+            "commits": self.commits,
+            "written": self.written,
+            "unwritten": len(self._dirty),
+        }
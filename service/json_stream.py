@@ -0,0 +1,109 @@
+"""
+Потоковый разбор больших JSON-ответов: элементы массива по ключу верхнего уровня
+отдаются по одному по мере поступления байтов, весь документ в памяти не собирается.
+"""
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator
+
+_WHITESPACE = " \t\n\r"
+# Обработанная часть буфера отбрасывается, когда ее размер превышает порог
+_COMPACT_AT = 1 << 16
+
+
+class _StreamBuffer():
+    def __init__(self, chunks: AsyncIterable[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    async def _more(self) -> bool:
+        if self.eof:
+            return False
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self.eof = True
+            self.text += self._utf8.decode(b"", final=True)
+            return False
+        if self.pos > _COMPACT_AT:
+            self.text, self.pos = self.text[self.pos:], 0
+        self.text += self._utf8.decode(chunk)
+        return True
+
+    async def peek(self) -> str:
+        """
+        Следующий значимый символ без его поглощения
+        """
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not await self._more():
+                raise ValueError("Неожиданный конец JSON")
+
+    async def expect(self, char: str):
+        if await self.peek() != char:
+            raise ValueError(f"Ожидался символ {char!r} в позиции {self.pos}")
+        self.pos += 1
+
+    async def value(self) -> Any:
+        """
+        Очередное значение целиком; если оно не поместилось в буфер, дочитываются новые байты
+        """
+        await self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not await self._more():
+                    raise
+                continue
+            # Число или литерал в самом конце буфера может быть обрезан — дочитываем до разделителя
+            if end == len(self.text) and not self.eof:
+                await self._more()
+                continue
+            self.pos = end
+            return value
+
+
+async def iter_array_items(chunks: AsyncIterable[bytes], key: str) -> AsyncIterator[Any]:
+    """
+    Элементы массива document[key] из потока байтов JSON-объекта.
+    Одновременно в памяти находятся только текущий элемент и непрочитанный хвост буфера.
+    Если ключа нет или его значение не массив, ничего не возвращается
+    chunks: AsyncIterable[bytes] - Поток байтов, например response.aiter_bytes()
+    key: str - Ключ верхнего уровня
+    """
+    buffer = _StreamBuffer(chunks)
+    await buffer.expect("{")
+    if await buffer.peek() == "}":
+        return
+    while True:
+        name = await buffer.value()
+        await buffer.expect(":")
+        if name == key and await buffer.peek() == "[":
+            buffer.pos += 1
+            if await buffer.peek() == "]":
+                return
+            while True:
+                yield await buffer.value()
+                char = await buffer.peek()
+                buffer.pos += 1
+                if char == "]":
+                    return
+                if char != ",":
+                    raise ValueError(f"Ожидался символ ',' или ']' в позиции {buffer.pos - 1}")
+        await buffer.value()
+        char = await buffer.peek()
+        buffer.pos += 1
+        if char == "}":
+            return
+        if char != ",":
+            raise ValueError(f"Ожидался символ ',' или '}}' в позиции {buffer.pos - 1}")
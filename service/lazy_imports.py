@@ -0,0 +1,12 @@
+"""
+Отложенный импорт тяжелых зависимостей: модуль загружается при первом использовании, а не при старте приложения
+"""
+from types import ModuleType
+
+
+def load_numpy() -> ModuleType:
+    """
+    Модуль numpy. Модули, использующие NumPy, объявляют np = None и присваивают результат при создании объекта
+    """
+    import numpy
+    return numpy
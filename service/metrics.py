@@ -0,0 +1,245 @@
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей.
+Запись значения — одна операция со словарем и bisect, поэтому метрики можно не отключать под нагрузкой.
+"""
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src import consts as c
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric():
+    """
+    Базовый класс метрики с набором меток
+    name: str - Имя метрики
+    documentation: str - Описание для HELP
+    labelnames: Sequence[str] - Имена меток; значения передаются позиционно в том же порядке
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[Any, ...], Any] = {}
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: Any, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels: Any, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels: Any, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, *labels: Any, value: float):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма: счетчики по корзинам хранятся без накопления и суммируются только при выводе
+    buckets: Sequence[float] - Верхние границы корзин по возрастанию
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels: Any, value: float):
+        state = self.values.get(labels)
+        if state is None:
+            # Последняя корзина — +Inf; затем сумма и количество наблюдений
+            state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(state[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry():
+    """
+    Набор метрик приложения и функций, которые снимают значения в момент запроса /metrics
+    """
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Collector] = []
+
+    def _add(self, metric: Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Collector):
+        """
+        collector: Callable - Возвращает кортежи (имя, тип, описание, [(метки, значение), ...])
+        """
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines += metric.render()
+        for collector in self.collectors:
+            for name, kind, documentation, samples in collector():
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class UpstreamMetrics():
+    """
+    Метрики обращений к API Яндекс.Доставки по эндпоинтам
+    """
+    def __init__(self, registry: MetricsRegistry):
+        self.duration = registry.histogram(
+            "upstream_request_duration_seconds", "Время одной попытки запроса к API", ("endpoint",))
+        self.responses = registry.counter(
+            "upstream_responses_total", "Ответы API по коду статуса или типу ошибки", ("endpoint", "status"))
+        self.in_flight = registry.gauge(
+            "upstream_requests_in_flight", "Запросы к API, ожидающие ответа", ("endpoint",))
+        self.pool_wait = registry.histogram(
+            "upstream_pool_wait_seconds", "Ожидание соединения из пула до начала отправки запроса",
+            ("endpoint",), WAIT_BUCKETS)
+        self.rate_limit_wait = registry.histogram(
+            "upstream_rate_limit_wait_seconds", "Ожидание токена ограничителя частоты", ("endpoint",), WAIT_BUCKETS)
+        self.concurrency_wait = registry.histogram(
+            "upstream_concurrency_wait_seconds", "Ожидание места в адаптивном пределе одновременных запросов",
+            ("endpoint",), WAIT_BUCKETS)
+        self.retries = registry.counter(
+            "upstream_retries_total", "Повторы запросов к API по причине", ("endpoint", "reason"))
+        self.rejected = registry.counter(
+            "upstream_circuit_rejections_total", "Запросы, отклоненные разомкнутым автоматом защиты", ("endpoint",))
+
+    def trace(self, endpoint: str) -> Callable:
+        """
+        Обработчик расширения trace httpcore: время от отправки запроса в пул
+        до первого события соединения — ожидание свободного соединения
+        """
+        started = time.perf_counter()
+        pending = True
+
+        async def trace(event: str, info: dict):
+            nonlocal pending
+            if pending:
+                pending = False
+                self.pool_wait.observe(endpoint, value=time.perf_counter() - started)
+
+        return trace
+
+
+class HTTPMetrics():
+    """
+    Метрики входящих запросов к приложению
+    """
+    def __init__(self, registry: MetricsRegistry):
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "Время обработки входящего запроса", ("method", "route"))
+        self.requests = registry.counter(
+            "http_requests_total", "Входящие запросы по коду ответа", ("method", "route", "status"))
+        self.in_flight = registry.gauge("http_requests_in_flight", "Входящие запросы в обработке")
+
+
+class MetricsMiddleware():
+    """
+    ASGI-middleware входящих метрик; HTTPMetrics берется из app.state.http_metrics.
+    Метка route — шаблон пути FastAPI, а не сам путь, чтобы число рядов не росло
+    с числом идентификаторов; ненайденные пути сводятся в "unmatched"
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        metrics: Optional[HTTPMetrics] = getattr(scope["app"].state, "http_metrics", None) \
+            if scope["type"] == "http" else None
+        if metrics is None:
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = getattr(scope.get("route"), "path", "unmatched")
+            metrics.in_flight.dec()
+            metrics.duration.observe(scope["method"], path, value=time.perf_counter() - started)
+            metrics.requests.inc(scope["method"], path, status)
+
+
+def make_registry() -> Optional[MetricsRegistry]:
+    """
+    Реестр метрик или None, если метрики выключены настройкой METRICS_ENABLED
+    """
+    return MetricsRegistry() if c.METRICS_ENABLED else None
@@ -1,16 +1,23 @@
-import httpx
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
 from src import consts as c
+from service.base import BaseService, describe_error
+from service.cache import CachedLoader
+from service.http_client import UpstreamClient
+from service.order_status import lookup_ttl, order_status
 
-class OrderConfirmation():
+class OrderConfirmation(BaseService):
     """
     Класс для работы с подтверждением заказа
     """
-    def __init__(self, api_key: str, base_url: str):
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        self.base_url = base_url
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        client: Optional[UpstreamClient] = None,
+        endpoints: Optional[c.EndpointSet] = None,
+    ):
+        super().__init__(api_key, base_url, client, endpoints)
 
     async def confirm_order(
         self,
@@ -20,22 +27,50 @@ class OrderConfirmation():
         Подтверждение заказа
         offer_id: str - Идентификатор предложения маршрутного листа.
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.base_url}/offers/confirm", headers=self.headers, json={"offer_id": offer_id})
-            response.raise_for_status()
-            return response.json().get("request_id")
-        
-class GetInfoAboutDraft():
+        response = await self._request(
+            "POST", self.endpoints.Confirmation_of_the_application, json={"offer_id": offer_id})
+        return response.json().get("request_id")
+
+    async def cancel_order(self, request_id: str):
+        """
+        Отмена заявки. Повторная отмена уже отмененной заявки безопасна
+        request_id*: str - Идентификатор заказа в системе Яндекс.Доставки
+        """
+        response = await self._request(
+            "POST", self.endpoints.Cancellation_of_the_application, json={"request_id": request_id}, idempotent=True)
+        data = response.json()
+        return {key: data.get(key) for key in ("status", "reason", "description")}
+
+    async def edit_order(self, request_id: str, changes: dict):
+        """
+        Редактирование заявки: получатель, место назначения, товары или грузоместа
+        request_id*: str - Идентификатор заказа в системе Яндекс.Доставки
+        changes*: dict - Изменяемые поля заявки в формате API
+        """
+        response = await self._request("POST", self.endpoints.Order_Editing, json={**changes, "request_id": request_id})
+        return {"editing_task_id": response.json().get("editing_task_id")}
+
+class GetInfoAboutDraft(BaseService):
     """
     Класс для получения информации о заявке
+    lookups: CachedLoader - Общий для вызывающих микрокэш: одновременные одинаковые запросы
+        объединяются в один запрос к API, ответы хранятся несколько секунд (с финальным статусом — дольше)
     """
-    def __init__(self, api_key: str, base_url: str):
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        self.base_url = base_url
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        client: Optional[UpstreamClient] = None,
+        lookups: Optional[CachedLoader] = None,
+        endpoints: Optional[c.EndpointSet] = None,
+    ):
+        super().__init__(api_key, base_url, client, endpoints)
+        self.lookups = lookups
 
+    async def _lookup(self, key: tuple, loader: Callable[[], Awaitable[Any]], ttl=None) -> Any:
+        if self.lookups is None:
+            return await loader()
+        return await self.lookups.get_or_load(key, loader, ttl)
 
     async def get_info_about_draft(
             self,
@@ -46,62 +81,154 @@ class GetInfoAboutDraft():
         request_code: str - Идентификатор заказа у отправителя
         request_id: str - Идентификатор заказа в системе Яндекс.Доставки
         """
+        return await self._lookup(
+            ("info", request_code, request_id),
+            lambda: self._fetch_info(request_code, request_id),
+            lambda result: lookup_ttl([order_status(result)]))
+
+    async def _fetch_info(self, request_code: Optional[str], request_id: Optional[str]):
         params = {}
         if request_code:
             params["request_code"] = request_code
         if request_id:
             params["request_id"] = request_id
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/request/info", headers=self.headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            order_info = {
-                        "info": {
-                            key: data.get(key)
-                            for key in ("full_items_price", "request", "request_id", "sharing_url")
-                        },
-                        "request_state": {
-                            key: data.get("state", {}).get(key)
-                            for key in ("description", "status", "timestamp", "timestamp_utc", "reason")
-                        },
-                        "self_pickup_node_code": {
-                            key: data.get("self_pickup_node_code", {}).get(key)
-                            for key in ("code", "type")
-                        },
-                    }
-
-            return {"order_info": order_info}
+        response = await self._request(
+            "GET", self.endpoints.Getting_information_about_the_application, params=params, idempotent=True)
+        data = response.json()
+        order_info = {
+                    "info": {
+                        key: data.get(key)
+                        for key in ("full_items_price", "request", "request_id", "sharing_url")
+                    },
+                    "request_state": {
+                        key: data.get("state", {}).get(key)
+                        for key in ("description", "status", "timestamp", "timestamp_utc", "reason")
+                    },
+                    "self_pickup_node_code": {
+                        key: data.get("self_pickup_node_code", {}).get(key)
+                        for key in ("code", "type")
+                    },
+                }
+
+        return {"order_info": order_info}
         
     async def up_to_date_shipping_information(self,request_id: str):
         """
         Получение актуальной даты и времени доставки. Метод актуален только для заказов в статусе, отличном от DELIVERY_DELIVERED, ERROR или CANCELLED.
         request_id*: str - Идентификатор заказа в системе Яндекс.Доставки
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/request/tracking", headers=self.headers, params={"request_id": request_id})
-            response.raise_for_status()
-            data = response.json()
-            return {'delivery_date': data.get('delivery_date'),
-                    'delivery_interval': data.get('delivery_interval')} 
+        return await self._lookup(("tracking", request_id), lambda: self._fetch_tracking(request_id))
+
+    async def _fetch_tracking(self, request_id: str):
+        response = await self._request("GET", "/request/tracking", params={"request_id": request_id}, idempotent=True)
+        data = response.json()
+        return {'delivery_date': data.get('delivery_date'),
+                'delivery_interval': data.get('delivery_interval')} 
         
     async def get_Delivery_interval(self, request_id: str):
         """
         Получение интервала доставки для заказа. Метод актуален только для заказов в статусе, отличном от DELIVERY_DELIVERED, ERROR или CANCELLED.
         request_id*: str - Идентификатор заказа в системе Яндекс.Доставки
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.base_url}/request/datetime_options", headers=self.headers, json={"request_id": request_id})
-            response.raise_for_status()
-            data = response.json()
-            return {'interval': data.get('options')}
+        return await self._lookup(("datetime_options", request_id), lambda: self._fetch_delivery_interval(request_id))
+
+    async def _fetch_delivery_interval(self, request_id: str):
+        response = await self._request(
+            "POST", self.endpoints.Getting_delivery_intervals, json={"request_id": request_id}, idempotent=True)
+        data = response.json()
+        return {'interval': data.get('options')}
         
     async def get_history_of_status_changes(self, request_id: str):
         """
         Получение истории изменения статусов заказа.
         request_id*: str - Идентификатор заказа в системе Яндекс.Доставки
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/request/history", headers=self.headers, params={"request_id": request_id})
-            response.raise_for_status()
-            data = response.json()
-            return {'history': data.get('state_history')}
\ No newline at end of file
+        return await self._lookup(
+            ("history", request_id),
+            lambda: self._fetch_history(request_id),
+            lambda result: lookup_ttl(state.get("status") for state in result.get("history") or ()))
+
+    async def _fetch_history(self, request_id: str):
+        response = await self._request("GET", "/request/history", params={"request_id": request_id}, idempotent=True)
+        data = response.json()
+        return {'history': data.get('state_history')}
+
+    async def _bulk_item(self, index: int, order: dict, parts: Sequence[str], semaphore: asyncio.Semaphore) -> dict:
+        """
+        Запрошенные части ответа об одной заявке. Ошибка одной части не отменяет остальные
+        и попадает в errors под именем части
+        """
+        request_id, request_code = order.get("request_id"), order.get("request_code")
+        item: Dict[str, Any] = {"index": index, "request_id": request_id, "request_code": request_code}
+        item.update({part: None for part in parts})
+        errors: Dict[str, Any] = {}
+
+        async def fetch(part: str):
+            try:
+                async with semaphore:
+                    if part == "info":
+                        result = await self.get_info_about_draft(request_code=request_code, request_id=request_id)
+                    elif part == "tracking":
+                        result = await self.up_to_date_shipping_information(item["request_id"])
+                    else:
+                        result = await self.get_history_of_status_changes(item["request_id"])
+            except Exception as exc:
+                errors[part] = describe_error(exc)
+            else:
+                item[part] = result
+
+        pending = [part for part in parts if part != "info"]
+        if request_id is None:
+            # Отслеживание и история запрашиваются по request_id — сначала узнаем его из информации о заявке
+            await fetch("info")
+            info = item.get("info") if "info" in parts else item.pop("info", None)
+            item["request_id"] = (((info or {}).get("order_info") or {}).get("info") or {}).get("request_id")
+            if item["request_id"] is None:
+                for part in pending:
+                    errors.setdefault(part, {"type": "unknown_request_id", "message": "request_id заявки не найден"})
+                pending = []
+        elif "info" in parts:
+            pending.append("info")
+        await asyncio.gather(*(fetch(part) for part in pending))
+        item["errors"] = errors
+        return item
+
+    async def iter_bulk_order_info(
+        self,
+        orders: Sequence[dict],
+        parts: Sequence[str] = ("info", "tracking", "history"),
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Информация о множестве заявок: результаты отдаются по мере готовности.
+        Каждый элемент содержит index (позиция в orders), request_id, request_code, запрошенные части
+        и errors — ошибки по частям; ошибка одной заявки не прерывает пакет
+        orders: Sequence[dict] - Заявки: request_id и/или request_code
+        parts: Sequence[str] - Части ответа: info, tracking, history
+        concurrency: int - Максимум одновременных запросов к API
+        """
+        semaphore = asyncio.Semaphore(concurrency or c.ORDER_INFO_BULK_CONCURRENCY)
+        tasks = [
+            asyncio.ensure_future(self._bulk_item(index, order, parts, semaphore))
+            for index, order in enumerate(orders)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def bulk_order_info(
+        self,
+        orders: Sequence[dict],
+        parts: Sequence[str] = ("info", "tracking", "history"),
+        concurrency: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Информация о множестве заявок в порядке orders, см. iter_bulk_order_info
+        """
+        results = [None] * len(orders)
+        async for item in self.iter_bulk_order_info(orders, parts, concurrency):
+            results[item["index"]] = item
+        return results
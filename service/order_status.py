@@ -0,0 +1,40 @@
+from typing import Iterable, Optional
+
+from src import consts as c
+
+# Статусы, после которых заявка больше не меняется
+TERMINAL_STATUSES = frozenset({"DELIVERY_DELIVERED", "ERROR", "CANCELLED"})
+
+
+def is_terminal_status(status: Optional[str]) -> bool:
+    """
+    Финальный статус заявки: DELIVERY_DELIVERED, ERROR или любой из вариантов отмены
+    """
+    if status is None:
+        return False
+    return status in TERMINAL_STATUSES or status.startswith("CANCEL")
+
+
+def is_delivery_status(status: Optional[str]) -> bool:
+    """
+    Заявка на последней миле (статусы DELIVERY_*): статус может смениться в ближайшее время
+    """
+    return status is not None and status.startswith("DELIVERY_") and not is_terminal_status(status)
+
+
+def order_status(order_info: dict) -> Optional[str]:
+    """
+    Статус из ответа GetInfoAboutDraft.get_info_about_draft
+    """
+    return (order_info.get("order_info", {}).get("request_state") or {}).get("status")
+
+
+def lookup_ttl(statuses: Iterable[Optional[str]]) -> Optional[float]:
+    """
+    Время жизни ответа о заявке в микрокэше: финальный статус уже не изменится,
+    поэтому такой ответ хранится дольше; None — время жизни кэша по умолчанию
+    statuses: Iterable[str] - Статусы из ответа (текущий или история)
+    """
+    if any(is_terminal_status(status) for status in statuses):
+        return c.ORDER_LOOKUP_TERMINAL_TTL
+    return None
@@ -0,0 +1,441 @@
+import asyncio
+import heapq
+import inspect
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src import consts as c
+from service.cache import TTLCache
+from service.order_confirmation import GetInfoAboutDraft
+from service.order_status import is_delivery_status, is_terminal_status, order_status
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[Dict[str, Any]], Any]
+
+APPLIED = "applied"
+DUPLICATE = "duplicate"
+STALE = "stale"
+DROPPED = "dropped"
+
+
+class TrackerFullError(Exception):
+    """
+    Отслеживается максимум заявок: новая заявка не добавлена
+    """
+    def __init__(self, max_orders: int):
+        super().__init__(f"Отслеживается максимум заявок: {max_orders}")
+        self.max_orders = max_orders
+
+
+def event_time(event: Dict[str, Any]) -> float:
+    """
+    Время смены статуса из события: timestamp (unix-время) или timestamp_utc (ISO 8601)
+    """
+    timestamp = event.get("timestamp")
+    if timestamp is not None:
+        return float(timestamp)
+    moment = datetime.fromisoformat(str(event["timestamp_utc"]).replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+@dataclass
+class TrackedOrder():
+    """
+    Состояние отслеживаемой заявки
+    request_id: str - Идентификатор заказа в системе Яндекс.Доставки
+    state: dict - Последний ответ get_info_about_draft
+    status: str - Последний известный статус
+    unchanged_polls: int - Сколько опросов подряд статус не менялся
+    failures: int - Сколько опросов подряд завершились ошибкой
+    generation: int - Номер актуальной записи в расписании опросов
+    due_at: float - Когда опросить заявку (time.monotonic); None — опрос не запланирован
+    subscribers: set - Очереди подписчиков на изменения состояния
+    event_at: float - Время смены статуса из последнего примененного push-события, unix-время
+    sequence: int - Наибольший номер push-события заявки
+    pushed_at: float - Когда пришло последнее push-событие, time.monotonic
+    seen: set - Ключи (время, статус, sequence) push-событий с временем event_at, для отбрасывания повторов.
+        Более ранние события отбрасываются как устаревшие, поэтому их ключи не хранятся
+    """
+    request_id: str
+    state: Optional[Dict[str, Any]] = None
+    status: Optional[str] = None
+    unchanged_polls: int = 0
+    failures: int = 0
+    generation: int = 0
+    due_at: Optional[float] = None
+    subscribers: Set[asyncio.Queue] = field(default_factory=set)
+    event_at: Optional[float] = None
+    sequence: Optional[int] = None
+    pushed_at: Optional[float] = None
+    seen: Set[Tuple[float, Optional[str], Optional[int]]] = field(default_factory=set)
+
+
+class OrderTracker():
+    """
+    Серверное отслеживание статусов заявок с адаптивной частотой опроса.
+    Заявки на последней миле опрашиваются часто, остальные — реже, интервал растет,
+    пока статус не меняется, а после финального статуса опрос прекращается.
+    Подписчикам отправляются только изменения состояния.
+    Если статусы приходят push-событиями (ingest), опрос заявки откладывается на reconcile_interval
+    после каждого события: API опрашивается только для заявок, по которым события перестали приходить
+    или пропущены (разрыв в sequence).
+    fast_interval: float - Интервал опроса для статусов DELIVERY_*, секунды
+    default_interval: float - Интервал опроса для остальных статусов, секунды
+    idle_interval: float - Максимальный интервал опроса, секунды
+    concurrency: int - Максимум одновременных запросов к API
+    max_polls_per_minute: int - Общий бюджет опросов в минуту
+    reconcile_interval: float - Через сколько секунд без событий сверять заявку с API
+    pushed_ttl: float - Через сколько секунд без событий заявка без подписчиков перестает отслеживаться
+    max_orders: int - Сколько заявок отслеживается одновременно; при заполнении новое событие
+        вытесняет заявку без подписчиков, давно не получавшую событий
+    """
+    def __init__(
+        self,
+        info: GetInfoAboutDraft,
+        fast_interval: float = c.TRACKER_FAST_INTERVAL,
+        default_interval: float = c.TRACKER_DEFAULT_INTERVAL,
+        idle_interval: float = c.TRACKER_IDLE_INTERVAL,
+        concurrency: int = c.TRACKER_CONCURRENCY,
+        max_polls_per_minute: int = c.TRACKER_MAX_POLLS_PER_MINUTE,
+        queue_size: int = 100,
+        reconcile_interval: float = c.TRACKER_RECONCILE_INTERVAL,
+        pushed_ttl: float = c.TRACKER_PUSHED_TTL,
+        max_orders: int = c.TRACKER_MAX_ORDERS,
+    ):
+        self.info = info
+        self.max_orders = max_orders
+        self.pushed_ttl = pushed_ttl
+        self.reconcile_interval = reconcile_interval
+        self.fast_interval = fast_interval
+        self.default_interval = default_interval
+        self.idle_interval = idle_interval
+        self.queue_size = queue_size
+        # Порядок — по последнему push-событию: при заполнении вытесняются заявки из начала
+        self.orders: "OrderedDict[str, TrackedOrder]" = OrderedDict()
+        self.polls = 0
+        self.changes = 0
+        self.failures = 0
+        self.events = {APPLIED: 0, DUPLICATE: 0, STALE: 0, DROPPED: 0}
+        self.evicted = 0
+        self.gaps = 0
+        self.reconciles = 0
+        self._listeners: List[Listener] = []
+        # Завершенные заявки убираются из таблицы; повторы их событий отбрасываются по этому списку
+        self._closed = TTLCache(c.TRACKER_CLOSED_TTL, c.TRACKER_CLOSED_MAX_SIZE)
+        self._schedule: List[Tuple[float, str, int]] = []
+        self._slots = asyncio.Semaphore(concurrency)
+        self._poll_gap = 60.0 / max_polls_per_minute if max_polls_per_minute > 0 else 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._polls_in_progress: Set[asyncio.Task] = set()
+
+    def interval_for(self, order: TrackedOrder) -> float:
+        """
+        Интервал до следующего опроса заявки
+        """
+        if order.failures:
+            return min(self.idle_interval, self.default_interval * 2 ** (order.failures - 1))
+        base = self.fast_interval if is_delivery_status(order.status) else self.default_interval
+        return min(max(self.idle_interval, base), base * 1.5 ** order.unchanged_polls)
+
+    def _schedule_poll(self, order: TrackedOrder, delay: float):
+        due_at = time.monotonic() + delay
+        if order.due_at is not None and order.due_at <= due_at:
+            # Опрос откладывается без новой записи в расписании: при извлечении старой записи
+            # она переносится на due_at. Так поток событий не раздувает кучу
+            order.due_at = due_at
+            return
+        order.generation += 1
+        order.due_at = due_at
+        heapq.heappush(self._schedule, (due_at, order.request_id, order.generation))
+        self._wakeup.set()
+
+    def watch(self, request_id: str) -> TrackedOrder:
+        """
+        Добавление заявки в отслеживание; первый опрос — как можно скорее.
+        TrackerFullError, если отслеживается max_orders заявок
+        """
+        order = self.orders.get(request_id)
+        if order is None:
+            if not self._make_room():
+                raise TrackerFullError(self.max_orders)
+            order = TrackedOrder(request_id)
+            self.orders[request_id] = order
+            self._schedule_poll(order, 0)
+        return order
+
+    def unwatch(self, request_id: str):
+        order = self.orders.pop(request_id, None)
+        if order is not None:
+            order.generation += 1
+            order.due_at = None
+            if is_terminal_status(order.status):
+                self._closed.set(request_id, True)
+
+    def _make_room(self) -> bool:
+        """
+        Место для новой заявки. При заполнении вытесняется заявка без подписчиков, дольше всех
+        не получавшая событий; False, если у всех заявок есть подписчики
+        """
+        if len(self.orders) < self.max_orders:
+            return True
+        victim = next((request_id for request_id, order in self.orders.items() if not order.subscribers), None)
+        if victim is None:
+            return False
+        self.unwatch(victim)
+        self.evicted += 1
+        return True
+
+    def add_listener(self, listener: Listener):
+        """
+        Подписка кода сервиса на все изменения состояния заявок: listener(event) вызывается
+        для каждого изменения; если он возвращает корутину, она запускается отдельной задачей
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def subscribe(self, request_id: str, queue: Optional[asyncio.Queue] = None) -> asyncio.Queue:
+        """
+        Подписка на изменения состояния заявки. Одну очередь можно подписать на несколько заявок.
+        Если состояние уже известно, оно сразу кладется в очередь. Заявка отслеживается, пока
+        на нее есть подписка или по ней приходят push-события
+        """
+        queue = queue if queue is not None else asyncio.Queue(self.queue_size)
+        order = self.watch(request_id)
+        order.subscribers.add(queue)
+        if order.state is not None:
+            self._put(queue, self._event(order))
+        return queue
+
+    def unsubscribe(self, request_id: str, queue: asyncio.Queue):
+        order = self.orders.get(request_id)
+        if order is not None:
+            order.subscribers.discard(queue)
+            # Заявку со статусами из push-событий продолжают сверять с API, остальные без подписчиков не опрашиваются
+            if not order.subscribers and (order.event_at is None or is_terminal_status(order.status)):
+                self.unwatch(request_id)
+
+    @staticmethod
+    def _event(order: TrackedOrder) -> Dict[str, Any]:
+        return {"request_id": order.request_id, "status": order.status, **order.state}
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: Dict[str, Any]):
+        if queue.full():
+            # Медленный подписчик теряет самое старое событие, а не блокирует опрос
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def _publish(self, order: TrackedOrder):
+        if not order.subscribers and not self._listeners:
+            return
+        event = self._event(order)
+        for queue in list(order.subscribers):
+            self._put(queue, event)
+        for listener in list(self._listeners):
+            try:
+                result = listener(event)
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result)
+            except Exception:
+                logger.exception("Ошибка обработчика изменения статуса заявки %s", order.request_id)
+
+    def ingest(self, event: Dict[str, Any]) -> str:
+        """
+        Применение push-события о смене статуса заявки.
+        Повтор события (та же заявка, время, статус и sequence) отбрасывается, событие старше известного
+        состояния не меняет его. Событие новой заявки, для которой нет места (у всех max_orders заявок
+        есть подписчики), отбрасывается. Возвращает applied, duplicate, stale или dropped
+        event: dict - request_id, status, timestamp или timestamp_utc; description, reason, sequence необязательны
+        """
+        request_id = str(event["request_id"])
+        timestamp = event_time(event)
+        sequence = event.get("sequence")
+        key = (timestamp, event.get("status"), sequence)
+        order = self.orders.get(request_id)
+        if order is None:
+            if self._closed.get(request_id) is not None:
+                # Заявка уже в финальном статусе: событие повторное или запоздавшее
+                self.events[STALE] += 1
+                return STALE
+            if not self._make_room():
+                self.events[DROPPED] += 1
+                return DROPPED
+            order = TrackedOrder(request_id)
+            self.orders[request_id] = order
+        elif key in order.seen:
+            self.events[DUPLICATE] += 1
+            return DUPLICATE
+        order.pushed_at = time.monotonic()
+        self.orders.move_to_end(request_id)
+        gap = sequence is not None and order.sequence is not None and sequence > order.sequence + 1
+        if sequence is not None and (order.sequence is None or sequence > order.sequence):
+            order.sequence = sequence
+        if order.event_at is not None and timestamp < order.event_at:
+            result = STALE
+        else:
+            result = APPLIED
+            if order.event_at != timestamp:
+                # Повтор более раннего события будет отброшен как устаревший: его ключ больше не нужен
+                order.seen.clear()
+            order.seen.add(key)
+            order.event_at = timestamp
+            order.state = self._state_from_event(order.state, request_id, event, timestamp)
+            order.status = event.get("status")
+            order.unchanged_polls = 0
+            order.failures = 0
+            self.changes += 1
+            self._publish(order)
+        self.events[result] += 1
+        if gap:
+            # Пропущено событие: сверяем заявку с API сразу
+            self.gaps += 1
+            self._schedule_poll(order, 0)
+        elif is_terminal_status(order.status):
+            if order.subscribers:
+                order.generation += 1
+                order.due_at = None
+            else:
+                self.unwatch(request_id)
+        else:
+            self._schedule_poll(order, self.reconcile_interval)
+        return result
+
+    @staticmethod
+    def _state_from_event(
+        state: Optional[Dict[str, Any]],
+        request_id: str,
+        event: Dict[str, Any],
+        timestamp: float,
+    ) -> Dict[str, Any]:
+        """
+        Ответ в формате get_info_about_draft с request_state из события; остальные поля — из прежнего состояния
+        """
+        order_info = dict((state or {}).get("order_info") or {"info": {"request_id": request_id}})
+        timestamp_utc = event.get("timestamp_utc") or \
+            datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+        order_info["request_state"] = {
+            "description": event.get("description"),
+            "status": event.get("status"),
+            "timestamp": event.get("timestamp", int(timestamp)),
+            "timestamp_utc": timestamp_utc,
+            "reason": event.get("reason"),
+        }
+        return {**(state or {}), "order_info": order_info}
+
+    async def _poll(self, order: TrackedOrder):
+        pushed = order.event_at is not None
+        if pushed:
+            self.reconciles += 1
+        try:
+            state = await self.info.get_info_about_draft(request_id=order.request_id)
+        except Exception:
+            self.failures += 1
+            order.failures += 1
+            logger.warning("Не удалось получить статус заявки %s", order.request_id, exc_info=True)
+        else:
+            order.failures = 0
+            request_state = state.get("order_info", {}).get("request_state") or {}
+            previous = (order.state or {}).get("order_info", {}).get("request_state") or {}
+            if pushed and request_state.get("timestamp") is not None and \
+                    float(request_state["timestamp"]) < order.event_at:
+                # Ответ API отстает от уже полученного события
+                order.unchanged_polls += 1
+            elif order.state is None or (request_state.get("status"), request_state.get("timestamp")) != (
+                    previous.get("status"), previous.get("timestamp")):
+                order.state = state
+                order.status = order_status(state)
+                order.unchanged_polls = 0
+                self.changes += 1
+                if pushed and request_state.get("timestamp") is not None:
+                    if order.event_at != float(request_state["timestamp"]):
+                        order.seen.clear()
+                    order.event_at = float(request_state["timestamp"])
+                self._publish(order)
+            else:
+                order.unchanged_polls += 1
+        finally:
+            self.polls += 1
+        if self.orders.get(order.request_id) is not order:
+            return
+        if not is_terminal_status(order.status):
+            # Заявку со статусами из событий достаточно сверять редко
+            self._schedule_poll(order, self.reconcile_interval if pushed else self.interval_for(order))
+        elif not order.subscribers:
+            self.unwatch(order.request_id)
+
+    async def _run_poll(self, order: TrackedOrder):
+        try:
+            await self._poll(order)
+        finally:
+            self._slots.release()
+
+    async def _run(self):
+        while True:
+            if not self._schedule:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            due_at, request_id, generation = self._schedule[0]
+            delay = due_at - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._schedule)
+            order = self.orders.get(request_id)
+            if order is None or order.generation != generation:
+                continue
+            if order.due_at is not None and order.due_at > due_at:
+                heapq.heappush(self._schedule, (order.due_at, request_id, generation))
+                continue
+            if not order.subscribers and order.pushed_at is not None and \
+                    time.monotonic() - order.pushed_at >= self.pushed_ttl:
+                # События по заявке давно не приходят, а подписчиков нет: сверять ее не для кого
+                self.unwatch(request_id)
+                self.evicted += 1
+                continue
+            order.due_at = None
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run_poll(order))
+            self._polls_in_progress.add(task)
+            task.add_done_callback(self._polls_in_progress.discard)
+            if self._poll_gap:
+                await asyncio.sleep(self._poll_gap)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = [task for task in (self._task, *self._polls_in_progress) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "watched": len(self.orders),
+            "scheduled": sum(1 for order in self.orders.values() if not is_terminal_status(order.status)),
+            "polls": self.polls,
+            "changes": self.changes,
+            "failures": self.failures,
+            "events": dict(self.events),
+            "gaps": self.gaps,
+            "reconciles": self.reconciles,
+            "evicted": self.evicted,
+        }
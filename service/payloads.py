@@ -0,0 +1,202 @@
+"""
+Сборка тел запросов создания заказа.
+
+request_create_body/offer_create_body — исходный путь: модель на каждый товар и место,
+model_dump() каждой по отдельности, сериализация словаря в JSON внутри httpx.
+request_create_payload/offer_create_payload — быстрый путь: тело целиком проверяется одним
+вызовом закэшированного TypeAdapter и сразу сериализуется в байты JSON.
+Оба пути дают байт-в-байт одинаковый JSON (в формате, в котором его кодирует httpx).
+Быстрому пути можно передать готовые грузоместа (service.cart) вместо места на каждый товар.
+"""
+import json
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from schemas.Order_model import (
+    BillingInfo,
+    PaymentMethod,
+    DestinationRequestNode,
+    RequestResourceItem,
+    ResourcePlace,
+    LastMilePolicy,
+    ContactPerson,
+    SourceRequestNode)
+
+ITEM_FIELDS = ("article", "billing_details", "count", "name", "place_barcode")
+
+
+class RequestCreateBody(TypedDict):
+    billing_info: BillingInfo
+    destination: Dict[str, str]
+    info: Dict[str, str]
+    items: List[RequestResourceItem]
+    last_mile_policy: str
+    places: List[ResourcePlace]
+    recipient_info: ContactPerson
+    source: SourceRequestNode
+    particular_items_refuse: bool
+
+
+class OfferCreateBody(TypedDict):
+    billing_info: BillingInfo
+    destination: Dict[str, str]
+    info: Dict[str, str]
+    items: List[RequestResourceItem]
+    last_mile_policy: str
+    places: List[ResourcePlace]
+    recipient_info: List[ContactPerson]
+    source: SourceRequestNode
+    particular_items_refuse: bool
+
+
+@lru_cache(maxsize=None)
+def adapter(body_type: type) -> TypeAdapter:
+    return TypeAdapter(body_type)
+
+
+@lru_cache(maxsize=None)
+def _billing_already_paid() -> BillingInfo:
+    # Модель создается при первой сборке тела, а не при импорте: схема BillingInfo строится лениво
+    return BillingInfo(payment_method=PaymentMethod.already_paid)
+
+
+def encode_json(body: dict) -> bytes:
+    """
+    JSON так же, как его кодирует httpx для параметра json=
+    """
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def _raw_body(
+    operator_request_id: str,
+    source: dict,
+    destination: str,
+    items: List[dict],
+    barcode: str,
+    recipient_info,
+    places: Optional[List[dict]] = None,
+) -> dict:
+    return {
+        "billing_info": _billing_already_paid(),
+        "destination": {
+            "type": DestinationRequestNode.platform_station.value,
+            "platform_station_id": destination,
+        },
+        "info": {"operator_request_id": operator_request_id},
+        "items": [{field: item[field] for field in ITEM_FIELDS} for item in items],
+        "last_mile_policy": LastMilePolicy.self_pickup.value,
+        "places": places if places is not None else [
+            {"barcode": barcode, "physical_dims": item["physical_dims"], "description": item.get("description")}
+            for item in items
+        ],
+        "recipient_info": recipient_info,
+        "source": {
+            "platform_station": {"platform_station_id": source["platform_station_id"]},
+            "interval_utc": source["interval_utc"],
+        },
+        "particular_items_refuse": False,
+    }
+
+
+def request_create_payload(
+    operator_request_id: str,
+    source: dict,
+    destination: str,
+    items: List[dict],
+    contact: dict,
+    barcode: str,
+    places: Optional[List[dict]] = None,
+) -> bytes:
+    """
+    Тело /request/create в байтах JSON: одна проверка всего тела и сериализация без промежуточных словарей
+    places: list[dict] - Грузоместа; по умолчанию место на каждый товар со штрихкодом barcode
+    """
+    recipient_info = {"first_name": contact["name"], "phone": contact["phone"], "email": contact.get("email")}
+    body_adapter = adapter(RequestCreateBody)
+    body = _raw_body(operator_request_id, source, destination, items, barcode, recipient_info, places)
+    return body_adapter.dump_json(body_adapter.validate_python(body))
+
+
+def offer_create_payload(
+    operator_request_id: str,
+    source: dict,
+    destination: str,
+    items: List[dict],
+    contact: dict,
+    places: Optional[List[dict]] = None,
+) -> bytes:
+    """
+    Тело /offers/create в байтах JSON
+    places: list[dict] - Грузоместа; по умолчанию место на каждый товар
+    """
+    recipient_info = [{"first_name": contact["first_name"], "phone": contact["phone"], "email": contact.get("email")}]
+    body_adapter = adapter(OfferCreateBody)
+    body = _raw_body(operator_request_id, source, destination, items, "barcode", recipient_info, places)
+    return body_adapter.dump_json(body_adapter.validate_python(body))
+
+
+def request_create_body(
+    operator_request_id: str,
+    source: dict,
+    destination: str,
+    items: List[dict],
+    contact: dict,
+    barcode: str,
+) -> dict:
+    """
+    Тело /request/create через отдельные модели на каждый товар и место
+    """
+    return {
+        "billing_info": BillingInfo(payment_method=PaymentMethod.already_paid).model_dump(mode="json"),
+        "destination": {
+            "type": DestinationRequestNode.platform_station.value,
+            "platform_station_id": destination,
+        },
+        "info": {"operator_request_id": operator_request_id},
+        "items": [
+            RequestResourceItem(
+                article=item["article"],
+                billing_details=item["billing_details"],
+                count=item["count"],
+                name=item["name"],
+                place_barcode=item["place_barcode"],
+            ).model_dump(mode="json")
+            for item in items
+        ],
+        "last_mile_policy": LastMilePolicy.self_pickup.value,
+        "places": [ResourcePlace(
+            barcode=barcode,
+            physical_dims=item["physical_dims"],
+            description=item.get("description")
+        ).model_dump(mode="json")
+            for item in items
+        ],
+        "recipient_info": ContactPerson(
+            first_name=contact["name"],
+            phone=contact["phone"],
+            email=contact.get("email")
+        ).model_dump(mode="json"),
+        "source": SourceRequestNode(
+            platform_station={"platform_station_id": source["platform_station_id"]},
+            interval_utc=source["interval_utc"]).model_dump(mode="json"),
+        "particular_items_refuse": False
+    }
+
+
+def offer_create_body(
+    operator_request_id: str,
+    source: dict,
+    destination: str,
+    items: List[dict],
+    contact: dict,
+) -> dict:
+    """
+    Тело /offers/create через отдельные модели на каждый товар и место
+    """
+    body = request_create_body(
+        operator_request_id, source, destination, items, {**contact, "name": contact["first_name"]}, "barcode")
+    body["recipient_info"] = [body["recipient_info"]]
+    return body
@@ -0,0 +1,420 @@
+import asyncio
+import heapq
+import inspect
+import json
+import logging
+import math
+import sys
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from src import consts as c
+
+if TYPE_CHECKING:
+    from service.pvz_snapshot import PickupPointSnapshot
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Источник ПВЗ: корутина со списком записей или асинхронный поток записей
+Fetch = Callable[[], Any]
+
+# Одинаковые наборы методов оплаты у тысяч ПВЗ хранятся одним кортежем
+_SHARED_TUPLES: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Расстояние по поверхности Земли между двумя точками, километры
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _shared_tuple(values: Iterable[str]) -> Tuple[str, ...]:
+    key = tuple(sys.intern(value) if isinstance(value, str) else value for value in values)
+    return _SHARED_TUPLES.setdefault(key, key)
+
+
+@dataclass(slots=True)
+class PickupPoint():
+    """
+    Компактная запись о ПВЗ из ответа /pickup-points/list: поля для поиска хранятся отдельно,
+    остальная запись — одной строкой байтов JSON вместо дерева словарей
+    id: str - ID ПВЗ в платформе
+    type: str - Тип ПВЗ (PickupStationType)
+    latitude: float - Широта
+    longitude: float - Долгота
+    payment_methods: tuple[str] - Доступные методы оплаты (PaymentMethod)
+    data: bytes - Сохраняемые поля исходной записи в JSON (все или только PVZ_FIELDS);
+        у записей из снимка — memoryview над отображенным в память файлом
+    """
+    id: str
+    type: Optional[str]
+    latitude: float
+    longitude: float
+    payment_methods: Tuple[str, ...]
+    data: bytes
+
+    @property
+    def raw(self) -> dict:
+        return json.loads(bytes(self.data))
+
+    @classmethod
+    def from_dict(cls, data: dict, fields: Sequence[str] = c.PVZ_FIELDS) -> Optional["PickupPoint"]:
+        position = data.get("position") or {}
+        latitude, longitude = position.get("latitude"), position.get("longitude")
+        if data.get("id") is None or latitude is None or longitude is None:
+            return None
+        kept = {key: data[key] for key in fields if key in data} if fields else data
+        point_type = data.get("type")
+        return cls(
+            id=data["id"],
+            type=sys.intern(point_type) if isinstance(point_type, str) else point_type,
+            latitude=float(latitude),
+            longitude=float(longitude),
+            payment_methods=_shared_tuple(data.get("payment_methods") or ()),
+            data=json.dumps(kept, ensure_ascii=False, separators=(",", ":")).encode(),
+        )
+
+
+def _unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    phi, lmb = math.radians(latitude), math.radians(longitude)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lmb), cos_phi * math.sin(lmb), math.sin(phi)
+
+
+def _chord_to_km(chord_sq: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_sq) / 2))
+
+
+def _km_to_chord_sq(distance_km: float) -> float:
+    half_angle = min(math.pi / 2, distance_km / (2 * EARTH_RADIUS_KM))
+    return (2 * math.sin(half_angle)) ** 2
+
+
+class PickupPointIndex():
+    """
+    Неизменяемый индекс ПВЗ: KD-дерево по точкам на единичной сфере
+    и обратные индексы по типу ПВЗ и методу оплаты.
+    Длина хорды монотонна по расстоянию на поверхности, поэтому поиск по дереву
+    дает те же результаты, что и перебор с haversine, без проблем на 180-м меридиане.
+    leaf_size: int - Размер листа дерева, ниже которого точки перебираются линейно
+    tree: tuple - Готовое дерево (порядок точек и оси разбиения), например из снимка; без него дерево строится
+    """
+    def __init__(
+        self,
+        points: Iterable[PickupPoint],
+        leaf_size: int = 8,
+        tree: Optional[Tuple[Sequence[int], Sequence[int]]] = None,
+    ):
+        self.leaf_size = leaf_size
+        self.points: List[PickupPoint] = list(points)
+        self.by_id: Dict[str, int] = {}
+        self.by_type: Dict[str, Set[int]] = {}
+        self.by_payment_method: Dict[str, Set[int]] = {}
+        self._coords: List[Tuple[float, float, float]] = []
+        for position, point in enumerate(self.points):
+            self.by_id[point.id] = position
+            self.by_type.setdefault(point.type, set()).add(position)
+            for method in point.payment_methods:
+                self.by_payment_method.setdefault(method, set()).add(position)
+            self._coords.append(_unit_vector(point.latitude, point.longitude))
+        if tree is not None:
+            self._order: List[int] = list(tree[0])
+            self._axes: List[int] = list(tree[1])
+        else:
+            self._order = list(range(len(self.points)))
+            self._axes = [0] * len(self.points)
+            self._build(0, len(self._order))
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _build(self, lo: int, hi: int):
+        stack = [(lo, hi)]
+        coords = self._coords
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= self.leaf_size:
+                continue
+            chunk = self._order[lo:hi]
+            spreads = [
+                max(coords[p][axis] for p in chunk) - min(coords[p][axis] for p in chunk)
+                for axis in range(3)
+            ]
+            axis = spreads.index(max(spreads))
+            chunk.sort(key=lambda p: coords[p][axis])
+            self._order[lo:hi] = chunk
+            mid = (lo + hi) // 2
+            self._axes[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+    def _allowed(self, point_type: Optional[str], payment_method: Optional[str]) -> Optional[Set[int]]:
+        allowed = None
+        if point_type is not None:
+            allowed = self.by_type.get(point_type, set())
+        if payment_method is not None:
+            methods = self.by_payment_method.get(payment_method, set())
+            allowed = methods if allowed is None else allowed & methods
+        return allowed
+
+    def _sparse(self, allowed: Optional[Set[int]]) -> bool:
+        # Если под фильтр попадает малая доля точек, дешевле перебрать их напрямую
+        return allowed is not None and len(allowed) * 8 < len(self.points)
+
+    @staticmethod
+    def _chord_sq(a: Tuple[float, float, float], b: Tuple[float, float, float]) -> float:
+        dx, dy, dz = a[0] - b[0], a[1] - b[1], a[2] - b[2]
+        return dx * dx + dy * dy + dz * dz
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int = 5,
+        point_type: Optional[str] = None,
+        payment_method: Optional[str] = None,
+    ) -> List[Tuple[float, PickupPoint]]:
+        """
+        Ближайшие ПВЗ к точке: список пар (расстояние в км, ПВЗ) по возрастанию расстояния
+        """
+        if limit <= 0 or not self.points:
+            return []
+        allowed = self._allowed(point_type, payment_method)
+        query = _unit_vector(latitude, longitude)
+        coords, chord_sq = self._coords, self._chord_sq
+        if self._sparse(allowed):
+            best = heapq.nsmallest(limit, ((chord_sq(query, coords[p]), p) for p in allowed))
+            return [(_chord_to_km(d), self.points[p]) for d, p in best]
+
+        heap: List[Tuple[float, int]] = []
+        order, axes, leaf_size = self._order, self._axes, self.leaf_size
+
+        def consider(position: int):
+            if allowed is not None and position not in allowed:
+                return
+            distance = chord_sq(query, coords[position])
+            if len(heap) < limit:
+                heapq.heappush(heap, (-distance, position))
+            elif distance < -heap[0][0]:
+                heapq.heapreplace(heap, (-distance, position))
+
+        def search(lo: int, hi: int):
+            if hi - lo <= leaf_size:
+                for i in range(lo, hi):
+                    consider(order[i])
+                return
+            mid = (lo + hi) // 2
+            axis = axes[mid]
+            diff = query[axis] - coords[order[mid]][axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            search(*near)
+            consider(order[mid])
+            if len(heap) < limit or diff * diff < -heap[0][0]:
+                search(*far)
+
+        search(0, len(order))
+        return [(_chord_to_km(-d), self.points[p]) for d, p in sorted(heap, reverse=True)]
+
+    def within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        point_type: Optional[str] = None,
+        payment_method: Optional[str] = None,
+    ) -> List[Tuple[float, PickupPoint]]:
+        """
+        ПВЗ в радиусе radius_km от точки, отсортированные по расстоянию
+        """
+        allowed = self._allowed(point_type, payment_method)
+        query = _unit_vector(latitude, longitude)
+        limit_sq = _km_to_chord_sq(radius_km)
+        coords, chord_sq = self._coords, self._chord_sq
+        found: List[Tuple[float, int]] = []
+        if self._sparse(allowed):
+            candidates: Iterable[int] = allowed
+        else:
+            candidates = []
+            order, axes, leaf_size = self._order, self._axes, self.leaf_size
+            stack = [(0, len(order))]
+            while stack:
+                lo, hi = stack.pop()
+                if hi - lo <= leaf_size:
+                    candidates.extend(order[lo:hi])
+                    continue
+                mid = (lo + hi) // 2
+                axis = axes[mid]
+                diff = query[axis] - coords[order[mid]][axis]
+                candidates.append(order[mid])
+                if diff < 0 or diff * diff <= limit_sq:
+                    stack.append((lo, mid))
+                if diff >= 0 or diff * diff <= limit_sq:
+                    stack.append((mid + 1, hi))
+        for position in candidates:
+            if allowed is not None and position not in allowed:
+                continue
+            distance = chord_sq(query, coords[position])
+            if distance <= limit_sq:
+                found.append((distance, position))
+        found.sort()
+        return [(_chord_to_km(d), self.points[p]) for d, p in found]
+
+    def filter(self, point_type: Optional[str] = None, payment_method: Optional[str] = None) -> List[PickupPoint]:
+        """
+        ПВЗ по типу и/или методу оплаты
+        """
+        allowed = self._allowed(point_type, payment_method)
+        if allowed is None:
+            return list(self.points)
+        return [self.points[position] for position in sorted(allowed)]
+
+    def get(self, point_id: str) -> Optional[PickupPoint]:
+        position = self.by_id.get(point_id)
+        return None if position is None else self.points[position]
+
+
+class PickupPointStore():
+    """
+    Хранилище ПВЗ в памяти процесса с фоновым обновлением.
+    Индекс пересобирается целиком и подменяется одной операцией присваивания,
+    поэтому читатели никогда не видят частично построенное состояние.
+    snapshot: PickupPointSnapshot - Файл снимка, общий для воркеров: индекс читается из него при старте,
+        после загрузки списка записывается в него и читается обратно, чтобы тела записей лежали в общей памяти
+    """
+    def __init__(self, snapshot: Optional["PickupPointSnapshot"] = None):
+        self.index = PickupPointIndex(())
+        self.loaded_at: Optional[float] = None
+        self.snapshot = snapshot
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def load(self, points: Optional[Iterable[Any]]) -> int:
+        """
+        Построение индекса из списка ПВЗ в формате ответа /pickup-points/list или готовых PickupPoint.
+        Если задан снимок, индекс публикуется через него
+        """
+        records = [
+            point if isinstance(point, PickupPoint) else PickupPoint.from_dict(point)
+            for point in points or ()
+        ]
+        index = PickupPointIndex(record for record in records if record is not None)
+        loaded_at = time.time()
+        if self.snapshot is not None:
+            try:
+                self.snapshot.write(index, loaded_at)
+                index, loaded_at = self.snapshot.read()
+            except (OSError, ValueError):
+                logger.warning("Не удалось записать снимок ПВЗ %s", self.snapshot.path, exc_info=True)
+        self.index, self.loaded_at = index, loaded_at
+        return len(index)
+
+    def restore(self) -> bool:
+        """
+        Чтение индекса из снимка, если файл появился или сменился с прошлого чтения.
+        Возвращает True, если индекс подменен
+        """
+        if self.snapshot is None or not self.snapshot.changed():
+            return False
+        try:
+            index, loaded_at = self.snapshot.read()
+        except (OSError, ValueError):
+            logger.warning("Снимок ПВЗ %s не прочитан", self.snapshot.path, exc_info=True)
+            return False
+        self.index, self.loaded_at = index, loaded_at
+        return True
+
+    @staticmethod
+    async def _records(fetch: Fetch) -> List[PickupPoint]:
+        """
+        Компактные записи ПВЗ. Если fetch отдает поток записей, каждая превращается в PickupPoint
+        сразу после разбора, и полный список словарей в памяти не собирается
+        """
+        points = fetch()
+        if inspect.isawaitable(points):
+            points = await points
+        if not hasattr(points, "__aiter__"):
+            return [record for record in map(PickupPoint.from_dict, points or ()) if record is not None]
+        records = []
+        async for point in points:
+            record = PickupPoint.from_dict(point)
+            if record is not None:
+                records.append(record)
+        return records
+
+    async def refresh(self, fetch: Fetch) -> int:
+        async with self._lock:
+            records = await self._records(fetch)
+            # Построение дерева для десятков тысяч точек занимает заметное время — не блокируем event loop
+            return await asyncio.to_thread(self.load, records)
+
+    async def ensure_loaded(self, fetch: Fetch):
+        if self.loaded:
+            return
+        async with self._lock:
+            if not self.loaded and not await asyncio.to_thread(self.restore):
+                records = await self._records(fetch)
+                await asyncio.to_thread(self.load, records)
+
+    async def sync(self, fetch: Fetch, max_age: float) -> Optional[int]:
+        """
+        Обновление через общий снимок: снимок, записанный другим воркером, подхватывается без запроса к API,
+        список загружает только воркер, получивший блокировку снимка, и только если снимок старше max_age.
+        Возвращает количество ПВЗ, если индекс подменен, иначе None
+        """
+        async with self._lock:
+            restored = await asyncio.to_thread(self.restore)
+            if self.loaded and time.time() - self.loaded_at < max_age:
+                return len(self.index) if restored else None
+            with self.snapshot.writer() as acquired:
+                if not acquired:
+                    return len(self.index) if restored else None
+                # Пока ждали блокировку, снимок мог обновить другой воркер
+                if await asyncio.to_thread(self.restore) and time.time() - self.loaded_at < max_age:
+                    return len(self.index)
+                records = await self._records(fetch)
+                return await asyncio.to_thread(self.load, records)
+
+    async def _refresh_forever(self, fetch: Fetch, interval: float, period: float):
+        while True:
+            try:
+                if self.snapshot is None:
+                    count = await self.refresh(fetch)
+                else:
+                    count = await self.sync(fetch, interval)
+                if count is not None:
+                    logger.info("Индекс ПВЗ обновлен: %s точек", count)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Не удалось обновить индекс ПВЗ, используется предыдущая версия")
+            await asyncio.sleep(period)
+
+    def start(self, fetch: Fetch, interval: float):
+        """
+        Запуск фонового обновления индекса раз в interval секунд.
+        Со снимком файл проверяется чаще, чтобы воркеры быстро подхватывали снимок, записанный другим
+        """
+        if self._task is None or self._task.done():
+            period = interval if self.snapshot is None else min(interval, c.PVZ_SNAPSHOT_POLL_INTERVAL)
+            self._task = asyncio.create_task(self._refresh_forever(fetch, interval, period))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
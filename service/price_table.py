@@ -0,0 +1,299 @@
+"""
+Таблица цен популярных маршрутов склад → ПВЗ, рассчитанных заранее по весовым ступеням.
+
+Маршрут получает номер строки, весовая ступень — номер столбца; цена, сроки доставки и время
+расчета лежат в массивах NumPy размером маршруты × ступени. Поиск — словарь маршрутов
+и бинарный поиск по нескольким ступеням, без запроса к API. Вес между ступенями получает
+цену, интерполированную между соседними ступенями, и сроки верхней ступени.
+Ячейки обновляются в фоне по расписанию в пределах своего бюджета частоты запросов;
+пустая или устаревшая ячейка, неизвестный маршрут или вес больше последней ступени — промах,
+и расчет идет в API как обычно.
+"""
+import asyncio
+import json
+import logging
+import math
+import re
+import time
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src import consts as c
+from service.lazy_imports import load_numpy
+from service.resilience import TokenBucket
+from schemas.Order_model import PaymentMethod
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    # NumPy загружается при создании таблицы, а не при старте приложения
+    np = None
+
+logger = logging.getLogger(__name__)
+
+Fetch = Callable[..., Awaitable[Dict[str, Any]]]
+Route = Tuple[str, str]
+
+_PRICE = re.compile(r"^\s*(-?\d+(?:[.,]\d+)?)\s*([A-Za-z]*)\s*$")
+
+
+def parse_price(value: Any) -> Optional[Tuple[float, str]]:
+    """
+    Сумма и валюта из pricing_total ("149.00 RUB"); None, если формат незнаком
+    """
+    if isinstance(value, (int, float)):
+        return float(value), ""
+    match = _PRICE.match(str(value)) if value is not None else None
+    if match is None:
+        return None
+    return float(match.group(1).replace(",", ".")), match.group(2)
+
+
+def format_price(amount: float, currency: str) -> str:
+    return f"{amount:.2f} {currency}".strip()
+
+
+def load_routes(path: str) -> List[Route]:
+    """
+    Маршруты из файла JSON: список {"source": ..., "destination": ...} или пар [source, destination]
+    """
+    with open(path, encoding="utf-8") as file:
+        items = json.load(file)
+    routes = []
+    for item in items:
+        if isinstance(item, dict):
+            routes.append((str(item["source"]), str(item["destination"])))
+        else:
+            source, destination = item
+            routes.append((str(source), str(destination)))
+    return routes
+
+
+class PriceTable():
+    """
+    Заранее рассчитанные цены маршрутов по весовым ступеням
+    routes: Sequence[tuple] - Маршруты (source, destination) в порядке популярности: в нем же идет заполнение
+    weights: Sequence[int] - Весовые ступени в граммах
+    fetch: Callable - Расчет в API: fetch(destination, source, total_weight, tariff, payment_method)
+    max_age: float - Возраст цены, после которого она не используется, секунды
+    interpolate: bool - Интерполировать цену между ступенями; иначе берется цена верхней ступени
+    rate: float - Запросов в секунду на обновление таблицы
+    burst: int - Допустимый всплеск запросов обновления
+    concurrency: int - Одновременных запросов обновления
+    tariff, payment_method - Тариф и способ оплаты, для которых считается таблица; прочие расчеты идут в API
+    """
+    def __init__(
+        self,
+        routes: Sequence[Route],
+        weights: Sequence[int],
+        fetch: Fetch,
+        max_age: float = c.PRICE_TABLE_MAX_AGE,
+        interpolate: bool = c.PRICE_TABLE_INTERPOLATE,
+        rate: float = c.PRICE_TABLE_RPS,
+        burst: int = c.PRICE_TABLE_BURST,
+        concurrency: int = c.PRICE_TABLE_CONCURRENCY,
+        tariff: str = "self_pickup",
+        payment_method: PaymentMethod = PaymentMethod.already_paid,
+    ):
+        global np
+        np = load_numpy()
+        self.routes: List[Route] = list(dict.fromkeys(routes))
+        self.index: Dict[Route, int] = {route: row for row, route in enumerate(self.routes)}
+        self.weights: List[int] = sorted(set(weights))
+        self.fetch = fetch
+        self.max_age = max_age
+        self.interpolate = interpolate
+        self.budget = TokenBucket(rate, burst)
+        self.concurrency = max(1, concurrency)
+        self.tariff = tariff
+        self.payment_method = payment_method
+        shape = (len(self.routes), len(self.weights))
+        # NaN — цена ячейки неизвестна
+        self.prices = np.full(shape, np.nan, np.float64)
+        self.days_min = np.zeros(shape, np.int16)
+        self.days_max = np.zeros(shape, np.int16)
+        self.loaded_at = np.zeros(shape, np.float64)
+        # Валюта строки — номер в currencies: строки валют не хранятся в каждой ячейке
+        self.currency = np.zeros(len(self.routes), np.int16)
+        self.currencies: List[str] = []
+        self.hits = 0
+        self.interpolated = 0
+        self.unknown_route = 0
+        self.out_of_range = 0
+        self.stale = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.refreshed_at: Optional[float] = None
+        self.ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, fetch: Fetch) -> Optional["PriceTable"]:
+        """
+        Таблица маршрутов из PRICE_TABLE_ROUTES_FILE; None, если файл не задан
+        """
+        if not c.PRICE_TABLE_ROUTES_FILE:
+            return None
+        return cls(load_routes(c.PRICE_TABLE_ROUTES_FILE), c.PRICE_TABLE_WEIGHTS, fetch)
+
+    def _cell(self, row: int, column: int, now: float) -> bool:
+        if math.isnan(self.prices[row, column]):
+            return False
+        return now - self.loaded_at[row, column] <= self.max_age
+
+    def lookup(
+        self,
+        destination: str,
+        source: str,
+        total_weight: int,
+        tariff: str = "self_pickup",
+        payment_method: PaymentMethod = PaymentMethod.already_paid,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Расчет из таблицы в формате Calculate.calculate_delivery; None — промах, нужен запрос в API
+        """
+        if tariff != self.tariff or payment_method != self.payment_method:
+            return None
+        row = self.index.get((source, destination))
+        if row is None:
+            self.unknown_route += 1
+            return None
+        column = bisect_left(self.weights, total_weight)
+        if column == len(self.weights):
+            self.out_of_range += 1
+            return None
+        now = time.time()
+        if not self._cell(row, column, now):
+            self.stale += 1
+            return None
+        price = float(self.prices[row, column])
+        upper = self.weights[column]
+        if self.interpolate and column > 0 and total_weight < upper:
+            lower = self.weights[column - 1]
+            if not self._cell(row, column - 1, now):
+                self.stale += 1
+                return None
+            lower_price = float(self.prices[row, column - 1])
+            price = round(lower_price + (price - lower_price) * (total_weight - lower) / (upper - lower), 2)
+            self.interpolated += 1
+        self.hits += 1
+        return {
+            "delivery_days": {"min": int(self.days_min[row, column]), "max": int(self.days_max[row, column])},
+            "pricing_total": format_price(price, self.currencies[self.currency[row]]),
+        }
+
+    def store(self, row: int, column: int, quote: Dict[str, Any]) -> bool:
+        """
+        Запись расчета API в ячейку; расчет незнакомого формата или со значениями,
+        не помещающимися в массивы таблицы, не записывается
+        """
+        price = parse_price(quote.get("pricing_total"))
+        days = quote.get("delivery_days")
+        if price is None or not isinstance(days, dict) or days.get("min") is None or days.get("max") is None:
+            return False
+        amount, currency = price
+        # Номер валюты и сроки за пределами типа массива молча переполнились бы
+        days_limit = np.iinfo(self.days_min.dtype)
+        if not all(days_limit.min <= int(days[key]) <= days_limit.max for key in ("min", "max")):
+            return False
+        if currency not in self.currencies:
+            if len(self.currencies) > np.iinfo(self.currency.dtype).max:
+                return False
+            self.currencies.append(currency)
+        self.currency[row] = self.currencies.index(currency)
+        self.prices[row, column] = amount
+        self.days_min[row, column] = int(days["min"])
+        self.days_max[row, column] = int(days["max"])
+        self.loaded_at[row, column] = time.time()
+        return True
+
+    async def _refresh_cell(self, row: int, column: int, semaphore: asyncio.Semaphore) -> bool:
+        source, destination = self.routes[row]
+        async with semaphore:
+            await self.budget.acquire()
+            try:
+                quote = await self.fetch(destination, source, self.weights[column], self.tariff, self.payment_method)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Прежняя цена ячейки остается в силе до max_age
+                self.failures += 1
+                logger.debug("Не удалось рассчитать цену %s → %s, %s г", source, destination,
+                             self.weights[column], exc_info=True)
+                return False
+        return self.store(row, column, quote)
+
+    async def refresh(self) -> int:
+        """
+        Расчет всех ячеек таблицы в порядке маршрутов; возвращает число записанных ячеек
+        """
+        # Semaphore пропускает ожидающих по очереди — популярные маршруты заполняются первыми
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(
+            self._refresh_cell(row, column, semaphore)
+            for row in range(len(self.routes)) for column in range(len(self.weights))))
+        self.refreshes += 1
+        self.refreshed_at = time.time()
+        return sum(results)
+
+    async def _refresh_forever(self, interval: float):
+        while True:
+            try:
+                filled = await self.refresh()
+                logger.info("Таблица цен обновлена: %s из %s ячеек", filled, self.prices.size)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Не удалось обновить таблицу цен", exc_info=True)
+            self.ready.set()
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float):
+        """
+        Заполнение таблицы сразу и затем обновление раз в interval секунд
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_forever(interval))
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """
+        Ожидание первого заполнения таблицы не дольше timeout секунд
+        """
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Таблица цен не заполнена за %s с, до заполнения расчеты идут в API", timeout)
+            return False
+        return True
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        known = ~np.isnan(self.prices)
+        fresh = known & (now - self.loaded_at <= self.max_age)
+        return {
+            "routes": len(self.routes),
+            "weights": self.weights,
+            "cells": int(self.prices.size),
+            "filled": int(known.sum()),
+            "fresh": int(fresh.sum()),
+            "bytes": int(self.prices.nbytes + self.days_min.nbytes + self.days_max.nbytes
+                         + self.loaded_at.nbytes + self.currency.nbytes),
+            "ready": self.ready.is_set(),
+            "hits": self.hits,
+            "interpolated": self.interpolated,
+            "unknown_route": self.unknown_route,
+            "out_of_range": self.out_of_range,
+            "stale": self.stale,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "refreshed_at": self.refreshed_at,
+        }
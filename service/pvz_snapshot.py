@@ -0,0 +1,196 @@
+"""
+Двоичный снимок индекса ПВЗ. Воркеры отображают файл в память (mmap), поэтому тела записей
+лежат в общем кэше страниц ОС одной копией на всю машину, а старт не требует загрузки списка с API.
+
+Формат (little-endian):
+    заголовок    _HEADER: сигнатура, версия формата, leaf_size, число точек, время загрузки, смещения разделов
+    таблицы      JSON: типы ПВЗ и наборы методов оплаты, на которые ссылаются записи
+    записи       _RECORD на точку: координаты, id и тело в разделе данных, номер типа и набора методов
+    дерево       порядок точек KD-дерева (int32) и оси разбиения (uint8)
+    данные       id и тела записей (компактный JSON) подряд
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from service.pickup_points import PickupPoint, PickupPointIndex
+
+try:
+    import fcntl
+except ImportError:  # не-POSIX платформы: блокировка снимка не используется
+    fcntl = None
+
+MAGIC = b"PVZSNAP\x00"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sHHIdQQQQQ")
+_RECORD = struct.Struct("<ddQIQIiI")
+
+
+class SnapshotError(ValueError):
+    """
+    Файл снимка поврежден или записан в другой версии формата
+    """
+
+
+def _encode(index: PickupPointIndex, created_at: float) -> Iterator[bytes]:
+    points = index.points
+    types = sorted({point.type for point in points if point.type is not None})
+    type_numbers = {point_type: number for number, point_type in enumerate(types)}
+    methods = list(dict.fromkeys(point.payment_methods for point in points))
+    method_numbers = {value: number for number, value in enumerate(methods)}
+    tables = json.dumps({"types": types, "payment_methods": methods}, ensure_ascii=False).encode()
+
+    records = bytearray()
+    blob = []
+    offset = 0
+    for point in points:
+        point_id = point.id.encode()
+        records += _RECORD.pack(
+            point.latitude, point.longitude,
+            offset, len(point_id), offset + len(point_id), len(point.data),
+            type_numbers[point.type] if point.type is not None else -1,
+            method_numbers[point.payment_methods],
+        )
+        blob += (point_id, point.data)
+        offset += len(point_id) + len(point.data)
+    tree = struct.pack(f"<{len(points)}i", *index._order) + bytes(index._axes)
+
+    tables_offset = _HEADER.size
+    records_offset = tables_offset + len(tables)
+    tree_offset = records_offset + len(records)
+    blob_offset = tree_offset + len(tree)
+    yield _HEADER.pack(
+        MAGIC, FORMAT_VERSION, index.leaf_size, len(points), created_at,
+        tables_offset, len(tables), records_offset, tree_offset, blob_offset)
+    yield tables
+    yield records
+    yield tree
+    yield from blob
+
+
+def _decode(buffer: mmap.mmap) -> Tuple[PickupPointIndex, float]:
+    if len(buffer) < _HEADER.size:
+        raise SnapshotError("Снимок ПВЗ обрезан")
+    (magic, version, leaf_size, count, created_at,
+     tables_offset, tables_size, records_offset, tree_offset, blob_offset) = _HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise SnapshotError(f"Неподдерживаемый снимок ПВЗ: {magic!r}, версия {version}")
+    if tree_offset != records_offset + count * _RECORD.size or blob_offset != tree_offset + count * 5:
+        raise SnapshotError("Снимок ПВЗ поврежден: неверные смещения разделов")
+    if blob_offset > len(buffer) or tables_offset + tables_size > records_offset:
+        # Иначе обрезанный файл падает на чтении таблиц или записей с ошибкой не того типа
+        raise SnapshotError("Снимок ПВЗ обрезан")
+    view = memoryview(buffer)
+    tables = json.loads(bytes(view[tables_offset:tables_offset + tables_size]))
+    types = [sys.intern(point_type) for point_type in tables["types"]]
+    methods = [tuple(sys.intern(method) for method in value) for value in tables["payment_methods"]]
+    if count:
+        # Данные записей лежат подряд: последняя запись заканчивается в конце файла
+        *_, data_offset, data_size, _, _ = _RECORD.unpack_from(buffer, tree_offset - _RECORD.size)
+        if blob_offset + data_offset + data_size > len(buffer):
+            raise SnapshotError("Снимок ПВЗ обрезан")
+    blob = view[blob_offset:]
+    points = [
+        PickupPoint(
+            id=str(blob[id_offset:id_offset + id_size], "utf-8"),
+            type=types[type_number] if type_number >= 0 else None,
+            latitude=latitude,
+            longitude=longitude,
+            payment_methods=methods[methods_number],
+            # Тело не копируется: срез ссылается на страницы отображенного файла
+            data=blob[data_offset:data_offset + data_size],
+        )
+        for latitude, longitude, id_offset, id_size, data_offset, data_size, type_number, methods_number
+        in _RECORD.iter_unpack(view[records_offset:tree_offset])
+    ]
+    order = struct.unpack_from(f"<{count}i", buffer, tree_offset)
+    axes = view[tree_offset + 4 * count:blob_offset]
+    return PickupPointIndex(points, leaf_size, tree=(order, axes)), created_at
+
+
+class PickupPointSnapshot():
+    """
+    Файл снимка индекса ПВЗ, общий для воркеров на одной машине.
+    Новый снимок пишется во временный файл и подменяется через os.replace: воркеры,
+    отобразившие прежний файл, продолжают работать с ним, пока не перечитают снимок.
+    path: str - Путь к файлу снимка
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        # (inode, mtime) прочитанного файла: по нему видно, что снимок подменили
+        self.version: Optional[Tuple[int, int]] = None
+
+    def changed(self) -> bool:
+        """
+        Есть ли на диске снимок, отличный от прочитанного последним
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) != self.version
+
+    def read(self) -> Tuple[PickupPointIndex, float]:
+        """
+        Индекс из снимка и время загрузки списка, по которому он построен
+        """
+        with open(self.path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_size == 0:
+                raise SnapshotError("Снимок ПВЗ пуст")
+            # Отображение живет, пока на него ссылаются записи индекса; файл можно закрыть сразу
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Версия запоминается и для поврежденного файла, чтобы не перечитывать его до следующей подмены
+        self.version = (stat.st_ino, stat.st_mtime_ns)
+        return _decode(buffer)
+
+    def write(self, index: PickupPointIndex, created_at: float) -> int:
+        """
+        Атомарная запись снимка индекса. Возвращает размер файла в байтах
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(prefix=".pvz-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for part in _encode(index, created_at):
+                    file.write(part)
+                file.flush()
+                os.fsync(file.fileno())
+                size = file.tell()
+            # mkstemp создает файл с правами 0600, а снимок читают воркеры, возможно, под другим пользователем
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, self.path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+        return size
+
+    @contextmanager
+    def writer(self) -> Iterator[bool]:
+        """
+        Неблокирующая межпроцессная блокировка обновления снимка:
+        True — блокировка получена и список загружает этот воркер, False — его уже обновляет другой
+        """
+        if fcntl is None:
+            yield True
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,54 @@
+import bisect
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence
+
+from src import consts as c
+from service.shared_cache import TwoLevelCache
+
+
+class QuoteCache(TwoLevelCache):
+    """
+    Кэш расчетов стоимости доставки (/pricing-calculator).
+    Вес заказа округляется вверх до ближайшей весовой ступени, и расчет запрашивается
+    для веса ступени — так близкие по весу заказы получают один и тот же ответ из кэша,
+    а цена не занижается. Вес больше последней ступени используется как есть.
+    ttl: float - Время жизни расчета, секунды
+    max_size: int - Максимальное количество расчетов в кэше
+    weight_tiers: Sequence[int] - Верхние границы весовых ступеней в граммах
+    redis - Клиент Redis для общего между воркерами уровня кэша
+    namespace: str - Префикс ключей в Redis
+    """
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int,
+        weight_tiers: Sequence[int] = (),
+        redis: Any = None,
+        namespace: str = "quotes",
+    ):
+        super().__init__(namespace, ttl, max_size, redis=redis)
+        self.weight_tiers = sorted(set(weight_tiers))
+
+    @classmethod
+    def from_env(cls, redis: Any = None, namespace: str = "quotes", max_size: Optional[int] = None) -> "QuoteCache":
+        return cls(
+            c.QUOTE_CACHE_TTL, c.QUOTE_CACHE_MAX_SIZE if max_size is None else max_size, c.QUOTE_WEIGHT_TIERS,
+            redis=redis, namespace=namespace)
+
+    def bucket_weight(self, total_weight: int) -> int:
+        position = bisect.bisect_left(self.weight_tiers, total_weight)
+        if position == len(self.weight_tiers):
+            return total_weight
+        return self.weight_tiers[position]
+
+    @staticmethod
+    def key(destination: str, source: str, total_weight: int, tariff: str, payment_method: str) -> Hashable:
+        return (source, destination, tariff, payment_method, total_weight)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Dict[str, Any]]],
+        ttl: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        # Копия, чтобы изменения у вызывающего не портили закэшированный расчет
+        return dict(await super().get_or_load(key, loader, ttl))
@@ -0,0 +1,149 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+from typing import IO, Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLog():
+    """
+    Журнал входящих запросов в JSONL для воспроизведения нагрузки (benchmarks.replay).
+    Строка: ts, method, path, query, content_type, body (или body_b64), route, status, duration_ms.
+    Заголовки, кроме Content-Type, не пишутся: в них токены клиентов.
+    write только ставит строку в буфер; файл пишет фоновая задача в потоке (asyncio.to_thread),
+    чтобы медленный диск не останавливал цикл событий. Переполнение буфера сбрасывает новые строки
+    path: str - Файл журнала, дописывается
+    max_body: int - Тела длиннее порога не сохраняются, в строке остается body_truncated
+    max_pending: int - Максимальное количество строк, ожидающих записи
+    """
+    def __init__(self, path: str, max_body: int = 65536, max_pending: int = 10000):
+        self.path = path
+        self.max_body = max_body
+        self.max_pending = max_pending
+        self.records = 0
+        self.dropped = 0
+        self.errors = 0
+        self._file: Optional[IO[str]] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    def write(self, entry: Dict[str, Any]):
+        if self._closing or len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append(entry)
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        """
+        Дописывает буфер и закрывает файл
+        """
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await asyncio.to_thread(self._close)
+
+    async def _writer(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            batch, self._pending = self._pending, []
+            if batch:
+                try:
+                    await asyncio.to_thread(self._write, batch)
+                except Exception:
+                    self.errors += 1
+                    logger.warning("Не удалось записать запросы в журнал %s", self.path, exc_info=True)
+                else:
+                    self.records += len(batch)
+            if self._closing and not self._pending:
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n" for entry in batch))
+        self._file.flush()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _body_fields(body: bytes, truncated: bool) -> Dict[str, Any]:
+    if truncated:
+        return {"body_truncated": True}
+    if not body:
+        return {}
+    try:
+        return {"body": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(body).decode("ascii")}
+
+
+class RequestLogMiddleware():
+    """
+    ASGI-middleware записи входящих HTTP-запросов; RequestLog берется из app.state.request_log.
+    Тело запроса копируется по мере чтения приложением, ответ не задерживается
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        log: Optional[RequestLog] = getattr(scope["app"].state, "request_log", None) \
+            if scope["type"] == "http" else None
+        if log is None:
+            await self.app(scope, receive, send)
+            return
+        chunks = []
+        size = 0
+        status = 500
+
+        async def receive_wrapper():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size <= log.max_body:
+                    chunks.append(chunk)
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        timestamp = time.time()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            headers = dict(scope.get("headers") or ())
+            entry = {
+                "ts": round(timestamp, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "content_type": headers.get(b"content-type", b"").decode("latin-1") or None,
+                **_body_fields(b"".join(chunks), size > log.max_body),
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+            log.write(entry)
@@ -0,0 +1,775 @@
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from src import consts as c
+from service.metrics import UpstreamMetrics
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """
+    Запрос не отправлен: эндпоинт API временно считается недоступным
+    """
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Эндпоинт {endpoint} временно недоступен, повтор через {retry_in:.1f} с")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class TokenBucket():
+    """
+    Ограничитель частоты запросов "ведро с токенами"
+    rate: float - Скорость пополнения, запросов в секунду
+    burst: int - Вместимость ведра (допустимый всплеск)
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        self._refill()
+        # Токен резервируется сразу, баланс может уйти в минус: каждый ожидающий
+        # спит ровно до момента, когда его токен будет пополнен, и очередь не копит погрешность
+        self.tokens -= 1
+        if self.tokens < 0:
+            delay = -self.tokens / self.rate
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+    def try_acquire(self) -> bool:
+        """
+        Токен без ожидания; False, если ведро пусто
+        """
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RateLimiter():
+    """
+    Набор TokenBucket на пару api_key/эндпоинт
+    rate: float - Запросов в секунду по умолчанию
+    burst: int - Допустимый всплеск по умолчанию
+    endpoint_rates: dict - Переопределения скорости для отдельных эндпоинтов
+    """
+    def __init__(self, rate: float, burst: int, endpoint_rates: Optional[Dict[str, float]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.endpoint_rates = endpoint_rates or {}
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def bucket(self, api_key: str, endpoint: str) -> TokenBucket:
+        key = (api_key, endpoint)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate = self.endpoint_rates.get(endpoint, self.rate)
+            bucket = TokenBucket(rate, self.burst)
+            self._buckets[key] = bucket
+        return bucket
+
+    async def acquire(self, api_key: str, endpoint: str):
+        await self.bucket(api_key, endpoint).acquire()
+
+    def try_acquire(self, api_key: str, endpoint: str) -> bool:
+        return self.bucket(api_key, endpoint).try_acquire()
+
+    def snapshot(self) -> Dict[str, float]:
+        waited: Dict[str, float] = {}
+        for (_, endpoint), bucket in self._buckets.items():
+            waited[endpoint] = round(waited.get(endpoint, 0.0) + bucket.waited, 3)
+        return waited
+
+
+class AdaptiveLimit():
+    """
+    Адаптивный предел одновременных запросов (AIMD). Пока API отвечает без ошибок и без роста задержки,
+    предел растет на 1 за каждые limit ответов — если он был исчерпан; при 429/5xx, ошибке соединения
+    или задержке, выросшей в tolerance раз относительно долгосрочной, предел умножается на backoff —
+    не чаще раза за время ответа, чтобы пачка ошибок от одной перегрузки не сбросила его до минимума.
+    Запросы сверх предела ждут в очереди в порядке поступления.
+    initial, min_limit, max_limit: int - Начальный предел и его границы
+    tolerance: float - Во сколько раз недавняя задержка может превышать долгосрочную
+    backoff: float - Множитель уменьшения предела
+    """
+    SHORT_SMOOTHING = 0.2
+    LONG_SMOOTHING = 0.02
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, tolerance: float, backoff: float):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.short_latency: Optional[float] = None
+        self.long_latency: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self._decreased_at = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Место уже выдано — возвращаем его следующему
+                self.in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                # _wake мог уже снять отмененное ожидание с очереди
+                self._waiters.remove(waiter)
+            raise
+
+    def try_acquire(self) -> bool:
+        """
+        Место без ожидания; False, если предел исчерпан или есть очередь
+        """
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False):
+        """
+        Освобождение места с результатом запроса
+        latency: float - Время ответа, секунды; None — результат не учитывается (запрос отменен)
+        overloaded: bool - API перегружен: 429, 5xx или ошибка соединения
+        """
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        if overloaded:
+            self._decrease()
+        elif latency is not None:
+            if self.long_latency is None:
+                self.short_latency = self.long_latency = latency
+            else:
+                self.short_latency += (latency - self.short_latency) * self.SHORT_SMOOTHING
+                self.long_latency += (latency - self.long_latency) * self.LONG_SMOOTHING
+            if self.short_latency > self.long_latency * self.tolerance:
+                self._decrease()
+            elif saturated and self.limit < self.max_limit and not self._recently_decreased():
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.increases += 1
+        self._wake()
+
+    def _recently_decreased(self) -> bool:
+        return time.monotonic() - self._decreased_at < (self.long_latency or 0.0)
+
+    def _decrease(self):
+        if self._recently_decreased():
+            return
+        self._decreased_at = time.monotonic()
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.decreases += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "latency_ms": round((self.short_latency or 0.0) * 1000, 2),
+            "baseline_ms": round((self.long_latency or 0.0) * 1000, 2),
+        }
+
+
+class ConcurrencyLimiter():
+    """
+    Адаптивные пределы одновременных запросов на пару base_url/вид запроса: чтение или запись
+    read, write: tuple - Начальный, наименьший и наибольший предел
+    write_endpoints: FrozenSet[str] - Эндпоинты записи; остальные — чтение
+    """
+    READ = "read"
+    WRITE = "write"
+
+    def __init__(
+        self,
+        read: Tuple[int, int, int] = (32, 4, 100),
+        write: Tuple[int, int, int] = (16, 2, 64),
+        write_endpoints: FrozenSet[str] = frozenset(),
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+    ):
+        self.bounds = {self.READ: read, self.WRITE: write}
+        self.write_endpoints = write_endpoints
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self._limits: Dict[Tuple[str, str], AdaptiveLimit] = {}
+        self._endpoints: Dict[Tuple[str, str], AdaptiveLimit] = {}
+
+    @classmethod
+    def from_env(cls) -> "ConcurrencyLimiter":
+        return cls(
+            read=(c.READ_CONCURRENCY_INITIAL, c.READ_CONCURRENCY_MIN, c.READ_CONCURRENCY_MAX),
+            write=(c.WRITE_CONCURRENCY_INITIAL, c.WRITE_CONCURRENCY_MIN, c.WRITE_CONCURRENCY_MAX),
+            write_endpoints=c.UPSTREAM_WRITE_ENDPOINTS,
+            tolerance=c.CONCURRENCY_LATENCY_TOLERANCE,
+            backoff=c.CONCURRENCY_BACKOFF,
+        )
+
+    def kind(self, endpoint: str) -> str:
+        path = endpoint if endpoint.startswith("/") else urlsplit(endpoint).path
+        return self.WRITE if path in self.write_endpoints else self.READ
+
+    def limit(self, base_url: str, endpoint: str) -> AdaptiveLimit:
+        key = (base_url, endpoint)
+        limit = self._endpoints.get(key)
+        if limit is None:
+            kind_key = (base_url, self.kind(endpoint))
+            limit = self._limits.get(kind_key)
+            if limit is None:
+                limit = AdaptiveLimit(*self.bounds[kind_key[1]], self.tolerance, self.backoff)
+                self._limits[kind_key] = limit
+            self._endpoints[key] = limit
+        return limit
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {"base_url": base_url, "kind": kind, **limit.snapshot()}
+            for (base_url, kind), limit in self._limits.items()
+        ]
+
+
+class EndpointHedge():
+    """
+    Задержка дубля и бюджет дублей одного эндпоинта
+    """
+    def __init__(self, percentile: float, min_delay: float, budget: float, burst: int, window: int, min_samples: int):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = budget
+        self.burst = max(1, burst)
+        self.min_samples = max(1, min_samples)
+        self.tokens = float(self.burst)
+        self.latencies: Deque[float] = deque(maxlen=max(1, window))
+        self.delay: Optional[float] = None
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self.denied = 0
+        self.skipped = 0
+        # Перцентиль пересчитывается не на каждый ответ, а раз в 1/20 окна
+        self._recompute_every = max(1, window // 20)
+        self._since_recompute = 0
+
+    def record(self, latency: float):
+        self.latencies.append(latency)
+        self._since_recompute += 1
+        if len(self.latencies) >= self.min_samples and (self.delay is None or self._since_recompute >= self._recompute_every):
+            ordered = sorted(self.latencies)
+            index = min(len(ordered) - 1, int(len(ordered) * self.percentile))
+            self.delay = max(self.min_delay, ordered[index])
+            self._since_recompute = 0
+
+    def earn(self):
+        self.requests += 1
+        self.tokens = min(self.burst, self.tokens + self.budget)
+
+    @property
+    def affordable(self) -> bool:
+        return self.tokens >= 1
+
+    def spend(self):
+        self.tokens -= 1
+        self.hedged += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "wins": self.wins,
+            "denied": self.denied,
+            "skipped": self.skipped,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            "win_rate": round(self.wins / self.hedged, 4) if self.hedged else 0.0,
+            "delay_ms": round(self.delay * 1000, 2) if self.delay is not None else None,
+        }
+
+
+class HedgePolicy():
+    """
+    Дублирование (hedging) идемпотентных запросов чтения: если попытка не получила ответ за перцентиль
+    недавних времен ответа эндпоинта, отправляется вторая такая же; побеждает первый ответ, другая
+    попытка отменяется. Каждый запрос добавляет budget токена (не больше burst), дубль расходует
+    один — дублей не больше доли budget от запросов, и при медленном API нагрузка не умножается.
+    Пока времен ответа меньше min_samples, запросы не дублируются.
+    endpoints: FrozenSet[str] - Эндпоинты, для которых включено дублирование
+    percentile: float - Перцентиль времени ответа, после которого отправляется дубль
+    min_delay: float - Наименьшая задержка дубля, секунды
+    budget: float - Доля дублей от числа запросов
+    burst: int - Допустимый всплеск дублей
+    window: int - Сколько последних времен ответа учитывать
+    min_samples: int - Сколько времен ответа нужно, прежде чем дублировать
+    """
+    def __init__(
+        self,
+        endpoints: FrozenSet[str],
+        percentile: float = 0.95,
+        min_delay: float = 0.005,
+        budget: float = 0.05,
+        burst: int = 10,
+        window: int = 1000,
+        min_samples: int = 50,
+    ):
+        self.endpoints = endpoints
+        self.settings = (percentile, min_delay, budget, burst, window, min_samples)
+        self._endpoints: Dict[Tuple[str, str], EndpointHedge] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["HedgePolicy"]:
+        """
+        Политика для HEDGE_ENDPOINTS; None, если список пуст
+        """
+        if not c.HEDGE_ENDPOINTS:
+            return None
+        return cls(
+            c.HEDGE_ENDPOINTS, c.HEDGE_PERCENTILE, c.HEDGE_MIN_DELAY, c.HEDGE_BUDGET, c.HEDGE_BURST,
+            c.HEDGE_WINDOW, c.HEDGE_MIN_SAMPLES)
+
+    def endpoint(self, base_url: str, endpoint: str) -> Optional[EndpointHedge]:
+        """
+        Состояние дублирования эндпоинта; None, если для него дублирование не включено
+        """
+        key = (base_url, endpoint)
+        hedge = self._endpoints.get(key)
+        if hedge is None:
+            path = endpoint if endpoint.startswith("/") else urlsplit(endpoint).path
+            if path not in self.endpoints:
+                return None
+            hedge = EndpointHedge(*self.settings)
+            self._endpoints[key] = hedge
+        return hedge
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {"base_url": base_url, "endpoint": endpoint, **hedge.snapshot()}
+            for (base_url, endpoint), hedge in self._endpoints.items()
+        ]
+
+
+class CircuitBreaker():
+    """
+    Автомат защиты эндпоинта: после failure_threshold ошибок подряд запросы
+    отклоняются сразу в течение recovery_time, затем пропускается один пробный запрос.
+    failure_threshold: int - Число ошибок подряд до размыкания
+    recovery_time: float - Время в разомкнутом состоянии, секунды
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, endpoint: str, failure_threshold: int, recovery_time: float):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_started_at: Optional[float] = None
+
+    def before_call(self):
+        if self.state == self.CLOSED:
+            return
+        now = time.monotonic()
+        elapsed = now - self.opened_at
+        if self.state == self.OPEN and elapsed >= self.recovery_time:
+            self.state = self.HALF_OPEN
+            self._trial_started_at = None
+        if self.state == self.HALF_OPEN:
+            # Пробный запрос, который так и не завершился (например, был отменен), не блокирует следующий
+            if self._trial_started_at is None or now - self._trial_started_at >= self.recovery_time:
+                self._trial_started_at = now
+                return
+        self.rejected += 1
+        raise CircuitOpenError(self.endpoint, max(0.0, self.recovery_time - elapsed))
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning("Эндпоинт %s недоступен, запросы приостановлены на %s с", self.endpoint, self.recovery_time)
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._trial_started_at = None
+
+
+class RetryPolicy():
+    """
+    Повторы идемпотентных запросов с экспоненциальной задержкой и случайным разбросом (full jitter).
+    Если API прислало Retry-After, ждем не меньше указанного времени.
+    max_attempts: int - Максимум попыток, включая первую
+    base_delay: float - Базовая задержка, секунды
+    max_delay: float - Максимальная задержка между попытками, секунды
+    max_retry_after: float - Retry-After больше этого значения не ждем, а возвращаем ошибку
+    """
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        max_retry_after: float,
+        retry_statuses: FrozenSet[int] = RETRYABLE_STATUSES,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = retry_statuses
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def retry_after(response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            moment = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, moment.timestamp() - time.time())
+
+    def delay(self, attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
+        """
+        Задержка перед следующей попыткой или None, если повторять не нужно
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt)
+        if response is not None:
+            retry_after = self.retry_after(response)
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    return None
+                delay = max(delay, retry_after)
+        return delay
+
+
+class UpstreamPolicy():
+    """
+    Общая политика обращения к API: ограничение частоты, адаптивный предел одновременных запросов,
+    дублирование медленных запросов чтения, повторы и автомат защиты. Один экземпляр разделяется всеми клиентами пула.
+    """
+    def __init__(
+        self,
+        limiter: Optional[RateLimiter] = None,
+        retry: Optional[RetryPolicy] = None,
+        failure_threshold: int = 5,
+        recovery_time: float = 30.0,
+        metrics: Optional[UpstreamMetrics] = None,
+        concurrency: Optional[ConcurrencyLimiter] = None,
+        hedging: Optional[HedgePolicy] = None,
+    ):
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.hedging = hedging
+        self.metrics = metrics
+        self.retry = retry or RetryPolicy(1, 0, 0, 0)
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.retries = 0
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    @classmethod
+    def from_env(
+        cls,
+        metrics: Optional[UpstreamMetrics] = None,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+    ) -> "UpstreamPolicy":
+        """
+        rate: float - Запросов в секунду на эндпоинт вместо RATE_LIMIT_RPS
+        burst: int - Допустимый всплеск вместо RATE_LIMIT_BURST
+        """
+        return cls(
+            limiter=RateLimiter(
+                c.RATE_LIMIT_RPS if rate is None else rate,
+                c.RATE_LIMIT_BURST if burst is None else burst,
+                c.RATE_LIMIT_ENDPOINTS),
+            retry=RetryPolicy(c.RETRY_MAX_ATTEMPTS, c.RETRY_BASE_DELAY, c.RETRY_MAX_DELAY, c.RETRY_AFTER_MAX),
+            failure_threshold=c.BREAKER_FAILURE_THRESHOLD,
+            recovery_time=c.BREAKER_RECOVERY_TIME,
+            metrics=metrics,
+            concurrency=ConcurrencyLimiter.from_env() if c.ADAPTIVE_CONCURRENCY else None,
+            hedging=HedgePolicy.from_env(),
+        )
+
+    def breaker(self, base_url: str, endpoint: str) -> CircuitBreaker:
+        key = (base_url, endpoint)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(f"{base_url}{endpoint}", self.failure_threshold, self.recovery_time)
+            self._breakers[key] = breaker
+        return breaker
+
+    async def execute(
+        self,
+        api_key: str,
+        base_url: str,
+        endpoint: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+        idempotent: bool,
+        hedge: bool = False,
+    ) -> httpx.Response:
+        """
+        Выполнение запроса с учетом политики; для ответов с ошибкой вызывает raise_for_status
+        send: Callable - Отправка одной попытки запроса
+        idempotent: bool - Запрос можно повторять после ответа с ошибкой или таймаута
+        hedge: bool - Медленную попытку можно продублировать, если эндпоинт есть в HedgePolicy
+        """
+        breaker = self.breaker(base_url, endpoint)
+        limit = self.concurrency.limit(base_url, endpoint) if self.concurrency is not None else None
+        hedging = (
+            self.hedging.endpoint(base_url, endpoint)
+            if self.hedging is not None and hedge and idempotent else None)
+        metrics = self.metrics
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                if metrics is not None:
+                    metrics.rejected.inc(endpoint)
+                raise
+            if self.limiter is not None:
+                if metrics is None:
+                    await self.limiter.acquire(api_key, endpoint)
+                else:
+                    started = time.perf_counter()
+                    await self.limiter.acquire(api_key, endpoint)
+                    metrics.rate_limit_wait.observe(endpoint, value=time.perf_counter() - started)
+            try:
+                if hedging is None:
+                    response = await self._send(limit, metrics, endpoint, send)
+                else:
+                    response = await self._hedged(hedging, api_key, limit, metrics, endpoint, send)
+            except httpx.TransportError as exc:
+                breaker.record_failure()
+                # Ошибка соединения означает, что запрос не был отправлен — его можно повторить всегда
+                delay = self.retry.delay(attempt) if idempotent or isinstance(exc, httpx.ConnectError) else None
+                if delay is None:
+                    raise
+                self._count_retry(endpoint, type(exc).__name__)
+                await asyncio.sleep(delay)
+                continue
+            if response.status_code in self.retry.retry_statuses:
+                breaker.record_failure()
+                # 429 означает, что запрос не был обработан, поэтому его повторяем даже для записи
+                retryable = idempotent or response.status_code == 429
+                delay = self.retry.delay(attempt, response) if retryable else None
+                if delay is not None:
+                    # Потоковый ответ держит соединение, пока его не закрыть
+                    await response.aclose()
+                    self._count_retry(endpoint, str(response.status_code))
+                    await asyncio.sleep(delay)
+                    continue
+            else:
+                breaker.record_success()
+            if response.is_error:
+                # Тело ошибки небольшое: дочитываем его и для потокового ответа, соединение при этом освобождается
+                await response.aread()
+            response.raise_for_status()
+            return response
+
+    async def _send(
+        self,
+        limit: Optional[AdaptiveLimit],
+        metrics: Optional[UpstreamMetrics],
+        endpoint: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+        acquired: bool = False,
+    ) -> httpx.Response:
+        """
+        Одна попытка запроса в пределах адаптивного предела: время ответа и перегрузка API меняют предел
+        acquired: bool - Место в пределе уже получено через try_acquire
+        """
+        if limit is None:
+            return await (send() if metrics is None else self._measured(metrics, endpoint, send))
+        if acquired:
+            pass
+        elif metrics is None:
+            await limit.acquire()
+        else:
+            started = time.perf_counter()
+            await limit.acquire()
+            metrics.concurrency_wait.observe(endpoint, value=time.perf_counter() - started)
+        started = time.perf_counter()
+        try:
+            response = await (send() if metrics is None else self._measured(metrics, endpoint, send))
+        except httpx.TransportError:
+            limit.release(overloaded=True)
+            raise
+        except BaseException:
+            limit.release()
+            raise
+        status = response.status_code
+        limit.release(time.perf_counter() - started, overloaded=status == 429 or status >= 500)
+        return response
+
+    async def _hedged(
+        self,
+        hedge: EndpointHedge,
+        api_key: str,
+        limit: Optional[AdaptiveLimit],
+        metrics: Optional[UpstreamMetrics],
+        endpoint: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        """
+        Попытка с дублем: если первая не ответила за hedge.delay, отправляется вторая, побеждает первый ответ.
+        Дубль не ждет ни токена частоты, ни места в пределе — без них и без бюджета он не отправляется
+        """
+        hedge.earn()
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self._send(limit, metrics, endpoint, send))
+
+        def record(task: asyncio.Future):
+            # Учитывается только собственное время первой попытки; отмененная проигравшая не измерена
+            if not task.cancelled():
+                hedge.record(time.perf_counter() - started)
+
+        primary.add_done_callback(record)
+        try:
+            if hedge.delay is not None:
+                await asyncio.wait((primary,), timeout=hedge.delay)
+            if primary.done() or hedge.delay is None or not self._hedge_allowed(hedge, api_key, endpoint, limit):
+                return await primary
+        except BaseException:
+            primary.cancel()
+            raise
+        secondary = asyncio.ensure_future(self._send(limit, metrics, endpoint, send, acquired=limit is not None))
+        pending = {primary, secondary}
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Ответ предпочтительнее ошибки соединения: при ошибке ждем вторую попытку
+                winner = next((task for task in done if task.exception() is None), None)
+            if winner is None:
+                winner = primary
+            if winner is secondary:
+                hedge.wins += 1
+            return winner.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            for task in (primary, secondary):
+                if task is winner:
+                    continue
+                try:
+                    response = await task
+                except BaseException:
+                    continue
+                await response.aclose()
+
+    def _hedge_allowed(self, hedge: EndpointHedge, api_key: str, endpoint: str, limit: Optional[AdaptiveLimit]) -> bool:
+        if not hedge.affordable:
+            hedge.denied += 1
+            return False
+        # Место в пределе берется последним: его, в отличие от токена частоты, пришлось бы возвращать
+        if (self.limiter is not None and not self.limiter.try_acquire(api_key, endpoint)) or (
+                limit is not None and not limit.try_acquire()):
+            hedge.skipped += 1
+            return False
+        hedge.spend()
+        return True
+
+    @staticmethod
+    async def _measured(
+        metrics: UpstreamMetrics,
+        endpoint: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        """
+        Одна попытка запроса с записью времени, кода ответа и числа запросов в полете
+        """
+        metrics.in_flight.inc(endpoint)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await send()
+            status = str(response.status_code)
+            return response
+        except httpx.TransportError as exc:
+            status = type(exc).__name__
+            raise
+        except asyncio.CancelledError:
+            # Отмененный проигравший дубль — не ошибка API
+            status = "cancelled"
+            raise
+        finally:
+            metrics.in_flight.dec(endpoint)
+            metrics.duration.observe(endpoint, value=time.perf_counter() - started)
+            metrics.responses.inc(endpoint, status)
+
+    def _count_retry(self, endpoint: str, reason: str):
+        self.retries += 1
+        if self.metrics is not None:
+            self.metrics.retries.inc(endpoint, reason)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "breakers": {
+                breaker.endpoint: {"state": breaker.state, "failures": breaker.failures, "rejected": breaker.rejected}
+                for breaker in self._breakers.values()
+            },
+            "rate_limit_wait_s": self.limiter.snapshot() if self.limiter is not None else {},
+            "concurrency": self.concurrency.snapshot() if self.concurrency is not None else [],
+            "hedging": self.hedging.snapshot() if self.hedging is not None else [],
+        }
@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import time
+import uuid
+import zlib
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from src import consts as c
+from service.cache import CachedLoader
+
+logger = logging.getLogger(__name__)
+
+_BASE_ERRORS: tuple = (OSError, asyncio.TimeoutError)
+
+
+def redis_errors() -> tuple:
+    """
+    Ошибки обращения к Redis. Пакет redis не импортируется вместе с модулем — это заметная часть
+    времени старта: его исключения нужны, только когда клиент уже создан и redis.exceptions загружен
+    """
+    module = sys.modules.get("redis.exceptions")
+    return _BASE_ERRORS if module is None else (module.RedisError, *_BASE_ERRORS)
+
+# Значения длиннее порога сжимаются zlib; первый байт — признак формата
+COMPRESS_THRESHOLD = 512
+_PLAIN = b"j"
+_ZLIB = b"z"
+
+
+def make_redis():
+    """
+    Клиент Redis из настроек REDIS_HOST/REDIS_PORT/REDIS_PASSWORD.
+    Возвращает None, если Redis не настроен или пакет redis не установлен
+    """
+    if not c.REDIS_HOST:
+        return None
+    try:
+        from redis import asyncio as redis_asyncio
+    except ImportError:
+        logger.warning("REDIS_HOST задан, но пакет redis не установлен — используется только кэш процесса")
+        return None
+    return redis_asyncio.Redis(
+        host=c.REDIS_HOST,
+        port=int(c.REDIS_PORT or 6379),
+        password=c.REDIS_PASSWORD,
+        socket_timeout=c.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=c.REDIS_SOCKET_TIMEOUT,
+    )
+
+
+def dumps(value: Any) -> bytes:
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+    if len(data) > COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(data, 6)
+    return _PLAIN + data
+
+
+def loads(data: bytes) -> Any:
+    marker, payload = data[:1], data[1:]
+    if marker == _ZLIB:
+        payload = zlib.decompress(payload)
+    return json.loads(payload)
+
+
+class TwoLevelCache(CachedLoader):
+    """
+    Двухуровневый кэш: L1 в памяти процесса и общий для всех воркеров L2 в Redis.
+    При промахе в обоих уровнях источник вызывает только тот воркер, который взял
+    распределенную блокировку по ключу; остальные ждут появления значения в Redis.
+    Если Redis недоступен, кэш на retry_interval секунд переходит в режим только L1.
+    namespace: str - Префикс ключей в Redis
+    ttl: float - Время жизни записи в L1, секунды
+    max_size: int - Размер L1; 0 — хранить только в Redis
+    l2_ttl: float - Время жизни записи в Redis, секунды
+    redis - Клиент redis.asyncio.Redis или совместимый; None — только L1
+    """
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        max_size: int,
+        l2_ttl: Optional[float] = None,
+        redis: Any = None,
+        lock_timeout: float = 10.0,
+        retry_interval: float = 30.0,
+    ):
+        super().__init__(ttl, max_size)
+        self.namespace = namespace
+        self.l2_ttl = l2_ttl if l2_ttl is not None else ttl
+        self.redis = redis
+        self.lock_timeout = lock_timeout
+        self.retry_interval = retry_interval
+        self.l2_hits = 0
+        self.l2_errors = 0
+        self.lock_waits = 0
+        self._redis_down_until = 0.0
+
+    def redis_key(self, key: Hashable) -> str:
+        raw = "|".join(map(str, key)) if isinstance(key, tuple) else str(key)
+        if len(raw) > 200:
+            raw = hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+        return f"{self.namespace}:{raw}"
+
+    @property
+    def redis_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, exc: BaseException):
+        self.l2_errors += 1
+        if time.monotonic() >= self._redis_down_until:
+            logger.warning("Redis недоступен (%r), кэш %s работает только в памяти процесса", exc, self.namespace)
+        self._redis_down_until = time.monotonic() + self.retry_interval
+
+    async def _l2_get(self, redis_key: str) -> Any:
+        try:
+            data = await self.redis.get(redis_key)
+        except redis_errors() as exc:
+            self._redis_failed(exc)
+            return _MISSING
+        return _MISSING if data is None else loads(data)
+
+    async def _l2_set(self, redis_key: str, value: Any, ttl: float):
+        try:
+            await self.redis.set(redis_key, dumps(value), px=int(ttl * 1000))
+        except redis_errors() as exc:
+            self._redis_failed(exc)
+
+    async def _load_shared(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]) -> Any:
+        if not self.redis_available:
+            return await loader()
+        redis_key = self.redis_key(key)
+        l2_ttl = self.l2_ttl if ttl is None else ttl
+        value = await self._l2_get(redis_key)
+        if value is not _MISSING:
+            self.l2_hits += 1
+            return value
+        if not self.redis_available:
+            return await loader()
+
+        lock_key, token = f"{redis_key}:lock", uuid.uuid4().hex
+        try:
+            locked = await self.redis.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000))
+        except redis_errors() as exc:
+            self._redis_failed(exc)
+            return await loader()
+        if not locked:
+            # Значение уже загружает другой воркер — ждем его в Redis, но не дольше lock_timeout
+            self.lock_waits += 1
+            deadline = time.monotonic() + self.lock_timeout
+            delay = 0.02
+            while time.monotonic() < deadline and self.redis_available:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.5)
+                value = await self._l2_get(redis_key)
+                if value is not _MISSING:
+                    self.l2_hits += 1
+                    return value
+            return await loader()
+        try:
+            value = await loader()
+            await self._l2_set(redis_key, value, l2_ttl)
+            return value
+        finally:
+            try:
+                # Снимаем только свою блокировку; гонка с ее истечением приводит лишь к лишнему запросу к API
+                if await self.redis.get(lock_key) == token.encode():
+                    await self.redis.delete(lock_key)
+            except redis_errors() as exc:
+                self._redis_failed(exc)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        if self.redis is None:
+            return await super().get_or_load(key, loader, ttl)
+        return await super().get_or_load(key, lambda: self._load_shared(key, loader, ttl), ttl)
+
+    async def invalidate(self, key: Hashable):
+        self.cache.delete(key)
+        if self.redis_available:
+            try:
+                await self.redis.delete(self.redis_key(key))
+            except redis_errors() as exc:
+                self._redis_failed(exc)
+
+    def snapshot(self):
+        return {
+            **super().snapshot(),
+            "l2_hits": self.l2_hits,
+            "l2_errors": self.l2_errors,
+            "lock_waits": self.lock_waits,
+            "redis": "disabled" if self.redis is None else ("up" if self.redis_available else "down"),
+        }
+
+
+_MISSING = object()
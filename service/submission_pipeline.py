@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from src import consts as c
+from service.base import describe_error
+from service.cart import PLACES_PER_ITEM, order_places
+from service.Creating_order import CreatingOrder
+from service.job_journal import ACTION_CONFIRM, STATE_FAILED as JOB_FAILED, JobFailedError, JobJournal
+from service.creating_draft import DraftDelivery
+from service.order_confirmation import GetInfoAboutDraft, OrderConfirmation
+from service.resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+KIND_REQUEST = "request"
+KIND_OFFER = "offer"
+
+STATE_QUEUED = "queued"
+STATE_RECONCILING = "reconciling"
+STATE_SUBMITTING = "submitting"
+STATE_CONFIRMING = "confirming"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+
+@dataclass
+class OrderSubmission():
+    """
+    Заказ для пакетной отправки
+    operator_request_id*: str - Идентификатор заказа у отправителя, ключ идемпотентности
+    source*: dict - Словарь с platform_station_id и interval_utc склада отправки; без interval_utc для kind=request берется ближайший доступный интервал
+    destination*: str - Идентификатор ПВЗ-получателя
+    items*: list[dict] - Товары заказа
+    contact*: dict - Контактное лицо получателя
+    barcode: str - Штрихкод места (для kind=request)
+    kind: str - request — /request/create; offer — /offers/create и затем /offers/confirm
+    places: str - Грузоместа: item — на каждый товар, barcode — по place_barcode, pack — раскладка по весу
+    """
+    operator_request_id: str
+    source: dict
+    destination: str
+    items: List[dict]
+    contact: dict
+    barcode: Optional[str] = None
+    kind: str = KIND_REQUEST
+    places: str = PLACES_PER_ITEM
+
+
+@dataclass
+class SubmissionResult():
+    """
+    Состояние отправки заказа
+    state: str - queued, reconciling, submitting, confirming, done или failed
+    offer_id: str - Идентификатор предложения (для kind=offer)
+    request_id: str - Идентификатор заказа в системе Яндекс.Доставки
+    error: dict - Описание последней ошибки
+    ambiguous: bool - Ошибка не исключает, что заказ все же создан в API
+    attempts: int - Количество попыток отправки
+    """
+    operator_request_id: str
+    kind: str
+    state: str = STATE_QUEUED
+    offer_id: Optional[str] = None
+    request_id: Optional[str] = None
+    error: Optional[Dict[str, Any]] = None
+    ambiguous: bool = False
+    attempts: int = 0
+    updated_at: float = field(default_factory=time.time)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (STATE_DONE, STATE_FAILED)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "operator_request_id": self.operator_request_id,
+            "kind": self.kind,
+            "state": self.state,
+            "offer_id": self.offer_id,
+            "request_id": self.request_id,
+            "error": self.error,
+            "attempts": self.attempts,
+            "updated_at": self.updated_at,
+        }
+
+
+def _is_ambiguous(exc: BaseException) -> bool:
+    """
+    Мог ли запрос дойти до API и создать заказ, несмотря на ошибку
+    """
+    if isinstance(exc, (CircuitOpenError, httpx.ConnectError, httpx.PoolTimeout, httpx.ConnectTimeout)):
+        return False
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500 or exc.response.status_code == 408
+    return isinstance(exc, httpx.TransportError)
+
+
+class SubmissionPipeline():
+    """
+    Очередь пакетной отправки заказов с пулом асинхронных воркеров.
+    Повторная отправка с тем же operator_request_id не создает второй заказ: возвращается
+    текущее состояние, а после неоднозначной ошибки заказ сначала ищется в API по request_code.
+    Результаты хранятся только в памяти процесса: после перезапуска и между воркерами повтор
+    не распознается (кроме подтверждения предложений через journal).
+    Для kind=offer после создания предложения автоматически вызывается confirm_order;
+    с journal подтверждение идет через журнал заданий и переживает перезапуск воркера.
+    workers: int - Количество воркеров (максимум одновременных заказов в работе)
+    queue_size: int - Вместимость очереди; при заполнении submit ждет освобождения места
+    max_results: int - Сколько результатов хранить для идемпотентности; вытесняются завершенные
+    """
+    def __init__(
+        self,
+        creating_order: CreatingOrder,
+        draft_delivery: DraftDelivery,
+        confirmation: OrderConfirmation,
+        info: GetInfoAboutDraft,
+        workers: int = c.SUBMISSION_WORKERS,
+        queue_size: int = c.SUBMISSION_QUEUE_SIZE,
+        max_results: int = c.SUBMISSION_MAX_RESULTS,
+        journal: Optional[JobJournal] = None,
+    ):
+        self.creating_order = creating_order
+        self.draft_delivery = draft_delivery
+        self.confirmation = confirmation
+        self.info = info
+        self.journal = journal
+        self.workers = workers
+        self.max_results = max_results
+        self.results: "OrderedDict[str, SubmissionResult]" = OrderedDict()
+        self.deduplicated = 0
+        self.reconciled = 0
+        self._queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _remember(self, result: SubmissionResult):
+        self.results[result.operator_request_id] = result
+        self.results.move_to_end(result.operator_request_id)
+        excess = len(self.results) - self.max_results
+        if excess <= 0:
+            return
+        # Вытесняются самые старые завершенные результаты, где бы они ни стояли: незавершенных
+        # не больше, чем вмещают очередь и воркеры, поэтому просмотр до нужного числа короткий
+        evicted = []
+        for operator_request_id, item in self.results.items():
+            if item.finished:
+                evicted.append(operator_request_id)
+                if len(evicted) == excess:
+                    break
+        for operator_request_id in evicted:
+            del self.results[operator_request_id]
+
+    async def _reconcile(self, result: SubmissionResult) -> bool:
+        """
+        Поиск заказа в API по operator_request_id после неоднозначной ошибки.
+        Возвращает True, если заказ найден и результат отмечен как завершенный
+        """
+        try:
+            info = await self.info.get_info_about_draft(request_code=result.operator_request_id)
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == 404:
+                return False
+            raise
+        request_id = info.get("order_info", {}).get("info", {}).get("request_id")
+        if request_id is None:
+            return False
+        self.reconciled += 1
+        result.request_id = request_id
+        result.state = STATE_DONE
+        result.error = None
+        result.ambiguous = False
+        result.updated_at = time.time()
+        result.done.set()
+        return True
+
+    async def submit(self, order: OrderSubmission) -> SubmissionResult:
+        """
+        Постановка заказа в очередь. Для уже известного operator_request_id
+        возвращает существующий результат; неудачный заказ ставится в очередь повторно
+        """
+        result = self.results.get(order.operator_request_id)
+        if result is not None and result.state != STATE_FAILED:
+            self.deduplicated += 1
+            return result
+        if result is not None and result.ambiguous:
+            # Пока идет поиск в API, повторы того же заказа получают этот результат, а не отправляют его еще раз
+            result.state = STATE_RECONCILING
+            result.done.clear()
+            try:
+                found = await self._reconcile(result)
+            except asyncio.CancelledError:
+                result.state = STATE_FAILED
+                result.done.set()
+                raise
+            except Exception as exc:
+                # Не можем проверить, создан ли заказ — повторная отправка рискует дублем
+                result.state = STATE_FAILED
+                result.error = describe_error(exc)
+                result.updated_at = time.time()
+                result.done.set()
+                return result
+            if found:
+                return result
+        if result is None:
+            result = SubmissionResult(order.operator_request_id, order.kind)
+        result.state = STATE_QUEUED
+        result.error = None
+        result.ambiguous = False
+        result.done.clear()
+        result.updated_at = time.time()
+        self._remember(result)
+        await self._queue.put((order, result))
+        return result
+
+    async def submit_many(self, orders: List[OrderSubmission]) -> List[SubmissionResult]:
+        return [await self.submit(order) for order in orders]
+
+    async def wait(self, results: List[SubmissionResult], timeout: Optional[float] = None) -> List[SubmissionResult]:
+        """
+        Ожидание завершения отправки; по истечении timeout возвращает текущее состояние
+        """
+        pending = [asyncio.ensure_future(result.done.wait()) for result in results if not result.finished]
+        if pending:
+            _, not_done = await asyncio.wait(pending, timeout=timeout)
+            for waiter in not_done:
+                waiter.cancel()
+        return results
+
+    async def _process(self, order: OrderSubmission, result: SubmissionResult):
+        result.attempts += 1
+        items, places = order_places(order.items, order.places, order.operator_request_id)
+        if order.kind == KIND_OFFER:
+            if result.offer_id is None:
+                result.state = STATE_SUBMITTING
+                result.offer_id = await self.draft_delivery.Creating_an_application(
+                    order.operator_request_id, order.source, order.destination, items, order.contact, places)
+            result.state = STATE_CONFIRMING
+            result.updated_at = time.time()
+            result.request_id = await self._confirm(result.offer_id)
+        else:
+            result.state = STATE_SUBMITTING
+            result.request_id = await self.creating_order.Creating_an_application(
+                order.operator_request_id, order.source, order.destination, items, order.contact,
+                order.barcode, places)
+        result.state = STATE_DONE
+
+    async def _confirm(self, offer_id: str) -> Optional[str]:
+        if self.journal is None:
+            return await self.confirmation.confirm_order(offer_id)
+        job = await self.journal.submit({"action": ACTION_CONFIRM, "offer_id": offer_id})
+        await job.done.wait()
+        if job.state == JOB_FAILED:
+            raise JobFailedError(job)
+        return job.result["request_id"]
+
+    async def _worker(self):
+        while True:
+            order, result = await self._queue.get()
+            try:
+                await self._process(order, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Не удалось отправить заказ %s: %r", order.operator_request_id, exc)
+                result.state = STATE_FAILED
+                result.error = describe_error(exc)
+                result.ambiguous = _is_ambiguous(exc)
+            finally:
+                result.updated_at = time.time()
+                if result.finished:
+                    result.done.set()
+                self._queue.task_done()
+
+    def snapshot(self) -> Dict[str, Any]:
+        states: Dict[str, int] = {}
+        for result in self.results.values():
+            states[result.state] = states.get(result.state, 0) + 1
+        return {
+            "queued": self._queue.qsize(),
+            "workers": len(self._tasks),
+            "states": states,
+            "deduplicated": self.deduplicated,
+            "reconciled": self.reconciled,
+        }
@@ -0,0 +1,258 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import httpx
+from pydantic import BaseModel
+
+from src import consts as c
+from service.cache import CachedLoader
+from service.calculation_module import Calculate
+from service.Creating_order import CreatingOrder
+from service.creating_draft import DraftDelivery
+from service.http_client import ClientSettings, UpstreamClient
+from service.interval_store import IntervalStore
+from service.metrics import UpstreamMetrics
+from service.order_confirmation import GetInfoAboutDraft, OrderConfirmation
+from service.pickup_points import PickupPointStore
+from service.price_table import PriceTable
+from service.quote_cache import QuoteCache
+from service.resilience import UpstreamPolicy
+from service.shared_cache import TwoLevelCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+TEST_TENANT = "test"
+
+
+class UnknownTenantError(KeyError):
+    """
+    Клиент не найден в настройках
+    """
+
+
+class TenantConfig(BaseModel):
+    """
+    Настройки клиента (магазина)
+    api_key*: str - Ключ API Яндекс.Доставки
+    base_url: str - Адрес API; по умолчанию yandex_host (для test=True — test_yandex_host)
+    test: bool - Тестовый контур: адреса методов test_*
+    rps: float - Запросов в секунду на эндпоинт; по умолчанию RATE_LIMIT_RPS
+    burst: int - Допустимый всплеск; по умолчанию RATE_LIMIT_BURST
+    max_connections: int - Соединений в пуле клиента; по умолчанию TENANT_MAX_CONNECTIONS
+    """
+    api_key: str
+    base_url: Optional[str] = None
+    test: bool = False
+    rps: Optional[float] = None
+    burst: Optional[int] = None
+    max_connections: Optional[int] = None
+
+    @property
+    def host(self) -> Optional[str]:
+        return self.base_url or (c.test_yandex_host if self.test else c.yandex_host)
+
+
+def load_tenants(path: Optional[str] = None) -> Dict[str, TenantConfig]:
+    """
+    Клиенты из файла TENANTS_FILE и клиент test, если задан test_yandex_key
+    """
+    tenants: Dict[str, TenantConfig] = {}
+    if c.test_yandex_key:
+        tenants[TEST_TENANT] = TenantConfig(api_key=c.test_yandex_key, base_url=c.test_yandex_host, test=True)
+    if path:
+        with open(path, encoding="utf-8") as file:
+            for name, config in json.load(file).items():
+                if name == DEFAULT_TENANT:
+                    raise ValueError(f"Имя клиента {DEFAULT_TENANT} зарезервировано за ключом yandex_key")
+                tenants[name] = TenantConfig.model_validate(config)
+    return tenants
+
+
+class TenantServices():
+    """
+    Сервисы одного клиента поверх его UpstreamClient: создаются один раз и переиспользуются запросами
+    name: str - Имя клиента
+    client: UpstreamClient - Клиент API со своим пулом соединений и политикой (ограничение частоты, автоматы защиты)
+    quote_cache, order_lookups, interval_cache - Кэши клиента; ключи в Redis — с именем клиента
+    intervals: IntervalStore - Интервалы отгрузки складов клиента
+    price_table: PriceTable - Таблица цен популярных маршрутов (только у клиента default)
+    test: bool - Тестовый контур: сервисы обращаются к адресам методов test_* (consts.endpoints(True))
+    """
+    def __init__(
+        self,
+        name: str,
+        client: UpstreamClient,
+        quote_cache: QuoteCache,
+        order_lookups: CachedLoader,
+        pickup_points: PickupPointStore,
+        pvz_cache: TwoLevelCache,
+        interval_cache: TwoLevelCache,
+        intervals: IntervalStore,
+        test: bool = False,
+        price_table: Optional[PriceTable] = None,
+    ):
+        self.name = name
+        self.client = client
+        self.quote_cache = quote_cache
+        self.order_lookups = order_lookups
+        self.interval_cache = interval_cache
+        self.intervals = intervals
+        self.test = test
+        self.endpoints = endpoints = c.endpoints(test)
+        self.last_used = time.monotonic()
+        api_key, base_url = client.api_key, client.base_url
+        self.calculate = Calculate(
+            api_key, base_url,
+            client=client,
+            pickup_points=pickup_points,
+            quote_cache=quote_cache,
+            pvz_cache=pvz_cache,
+            interval_cache=interval_cache,
+            intervals=intervals,
+            price_table=price_table,
+            endpoints=endpoints)
+        self.creating_order = CreatingOrder(api_key, base_url, client=client, intervals=intervals, endpoints=endpoints)
+        self.draft_delivery = DraftDelivery(api_key, base_url, client=client, endpoints=endpoints)
+        self.confirmation = OrderConfirmation(api_key, base_url, client=client, endpoints=endpoints)
+        self.info = GetInfoAboutDraft(api_key, base_url, client=client, lookups=order_lookups, endpoints=endpoints)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "idle_s": round(time.monotonic() - self.last_used, 3),
+            "test": self.test,
+            "max_connections": self.client.settings.max_connections,
+            "rate_waited": self.client.policy.limiter.snapshot() if self.client.policy.limiter else {},
+            "quotes": self.quote_cache.snapshot(),
+            "order_lookups": self.order_lookups.snapshot(),
+        }
+
+
+class TenantRegistry():
+    """
+    Реестр клиентов: имя клиента (заголовок X-Tenant) -> TenantServices.
+    У каждого клиента свой пул соединений, свой бюджет частоты запросов и автоматы защиты,
+    свои кэши — шумный магазин не выбирает соединения и токены остальных и не вытесняет их расчеты.
+    Сервисы создаются при первом запросе клиента; сверх max_active давно не использованные
+    вытесняются (LRU), их соединения закрываются через close_delay. Клиент default — сервисы
+    на ключе yandex_key, созданные в lifespan; он не вытесняется
+    default: TenantServices - Сервисы клиента по умолчанию
+    configs: dict - Настройки клиентов по имени (load_tenants)
+    transport - Транспорт httpx для всех клиентов (бенчмарки подменяют API имитацией)
+    """
+    def __init__(
+        self,
+        default: TenantServices,
+        configs: Dict[str, TenantConfig],
+        pickup_points: PickupPointStore,
+        pvz_cache: TwoLevelCache,
+        redis: Any = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        metrics: Optional[UpstreamMetrics] = None,
+        max_active: int = c.TENANT_MAX_ACTIVE,
+        close_delay: float = c.TENANT_CLOSE_DELAY,
+    ):
+        self.default = default
+        self.configs = configs
+        self.pickup_points = pickup_points
+        self.pvz_cache = pvz_cache
+        self.redis = redis
+        self.transport = transport
+        self.metrics = metrics
+        self.max_active = max_active
+        self.close_delay = close_delay
+        self.created = 0
+        self.evicted = 0
+        self._active: "OrderedDict[str, TenantServices]" = OrderedDict()
+        self._closing: Dict[asyncio.Task, TenantServices] = {}
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def get(self, name: Optional[str] = None) -> TenantServices:
+        """
+        Сервисы клиента; без имени — клиента по умолчанию
+        """
+        if not name or name == DEFAULT_TENANT:
+            services = self.default
+        else:
+            services = self._active.get(name)
+            if services is None:
+                config = self.configs.get(name)
+                if config is None:
+                    raise UnknownTenantError(name)
+                services = self._active[name] = self._build(name, config)
+                self.created += 1
+                while len(self._active) > self.max_active:
+                    _, evicted = self._active.popitem(last=False)
+                    self._retire(evicted)
+            else:
+                self._active.move_to_end(name)
+        services.last_used = time.monotonic()
+        return services
+
+    def _build(self, name: str, config: TenantConfig) -> TenantServices:
+        max_connections = config.max_connections or c.TENANT_MAX_CONNECTIONS
+        settings = ClientSettings.from_env().model_copy(update={
+            "max_connections": max_connections,
+            "max_keepalive_connections": min(c.HTTP_MAX_KEEPALIVE_CONNECTIONS, max_connections),
+        })
+        client = UpstreamClient(
+            config.api_key, config.host, settings,
+            transport=self.transport,
+            policy=UpstreamPolicy.from_env(self.metrics, rate=config.rps, burst=config.burst))
+        interval_cache = TwoLevelCache(
+            f"intervals:{name}", c.INTERVAL_CACHE_TTL, c.TENANT_INTERVAL_CACHE_MAX_SIZE, redis=self.redis)
+        # Интервалы загружаются при обращении, без фонового обновления: клиентов может быть много
+        intervals = IntervalStore(Calculate(
+            config.api_key, config.host,
+            client=client,
+            interval_cache=interval_cache,
+            endpoints=c.endpoints(config.test)).delivery_interval)
+        return TenantServices(
+            name, client,
+            quote_cache=QuoteCache.from_env(self.redis, f"quotes:{name}", c.TENANT_QUOTE_CACHE_MAX_SIZE),
+            order_lookups=CachedLoader(c.ORDER_LOOKUP_TTL, c.TENANT_ORDER_LOOKUP_MAX_SIZE),
+            pickup_points=self.pickup_points,
+            pvz_cache=self.pvz_cache,
+            interval_cache=interval_cache,
+            intervals=intervals,
+            test=config.test)
+
+    def _retire(self, services: TenantServices):
+        """
+        Запросы, уже получившие сервисы клиента, дорабатывают на его соединениях; клиент закрывается позже
+        """
+        self.evicted += 1
+        task = asyncio.get_running_loop().create_task(self._close_later(services))
+        self._closing[task] = services
+        task.add_done_callback(lambda done: self._closing.pop(done, None))
+
+    async def _close_later(self, services: TenantServices):
+        await asyncio.sleep(self.close_delay)
+        await services.client.aclose()
+
+    async def aclose(self):
+        retired = [*self._closing.values(), *self._active.values()]
+        tasks = list(self._closing)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._closing.clear()
+        self._active.clear()
+        for services in retired:
+            await services.client.aclose()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "configured": len(self.configs),
+            "active": len(self._active),
+            "closing": len(self._closing),
+            "created": self.created,
+            "evicted": self.evicted,
+            "tenants": {name: services.snapshot() for name, services in self._active.items()},
+        }
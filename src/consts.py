@@ -1,7 +1,30 @@
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlsplit
 
-load_dotenv()
+
+def _find_dotenv() -> Optional[str]:
+    """
+    Файл .env в каталоге модуля или выше — там же, где его ищет load_dotenv()
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, '.env')
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+# python-dotenv импортируется, только если файл .env есть: без него импорт пакета — лишнее время старта
+_DOTENV_PATH = _find_dotenv()
+if _DOTENV_PATH:
+    from dotenv import load_dotenv
+    load_dotenv(_DOTENV_PATH)
 
 # BACKEND_URL = 'localhost:8000'
 BACKEND_URL = 'http://back.b.aovzerk.ru'
@@ -19,6 +42,11 @@ yandex_key = os.getenv('yandex_key')
 
 yandex_host=os.getenv('yandex_host')
 
+# Ключ и адрес тестового API: клиент test с адресами методов test_*
+test_yandex_key = os.getenv('test_yandex_key')
+
+test_yandex_host = os.getenv('test_yandex_host')
+
 #release
 calculate_delivery=os.getenv('calculate_delivery')
 
@@ -27,6 +55,7 @@ delivery_interval =os.getenv('delivery_interval')
 list_of_PVZ=os.getenv('list_of_PVZ')
 
 Creating_an_application=os.getenv('Creating_an_application')
+Creating_an_order=os.getenv('Creating_an_order')
 
 Confirmation_of_the_application=os.getenv('Confirmation_of_the_application')
 
@@ -46,6 +75,7 @@ test_delivery_interval =os.getenv('test_delivery_interval')
 test_list_of_PVZ=os.getenv('test_list_of_PVZ')
 
 test_Creating_an_application=os.getenv('test_Creating_an_application')
+test_Creating_an_order=os.getenv('test_Creating_an_order')
 
 test_Confirmation_of_the_application=os.getenv('test_Confirmation_of_the_application')
 
@@ -55,3 +85,234 @@ test_Order_Editing=os.getenv('test_Order_Editing')
 test_Cancellation_of_the_application=os.getenv('test_Cancellation_of_the_application')
 
 test_Getting_information_about_the_application=os.getenv('test_Getting_information_about_the_application')
+
+
+
+# Пути методов API, если адрес метода не задан в окружении
+_DEFAULT_ENDPOINTS = {
+    'calculate_delivery': '/pricing-calculator',
+    'delivery_interval': '/offers/info',
+    'list_of_PVZ': '/pickup-points/list',
+    'Creating_an_application': '/offers/create',
+    'Creating_an_order': '/request/create',
+    'Confirmation_of_the_application': '/offers/confirm',
+    'Getting_delivery_intervals': '/request/datetime_options',
+    'Order_Editing': '/request/edit',
+    'Cancellation_of_the_application': '/request/cancel',
+    'Getting_information_about_the_application': '/request/info',
+}
+
+
+@dataclass(frozen=True)
+class EndpointSet():
+    """
+    Адреса методов API Яндекс.Доставки из переменных окружения: боевые или тестовые (с префиксом test_).
+    Незаданный адрес — путь метода по умолчанию (_DEFAULT_ENDPOINTS)
+    """
+    calculate_delivery: str
+    delivery_interval: str
+    list_of_PVZ: str
+    Creating_an_application: str
+    Creating_an_order: str
+    Confirmation_of_the_application: str
+    Getting_delivery_intervals: str
+    Order_Editing: str
+    Cancellation_of_the_application: str
+    Getting_information_about_the_application: str
+
+
+@lru_cache(maxsize=None)
+def endpoints(test: bool = False) -> EndpointSet:
+    """
+    Набор адресов методов API; собирается и проверяется при первом обращении — сервисы получают его
+    при создании, поэтому ошибка в адресах останавливает запуск приложения.
+    Адрес должен быть абсолютным http(s)-URL или путем от yandex_host, начинающимся с /
+    test: bool - Тестовые адреса (test_*) вместо боевых
+    """
+    prefix = 'test_' if test else ''
+    values = {field.name: globals()[prefix + field.name] or _DEFAULT_ENDPOINTS[field.name] for field in fields(EndpointSet)}
+    invalid = [
+        prefix + name for name, value in values.items()
+        if not value.startswith('/') and urlsplit(value).scheme not in ('http', 'https')
+    ]
+    if invalid:
+        raise ValueError(f"Некорректные адреса методов API: {', '.join(invalid)}")
+    return EndpointSet(**values)
+
+
+# http client
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', 30))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 10))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_POOL_TIMEOUT = float(os.getenv('HTTP_POOL_TIMEOUT', 5))
+HTTP2 = os.getenv('HTTP2', 'false').lower() in ('1', 'true', 'yes')
+
+# pickup points
+PVZ_REFRESH_INTERVAL = float(os.getenv('PVZ_REFRESH_INTERVAL', 600))
+# Какие поля записи ПВЗ хранить в индексе; пусто — все поля
+PVZ_FIELDS = tuple(field.strip() for field in os.getenv('PVZ_FIELDS', '').split(',') if field.strip())
+# Файл снимка индекса ПВЗ, общий для воркеров на машине; пусто — снимок не используется
+PVZ_SNAPSHOT_PATH = os.getenv('PVZ_SNAPSHOT_PATH')
+PVZ_SNAPSHOT_POLL_INTERVAL = float(os.getenv('PVZ_SNAPSHOT_POLL_INTERVAL', 10))
+
+# pricing cache
+QUOTE_CACHE_TTL = float(os.getenv('QUOTE_CACHE_TTL', 60))
+QUOTE_CACHE_MAX_SIZE = int(os.getenv('QUOTE_CACHE_MAX_SIZE', 10000))
+QUOTE_WEIGHT_TIERS = [int(w) for w in os.getenv('QUOTE_WEIGHT_TIERS', '500,1000,2000,3000,5000,10000,15000,20000,30000').split(',') if w.strip()]
+
+# batch pricing
+PRICING_BATCH_CONCURRENCY = int(os.getenv('PRICING_BATCH_CONCURRENCY', 16))
+# Верхняя граница concurrency, которую может запросить клиент: больше — 422, а не шквал запросов к API
+PRICING_BATCH_MAX_CONCURRENCY = int(os.getenv('PRICING_BATCH_MAX_CONCURRENCY', 64))
+PRICING_BATCH_MAX_ITEMS = int(os.getenv('PRICING_BATCH_MAX_ITEMS', 2500))
+
+# price table: цены популярных маршрутов склад → ПВЗ, рассчитанные заранее по весовым ступеням.
+# Файл JSON [{"source": ..., "destination": ...}] в порядке популярности; пусто — таблица не используется
+PRICE_TABLE_ROUTES_FILE = os.getenv('PRICE_TABLE_ROUTES_FILE')
+PRICE_TABLE_WEIGHTS = [int(w) for w in os.getenv('PRICE_TABLE_WEIGHTS', ','.join(map(str, QUOTE_WEIGHT_TIERS))).split(',') if w.strip()]
+PRICE_TABLE_REFRESH_INTERVAL = float(os.getenv('PRICE_TABLE_REFRESH_INTERVAL', 600))
+# Цена старше PRICE_TABLE_MAX_AGE секунд не используется — расчет идет в API
+PRICE_TABLE_MAX_AGE = float(os.getenv('PRICE_TABLE_MAX_AGE', 1800))
+# Бюджет обновления таблицы: запросов в секунду, всплеск и одновременные запросы
+PRICE_TABLE_RPS = float(os.getenv('PRICE_TABLE_RPS', 10))
+PRICE_TABLE_BURST = int(os.getenv('PRICE_TABLE_BURST', 10))
+PRICE_TABLE_CONCURRENCY = int(os.getenv('PRICE_TABLE_CONCURRENCY', 4))
+# Цена веса между ступенями: линейная интерполяция соседних ступеней или (false) цена верхней ступени
+PRICE_TABLE_INTERPOLATE = os.getenv('PRICE_TABLE_INTERPOLATE', 'true').lower() not in ('0', 'false', 'no')
+# Сколько секунд при старте ждать первого заполнения таблицы; 0 — не ждать, до заполнения расчеты идут в API
+PRICE_TABLE_WARMUP_TIMEOUT = float(os.getenv('PRICE_TABLE_WARMUP_TIMEOUT', 0))
+
+# cart aggregation: делитель объемного веса (см³ на кг) и наибольший вес грузоместа при раскладке, граммы
+CART_VOLUMETRIC_DIVISOR = float(os.getenv('CART_VOLUMETRIC_DIVISOR', 5000))
+CART_MAX_PLACE_WEIGHT = int(os.getenv('CART_MAX_PLACE_WEIGHT', 30000))
+CART_MAX_LINES = int(os.getenv('CART_MAX_LINES', 20000))
+
+# order tracker
+TRACKER_FAST_INTERVAL = float(os.getenv('TRACKER_FAST_INTERVAL', 120))
+TRACKER_DEFAULT_INTERVAL = float(os.getenv('TRACKER_DEFAULT_INTERVAL', 600))
+TRACKER_IDLE_INTERVAL = float(os.getenv('TRACKER_IDLE_INTERVAL', 1800))
+TRACKER_CONCURRENCY = int(os.getenv('TRACKER_CONCURRENCY', 8))
+TRACKER_MAX_POLLS_PER_MINUTE = int(os.getenv('TRACKER_MAX_POLLS_PER_MINUTE', 300))
+# Сколько заявок отслеживается всего и на сколько заявок можно подписаться из одного соединения /ws/orders
+TRACKER_MAX_ORDERS = int(os.getenv('TRACKER_MAX_ORDERS', 100000))
+WS_MAX_SUBSCRIPTIONS = int(os.getenv('WS_MAX_SUBSCRIPTIONS', 500))
+# Push-события статусов: сверка с API после такой паузы в событиях; завершенные заявки помнятся для отбрасывания повторов
+TRACKER_RECONCILE_INTERVAL = float(os.getenv('TRACKER_RECONCILE_INTERVAL', 1800))
+# Заявка из push-событий без подписчиков перестает отслеживаться после такой паузы в событиях
+TRACKER_PUSHED_TTL = float(os.getenv('TRACKER_PUSHED_TTL', 10800))
+TRACKER_CLOSED_TTL = float(os.getenv('TRACKER_CLOSED_TTL', 86400))
+TRACKER_CLOSED_MAX_SIZE = int(os.getenv('TRACKER_CLOSED_MAX_SIZE', 500000))
+STATUS_EVENTS_TOKEN = os.getenv('STATUS_EVENTS_TOKEN')
+STATUS_EVENTS_MAX_BATCH = int(os.getenv('STATUS_EVENTS_MAX_BATCH', 10000))
+
+# upstream policy
+RATE_LIMIT_RPS = float(os.getenv('RATE_LIMIT_RPS', 20))
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', 40))
+# Переопределения по эндпоинтам: "/pricing-calculator=50,/request/info=30"
+RATE_LIMIT_ENDPOINTS = {
+    endpoint.strip(): float(rate)
+    for endpoint, rate in (
+        pair.split('=', 1) for pair in os.getenv('RATE_LIMIT_ENDPOINTS', '').split(',') if '=' in pair)
+}
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', 3))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', 0.2))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', 5))
+RETRY_AFTER_MAX = float(os.getenv('RETRY_AFTER_MAX', 30))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_RECOVERY_TIME = float(os.getenv('BREAKER_RECOVERY_TIME', 30))
+# Адаптивный предел одновременных запросов (AIMD): отдельно для чтения и для записи
+ADAPTIVE_CONCURRENCY = os.getenv('ADAPTIVE_CONCURRENCY', 'true').lower() not in ('0', 'false', 'no')
+# Эндпоинты записи; остальные считаются чтением
+UPSTREAM_WRITE_ENDPOINTS = frozenset(
+    endpoint.strip() for endpoint in os.getenv(
+        'UPSTREAM_WRITE_ENDPOINTS', '/request/create,/offers/create,/offers/confirm,/request/cancel,/request/edit'
+    ).split(',') if endpoint.strip())
+READ_CONCURRENCY_INITIAL = int(os.getenv('READ_CONCURRENCY_INITIAL', 32))
+READ_CONCURRENCY_MIN = int(os.getenv('READ_CONCURRENCY_MIN', 4))
+READ_CONCURRENCY_MAX = int(os.getenv('READ_CONCURRENCY_MAX', HTTP_MAX_CONNECTIONS))
+WRITE_CONCURRENCY_INITIAL = int(os.getenv('WRITE_CONCURRENCY_INITIAL', 16))
+WRITE_CONCURRENCY_MIN = int(os.getenv('WRITE_CONCURRENCY_MIN', 2))
+WRITE_CONCURRENCY_MAX = int(os.getenv('WRITE_CONCURRENCY_MAX', 64))
+# Предел уменьшается, когда недавняя задержка больше долгосрочной в CONCURRENCY_LATENCY_TOLERANCE раз
+# или API отвечает 429/5xx; уменьшение — умножение на CONCURRENCY_BACKOFF
+CONCURRENCY_LATENCY_TOLERANCE = float(os.getenv('CONCURRENCY_LATENCY_TOLERANCE', 2.0))
+CONCURRENCY_BACKOFF = float(os.getenv('CONCURRENCY_BACKOFF', 0.9))
+# Дублирование медленных запросов чтения (hedging) — только для перечисленных эндпоинтов,
+# например "/request/tracking,/request/info"; пусто — выключено
+HEDGE_ENDPOINTS = frozenset(
+    endpoint.strip() for endpoint in os.getenv('HEDGE_ENDPOINTS', '').split(',') if endpoint.strip())
+# Дубль отправляется, если ответа нет дольше этого перцентиля недавних времен ответа эндпоинта
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', 0.95))
+HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', 0.005))
+# Бюджет: дублей не больше HEDGE_BUDGET от числа запросов эндпоинта, всплеск до HEDGE_BURST
+HEDGE_BUDGET = float(os.getenv('HEDGE_BUDGET', 0.05))
+HEDGE_BURST = int(os.getenv('HEDGE_BURST', 10))
+# Сколько последних времен ответа учитывать и сколько нужно, прежде чем дублировать
+HEDGE_WINDOW = int(os.getenv('HEDGE_WINDOW', 1000))
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', 50))
+
+# shared cache
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.5))
+PVZ_CACHE_TTL = float(os.getenv('PVZ_CACHE_TTL', 600))
+INTERVAL_CACHE_TTL = float(os.getenv('INTERVAL_CACHE_TTL', 60))
+INTERVAL_CACHE_MAX_SIZE = int(os.getenv('INTERVAL_CACHE_MAX_SIZE', 2000))
+
+# order lookups: объединение одновременных запросов и микрокэш; ORDER_LOOKUP_MAX_SIZE=0 — только объединение
+ORDER_LOOKUP_TTL = float(os.getenv('ORDER_LOOKUP_TTL', 2))
+ORDER_LOOKUP_TERMINAL_TTL = float(os.getenv('ORDER_LOOKUP_TERMINAL_TTL', 300))
+ORDER_LOOKUP_MAX_SIZE = int(os.getenv('ORDER_LOOKUP_MAX_SIZE', 10000))
+
+# bulk order info
+ORDER_INFO_BULK_CONCURRENCY = int(os.getenv('ORDER_INFO_BULK_CONCURRENCY', 16))
+ORDER_INFO_BULK_MAX_CONCURRENCY = int(os.getenv('ORDER_INFO_BULK_MAX_CONCURRENCY', 64))
+ORDER_INFO_BULK_MAX_ORDERS = int(os.getenv('ORDER_INFO_BULK_MAX_ORDERS', 1000))
+
+# delivery intervals store
+INTERVAL_REFRESH_INTERVAL = float(os.getenv('INTERVAL_REFRESH_INTERVAL', 300))
+INTERVAL_MIN_LEAD = float(os.getenv('INTERVAL_MIN_LEAD', 0))
+# Сколько складов держать в памяти и через сколько секунд без обращений склад перестает обновляться в фоне
+INTERVAL_MAX_STATIONS = int(os.getenv('INTERVAL_MAX_STATIONS', 5000))
+INTERVAL_STATION_IDLE_TTL = float(os.getenv('INTERVAL_STATION_IDLE_TTL', 3600))
+
+# order submission pipeline
+SUBMISSION_WORKERS = int(os.getenv('SUBMISSION_WORKERS', 16))
+SUBMISSION_QUEUE_SIZE = int(os.getenv('SUBMISSION_QUEUE_SIZE', 10000))
+SUBMISSION_MAX_RESULTS = int(os.getenv('SUBMISSION_MAX_RESULTS', 100000))
+SUBMISSION_MAX_BATCH = int(os.getenv('SUBMISSION_MAX_BATCH', 5000))
+
+# tenants: магазины со своими ключами API, файл JSON {"имя": {"api_key": ..., "base_url": ..., "rps": ...}}.
+# Клиент выбирается заголовком X-Tenant; без него — ключ yandex_key
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+# Сколько клиентов держать с открытыми пулами и кэшами; давно не использованные вытесняются
+TENANT_MAX_ACTIVE = int(os.getenv('TENANT_MAX_ACTIVE', 64))
+TENANT_MAX_CONNECTIONS = int(os.getenv('TENANT_MAX_CONNECTIONS', 20))
+TENANT_QUOTE_CACHE_MAX_SIZE = int(os.getenv('TENANT_QUOTE_CACHE_MAX_SIZE', 2000))
+TENANT_ORDER_LOOKUP_MAX_SIZE = int(os.getenv('TENANT_ORDER_LOOKUP_MAX_SIZE', 2000))
+TENANT_INTERVAL_CACHE_MAX_SIZE = int(os.getenv('TENANT_INTERVAL_CACHE_MAX_SIZE', 200))
+# Через сколько секунд после вытеснения закрывать соединения клиента: начатые запросы дорабатывают
+TENANT_CLOSE_DELAY = float(os.getenv('TENANT_CLOSE_DELAY', 30))
+
+# order jobs: журнал подтверждений, отмен и редактирований заявок (SQLite); пусто — журнал в памяти, без восстановления
+JOB_JOURNAL_PATH = os.getenv('JOB_JOURNAL_PATH')
+# Пауза сбора пакета записи, секунды; 0 — писать сразу: изменения, сделанные во время записи, уходят следующим пакетом
+JOB_JOURNAL_COMMIT_INTERVAL = float(os.getenv('JOB_JOURNAL_COMMIT_INTERVAL', 0))
+JOB_JOURNAL_BATCH_SIZE = int(os.getenv('JOB_JOURNAL_BATCH_SIZE', 500))
+# FULL — fsync на каждую фиксацию пакета; NORMAL в режиме WAL переживает падение процесса, но не питания
+JOB_JOURNAL_SYNCHRONOUS = os.getenv('JOB_JOURNAL_SYNCHRONOUS', 'FULL').upper()
+JOB_JOURNAL_RETENTION = float(os.getenv('JOB_JOURNAL_RETENTION', 7 * 86400))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 16))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', 10000))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_DELAY = float(os.getenv('JOB_RETRY_DELAY', 1))
+JOB_MAX_RESULTS = int(os.getenv('JOB_MAX_RESULTS', 100000))
+JOB_MAX_BATCH = int(os.getenv('JOB_MAX_BATCH', 5000))
+
+# Журнал входящих запросов (JSONL) для воспроизведения нагрузки benchmarks.replay; пусто — не пишется
+REQUEST_LOG_PATH = os.getenv('REQUEST_LOG_PATH')
+REQUEST_LOG_MAX_BODY = int(os.getenv('REQUEST_LOG_MAX_BODY', 65536))
+REQUEST_LOG_MAX_PENDING = int(os.getenv('REQUEST_LOG_MAX_PENDING', 10000))
+
+# metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no')
@@ -0,0 +1,20 @@
+from typing import Callable, Optional
+
+import httpx
+import pytest
+
+from service.http_client import ClientSettings, UpstreamClient
+from service.resilience import UpstreamPolicy
+
+HOST = "http://yandex.test"
+
+
+@pytest.fixture
+def upstream() -> Callable[..., UpstreamClient]:
+    """
+    Клиент API поверх httpx.MockTransport: make(handler, policy=None)
+    """
+    def make(handler, policy: Optional[UpstreamPolicy] = None) -> UpstreamClient:
+        return UpstreamClient(
+            "test", HOST, ClientSettings(), transport=httpx.MockTransport(handler), policy=policy or UpstreamPolicy())
+    return make
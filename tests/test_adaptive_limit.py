@@ -0,0 +1,135 @@
+import asyncio
+
+import httpx
+
+from service.resilience import AdaptiveLimit, ConcurrencyLimiter, UpstreamPolicy
+
+
+def make_limit(initial: int = 4, min_limit: int = 2, max_limit: int = 10) -> AdaptiveLimit:
+    return AdaptiveLimit(initial, min_limit, max_limit, tolerance=2.0, backoff=0.5)
+
+
+def test_saturated_limit_grows_by_one_per_window():
+    limit = make_limit()
+
+    async def scenario():
+        # Предел все время исчерпан: освободившиеся и новые места сразу занимаются
+        for _ in range(10):
+            while limit.try_acquire():
+                pass
+            limit.release(latency=0.01)
+
+    asyncio.run(scenario())
+    # Аддитивный рост: +1/limit на ответ — примерно +1 за каждые limit ответов
+    assert 6 <= limit.limit < 7
+    assert limit.decreases == 0
+
+
+def test_unsaturated_limit_does_not_grow():
+    limit = make_limit()
+
+    async def scenario():
+        for _ in range(50):
+            await limit.acquire()
+            limit.release(latency=0.01)
+
+    asyncio.run(scenario())
+    assert limit.limit == 4
+    assert limit.increases == 0
+
+
+def test_overload_decreases_once_per_latency_window():
+    limit = make_limit(initial=8)
+
+    async def scenario():
+        await limit.acquire()
+        limit.release(latency=1.0)
+        for _ in range(5):
+            await limit.acquire()
+        for _ in range(5):
+            limit.release(overloaded=True)
+
+    asyncio.run(scenario())
+    # Пачка 503 от одной перегрузки уменьшает предел один раз: следующие в пределах времени ответа не считаются
+    assert (limit.limit, limit.decreases) == (4, 1)
+
+
+def test_latency_growth_decreases_to_minimum():
+    limit = make_limit(initial=8)
+
+    async def scenario():
+        for latency in (0.01, 0.01, 1.0, 1.0):
+            await limit.acquire()
+            limit._decreased_at = 0.0
+            limit.release(latency=latency)
+
+    asyncio.run(scenario())
+    assert limit.limit == 2
+    assert limit.decreases == 2
+
+
+def test_waiters_are_served_in_order_and_cancelled_waiter_leaves_queue():
+    limit = make_limit(initial=2, min_limit=1, max_limit=2)
+    served = []
+
+    async def scenario():
+        await limit.acquire()
+        await limit.acquire()
+
+        async def waiter(name: str):
+            await limit.acquire()
+            served.append(name)
+
+        tasks = [asyncio.create_task(waiter(name)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        assert limit.queued == 3
+        tasks[1].cancel()
+        await asyncio.sleep(0)
+        assert limit.queued == 2
+        limit.release()
+        limit.release()
+        await asyncio.gather(tasks[0], tasks[2])
+        return limit.in_flight
+
+    in_flight = asyncio.run(scenario())
+    assert served == ["a", "c"]
+    assert in_flight == 2
+
+
+def test_policy_shrinks_limit_under_server_errors(upstream):
+    concurrency = ConcurrencyLimiter(read=(8, 2, 8), backoff=0.5)
+    policy = UpstreamPolicy(failure_threshold=10 ** 9, concurrency=concurrency)
+    client = upstream(lambda request: httpx.Response(503), policy)
+
+    async def scenario():
+        for _ in range(3):
+            try:
+                await client.request("GET", "/request/info", idempotent=True)
+            except httpx.HTTPStatusError:
+                pass
+        await client.aclose()
+
+    asyncio.run(scenario())
+    snapshot = concurrency.snapshot()[0]
+    assert snapshot["decreases"] >= 1
+    assert snapshot["limit"] < 8
+    assert snapshot["in_flight"] == 0
+
+
+def test_waiter_cancelled_after_wake_raises_cancelled_error():
+    limit = make_limit(initial=1, min_limit=1, max_limit=1)
+
+    async def scenario():
+        await limit.acquire()
+        waiter = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        # Отмененное ожидание снимается с очереди раньше, чем задача успевает обработать отмену
+        waiter.cancel()
+        limit.release()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            return "cancelled"
+
+    assert asyncio.run(scenario()) == "cancelled"
+    assert (limit.queued, limit.in_flight) == (0, 0)
@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import consts as c
+from service.Creating_order import CreatingOrder
+from service.creating_draft import DraftDelivery
+from service.order_confirmation import GetInfoAboutDraft
+from tests.conftest import HOST
+from tests.test_submission_pipeline import make_order
+
+
+@pytest.fixture(autouse=True)
+def fresh_endpoints():
+    c.endpoints.cache_clear()
+    yield
+    c.endpoints.cache_clear()
+
+
+def request_paths(upstream, endpoints: c.EndpointSet) -> list:
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(str(request.url))
+        return httpx.Response(200, json={"request_id": "r-1"})
+
+    async def scenario():
+        client = upstream(handler)
+        await GetInfoAboutDraft("test", HOST, client=client, endpoints=endpoints).get_info_about_draft(request_id="r-1")
+        await client.aclose()
+
+    asyncio.run(scenario())
+    return seen
+
+
+def test_unset_endpoints_fall_back_to_api_paths(monkeypatch):
+    monkeypatch.setattr(c, "Getting_information_about_the_application", None)
+    assert c.endpoints().Getting_information_about_the_application == "/request/info"
+    assert GetInfoAboutDraft("test", HOST).endpoints is c.endpoints()
+
+
+def test_services_use_configured_paths(monkeypatch, upstream):
+    monkeypatch.setattr(c, "test_Getting_information_about_the_application", "/v2/request/info")
+    monkeypatch.setattr(c, "Getting_information_about_the_application", "http://other.test/request/info")
+    assert request_paths(upstream, c.endpoints(True)) == [f"{HOST}/v2/request/info?request_id=r-1"]
+    assert request_paths(upstream, c.endpoints()) == ["http://other.test/request/info?request_id=r-1"]
+
+
+def test_invalid_endpoint_is_rejected(monkeypatch):
+    monkeypatch.setattr(c, "test_Order_Editing", "request/edit")
+    with pytest.raises(ValueError, match="test_Order_Editing"):
+        c.endpoints(True)
+
+
+def test_order_and_offer_creation_have_separate_endpoints(monkeypatch, upstream):
+    monkeypatch.setattr(c, "Creating_an_order", "/v2/request/create")
+    monkeypatch.setattr(c, "Creating_an_application", None)
+    order = make_order()
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        return httpx.Response(200, json={"request_id": "r-1", "order_id": "o-1"})
+
+    async def scenario():
+        client = upstream(handler)
+        args = (order.operator_request_id, order.source, order.destination, order.items, order.contact)
+        await CreatingOrder("test", HOST, client=client).Creating_an_application(*args, order.barcode)
+        await DraftDelivery("test", HOST, client=client).Creating_an_application(*args)
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert seen == ["/v2/request/create", "/offers/create"]
@@ -0,0 +1,148 @@
+import asyncio
+from typing import List
+
+import httpx
+
+from service.resilience import ConcurrencyLimiter, HedgePolicy, UpstreamPolicy
+
+ENDPOINT = "/request/info"
+
+
+class ScriptedAPI():
+    """
+    Имитация API: задержка каждого следующего запроса берется из списка, потом — default
+    """
+    def __init__(self, delays: List[float], default: float = 0.001):
+        self.delays = list(delays)
+        self.default = default
+        self.sent = 0
+        self.cancelled = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.sent += 1
+        attempt = self.sent
+        delay = self.delays.pop(0) if self.delays else self.default
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return httpx.Response(200, json={"attempt": attempt})
+
+
+def make_policy(**kwargs) -> UpstreamPolicy:
+    concurrency = kwargs.pop("concurrency", None)
+    settings = {"min_samples": 5, "min_delay": 0.005, "percentile": 0.9, "budget": 1.0, "burst": 10, **kwargs}
+    return UpstreamPolicy(hedging=HedgePolicy(frozenset({ENDPOINT}), **settings), concurrency=concurrency)
+
+
+async def warm_up(client, count: int = 5):
+    for _ in range(count):
+        await client.request("GET", ENDPOINT, idempotent=True)
+
+
+def test_slow_attempt_is_hedged_and_loser_cancelled(upstream):
+    api = ScriptedAPI([0.001] * 5 + [1.0])
+    policy = make_policy()
+    client = upstream(api, policy)
+
+    async def scenario():
+        await warm_up(client)
+        response = await client.request("GET", ENDPOINT, idempotent=True)
+        await client.aclose()
+        return response.json()
+
+    body = asyncio.run(scenario())
+    stats = policy.hedging.snapshot()[0]
+    # Ответила вторая попытка (седьмой запрос), медленная первая отменена
+    assert body == {"attempt": 7}
+    assert api.cancelled == 1
+    assert (stats["requests"], stats["hedged"], stats["wins"]) == (6, 1, 1)
+    # Отмененная первая попытка не попадает в выборку времен ответа
+    assert len(policy.hedging.endpoint("http://yandex.test", ENDPOINT).latencies) == 5
+
+
+def test_fast_attempt_and_non_hedged_requests_send_once(upstream):
+    api = ScriptedAPI([])
+    policy = make_policy()
+    client = upstream(api, policy)
+
+    async def scenario():
+        await warm_up(client, 20)
+        # Не идемпотентный запрос и эндпоинт вне списка не дублируются
+        await client.request("POST", ENDPOINT)
+        await client.request("GET", "/request/tracking", idempotent=True)
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert api.sent == 22
+    assert policy.hedging.snapshot()[0]["hedged"] == 0
+
+
+def test_no_hedging_before_min_samples(upstream):
+    api = ScriptedAPI([0.05])
+    policy = make_policy()
+    client = upstream(api, policy)
+
+    async def scenario():
+        await client.request("GET", ENDPOINT, idempotent=True)
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert api.sent == 1
+
+
+def test_budget_caps_hedges(upstream):
+    slow = 0.05
+    api = ScriptedAPI([0.001] * 5 + [slow] * 200, default=0.001)
+    policy = make_policy(budget=0.1, burst=1)
+    client = upstream(api, policy)
+
+    async def scenario():
+        await warm_up(client)
+        # Дубли тоже медленные: каждый запрос ждет дольше задержки дубля
+        api.default = slow
+        for _ in range(20):
+            await client.request("GET", ENDPOINT, idempotent=True)
+        await client.aclose()
+
+    asyncio.run(scenario())
+    stats = policy.hedging.snapshot()[0]
+    # Всплеск в один дубль и по 0,1 токена на каждый из 25 запросов
+    assert stats["hedged"] <= 1 + 25 * 0.1
+    assert stats["denied"] == 20 - stats["hedged"]
+    assert api.sent == 25 + stats["hedged"]
+
+
+def test_cancelled_loser_releases_concurrency_slot(upstream):
+    api = ScriptedAPI([0.001] * 5 + [1.0])
+    concurrency = ConcurrencyLimiter(read=(4, 1, 4))
+    policy = make_policy(concurrency=concurrency)
+    client = upstream(api, policy)
+
+    async def scenario():
+        await warm_up(client)
+        await client.request("GET", ENDPOINT, idempotent=True)
+        await asyncio.sleep(0)
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert policy.hedging.snapshot()[0]["hedged"] == 1
+    assert concurrency.snapshot()[0]["in_flight"] == 0
+
+
+def test_hedge_skipped_without_free_concurrency_slot(upstream):
+    api = ScriptedAPI([0.001] * 5 + [0.05])
+    concurrency = ConcurrencyLimiter(read=(1, 1, 1))
+    policy = make_policy(concurrency=concurrency)
+    client = upstream(api, policy)
+
+    async def scenario():
+        await warm_up(client)
+        await client.request("GET", ENDPOINT, idempotent=True)
+        await client.aclose()
+
+    asyncio.run(scenario())
+    stats = policy.hedging.snapshot()[0]
+    assert (stats["hedged"], stats["skipped"]) == (0, 1)
+    assert api.sent == 6
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from service.interval_store import IntervalStore
+
+
+class Stations():
+    """
+    Имитация /offers/info: у склада "empty" интервалов нет, у остальных — один интервал через час
+    """
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, station_id: str):
+        self.calls.append(station_id)
+        await asyncio.sleep(self.delay)
+        if station_id == "empty":
+            return []
+        start = time.time() + 3600
+        return [{"from": start, "to": start + 3600}]
+
+
+def test_empty_station_is_not_refetched_until_refresh():
+    fetch = Stations()
+    store = IntervalStore(fetch, empty_ttl=60)
+
+    async def scenario():
+        return [await store.next_slot("empty") for _ in range(5)]
+
+    assert asyncio.run(scenario()) == [None] * 5
+    assert fetch.calls == ["empty"]
+
+
+def test_expired_empty_result_is_fetched_again():
+    fetch = Stations()
+    store = IntervalStore(fetch, empty_ttl=0)
+
+    async def scenario():
+        await store.next_slot("empty")
+        await store.next_slot("empty")
+
+    asyncio.run(scenario())
+    assert fetch.calls == ["empty", "empty"]
+
+
+def test_concurrent_misses_load_station_once():
+    fetch = Stations(delay=0.02)
+    store = IntervalStore(fetch)
+
+    async def scenario():
+        return await asyncio.gather(*(store.next_slot("s-1") for _ in range(10)))
+
+    slots = asyncio.run(scenario())
+    assert all(slot == slots[0] is not None for slot in slots)
+    assert fetch.calls == ["s-1"]
+
+
+def test_least_recently_requested_station_is_evicted():
+    fetch = Stations()
+    store = IntervalStore(fetch, max_stations=2)
+
+    async def scenario():
+        await store.next_slot("s-1")
+        await store.next_slot("s-2")
+        await store.next_slot("s-1")
+        await store.next_slot("s-3")
+
+    asyncio.run(scenario())
+    assert list(store.stations) == ["s-1", "s-3"]
+    assert store.evicted == 1
+
+
+def test_background_refresh_skips_idle_stations():
+    fetch = Stations()
+    store = IntervalStore(fetch, idle_ttl=60)
+
+    async def scenario():
+        await store.next_slot("s-1")
+        await store.next_slot("s-2")
+        store.stations["s-1"].requested_at -= 120
+        fetch.calls.clear()
+        store.start(0.01)
+        await asyncio.sleep(0.015)
+        await store.stop()
+
+    asyncio.run(scenario())
+    assert list(store.stations) == ["s-2"]
+    assert set(fetch.calls) == {"s-2"}
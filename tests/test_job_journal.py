@@ -0,0 +1,206 @@
+import asyncio
+import json
+import sqlite3
+
+import httpx
+
+from service.job_journal import STATE_DONE, STATE_FAILED, STATE_RUNNING, JobJournal, make_job
+from service.order_confirmation import OrderConfirmation
+from tests.conftest import HOST
+
+
+def make_journal(upstream, handler, path=None, **kwargs) -> JobJournal:
+    client = upstream(handler)
+    kwargs.setdefault("retry_delay", 0)
+    return JobJournal(path, OrderConfirmation("test", HOST, client=client), **kwargs)
+
+
+def ok(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/request/edit":
+        return httpx.Response(200, json={"editing_task_id": "task-1"})
+    return httpx.Response(200, json={"status": "CANCELLED"})
+
+
+def test_restart_resumes_cancel_and_fails_interrupted_edit(tmp_path, upstream):
+    path = str(tmp_path / "jobs.db")
+
+    async def scenario():
+        started = []
+
+        async def hanging(request: httpx.Request) -> httpx.Response:
+            started.append(request.url.path)
+            await asyncio.Event().wait()
+
+        journal = make_journal(upstream, hanging, path, workers=2)
+        await journal.start()
+        await journal.submit_many([
+            {"action": "cancel", "request_id": "r-1"},
+            {"action": "edit", "request_id": "r-2", "job_id": "edit-1", "changes": {"comment": "x"}},
+        ])
+        while len(started) < 2:
+            await asyncio.sleep(0.01)
+        # Остановка посреди запросов — как падение процесса: задания остаются в журнале running
+        await journal.stop()
+        with sqlite3.connect(path) as db:
+            assert dict(db.execute("SELECT job_id, state FROM jobs")) == {
+                "cancel:r-1": STATE_RUNNING, "edit-1": STATE_RUNNING}
+
+        replayed = []
+
+        def answer(request: httpx.Request) -> httpx.Response:
+            replayed.append(request.url.path)
+            return ok(request)
+
+        journal = make_journal(upstream, answer, path)
+        await journal.start()
+        cancel, edit = await journal.get("cancel:r-1"), await journal.get("edit-1")
+        await journal.wait([cancel, edit], timeout=5)
+        await journal.stop()
+        return cancel, edit, replayed, journal.resumed
+
+    cancel, edit, replayed, resumed = asyncio.run(scenario())
+    assert cancel.state == STATE_DONE
+    assert cancel.result["status"] == "CANCELLED"
+    # Правка могла быть применена до падения: повтор не отправляется
+    assert edit.state == STATE_FAILED
+    assert edit.error["type"] == "interrupted"
+    assert replayed == ["/request/cancel"]
+    assert resumed == 1
+
+
+def test_batch_is_written_in_one_commit(tmp_path, upstream):
+    path = str(tmp_path / "jobs.db")
+
+    async def scenario():
+        journal = make_journal(upstream, ok, path, commit_interval=0.05, batch_size=1000)
+        await journal.start()
+        jobs = await journal.submit_many([{"action": "cancel", "request_id": f"r-{i}"} for i in range(50)])
+        commits, written = journal.commits, journal.written
+        await journal.wait(jobs, timeout=5)
+        await journal.stop()
+        return jobs, commits, written, journal.commits
+
+    jobs, commits, written, total_commits = asyncio.run(scenario())
+    assert (commits, written) == (1, 50)
+    assert all(job.state == STATE_DONE for job in jobs)
+    # Изменения состояний 50 заданий (running, done) собираются в несколько пакетов, а не 100 транзакций
+    assert total_commits <= 10
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT count(*) FROM jobs WHERE state = ?", (STATE_DONE,)).fetchone()[0] == 50
+
+
+def test_known_job_id_is_not_executed_again(upstream):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        return ok(request)
+
+    async def scenario():
+        journal = make_journal(upstream, handler)
+        await journal.start()
+        first = await journal.submit({"action": "cancel", "request_id": "r-1"})
+        await journal.wait([first], timeout=5)
+        second = await journal.submit({"action": "cancel", "request_id": "r-1"})
+        await journal.stop()
+        return first, second, journal.deduplicated
+
+    first, second, deduplicated = asyncio.run(scenario())
+    assert second is first
+    assert deduplicated == 1
+    assert len(calls) == 1
+
+
+def test_server_error_retries_cancel_but_not_edit(upstream):
+    failures = {"/request/cancel": 1, "/request/edit": 1}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if failures[request.url.path]:
+            failures[request.url.path] -= 1
+            return httpx.Response(503)
+        return ok(request)
+
+    async def scenario():
+        journal = make_journal(upstream, handler)
+        await journal.start()
+        jobs = await journal.submit_many([
+            {"action": "cancel", "request_id": "r-1"},
+            {"action": "edit", "request_id": "r-2", "changes": {"comment": "x"}},
+        ])
+        await journal.wait(jobs, timeout=5)
+        await journal.stop()
+        return jobs
+
+    cancel, edit = asyncio.run(scenario())
+    assert (cancel.state, cancel.attempts) == (STATE_DONE, 2)
+    # 503 на правку: API могло ее применить, повтор не безопасен
+    assert (edit.state, edit.attempts) == (STATE_FAILED, 1)
+    assert edit.error["status_code"] == 503
+
+
+def test_rate_limited_edit_is_retried(upstream):
+    failures = [1]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if failures[0]:
+            failures[0] -= 1
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return ok(request)
+
+    async def scenario():
+        journal = make_journal(upstream, handler)
+        await journal.start()
+        job = await journal.submit({"action": "edit", "request_id": "r-1", "changes": {"comment": "x"}})
+        await journal.wait([job], timeout=5)
+        await journal.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert (job.state, job.attempts) == (STATE_DONE, 2)
+    assert job.result == {"editing_task_id": "task-1"}
+
+
+def test_finished_jobs_are_evicted_behind_unfinished(upstream):
+    journal = make_journal(upstream, ok, max_results=3)
+    pending = make_job({"action": "cancel", "request_id": "r-pending"})
+    journal._remember(pending)
+    for index in range(10):
+        job = make_job({"action": "cancel", "request_id": f"r-{index}"})
+        job.state = STATE_DONE
+        journal._remember(job)
+    assert list(journal.jobs) == ["cancel:r-pending", "cancel:r-8", "cancel:r-9"]
+
+
+def test_edit_interrupted_by_crash_is_not_replayed(tmp_path, upstream):
+    path, crashed = str(tmp_path / "jobs.db"), str(tmp_path / "crashed.db")
+
+    async def scenario():
+        async def crash(request: httpx.Request) -> httpx.Response:
+            # Снимок зафиксированного журнала в момент, когда правка уже дошла до API, — состояние после падения
+            with sqlite3.connect(path) as source, sqlite3.connect(crashed) as target:
+                source.backup(target)
+            await asyncio.Event().wait()
+
+        journal = make_journal(upstream, crash, path, commit_interval=0.02)
+        await journal.start()
+        await journal.submit({"action": "edit", "request_id": "r-1", "job_id": "edit-1", "changes": {"comment": "x"}})
+        while not (tmp_path / "crashed.db").exists():
+            await asyncio.sleep(0.01)
+        await journal.stop()
+
+        replayed = []
+
+        def answer(request: httpx.Request) -> httpx.Response:
+            replayed.append(request.url.path)
+            return ok(request)
+
+        journal = make_journal(upstream, answer, crashed)
+        await journal.start()
+        edit = await journal.get("edit-1")
+        await journal.wait([edit], timeout=5)
+        await journal.stop()
+        return edit, replayed
+
+    edit, replayed = asyncio.run(scenario())
+    assert (edit.state, edit.error["type"]) == (STATE_FAILED, "interrupted")
+    assert replayed == []
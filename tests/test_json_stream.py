@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+from service.json_stream import iter_array_items
+
+DOCUMENT = {
+    "meta": {"total": 3, "tags": ["a", "b"]},
+    "points": [
+        {"id": "1", "price": -12.5e3, "name": "ПВЗ \"Центр\"\\\né", "ok": True},
+        [[1, 2], [], [[None]]],
+        1234567890,
+        "строка с \\u-экранированием ☃",
+    ],
+    "tail": False,
+}
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def collect(data: bytes, key: str = "points", size: int = 1 << 16) -> list:
+    async def scenario():
+        return [item async for item in iter_array_items(chunked(data, size), key)]
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64])
+def test_items_split_across_chunks(size):
+    # Границы кусков попадают внутрь чисел, строк с экранированием, многобайтовых символов и вложенных массивов
+    data = json.dumps(DOCUMENT, ensure_ascii=False).encode()
+    assert collect(data, size=size) == DOCUMENT["points"]
+
+
+def test_escaped_input_and_whitespace():
+    data = json.dumps(DOCUMENT, ensure_ascii=True, indent=2).encode()
+    assert collect(data, size=3) == DOCUMENT["points"]
+
+
+def test_number_at_chunk_end_is_not_cut():
+    assert collect(b'{"points": [12345, 6]}', size=16) == [12345, 6]
+
+
+def test_missing_key_and_non_array_value_yield_nothing():
+    data = json.dumps(DOCUMENT).encode()
+    assert collect(data, key="absent") == []
+    assert collect(data, key="meta") == []
+    assert collect(b"{}") == []
+    assert collect(b'{"points": []}') == []
+
+
+@pytest.mark.parametrize("data", [
+    b'{"points": [1, 2',
+    b'{"points": [{"id": "1"',
+    b'{"points": ["unterminated',
+    b'{"points": [1',
+    b'',
+])
+def test_truncated_input_raises(data):
+    with pytest.raises(ValueError):
+        collect(data, size=2)
+
+
+@pytest.mark.parametrize("data", [
+    b'[1, 2]',
+    b'{"points": [1 2]}',
+    b'{"points" [1]}',
+    b'{"points": [1,, 2]}',
+    b'{"other": 1 "points": [1]}',
+])
+def test_malformed_input_raises(data):
+    with pytest.raises(ValueError):
+        collect(data)
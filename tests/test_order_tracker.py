@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from service.order_tracker import APPLIED, DROPPED, DUPLICATE, STALE, OrderTracker, TrackerFullError
+
+
+def event(timestamp: int, status: str, **kwargs) -> dict:
+    return {"request_id": "r-1", "timestamp": timestamp, "status": status, **kwargs}
+
+
+def test_redelivered_event_is_duplicate():
+    tracker = OrderTracker(None)
+    assert tracker.ingest(event(100, "CREATED", sequence=1)) == APPLIED
+    assert tracker.ingest(event(100, "CREATED", sequence=1)) == DUPLICATE
+    assert tracker.events == {APPLIED: 1, DUPLICATE: 1, STALE: 0, DROPPED: 0}
+
+
+def test_distinct_events_with_same_timestamp_are_applied():
+    tracker = OrderTracker(None)
+    assert tracker.ingest(event(100, "CREATED", sequence=1)) == APPLIED
+    # Статусы сменились в одну секунду: второе событие не повтор первого
+    assert tracker.ingest(event(100, "DELIVERY_PROCESSING_STARTED", sequence=2)) == APPLIED
+    assert tracker.orders["r-1"].status == "DELIVERY_PROCESSING_STARTED"
+    assert tracker.ingest(event(100, "CREATED", sequence=1)) == DUPLICATE
+
+
+def test_seen_keeps_only_latest_timestamp():
+    tracker = OrderTracker(None)
+    for index in range(1, 1001):
+        tracker.ingest(event(index, "DELIVERY_TRANSPORTATION", sequence=index))
+    order = tracker.orders["r-1"]
+    assert order.seen == {(1000.0, "DELIVERY_TRANSPORTATION", 1000)}
+    # Ключ раннего события забыт, но повтор все равно не применяется
+    assert tracker.ingest(event(5, "DELIVERY_TRANSPORTATION", sequence=5)) == STALE
+    assert order.event_at == 1000
+
+
+def test_last_unsubscribe_stops_polling_order_without_events():
+    tracker = OrderTracker(None)
+    first, second = asyncio.Queue(), asyncio.Queue()
+    tracker.subscribe("r-2", first)
+    tracker.subscribe("r-2", second)
+    tracker.unsubscribe("r-2", first)
+    assert "r-2" in tracker.orders
+    tracker.unsubscribe("r-2", second)
+    assert "r-2" not in tracker.orders
+
+
+def test_unsubscribe_keeps_order_with_push_events():
+    tracker = OrderTracker(None)
+    tracker.ingest(event(100, "CREATED"))
+    queue = tracker.subscribe("r-1")
+    tracker.unsubscribe("r-1", queue)
+    # Заявку со статусами из событий сверяют с API и без подписчиков
+    assert "r-1" in tracker.orders
+
+
+def test_watch_is_capped():
+    tracker = OrderTracker(None, max_orders=2)
+    tracker.subscribe("r-1")
+    tracker.subscribe("r-2")
+    with pytest.raises(TrackerFullError):
+        tracker.subscribe("r-3")
+    assert list(tracker.orders) == ["r-1", "r-2"]
+
+
+def test_full_tracker_evicts_least_recently_pushed_order_without_subscribers():
+    tracker = OrderTracker(None, max_orders=3)
+    tracker.subscribe("r-sub")
+    for request_id in ("r-a", "r-b"):
+        tracker.ingest({**event(100, "CREATED"), "request_id": request_id})
+    tracker.ingest({**event(200, "DELIVERY_TRANSPORTATION"), "request_id": "r-a"})
+    assert tracker.ingest({**event(100, "CREATED"), "request_id": "r-c"}) == APPLIED
+    # r-b дольше всех без событий; у r-sub есть подписчик
+    assert set(tracker.orders) == {"r-sub", "r-a", "r-c"}
+    assert tracker.evicted == 1
+
+
+def test_event_is_dropped_when_every_order_has_subscribers():
+    tracker = OrderTracker(None, max_orders=1)
+    tracker.subscribe("r-sub")
+    assert tracker.ingest(event(100, "CREATED")) == DROPPED
+    assert list(tracker.orders) == ["r-sub"]
+
+
+def test_pushed_order_without_events_is_dropped_instead_of_reconciled():
+    class Info():
+        calls = 0
+
+        async def get_info_about_draft(self, request_id: str):
+            Info.calls += 1
+            return {}
+
+    tracker = OrderTracker(Info(), reconcile_interval=0, pushed_ttl=0, max_polls_per_minute=0)
+
+    async def scenario():
+        tracker.start()
+        tracker.ingest(event(100, "CREATED"))
+        await asyncio.sleep(0.05)
+        await tracker.stop()
+
+    asyncio.run(scenario())
+    assert not tracker.orders
+    assert (Info.calls, tracker.evicted) == (0, 1)
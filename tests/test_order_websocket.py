@@ -0,0 +1,56 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from fastapi.websockets import WebSocketDisconnect
+
+import main
+from service.order_tracker import OrderTracker
+from src import consts as c
+
+PATH = f"{c.PATH_PREFIX}/ws/orders"
+
+
+@pytest.fixture
+def tracker():
+    # Без lifespan: обработчику нужен только трекер
+    main.app.state.order_tracker = tracker = OrderTracker(None)
+    yield tracker
+    del main.app.state.order_tracker
+
+
+@pytest.mark.parametrize("frame", ["[]", '"x"', "1", "{", '{"action": "watch"}', '{"action": "subscribe", "request_ids": "r-1"}'])
+def test_malformed_message_gets_error_and_keeps_connection(tracker, frame):
+    tracker.ingest({"request_id": "r-1", "status": "CREATED", "timestamp": 1})
+    with TestClient(main.app).websocket_connect(PATH) as websocket:
+        websocket.send_text(frame)
+        assert "error" in websocket.receive_json()
+        websocket.send_json({"action": "subscribe", "request_ids": ["r-1"]})
+        assert websocket.receive_json()["status"] == "CREATED"
+    assert not tracker.orders["r-1"].subscribers
+
+
+def test_failed_send_closes_connection_and_is_logged(tracker, caplog):
+    # Событие, которое нельзя сериализовать в JSON: задача отправки завершается ошибкой
+    tracker.ingest({"request_id": "r-1", "status": "CREATED", "timestamp": 1, "description": object()})
+    with caplog.at_level(logging.WARNING, logger="main"):
+        with TestClient(main.app).websocket_connect(PATH) as websocket:
+            websocket.send_json({"action": "subscribe", "request_ids": ["r-1"]})
+            with pytest.raises(WebSocketDisconnect) as closed:
+                websocket.receive_json()
+    assert closed.value.code == 1011
+    assert not tracker.orders["r-1"].subscribers
+    assert any("WebSocket" in record.getMessage() for record in caplog.records)
+
+
+def test_subscriptions_are_capped_and_dropped_on_disconnect(tracker, monkeypatch):
+    monkeypatch.setattr(c, "WS_MAX_SUBSCRIPTIONS", 2)
+    with TestClient(main.app).websocket_connect(PATH) as websocket:
+        websocket.send_json({"action": "subscribe", "request_ids": ["r-1", "r-2", "r-3"]})
+        assert "error" in websocket.receive_json()
+        websocket.send_json({"action": "subscribe", "request_ids": ["r-1", "r-2"]})
+        websocket.send_json({"action": "subscribe", "request_ids": ["r-3"]})
+        assert "error" in websocket.receive_json()
+        assert set(tracker.orders) == {"r-1", "r-2"}
+    # Заявки без событий, на которые больше никто не подписан, не опрашиваются
+    assert not tracker.orders
@@ -0,0 +1,70 @@
+import json
+
+import httpx
+import pytest
+
+from service.payloads import (
+    encode_json, offer_create_body, offer_create_payload, request_create_body, request_create_payload)
+
+SOURCE = {
+    "platform_station_id": "fbed3aa1-2cc6-4370-ab4d-59c5cc9bb924",
+    "interval_utc": {"start_utc": "2026-03-02T09:00:00+00:00", "end_utc": "2026-03-02T11:00:00+00:00"},
+}
+DESTINATION = "e1139f6d-e34f-47a9-a55f-31f032a861a6"
+
+
+def make_items(size: int) -> list:
+    return [
+        {
+            "article": f"ART-{i:05d}",
+            "billing_details": {"assessed_unit_price": 100000 + i, "unit_price": 99900 + i, "nds": 20},
+            "count": 1 + i % 3,
+            "name": f"Товар №{i} «тест» \"кавычки\" \\ слэш",
+            "place_barcode": f"PLACE-{i:05d}",
+            "physical_dims": {"dx": 10 + i % 5, "dy": 20, "dz": 15, "weight_gross": 500 + i},
+            "description": None if i % 2 else f"Коробка {i}",
+        }
+        for i in range(size)
+    ]
+
+
+CONTACTS = [
+    {"name": "Иван", "first_name": "Иван", "phone": "+79990000000", "email": "user@example.com"},
+    {"name": "Ann", "first_name": "Ann", "phone": "+79990000001"},
+]
+
+
+@pytest.mark.parametrize("size", [1, 2, 25])
+@pytest.mark.parametrize("contact", CONTACTS)
+def test_request_payload_matches_model_built_body(size, contact):
+    items = make_items(size)
+    args = ("order-1", SOURCE, DESTINATION, items, contact, "BOX-1")
+    baseline = request_create_body(*args)
+    payload = request_create_payload(*args)
+    assert payload == encode_json(baseline)
+    # Те же байты, что httpx отправил бы с json=
+    assert payload == httpx.Request("POST", "http://yandex.test", json=baseline).content
+
+
+@pytest.mark.parametrize("size", [1, 2, 25])
+@pytest.mark.parametrize("contact", CONTACTS)
+def test_offer_payload_matches_model_built_body(size, contact):
+    items = make_items(size)
+    args = ("order-1", SOURCE, DESTINATION, items, contact)
+    baseline = offer_create_body(*args)
+    payload = offer_create_payload(*args)
+    assert payload == encode_json(baseline)
+    assert payload == httpx.Request("POST", "http://yandex.test", json=baseline).content
+
+
+def test_payload_is_validated():
+    items = make_items(1)
+    items[0]["physical_dims"]["weight_gross"] = "тяжелый"
+    with pytest.raises(ValueError):
+        request_create_payload("order-1", SOURCE, DESTINATION, items, CONTACTS[0], "BOX-1")
+
+
+def test_payload_places_follow_items():
+    body = json.loads(request_create_payload("order-1", SOURCE, DESTINATION, make_items(3), CONTACTS[0], "BOX-1"))
+    assert [place["barcode"] for place in body["places"]] == ["BOX-1"] * 3
+    assert [place["description"] for place in body["places"]] == ["Коробка 0", None, "Коробка 2"]
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from service.pickup_points import PickupPoint, PickupPointIndex, haversine_km
+
+TYPES = ("pickup_point", "terminal", None)
+METHODS = ("already_paid", "card_on_receipt", "cash_on_receipt")
+
+
+def random_points(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    points = []
+    for number in range(count):
+        # Часть точек — у 180-го меридиана и полюсов, остальные — скоплением, как ПВЗ в городе
+        if number % 5 == 0:
+            latitude, longitude = rng.uniform(-89.9, 89.9), rng.choice((-179.99, 179.99, rng.uniform(-180, 180)))
+        else:
+            latitude, longitude = 55.75 + rng.gauss(0, 0.3), 37.6 + rng.gauss(0, 0.5)
+        methods = tuple(method for method in METHODS if rng.random() < 0.5)
+        points.append(PickupPoint(f"p-{number}", rng.choice(TYPES), latitude, longitude, methods, b"{}"))
+    return points
+
+
+def brute_force(points, latitude, longitude, point_type=None, payment_method=None):
+    return sorted(
+        (haversine_km(latitude, longitude, point.latitude, point.longitude), point.id)
+        for point in points
+        if (point_type is None or point.type == point_type)
+        and (payment_method is None or payment_method in point.payment_methods))
+
+
+def queries(count: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    return [
+        (55.75 + rng.gauss(0, 0.5), 37.6 + rng.gauss(0, 0.8)) if number % 3 else (rng.uniform(-90, 90), rng.uniform(-180, 180))
+        for number in range(count)
+    ]
+
+
+@pytest.fixture(scope="module")
+def points():
+    return random_points(2000)
+
+
+@pytest.fixture(scope="module")
+def index(points):
+    return PickupPointIndex(points, leaf_size=8)
+
+
+@pytest.mark.parametrize("point_type, payment_method", [(None, None), ("terminal", None), (None, "cash_on_receipt"), ("pickup_point", "already_paid")])
+def test_nearest_matches_brute_force(points, index, point_type, payment_method):
+    for latitude, longitude in queries(100):
+        expected = brute_force(points, latitude, longitude, point_type, payment_method)[:7]
+        found = index.nearest(latitude, longitude, limit=7, point_type=point_type, payment_method=payment_method)
+        assert [point.id for _, point in found] == [point_id for _, point_id in expected]
+        assert [distance for distance, _ in found] == pytest.approx([distance for distance, _ in expected], abs=1e-6)
+
+
+@pytest.mark.parametrize("radius_km", [0.5, 5, 50, 3000])
+def test_within_radius_matches_brute_force(points, index, radius_km):
+    for latitude, longitude in queries(100, seed=radius_km):
+        expected = [(distance, point_id) for distance, point_id in brute_force(points, latitude, longitude)
+                    if distance <= radius_km]
+        found = index.within_radius(latitude, longitude, radius_km)
+        assert [point.id for _, point in found] == [point_id for _, point_id in expected]
+        assert [distance for distance, _ in found] == pytest.approx([distance for distance, _ in expected], abs=1e-6)
+
+
+def test_filtered_radius_and_edge_cases(points, index):
+    found = index.within_radius(55.75, 37.6, 20, point_type="terminal", payment_method="already_paid")
+    assert all(point.type == "terminal" and "already_paid" in point.payment_methods for _, point in found)
+    assert index.nearest(0, 0, limit=0) == []
+    assert PickupPointIndex(()).nearest(0, 0) == []
+    assert index.get("p-42") is points[42]
+    assert index.get("missing") is None
@@ -0,0 +1,92 @@
+import string
+import sys
+from itertools import product
+
+import pytest
+
+from service.price_table import PriceTable
+
+ROUTE = ("station-1", "pvz-1")
+
+
+async def no_fetch(*args):
+    raise AssertionError("таблица не должна обращаться к API")
+
+
+def make_table(interpolate: bool = True) -> PriceTable:
+    table = PriceTable([ROUTE], [1000, 2000, 5000], no_fetch, max_age=3600, interpolate=interpolate)
+    for column, price in enumerate((100, 200, 500)):
+        assert table.store(0, column, {"pricing_total": f"{price}.00 RUB", "delivery_days": {"min": 1, "max": column + 2}})
+    return table
+
+
+def lookup(table: PriceTable, weight: int):
+    return table.lookup(ROUTE[1], ROUTE[0], weight)
+
+
+def test_numpy_is_loaded_with_first_table():
+    make_table()
+    assert "numpy" in sys.modules
+
+
+@pytest.mark.parametrize("weight, price, days_max", [(1000, "100.00 RUB", 2), (2000, "200.00 RUB", 3), (5000, "500.00 RUB", 4)])
+def test_price_at_breakpoint_is_exact(weight, price, days_max):
+    table = make_table()
+    assert lookup(table, weight) == {"delivery_days": {"min": 1, "max": days_max}, "pricing_total": price}
+    assert table.interpolated == 0
+
+
+@pytest.mark.parametrize("weight, price", [(1500, "150.00 RUB"), (1001, "100.10 RUB"), (3500, "350.00 RUB")])
+def test_price_between_breakpoints_is_interpolated(weight, price):
+    table = make_table()
+    quote = lookup(table, weight)
+    assert quote["pricing_total"] == price
+    # Сроки — верхней ступени
+    assert quote["delivery_days"]["max"] == (3 if weight <= 2000 else 4)
+    assert table.interpolated == 1
+
+
+def test_without_interpolation_upper_tier_is_used():
+    assert lookup(make_table(interpolate=False), 1500)["pricing_total"] == "200.00 RUB"
+
+
+def test_weight_below_first_tier_uses_first_tier():
+    table = make_table()
+    assert lookup(table, 1)["pricing_total"] == "100.00 RUB"
+    assert table.interpolated == 0
+
+
+def test_weight_above_last_tier_is_a_miss():
+    table = make_table()
+    assert lookup(table, 5001) is None
+    assert table.out_of_range == 1
+
+
+def test_unknown_route_and_stale_neighbour_are_misses():
+    table = make_table()
+    assert table.lookup("pvz-2", "station-1", 1500) is None
+    assert table.unknown_route == 1
+    table.loaded_at[0, 0] = 0
+    assert lookup(table, 1500) is None
+    assert lookup(table, 2000)["pricing_total"] == "200.00 RUB"
+
+
+def currency_codes(count: int) -> list:
+    return ["".join(letters) for letters in product(string.ascii_uppercase, repeat=4)][:count]
+
+
+def test_many_currencies_do_not_wrap():
+    codes = currency_codes(200)
+    table = PriceTable([("s", f"p-{row}") for row in range(200)], [1000], no_fetch)
+    for row, code in enumerate(codes):
+        assert table.store(row, 0, {"pricing_total": f"{row}.00 {code}", "delivery_days": {"min": 1, "max": 2}})
+    assert table.lookup("p-199", "s", 1000)["pricing_total"] == f"199.00 {codes[199]}"
+
+
+def test_values_outside_array_types_are_not_stored():
+    table = make_table()
+    quote = {"pricing_total": "1.00 NEW", "delivery_days": {"min": 1, "max": 2}}
+    table.currencies += currency_codes(32768 - len(table.currencies))
+    assert table.store(0, 0, quote) is False
+    assert table.store(0, 0, {"pricing_total": "1.00 RUB", "delivery_days": {"min": 1, "max": 10 ** 6}}) is False
+    assert lookup(table, 1000)["pricing_total"] == "100.00 RUB"
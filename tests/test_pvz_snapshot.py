@@ -0,0 +1,97 @@
+import asyncio
+import struct
+import time
+
+import pytest
+
+from service.pickup_points import PickupPoint, PickupPointIndex, PickupPointStore
+from service.pvz_snapshot import FORMAT_VERSION, MAGIC, PickupPointSnapshot, SnapshotError
+
+
+def make_points(count: int = 40) -> list:
+    points = [
+        PickupPoint.from_dict({
+            "id": f"пвз-{i}",
+            "type": "pickup_point" if i % 3 else None,
+            "position": {"latitude": 55.5 + i * 0.01, "longitude": 37.5 - i * 0.01},
+            "payment_methods": ["already_paid", "card_on_receipt"][:i % 3],
+            "address": {"full_address": f"Москва, ул. Ёлочная, {i}", "comment": ""},
+        }, fields=())
+        for i in range(count)
+    ]
+    # Пустые строки в полях записи
+    points.append(PickupPoint("", "", 0.0, 0.0, ("",), b"{}"))
+    return points
+
+
+def as_tuple(point: PickupPoint) -> tuple:
+    return point.id, point.type, point.latitude, point.longitude, point.payment_methods, bytes(point.data)
+
+
+def test_round_trip_keeps_points_and_tree(tmp_path):
+    index = PickupPointIndex(make_points(), leaf_size=4)
+    snapshot = PickupPointSnapshot(str(tmp_path / "pvz.bin"))
+    snapshot.write(index, 123.5)
+    restored, created_at = snapshot.read()
+    assert created_at == 123.5
+    assert restored.leaf_size == 4
+    assert [as_tuple(point) for point in restored.points] == [as_tuple(point) for point in index.points]
+    assert restored.get("пвз-7").raw["address"]["full_address"] == "Москва, ул. Ёлочная, 7"
+    assert restored.get("").type == ""
+    # Дерево из снимка дает те же ответы, что построенное заново
+    for latitude, longitude in ((55.6, 37.4), (0.0, 0.0), (-33.9, 151.2)):
+        expected = [(distance, point.id) for distance, point in index.nearest(latitude, longitude, limit=7)]
+        assert [(distance, point.id) for distance, point in restored.nearest(latitude, longitude, limit=7)] == expected
+
+
+def test_round_trip_empty_index(tmp_path):
+    snapshot = PickupPointSnapshot(str(tmp_path / "pvz.bin"))
+    snapshot.write(PickupPointIndex(()), 1.0)
+    restored, _ = snapshot.read()
+    assert len(restored) == 0
+    assert restored.nearest(55.0, 37.0) == []
+
+
+def test_truncated_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "pvz.bin"
+    PickupPointSnapshot(str(path)).write(PickupPointIndex(make_points(10)), 1.0)
+    data = path.read_bytes()
+    for size in range(len(data)):
+        path.write_bytes(data[:size])
+        with pytest.raises(SnapshotError):
+            PickupPointSnapshot(str(path)).read()
+
+
+def test_other_format_version_is_rejected(tmp_path):
+    path = tmp_path / "pvz.bin"
+    PickupPointSnapshot(str(path)).write(PickupPointIndex(make_points(3)), 1.0)
+    data = bytearray(path.read_bytes())
+    struct.pack_into("<8sH", data, 0, MAGIC, FORMAT_VERSION + 1)
+    path.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError, match="версия"):
+        PickupPointSnapshot(str(path)).read()
+
+
+def test_corrupt_snapshot_is_not_restored(tmp_path):
+    path = tmp_path / "pvz.bin"
+    PickupPointSnapshot(str(path)).write(PickupPointIndex(make_points(3)), 1.0)
+    path.write_bytes(path.read_bytes()[:200])
+    store = PickupPointStore(PickupPointSnapshot(str(path)))
+    assert store.restore() is False
+    assert not store.loaded
+
+
+@pytest.mark.parametrize("age, reloaded", [(10, False), (1000, True)])
+def test_stale_snapshot_is_reloaded_from_api(tmp_path, age, reloaded):
+    path = str(tmp_path / "pvz.bin")
+    PickupPointSnapshot(path).write(PickupPointIndex(make_points(3)), time.time() - age)
+    store = PickupPointStore(PickupPointSnapshot(path))
+    fetched = []
+
+    def fetch():
+        fetched.append(True)
+        return [{"id": "new", "position": {"latitude": 1.0, "longitude": 2.0}}]
+
+    asyncio.run(store.sync(fetch, max_age=100))
+    assert bool(fetched) is reloaded
+    assert (store.index.get("new") is not None) is reloaded
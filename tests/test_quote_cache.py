@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from service.calculation_module import Calculate
+from service.quote_cache import QuoteCache
+from tests.conftest import HOST
+
+
+def quoting(upstream, cache: QuoteCache, delay: float = 0.0):
+    """
+    Calculate поверх mock-API, который считает запросы и отвечает с задержкой delay
+    """
+    weights = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        weights.append(body["total_weight"])
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={"delivery_days": 2, "pricing_total": f"{len(weights)}00 RUB"})
+
+    client = upstream(handler)
+    return Calculate("test", HOST, client=client, quote_cache=cache), client, weights
+
+
+def test_concurrent_misses_load_once(upstream):
+    async def scenario():
+        cache = QuoteCache(ttl=60, max_size=100)
+        service, client, weights = quoting(upstream, cache, delay=0.05)
+        quotes = await asyncio.gather(*(service.calculate_delivery("pvz-1", "wh-1", 700) for _ in range(20)))
+        await client.aclose()
+        return cache, quotes, weights
+
+    cache, quotes, weights = asyncio.run(scenario())
+    assert weights == [700]
+    assert quotes == [{"delivery_days": 2, "pricing_total": "100 RUB"}] * 20
+    assert cache.snapshot()["misses"] == 1
+
+
+def test_different_keys_load_separately(upstream):
+    async def scenario():
+        cache = QuoteCache(ttl=60, max_size=100)
+        service, client, weights = quoting(upstream, cache, delay=0.01)
+        await asyncio.gather(
+            service.calculate_delivery("pvz-1", "wh-1", 700),
+            service.calculate_delivery("pvz-2", "wh-1", 700),
+            service.calculate_delivery("pvz-1", "wh-1", 700),
+        )
+        await client.aclose()
+        return weights
+
+    assert len(asyncio.run(scenario())) == 2
+
+
+def test_entry_expires_after_ttl(upstream):
+    async def scenario():
+        cache = QuoteCache(ttl=0.05, max_size=100)
+        service, client, weights = quoting(upstream, cache)
+        first = await service.calculate_delivery("pvz-1", "wh-1", 700)
+        cached = await service.calculate_delivery("pvz-1", "wh-1", 700)
+        await asyncio.sleep(0.1)
+        expired = await service.calculate_delivery("pvz-1", "wh-1", 700)
+        await client.aclose()
+        return first, cached, expired, weights
+
+    first, cached, expired, weights = asyncio.run(scenario())
+    assert first == cached == {"delivery_days": 2, "pricing_total": "100 RUB"}
+    assert expired["pricing_total"] == "200 RUB"
+    assert len(weights) == 2
+
+
+def test_failed_load_is_not_cached(upstream):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(400, json={"message": "bad station"})
+        return httpx.Response(200, json={"delivery_days": 1, "pricing_total": "50 RUB"})
+
+    async def scenario():
+        client = upstream(handler)
+        service = Calculate("test", HOST, client=client, quote_cache=QuoteCache(ttl=60, max_size=100))
+        with pytest.raises(httpx.HTTPStatusError):
+            await service.calculate_delivery("pvz-1", "wh-1", 700)
+        quote = await service.calculate_delivery("pvz-1", "wh-1", 700)
+        await client.aclose()
+        return quote
+
+    assert asyncio.run(scenario())["pricing_total"] == "50 RUB"
+    assert len(calls) == 2
+
+
+def test_weights_share_tier_entry(upstream):
+    async def scenario():
+        cache = QuoteCache(ttl=60, max_size=100, weight_tiers=(500, 1000, 5000))
+        service, client, weights = quoting(upstream, cache)
+        for weight in (501, 999, 1000):
+            await service.calculate_delivery("pvz-1", "wh-1", weight)
+        await service.calculate_delivery("pvz-1", "wh-1", 7000)
+        await client.aclose()
+        return weights
+
+    assert asyncio.run(scenario()) == [1000, 7000]
+
+
+def test_returned_quote_is_a_copy(upstream):
+    async def scenario():
+        cache = QuoteCache(ttl=60, max_size=100)
+        service, client, _ = quoting(upstream, cache)
+        quote = await service.calculate_delivery("pvz-1", "wh-1", 700)
+        quote["pricing_total"] = "0 RUB"
+        again = await service.calculate_delivery("pvz-1", "wh-1", 700)
+        await client.aclose()
+        return again
+
+    assert asyncio.run(scenario())["pricing_total"] == "100 RUB"
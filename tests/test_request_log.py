@@ -0,0 +1,91 @@
+import asyncio
+import json
+import threading
+
+import httpx
+from fastapi import FastAPI
+
+from service.request_log import RequestLog, RequestLogMiddleware
+
+
+def read_lines(path) -> list:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_file_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    write = RequestLog._write
+
+    def recording_write(self, batch):
+        threads.append(threading.get_ident())
+        write(self, batch)
+
+    monkeypatch.setattr(RequestLog, "_write", recording_write)
+
+    async def scenario():
+        log = RequestLog(str(tmp_path / "requests.jsonl"))
+        log.start()
+        for number in range(50):
+            log.write({"n": number})
+        await asyncio.sleep(0)
+        log.write({"n": 50})
+        await log.stop()
+        return log
+
+    log = asyncio.run(scenario())
+    assert [entry["n"] for entry in read_lines(tmp_path / "requests.jsonl")] == list(range(51))
+    assert log.records == 51
+    assert threads and threading.get_ident() not in threads
+
+
+def test_full_buffer_drops_new_entries(tmp_path):
+    async def scenario():
+        log = RequestLog(str(tmp_path / "requests.jsonl"), max_pending=3)
+        log.start()
+        for number in range(5):
+            log.write({"n": number})
+        await log.stop()
+        log.write({"n": 5})
+        return log
+
+    log = asyncio.run(scenario())
+    assert [entry["n"] for entry in read_lines(tmp_path / "requests.jsonl")] == [0, 1, 2]
+    assert (log.records, log.dropped) == (3, 3)
+
+
+def test_write_error_does_not_stop_writer(tmp_path):
+    async def scenario():
+        # Каталог вместо файла: open падает, но запросы продолжают обслуживаться
+        log = RequestLog(str(tmp_path))
+        log.start()
+        log.write({"n": 0})
+        await asyncio.sleep(0.05)
+        log.write({"n": 1})
+        await log.stop()
+        return log
+
+    log = asyncio.run(scenario())
+    assert (log.records, log.errors) == (0, 2)
+
+
+def test_middleware_logs_requests(tmp_path):
+    app = FastAPI()
+    app.add_middleware(RequestLogMiddleware)
+
+    @app.post("/echo")
+    async def echo(payload: dict):
+        return payload
+
+    async def scenario():
+        app.state.request_log = RequestLog(str(tmp_path / "requests.jsonl"), max_body=16)
+        app.state.request_log.start()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+            await client.post("/echo?x=1", json={"a": 1})
+            await client.post("/echo", json={"a": "x" * 32})
+        await app.state.request_log.stop()
+
+    asyncio.run(scenario())
+    short, long = read_lines(tmp_path / "requests.jsonl")
+    assert short["method"] == "POST" and short["path"] == "/echo" and short["query"] == "x=1"
+    assert short["body"] == '{"a":1}' and short["status"] == 200 and short["route"] == "/echo"
+    assert long["body_truncated"] is True and "body" not in long
@@ -0,0 +1,27 @@
+import pytest
+from pydantic import ValidationError
+
+from src import consts as c
+from schemas.Order_info_model import BulkOrderInfoRequest
+from schemas.Pricing_model import PricingMatrixRequest
+
+MATRIX = {"sources": ["wh-1"], "destinations": ["pvz-1"], "weights": [1000]}
+
+
+@pytest.mark.parametrize("concurrency", [None, 1, c.PRICING_BATCH_MAX_CONCURRENCY])
+def test_concurrency_within_bounds_is_accepted(concurrency):
+    assert PricingMatrixRequest(**MATRIX, concurrency=concurrency).concurrency == concurrency
+
+
+@pytest.mark.parametrize("concurrency", [0, c.PRICING_BATCH_MAX_CONCURRENCY + 1, 10 ** 9])
+def test_concurrency_out_of_bounds_is_rejected(concurrency):
+    with pytest.raises(ValidationError, match="concurrency"):
+        PricingMatrixRequest(**MATRIX, concurrency=concurrency)
+
+
+def test_bulk_order_info_concurrency_is_capped():
+    orders = [{"request_id": "r-1"}]
+    assert BulkOrderInfoRequest(orders=orders, concurrency=c.ORDER_INFO_BULK_MAX_CONCURRENCY).concurrency \
+        == c.ORDER_INFO_BULK_MAX_CONCURRENCY
+    with pytest.raises(ValidationError, match="concurrency"):
+        BulkOrderInfoRequest(orders=orders, concurrency=c.ORDER_INFO_BULK_MAX_CONCURRENCY + 1)
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from service.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, UpstreamPolicy
+
+
+class CountingAPI():
+    """
+    Имитация API: коды ответов берутся из списка по порядку, потом — 200
+    """
+    def __init__(self, statuses=(), headers=None):
+        self.statuses = list(statuses)
+        self.headers = headers or {}
+        self.sent = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.sent += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        return httpx.Response(status, headers=self.headers if status != 200 else None)
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("/x", failure_threshold=3, recovery_time=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert 0 < error.value.retry_in <= 60
+    assert breaker.rejected == 1
+
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker("/x", failure_threshold=2, recovery_time=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker("/x", failure_threshold=1, recovery_time=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Пока пробный запрос не завершен, остальные отклоняются
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_breaker_failed_trial_reopens():
+    breaker = CircuitBreaker("/x", failure_threshold=5, recovery_time=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_open_breaker_stops_requests_to_api(upstream):
+    api = CountingAPI([503] * 10)
+    policy = UpstreamPolicy(failure_threshold=2, recovery_time=60)
+    client = upstream(api, policy)
+
+    async def scenario():
+        outcomes = []
+        for _ in range(4):
+            try:
+                await client.request("GET", "/request/info", idempotent=True)
+            except (httpx.HTTPStatusError, CircuitOpenError) as exc:
+                outcomes.append(type(exc).__name__)
+        await client.aclose()
+        return outcomes
+
+    outcomes = asyncio.run(scenario())
+    assert outcomes == ["HTTPStatusError", "HTTPStatusError", "CircuitOpenError", "CircuitOpenError"]
+    assert api.sent == 2
+
+
+def test_idempotent_request_is_retried(upstream):
+    api = CountingAPI([503, 502])
+    policy = UpstreamPolicy(retry=RetryPolicy(3, 0, 0, 1))
+    client = upstream(api, policy)
+
+    async def scenario():
+        response = await client.request("GET", "/request/info", idempotent=True)
+        await client.aclose()
+        return response
+
+    assert asyncio.run(scenario()).status_code == 200
+    assert (api.sent, policy.retries) == (3, 2)
+
+
+def test_non_idempotent_request_is_retried_only_on_429(upstream):
+    api = CountingAPI([429, 503])
+    policy = UpstreamPolicy(retry=RetryPolicy(3, 0, 0, 1))
+    client = upstream(api, policy)
+
+    async def scenario():
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            await client.request("POST", "/request/create")
+        await client.aclose()
+        return error.value.response.status_code
+
+    # 429 — запрос не обработан, повтор безопасен; 503 после отправки — нет
+    assert asyncio.run(scenario()) == 503
+    assert api.sent == 2
+
+
+def test_long_retry_after_is_not_waited(upstream):
+    api = CountingAPI([503], headers={"Retry-After": "120"})
+    policy = UpstreamPolicy(retry=RetryPolicy(3, 0, 0, max_retry_after=5))
+    client = upstream(api, policy)
+
+    async def scenario():
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.request("GET", "/request/info", idempotent=True)
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert api.sent == 1
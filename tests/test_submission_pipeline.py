@@ -0,0 +1,184 @@
+import asyncio
+
+import httpx
+
+from service.Creating_order import CreatingOrder
+from service.creating_draft import DraftDelivery
+from service.order_confirmation import GetInfoAboutDraft, OrderConfirmation
+from service.submission_pipeline import (
+    STATE_DONE, STATE_FAILED, STATE_QUEUED, OrderSubmission, SubmissionPipeline, SubmissionResult)
+from tests.conftest import HOST
+
+
+def make_order(operator_request_id: str = "order-1") -> OrderSubmission:
+    return OrderSubmission(
+        operator_request_id=operator_request_id,
+        source={
+            "platform_station_id": "station-1",
+            "interval_utc": {"start_utc": "2030-01-01T10:00:00+00:00", "end_utc": "2030-01-01T12:00:00+00:00"},
+        },
+        destination="pvz-1",
+        items=[{
+            "article": "ART-1",
+            "billing_details": {"assessed_unit_price": 150000, "unit_price": 150000, "nds": 20},
+            "count": 1,
+            "name": "Товар",
+            "place_barcode": "BOX-1",
+            "physical_dims": {"dx": 20, "dy": 10, "dz": 15, "weight_gross": 700},
+        }],
+        contact={"name": "Иван", "first_name": "Иван", "phone": "+79990000000", "email": "user@example.com"},
+        barcode="BOX-1",
+    )
+
+
+def make_pipeline(upstream, handler, **kwargs) -> SubmissionPipeline:
+    client = upstream(handler)
+    return SubmissionPipeline(
+        CreatingOrder("test", HOST, client=client),
+        DraftDelivery("test", HOST, client=client),
+        OrderConfirmation("test", HOST, client=client),
+        GetInfoAboutDraft("test", HOST, client=client),
+        workers=2,
+        **kwargs)
+
+
+async def submit_and_wait(pipeline: SubmissionPipeline, order: OrderSubmission) -> SubmissionResult:
+    result = await pipeline.submit(order)
+    await pipeline.wait([result], timeout=5)
+    return result
+
+
+def test_repeated_submission_creates_one_order(upstream):
+    created = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        created.append(request.url.path)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"request_id": "r-1"})
+
+    async def scenario():
+        pipeline = make_pipeline(upstream, handler)
+        pipeline.start()
+        first = await pipeline.submit(make_order())
+        second = await pipeline.submit(make_order())
+        await pipeline.wait([first], timeout=5)
+        third = await pipeline.submit(make_order())
+        await pipeline.stop()
+        return first, second, third, pipeline.deduplicated
+
+    first, second, third, deduplicated = asyncio.run(scenario())
+    assert first is second is third
+    assert (first.state, first.request_id) == (STATE_DONE, "r-1")
+    assert deduplicated == 2
+    assert created == ["/request/create"]
+
+
+def test_ambiguous_failure_is_reconciled_instead_of_resent(upstream):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/request/create":
+            return httpx.Response(502)
+        assert request.url.params["request_code"] == "order-1"
+        return httpx.Response(200, json={"request_id": "r-created"})
+
+    async def scenario():
+        pipeline = make_pipeline(upstream, handler)
+        pipeline.start()
+        failed = await submit_and_wait(pipeline, make_order())
+        state, ambiguous = failed.state, failed.ambiguous
+        retried = await pipeline.submit(make_order())
+        await pipeline.stop()
+        return state, ambiguous, retried, pipeline.reconciled
+
+    state, ambiguous, retried, reconciled = asyncio.run(scenario())
+    # 502 на создание: заказ мог быть создан, поэтому повтор сначала ищет его в API
+    assert (state, ambiguous) == (STATE_FAILED, True)
+    assert (retried.state, retried.request_id) == (STATE_DONE, "r-created")
+    assert reconciled == 1
+    assert calls == ["/request/create", "/request/info"]
+
+
+def test_ambiguous_failure_is_resent_when_order_not_found(upstream):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/request/info":
+            return httpx.Response(404)
+        if calls.count("/request/create") == 1:
+            return httpx.Response(500)
+        return httpx.Response(200, json={"request_id": "r-2"})
+
+    async def scenario():
+        pipeline = make_pipeline(upstream, handler)
+        pipeline.start()
+        await submit_and_wait(pipeline, make_order())
+        result = await submit_and_wait(pipeline, make_order())
+        await pipeline.stop()
+        return result
+
+    result = asyncio.run(scenario())
+    assert (result.state, result.request_id, result.attempts) == (STATE_DONE, "r-2", 2)
+    assert calls == ["/request/create", "/request/info", "/request/create"]
+
+
+def test_connection_error_is_resent_without_lookup(upstream):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"request_id": "r-3"})
+
+    async def scenario():
+        pipeline = make_pipeline(upstream, handler)
+        pipeline.start()
+        failed = await submit_and_wait(pipeline, make_order())
+        ambiguous = failed.ambiguous
+        result = await submit_and_wait(pipeline, make_order())
+        await pipeline.stop()
+        return ambiguous, result
+
+    ambiguous, result = asyncio.run(scenario())
+    assert ambiguous is False
+    assert (result.state, result.request_id) == (STATE_DONE, "r-3")
+    assert calls == ["/request/create", "/request/create"]
+
+
+def test_finished_results_are_evicted_behind_unfinished(upstream):
+    pipeline = make_pipeline(upstream, lambda request: httpx.Response(200), max_results=3)
+    pipeline._remember(SubmissionResult("queued-1", "request", state=STATE_QUEUED))
+    for index in range(10):
+        pipeline._remember(SubmissionResult(f"done-{index}", "request", state=STATE_DONE))
+    assert list(pipeline.results) == ["queued-1", "done-8", "done-9"]
+
+
+def test_concurrent_retries_after_ambiguous_failure_create_one_order(upstream):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/request/info":
+            await asyncio.sleep(0.05)
+            return httpx.Response(404)
+        if calls.count("/request/create") == 1:
+            return httpx.Response(502)
+        return httpx.Response(200, json={"request_id": "r-4"})
+
+    async def scenario():
+        pipeline = make_pipeline(upstream, handler)
+        pipeline.start()
+        await submit_and_wait(pipeline, make_order())
+        first, second = await asyncio.gather(pipeline.submit(make_order()), pipeline.submit(make_order()))
+        await pipeline.wait([first], timeout=5)
+        await pipeline.stop()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert (first.state, first.request_id) == (STATE_DONE, "r-4")
+    # Второй повтор пришел, пока первый искал заказ в API: заказ отправлен один раз
+    assert calls == ["/request/create", "/request/info", "/request/create"]
@@ -0,0 +1,34 @@
+import asyncio
+
+import httpx
+
+from src import consts as c
+from service.cache import CachedLoader
+from service.tenants import TenantServices
+
+
+def test_test_tenant_calls_test_endpoints(monkeypatch, upstream):
+    monkeypatch.setattr(c, "test_Getting_information_about_the_application", "/sandbox/request/info")
+    monkeypatch.setattr(c, "test_Cancellation_of_the_application", "/sandbox/request/cancel")
+    c.endpoints.cache_clear()
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        return httpx.Response(200, json={"request_id": "r-1", "status": "CANCELLED"})
+
+    async def scenario():
+        client = upstream(handler)
+        for test in (True, False):
+            services = TenantServices(
+                "shop", client, quote_cache=None, order_lookups=CachedLoader(0, 0), pickup_points=None,
+                pvz_cache=None, interval_cache=None, intervals=None, test=test)
+            await services.info.get_info_about_draft(request_id="r-1")
+            await services.confirmation.cancel_order("r-1")
+        await client.aclose()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        c.endpoints.cache_clear()
+    assert seen == ["/sandbox/request/info", "/sandbox/request/cancel", "/request/info", "/request/cancel"]